@@ -84,7 +84,10 @@ ARCHITEKTÚRA KOMPONENSEK
    --------
    - ACTIVE_PROCESSES_LOCK: Futó subprocess-ek listájához
    - VMAF_LOCK: VMAF/PSNR worker koordinációhoz
-   - CPU_WORKER_LOCK: SVT és VMAF közös CPU használat korlátozásához
+   - CORE_SCHEDULER: SVT, VMAF és hang szerkesztés közös CPU mag kerete (CoreBudgetScheduler)
+     * Linuxon konkrét, diszjunkt CPU halmazt is kioszt (NUMA node-on belül, ha elfér)
+     * child_process_kwargs(): saját session (start_new_session); apply_process_placement(process, job):
+       indítás után a szülőből nice/ionice (PROCESS_PRIORITY_PROFILES) + CPU affinitás; set_low_priority a worker szál nice értékét emeli (a GUI szálét nem)
    - db_lock: Adatbázis műveletek szinkronizálása
 
 
@@ -303,9 +306,9 @@ KÓDOLÁSI WORKFLOW
         * VMAF/PSNR mérés indítása (ha auto_vmaf_psnr enabled)
       
    d) CPU worker koordináció:
-      - CPU_WORKER_LOCK használata
-      - SVT és VMAF NEM futhat egyszerre (CPU)
-      - Várakozás ha CPU worker aktív
+      - CORE_SCHEDULER mag keret (CoreBudgetScheduler)
+      - SVT és VMAF párhuzamosan fut, ha a szabad magok elegendők
+      - Várakozás, ha kevesebb a szabad mag a feladat minimumánál
 
 
 6. NVENC WORKER (nvenc_worker)
@@ -323,11 +326,33 @@ KÓDOLÁSI WORKFLOW
       - Várakozás új feladatra vagy stop jelre
       
    b) CQ meghatározás:
-      - Ha "auto" mode: ab-av1 crf-search futtatása
+      - Ha "auto" mode: CRF keresés (CRF_SEARCH_ENGINE)
+        * crf_search_results cache: azonos forrás ujjlenyomat + encoder + preset + engine
+          opciók + cél VMAF + max méret% esetén az eredmény azonnal, keresés nélkül
+          (a CRF→VMAF minta görbe is megmarad a crf_search_samples táblában)
+        * CRF_PREDICTOR: a korábbi kódolások (videos tábla CQ/VMAF + probe_cache forrás jellemzők)
+          legközelebbi szomszédaiból becsült CRF → szűk keresési ablak (natív kezdő CRF + tartomány,
+          ab-av1 --min-crf/--max-crf); ablakon kívüli válasznál teljes tartomány ugyanazzal a céllal;
+          sok egybehangzó szomszédnál a keresés kimarad (a VMAF ekkor becslés, '≈' jelöli, és a kimenet
+          teljes VMAF mérése ellenőrzi - crf_predictor_skips). Találati arány és megtakarított idő a logban
+          (crf_predictor_stats)
+        * SKIP_ENCODE_PREDICTOR: várhatóan nem zsugorodó forrás (saját mért görbe, hasonló korábbi
+          források másolt aránya, hatékony codec alacsony bit/pixel/frame értékkel) → keresés és
+          kódolás nélkül: NVENC → SVT queue, SVT → NoSuitableCRFFound → másolás. Kihagyott fájlok
+          és megspórolt kódolási idő a logban (skip_encode_stats, mért kódolási sebességből)
+        * native (NativeCrfSearch): minta klipek egyszer kivágva (kulcskockás stream copy,
+          NATIVE_CRF_SAMPLE_CACHE_DIR), párhuzamos minta kódolás (NVENC session / SVT magok)
+          és libvmaf, következő CRF a CRF→VMAF görbe szelőjéből; hibánál ab-av1
+        * --benchmark-crf-search <fájlok>: natív vs. ab-av1 idő és eredmény összevetés (a GUI-val azonos
+          save.db és felismert eszköz útvonalak; az engine sorrend fájlonként váltakozik)
+      - ab-av1 crf-search futtatása:
         * --min-vmaf parameter
         * --max-encoded-percent parameter
         * Sample encode (gyors becslés)
         * Eredmény: optimális CQ érték
+        * VMAF fallback: a minták (crf → VMAF, méret%) fájlonként megmaradnak (CRF_SAMPLES),
+          alacsonyabb célnál a mért görbéből választ, új keresés csak a nem próbált
+          CRF tartományra (--min-crf / --max-crf)
       - Ha "manual" mode: előre megadott CQ használata
       
    c) Kódolás:
@@ -366,8 +391,11 @@ KÓDOLÁSI WORKFLOW
    e) Eredmény: vissza coordinator-nak
    
    KÜLÖNBSÉGEK NVENC-től:
-   - CPU_WORKER_LOCK használata (VMAF-fel megosztva)
-   - Csak 1 példány futhat (CPU korlátozás)
+   - CORE_SCHEDULER mag keret (VMAF-fel megosztva): SVT_ENCODE_CORES kívánt,
+     SVT_ENCODE_MIN_CORES minimum; a CRF keresés és a kódolás külön foglal (közöttük a
+     magok a VMAF/PSNR workereké). A magszámot a CPU affinitás korlátozza; az SVT lp
+     paraméter szint (1-6), a svt_lp_for_cores() képezi le (-svtav1-params / ab-av1 --svt lp=N)
+   - Csak 1 példány futhat (SVT_QUEUE)
    - Lassabb, de univerzális (nincs GPU szükség)
    - Preset beállítás (0-13, alapértelmezett: 2)
 
@@ -384,12 +412,51 @@ KÓDOLÁSI WORKFLOW
    a) Queue figyelés:
       - VMAF_QUEUE.get(timeout=5)
       - Csak kész videók (completed státusz)
+      - Batch pipeline (VMAF_PREFETCH_LOOKAHEAD): a következő párok előkészítése háttér szálon
+        (VmafPrefetcher: posix_fadvise WILLNEED / fej beolvasás, probe, már ismert ujjlenyomat betöltése -
+        teljes hash nem fut, hogy ne versenyezzen a mérés dekóderével a NAS I/O-ért)
       
    b) Mérési mód eldöntése:
-      - ab-av1 preferred (gyorsabb):
-        * ab-av1 vmaf --reference --distorted
-        * Progress bar ab-av1 kimenetből
-        * VMAF + xPSNR együtt
+      - Metrika cache (METRIC_CACHE, metric_cache tábla) - mérés előtt:
+        * Kulcs: (forrás ujjlenyomat, kódolt ujjlenyomat, metrika, VMAF modell / PSNR változat, METRIC_CACHE_OPTIONS)
+        * Ujjlenyomat: sha256 a video stream packetekből (ffmpeg -c copy -f hash, dekódolás nélkül)
+        * Mérés előtt csak ismert ujjlenyomat számít (nincs hash); új eredmény hash-elése és mentése
+          halasztva, üres VMAF_QUEUE mellett (METRIC_CACHE.store_when_idle)
+        * Stat (size, mtime_ns, inode) változatlan → nincs hash; Settings tag átírás után carry_forward
+        * Találat: érték dekódolás és mag foglalás nélkül
+      - Inline metrikák (opt-in "Inline metrikák kódolás közben" checkbox + INLINE_METRICS_ENABLED,
+        ffmpeg 7+ loopback dekóder):
+        * A kódoló ffmpeg a már dekódolt forrás frame-eket és a kódolt stream visszadekódolt
+          példányát ([dec:0]) libvmaf + XPSNR/PSNR filterekbe is küldi (külön null kimenet)
+        * Csak az első (CRF keresés szerinti) próbálkozás mér, és csak elfogadott kimenet kerül a cache-be
+        * libvmaf szálak a CORE_SCHEDULER keretéből, várakozás nélkül (nincs szabad keret → nincs inline)
+        * A forrás ujjlenyomat ugyanebben a folyamatban (hash kimenet) → nincs újraolvasás
+        * Eredmény a metrika cache-be → az utána sorba kerülő teszt cache találat
+      - Gyors mód (task['sampled'] - jobb klikk / "Gyors (mintavételes) mérés" checkbox):
+        * VMAF_SAMPLE_CLIPS × VMAF_SAMPLE_SECONDS klip, sávonként egy (rétegzett véletlen)
+        * Becslés + 95% konfidencia intervallum a klip átlagokból (Student-t)
+        * Ha az intervallum átfedi a min VMAF-ot (VMAF_SAMPLE_ESCALATE): teljes mérés
+        * A becslés NEM kerül a Settings metadata-ba (Actual VMAF csak teljes mérésből)
+        * Táblázatban / adatbázisban '≈' előtaggal; PSNR: libvmaf psnr_y ('PSNR_Y')
+        * Becslés + CI a sampled_metric_estimates táblában (store_sampled_estimate / load_sampled_estimate)
+      - Hosszú videó (≥ 2 × VMAF_SEGMENT_MIN_SECONDS): szegmentált VMAF
+        * kulcskockához igazított -ss/-t darabok párhuzamos libvmaf folyamatokban
+        * METRIC_CORE_BUDGET mag keret: legfeljebb budget / VMAF_SEGMENT_THREADS folyamat, a keret
+          köztük egyenlően elosztva (folyamatonként ≥ VMAF_SEGMENT_THREADS libvmaf szál)
+        * PSNR: ugyanaz a változat, mint egy folyamatnál (xpsnr / psnr filter ág stats_file-lal,
+          a szegmensek per-frame értékei az ffmpeg összegzésével poolozva)
+        * per-frame JSON log → pontos pooled mean / harmonic mean / percentilisek
+        * Hiba vagy frame szám eltérés esetén egy folyamatos számítás
+      - Metrika engine-ek (MetricEngine, METRIC_ENGINES registry):
+        * ffmpeg: split → libvmaf + xpsnr/psnr + ssim, mindkét bemenet egyszer dekódolva
+        * ab-av1: vmaf / xpsnr alparancsok (metrikánként külön futás)
+        * numpy: PSNR (luma) / SSIM két ffmpeg rawvideo pipe-ból, vektorizálva
+        * Áteresztőképesség: pixel/s EWMA (engine, metrika) kulccsal, metric_engine_stats tábla
+        * Választás: lefedett metrikák × várható frame/s; hiba esetén a következő engine
+        * Felderítés: még nem mért engine egyszer, és minden METRIC_ENGINE_EXPLORE_INTERVAL. választás
+          a legkevesebbet futott alternatívára esik (a default_fps becslés nem dönt véglegesen)
+        * XPSNR-t mérő engine hiányában/hibájánál PSNR (luma) helyettesítő - pl. a NumPy engine
+        * Progress: 'abav1_progress' payload (metric='VMAF+XPSNR', metrics lista)
       - Fallback: ffmpeg-libvmaf
         * ffmpeg -lavfi libvmaf
         * Lassabb, de univerzális
@@ -402,13 +469,20 @@ KÓDOLÁSI WORKFLOW
    d) Eredmény feldolgozás:
       - VMAF érték Settings metadata-ba
       - PSNR érték Settings metadata-ba
+      - Per-frame pontszámok (libvmaf JSON log) → frame_metrics tábla (save.db)
+        * zlib-tömörített float32 tömb fájlonként + mean/harmonic mean/1%/5% low/min
+        * Legrosszabb FRAME_METRICS_WORST_WINDOW_SECONDS hosszú szakaszok (worst_json)
+        * load_frame_metrics / query_frame_metric_lows: lekérdezés újramérés nélkül,
+          csak egyező (size, mtime_ns, inode) azonosítóval; Settings tag írás után
+          carry_forward_frame_metrics() viszi tovább
+        * Jobb klikk → VMAF/PSNR ellenőrzés → tárolt per-frame log / leggyengébb tárolt logok
       - Tree frissítése: vmaf, psnr oszlopok
       - tree_item_data frissítése
       
    e) CPU koordináció:
-      - CPU_WORKER_LOCK használata
-      - SVT-vel megosztott CPU használat
-      - Csak 1 CPU-intenzív task egyszerre
+      - CORE_SCHEDULER: METRIC_CORE_BUDGET kívánt, METRIC_MIN_CORES minimum mag
+      - A kiosztott magszám a libvmaf n_threads értéke (szegmentált: folyamatok × szálak)
+      - SVT-vel párhuzamosan fut, ha a keret engedi
 
 
 ================================================================================
@@ -631,10 +705,30 @@ OPTIMALIZÁCIÓK ÉS TELJESÍTMÉNY
        - Tree data cache (parse-olás elkerülése)
        
     c) FFprobe cache:
+       - probe_media(): fájlonként EGYETLEN ffprobe (-show_format -show_streams),
+         a ProbeResult-ból olvas minden helper (duration, fps, felbontás, hangsávok)
+       - read_container_header(): natív MKV (EBML) / MP4 fejléc olvasó metaadat-only
+         lekérdezésekhez (get_output_file_info, Settings tag) - ffprobe csak fallback
+       - update_matroska_tag_inplace(): VMAF/PSNR Settings frissítés remux nélkül
+         (helyben / Void padding terhére / új Tags a fájl végén + SeekHead átlinkelés)
+       - reserve_matroska_tag_space(): kódolás / audio szerkesztés után Void padding
+         a Settings tag mögé → a későbbi tag frissítések O(1) helyben írások
+       - count_video_frames(): NUMBER_OF_FRAMES tag → konténer nb_frames →
+         ffprobe -count_packets (csak demux) → becslés; validáció soha nem dekódol végig
+       - PROBE_CACHE: in-memory LRU + probe_cache tábla (save.db), kulcs: útvonal,
+         érvényesség: (size, mtime_ns, inode) → változatlan fájlra nincs újabb ffprobe
+       - TOOL_CAPABILITIES: ffmpeg encoderek/filterek/libvmaf feature-ök, ab-av1 verzió,
+         nvidia-smi GPU és program helyek cache-e (bináris útvonal + méret + mtime,
+         tool_capabilities tábla) → változatlan binárisnál nincs felderítő subprocess
+       - ProbeScheduler: betöltéskor eszközönként (st_dev) AIMD párhuzamosság a mért
+         probe latencia alapján (NVMe: 32+, NAS: néhány), státuszsorban probe/s
        - Hidegindítás: betöltéskor 1x probolás
        - Tree item data tárolása (parse-olás elkerülése)
        - Stat cache (file size/mtime)
        - Melegindítás: csak ha változott a fájl
+       - get_output_files_info_batch(): melegindításkor a módosult kimenetek egy cél
+         könyvtár scan + fájlonként egyetlen fejléc olvasás alapján, a DB visszaírás
+         egyetlen tranzakció (update_output_info_batch_in_db)
        
     d) GUI frissítések:
        - Debouncing (ne minden üzenet külön)
@@ -703,7 +797,7 @@ FONTOSABB MEGJEGYZÉSEK
     - Batch INSERT gyorsabb, mint egyesével (1000 videó per batch)
     - WAL checkpoint biztosítja, hogy a journal fájl törlődik
     - Progress callback gyakran hívódik, hogy lássuk a haladást
-    - CPU_WORKER_LOCK garantálja: SVT és VMAF NEM fut egyszerre
+    - CORE_SCHEDULER: SVT és VMAF együtt sem foglal több magot a keretnél
     - STOP_EVENT thread-safe leállítást biztosít
     - tree_item_data cache csökkenti a parse/probe műveletek számát
     - Console logging thread-safe (ConsoleLogger + STDOUT_ROUTER)
@@ -732,16 +826,22 @@ from tkinter import ttk, filedialog, messagebox
 import threading
 import queue
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
 from tkinter import scrolledtext
-from contextlib import contextmanager
+from contextlib import contextmanager, nullcontext
+from collections import OrderedDict, deque
 import ctypes
 import sqlite3
 import json  # FFprobe JSON kimenetéhez szükséges
+import struct  # Natív konténer (EBML/MP4) fejléc olvasáshoz
+import zlib  # Matroska CRC-32 újraszámolás tag frissítéskor
+import hashlib  # Natív CRF keresés minta cache könyvtár neve
+import abc  # Metrika engine közös interfész
 from datetime import datetime
 import locale
 import multiprocessing
 import traceback
+import bisect
 from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
 
 # Windows CPU prioritás beállítás
@@ -765,8 +865,14 @@ if platform.system() == 'Windows':
             pass
 else:
     def set_low_priority():
-        """Nem-Windows rendszerek esetén nem csinál semmit"""
-        pass
+        """A hívó worker szál nice értékét emeli (Linuxon a nice szálanként érvényes, a GUI szál nem változik)"""
+        native_id = getattr(threading, 'get_native_id', None)
+        if platform.system() != 'Linux' or native_id is None:
+            return
+        try:
+            os.setpriority(os.PRIO_PROCESS, native_id(), WORKER_THREAD_NICE)
+        except (OSError, AttributeError):
+            pass
 
 # Gyerekfolyamatok leállításához használt segédfüggvény
 def terminate_process_tree(process):
@@ -810,9 +916,88 @@ CURRENT_LANGUAGE = 'hu'  # 'hu' vagy 'en'
 # Frame/size/duration ellenőrzés toleranciái
 FRAME_MISMATCH_RATIO = 0.005  # 0.5% eltérésig toleráns
 FRAME_MISMATCH_MIN_DIFF = 5   # Minimum 5 frame különbség szükséges riasztáshoz
+FRAME_COUNT_PACKET_TIMEOUT = 900  # ffprobe -count_packets timeout (csak demux, nagy fájlon is I/O-kötött)
+LAST_FRAME_TAIL_SECONDS = 10  # Utolsó frame export: csak a fájl utolsó N másodpercét dekódoljuk
 SIZE_MISMATCH_RATIO = 0.12    # 12%-nál kisebb végső méret gyanús
 DURATION_MISMATCH_RATIO = 0.95  # <95% hossz esetén gyanús
 
+# CPU mag ütemező konstansok (CORE_SCHEDULER - SVT-AV1, VMAF/PSNR és hang szerkesztés közös kerete)
+CPU_CORE_BUDGET = 0  # Az ütemező által kiosztható logikai magok száma (0 = összes mag)
+SVT_ENCODE_CORES = 12  # SVT-AV1 kódolás kívánt magszáma (lp szintre képezve, lásd SVT_LP_LEVEL_CORES; 0 = összes mag)
+# SVT-AV1 2.x: az lp "level of parallelism" (1-6), nem szálszám - szintenként a megcélzott magszám;
+# a pontos magkorlát a CORE_SCHEDULER affinitása (apply_process_placement)
+SVT_LP_LEVEL_CORES = (1, 2, 8, 12, 16, 20)
+SVT_ENCODE_MIN_CORES = 4  # SVT-AV1 ennyi szabad maggal már indulhat
+METRIC_MIN_CORES = 4  # VMAF/PSNR ennyi szabad maggal már indulhat (kívánt: METRIC_CORE_BUDGET)
+AUDIO_EDIT_CORES = 1  # Hangsáv eltávolítás/konvertálás magigénye
+
+# Linux folyamat elhelyezés (gyerekfolyamatok nice / ionice / CPU affinitás - apply_process_placement)
+PROCESS_PLACEMENT_ENABLED = True  # False: csak saját process group (start_new_session), prioritás és affinitás nélkül
+PROCESS_PRIORITY_PROFILES = {
+    # feladat típus: (nice, ionice osztály, ionice szint) - osztály: 2 = best-effort (0-7), 3 = idle
+    'encode': (10, 2, 4),  # ffmpeg kódolás (SVT-AV1 / NVENC)
+    'search': (10, 2, 4),  # ab-av1 crf-search (minta kódolás + VMAF)
+    'metric': (12, 2, 6),  # VMAF/PSNR/XPSNR mérés
+    'audio': (10, 2, 4),  # Hangsáv eltávolítás / konvertálás
+    'export': (5, 2, 2),  # Frame export (a felhasználó vár rá)
+    'hash': (15, 2, 7),  # Tartalom ujjlenyomat: best-effort legalacsonyabb szint (idle osztály a kritikus úton éhezne)
+}
+WORKER_THREAD_NICE = 5  # set_low_priority Linuxon: a worker szál nice értéke (a gyerekek profiljai ennél nem kisebbek)
+
+# VMAF/metrika számítás konstansok
+METRIC_CORE_BUDGET = 0  # Metrika számításra szánt logikai magok száma (0 = összes mag)
+VMAF_SEGMENT_MIN_SECONDS = 120  # Szegmentált VMAF: minimális szegmens hossz (rövidebb videó egy folyamatban fut)
+VMAF_SEGMENT_THREADS = 4  # Min. libvmaf szál szegmens folyamatonként: legfeljebb budget / ennyi folyamat, a keret köztük egyenlően oszlik
+VMAF_SEGMENT_MAX_PROCESSES = 16  # Max. egyidejű szegmens folyamat
+VMAF_POOL_PERCENTILES = (1, 5, 10, 50)  # Per-frame pontszámokból számolt percentilisek
+VMAF_SAMPLE_CLIPS = 8  # Mintavételes VMAF: klipek száma (az idővonal egyenlő sávjaiból egy-egy)
+VMAF_SAMPLE_SECONDS = 6.0  # Mintavételes VMAF: egy klip hossza (másodperc)
+VMAF_SAMPLE_MIN_COVERAGE_RATIO = 4  # Csak ha a videó legalább ennyiszer hosszabb a mintáknál (különben teljes mérés)
+VMAF_SAMPLE_ESCALATE = True  # Teljes mérés, ha a konfidencia intervallum átfedi a min VMAF-ot
+FRAME_METRICS_WORST_WINDOW_SECONDS = 10.0  # Per-frame logból keresett legrosszabb szakaszok hossza
+FRAME_METRICS_WORST_SEGMENTS = 3  # Tárolt legrosszabb (nem átfedő) szakaszok száma
+FRAME_METRICS_COMPRESS_LEVEL = 6  # zlib szint a float32 per-frame tömbökhöz
+FRAME_METRICS_LOWS_SHOWN = 15  # "Leggyengébb tárolt logok" listában mutatott fájlok száma
+VMAF_PREFETCH_LOOKAHEAD = 2  # VMAF batch pipeline: ennyi következő pár előkészítése mérés közben (0 = ki)
+VMAF_PREFETCH_MAX_BYTES = 2 * 1024 ** 3  # Page cache előtöltés fájlonként legfeljebb ennyi bájt (0 = teljes fájl)
+VMAF_PREFETCH_READ_MAX_BYTES = 64 * 1024 ** 2  # fadvise nélkül (Windows) szinkron olvasással legfeljebb ennyi bájt (0 = nincs olvasás)
+INLINE_METRICS_ENABLED = True  # Inline metrikák engedélyezése (a GUI checkbox opt-in; False = soha, loopback dekóder, ffmpeg 7+)
+INLINE_METRICS_VMAF_SUBSAMPLE = 1  # Inline VMAF: minden N. frame (1 = teljes mérés, csak ez kerül a metrika cache-be)
+INLINE_METRICS_AV1_DECODERS = ('libdav1d', 'libaom-av1')  # Szoftveres AV1 dekóderek a kódolt stream visszadekódolásához
+
+# CRF keresés konstansok (run_crf_search / CRF_SAMPLES)
+CRF_SAMPLE_TABLE_MAX_FILES = 256  # Ennyi fájl ab-av1 minta mérései maradnak memóriában (LRU)
+CRF_SEARCH_CRF_INCREMENT = 1.0  # ab-av1 --crf-increment: ennél közelebbi CRF-ek között nincs mit keresni
+CRF_SEARCH_MIN_VMAF = 85.0  # A VMAF fallback eddig csökkenti a célt (alatta NVENC → SVT, SVT → másolás)
+CRF_SEARCH_ENGINE = 'ab-av1'  # 'ab-av1': ab-av1 crf-search; 'native': beépített minta kódolás + libvmaf (hibánál ab-av1) - opt-in, amíg a --benchmark-crf-search nem mutat egyezést
+CRF_SEARCH_RANGE = {'av1_nvenc': (10, 51), 'svt-av1': (10, 63)}  # Natív keresés CRF/CQ tartománya encoderenként
+CRF_SEARCH_START = {'av1_nvenc': 28, 'svt-av1': 32}  # Első próbált CRF, amíg nincs mért pont
+NATIVE_CRF_SAMPLE_SECONDS = 20.0  # Minta klip hossza (mint az ab-av1 --sample-duration)
+NATIVE_CRF_SAMPLE_EVERY_SECONDS = 720.0  # Ennyi másodpercenként egy minta (mint az ab-av1 --sample-every)
+NATIVE_CRF_MIN_SAMPLES = 3  # Legalább ennyi minta (rövidebb videónál a teljes stream egy mintaként)
+NATIVE_CRF_MAX_SAMPLES = 12  # Legfeljebb ennyi minta
+NATIVE_CRF_MAX_ITERATIONS = 8  # Mért CRF pontok max. száma egy VMAF célra
+NATIVE_CRF_INITIAL_SLOPE = 0.5  # VMAF pont / CRF becslés, amíg csak egy mért pont van
+NATIVE_CRF_NVENC_SESSIONS = 3  # Egyidejű NVENC minta kódolás összesen (a fő kódolások mellett; consumer GPU limit ~8)
+NATIVE_CRF_SVT_MIN_CORES_PER_SAMPLE = 4  # SVT-AV1 minta kódolásonként legalább ennyi mag (párhuzamos minták száma)
+NATIVE_CRF_SAMPLE_CACHE_DIR = None  # Minta klip cache könyvtár (None = <temp>/av1_crf_samples)
+NATIVE_CRF_SAMPLE_CACHE_MAX_BYTES = 20 * 1024 ** 3  # A minta cache efölött a legrégebben használt fájlok klipjei törlődnek
+CRF_PREDICTOR_ENABLED = True  # CRF becslés a korábbi kódolásokból (szűk keresési ablak / keresés kihagyása)
+CRF_PREDICTOR_NEIGHBORS = 8  # Legfeljebb ennyi legközelebbi korábbi kódolásból becsül
+CRF_PREDICTOR_MIN_NEIGHBORS = 3  # Ennél kevesebb közeli szomszédnál nincs becslés (teljes keresés)
+CRF_PREDICTOR_MAX_DISTANCE = 1.5  # Szomszéd max. távolsága (log2 skála: 1 = kétszeres pixelszám / bit per pixel)
+CRF_PREDICTOR_CODEC_PENALTY = 1.0  # Eltérő forrás codec távolsága
+CRF_PREDICTOR_WINDOW = 3.0  # A keresési ablak fél szélessége CRF-ben (legalább; szórásnál 2 × szórás)
+CRF_PREDICTOR_SKIP_NEIGHBORS = 6  # Keresés kihagyásához legalább ennyi közeli szomszéd ...
+CRF_PREDICTOR_SKIP_SPREAD = 1.0  # ... a szomszédok becslésének szórása legfeljebb ennyi CRF ...
+CRF_PREDICTOR_SKIP_VMAF_DELTA = 1.0  # ... és mért VMAF-juk ennyin belül van a céltól (nincs messzi extrapoláció)
+CRF_PREDICTOR_REFRESH_SECONDS = 600.0  # A tanító adat (videos tábla) újraolvasása ennyi idő után
+SKIP_ENCODE_PREDICTOR_ENABLED = True  # Reménytelen (nem zsugorodó) források CRF keresés és kódolás nélkül a másolás ágra
+SKIP_ENCODE_SIZE_PERCENT = 100.0  # Ekkora vagy nagyobb kimenet/forrás méret% = nem zsugorodott (másolt sor is ide tartozik)
+SKIP_ENCODE_HOPELESS_RATIO = 0.8  # A közeli korábbi források (súlyozott) ekkora hányada nem zsugorodott → kihagyás
+SKIP_ENCODE_MIN_NEIGHBORS = 5  # Ennyi közeli korábbi forrás kell a történet alapú döntéshez
+SKIP_ENCODE_BPP_THRESHOLDS = {'av1': 0.08, 'hevc': 0.04, 'vp9': 0.05}  # Történet nélkül: codec → bit/pixel/frame alatt kihagyás
+
 # KISEBB JAVÍTÁS #16: Frame validálás konstansok
 MAX_MEAN_BRIGHTNESS = 20  # Fekete frame detektáláshoz
 MIN_STD_DEV = 5.0  # Fekete frame detektáláshoz
@@ -826,6 +1011,25 @@ DB_RETRY_DELAY = 0.1  # másodperc - Várakozás retry-ok között
 DB_BATCH_SIZE = 1000  # Batch INSERT méret (videók száma)
 DB_SAVE_WAIT_TIMEOUT = 300  # másodperc (5 perc) - Várakozás korábbi DB mentés befejezésére
 
+# Cache konstansok (modul szintű cache táblák a save.db-ben)
+CACHE_DB_TIMEOUT = 2.0  # másodperc - cache írás/olvasás soha ne blokkolja sokáig a workereket
+PROBE_CACHE_MEMORY_SIZE = 4096  # In-memory LRU bejegyzések száma a probe cache előtt
+CONTENT_FINGERPRINT_TIMEOUT = 3600  # Videó stream hash (ffmpeg -c copy -f hash) timeout - csak demux, I/O-kötött
+METRIC_CACHE_OPTIONS = "scale=auto;fmt=yuv420p10le;v1"  # Mérési mód azonosító a metrika cache kulcsban (változáskor új kulcs)
+PSNR_VARIANTS = ('XPSNR', 'PSNR', 'PSNR_Y')  # Mérhető PSNR változatok (xpsnr filter / ffmpeg psnr luma / libvmaf psnr_y)
+METRIC_CACHE_IDLE_POLL_SECONDS = 5.0  # Halasztott metrika cache mentés: üres VMAF_QUEUE-ra várás lépésköze
+METRIC_ENGINE_FPS_SMOOTHING = 0.3  # Metrika engine áteresztőképesség EWMA súlya (új mérés aránya)
+METRIC_ENGINE_EXPLORE_INTERVAL = 20  # Minden N. engine választásnál a legkevesebbet futott alternatíva mér (felderítés)
+NATIVE_METRIC_PROGRESS_INTERVAL = 0.5  # NumPy PSNR/SSIM engine progress frissítés (másodperc)
+TOOL_PROBE_TIMEOUT = 30  # Képesség felderítő ffmpeg/ab-av1 futások timeout-ja (másodperc)
+LIBVMAF_PROBE_FEATURES = ('psnr', 'float_ssim', 'float_ms_ssim')  # libvmaf feature-ök, amiket binárisonként egyszer tesztelünk
+PROBE_POOL_MAX_WORKERS = 64  # Betöltéskori probe thread pool felső korlátja (minden eszközre együtt)
+PROBE_POOL_INITIAL_CONCURRENCY = 4  # Kezdő párhuzamosság eszközönként (AIMD innen nő/csökken)
+PROBE_POOL_MAX_CONCURRENCY = 48  # Max. párhuzamos probe egy eszközön (pl. NVMe)
+PROBE_POOL_CONGESTION_RATIO = 2.0  # Ha az ablak átlagos latenciája > alap × ennyi → multiplikatív csökkentés
+PROBE_POOL_DECREASE_FACTOR = 0.7  # Multiplikatív csökkentés szorzója
+PROBE_POOL_BASELINE_DECAY = 0.1  # Az alap latencia ennyivel kúszik ablakonként a friss átlag felé (régi minimum elfelejtése)
+
 # Subtitle validálás konstansok
 SUBTITLE_VALIDATION_SAMPLE_BYTES = 2048  # Byte-ok száma felirat előnézet olvasásához
 
@@ -838,6 +1042,8 @@ TRANSLATIONS = {
         'browse': 'Tallózás',
         'debug_mode': 'Hibakereső mód (lépésenkénti, temp megőrzés)',
         'auto_vmaf_psnr': 'Automatikus VMAF/PSNR számítás átkódolás után',
+        'auto_vmaf_sampled': 'Gyors (mintavételes) mérés',
+        'auto_inline_metrics': 'Inline metrikák kódolás közben',
         'load_videos': 'Videók betöltése',
         'min_vmaf': 'Min VMAF:',
         'vmaf_fallback': 'VMAF csökkentés:',
@@ -913,6 +1119,7 @@ TRANSLATIONS = {
         'menu_encoded_video': 'Átkódolt videó',
         'menu_vmaf_test': 'Teljes VMAF/PSNR ellenőrzés',
         'menu_vmaf_test_multiple': 'Teljes VMAF/PSNR ellenőrzés ({count} videó)',
+        'menu_vmaf_sampled_multiple': 'Gyors VMAF becslés ({count} videó)',
         'menu_audio_tracks': 'Hangsávok',
         'menu_audio_remove_action': 'Hangsáv eltávolítása',
         'menu_audio_remove_confirm': 'Biztosan eltávolítod ezt a hangsávot?',
@@ -932,6 +1139,11 @@ TRANSLATIONS = {
         'menu_vmaf_full': 'Teljes VMAF/PSNR ellenőrzés',
         'menu_vmaf_only': 'Csak VMAF ellenőrzés',
         'menu_psnr_only': 'Csak PSNR ellenőrzés',
+        'menu_vmaf_sampled': 'Gyors VMAF becslés (mintavételes)',
+        'menu_frame_metrics': 'Tárolt per-frame VMAF log',
+        'menu_frame_metric_lows': 'Leggyengébb tárolt logok (1% low)',
+        'msg_frame_metrics_missing': 'Nincs érvényes tárolt per-frame VMAF log (teljes VMAF mérés után készül).',
+        'msg_frame_metric_lows_empty': 'Nincs érvényes tárolt per-frame VMAF log.',
         'menu_reencode': 'Újrakódolás',
         'menu_reencode_svt': 'SVT-AV1 újrakódolás',
         'msg_no_video': 'Nincs videó!',
@@ -956,6 +1168,8 @@ TRANSLATIONS = {
         'browse': 'Browse',
         'debug_mode': 'Debug mode (step-by-step, keep temp)',
         'auto_vmaf_psnr': 'Automatic VMAF/PSNR calculation after encoding',
+        'auto_vmaf_sampled': 'Fast (sampled) measurement',
+        'auto_inline_metrics': 'Inline metrics during encoding',
         'load_videos': 'Load Videos',
         'min_vmaf': 'Min VMAF:',
         'vmaf_fallback': 'VMAF Reduction:',
@@ -1031,6 +1245,7 @@ TRANSLATIONS = {
         'menu_encoded_video': 'Encoded Video',
         'menu_vmaf_test': 'Full VMAF/PSNR Check',
         'menu_vmaf_test_multiple': 'Full VMAF/PSNR Check ({count} videos)',
+        'menu_vmaf_sampled_multiple': 'Fast VMAF estimate ({count} videos)',
         'menu_audio_tracks': 'Audio Tracks',
         'menu_audio_remove_action': 'Remove audio track',
         'menu_audio_remove_confirm': 'Are you sure you want to remove this audio track?',
@@ -1050,6 +1265,11 @@ TRANSLATIONS = {
         'menu_vmaf_full': 'Full VMAF/PSNR Check',
         'menu_vmaf_only': 'VMAF Check only',
         'menu_psnr_only': 'PSNR Check only',
+        'menu_vmaf_sampled': 'Fast VMAF estimate (sampled)',
+        'menu_frame_metrics': 'Stored per-frame VMAF log',
+        'menu_frame_metric_lows': 'Weakest stored logs (1% low)',
+        'msg_frame_metrics_missing': 'No valid stored per-frame VMAF log (created by a full VMAF check).',
+        'msg_frame_metric_lows_empty': 'No valid stored per-frame VMAF logs.',
         'menu_reencode': 'Re-encode',
         'menu_reencode_svt': 'SVT-AV1 Re-encode',
         'msg_no_video': 'No videos!',
@@ -1118,15 +1338,31 @@ def format_localized_number(value: Optional[Union[int, float, str]], decimals: i
     except (TypeError, ValueError):
         return str(value) if value is not None else "-"
 
+def format_number_en(value: Optional[Union[int, float, str]], decimals: int = 1) -> str:
+    """Nyelvfüggetlen szám formázás (mindig tizedespont) - a fájlba írt Settings metaadathoz,
+    hogy a parse_* függvények a GUI nyelvétől függetlenül visszaolvassák."""
+    if value is None:
+        return "-"
+    try:
+        return f"{float(value):.{decimals}f}"
+    except (TypeError, ValueError):
+        return str(value)
+
 def detect_nvidia_gpu():
     """Detect NVIDIA GPU and check for NVENC support (40xx/50xx series).
     
-    Checks if an NVIDIA GPU is present using nvidia-smi and verifies
-    if it supports NVENC encoding (specifically targeting RTX 40xx/50xx series).
+    The result is cached in the tool capability registry until the
+    nvidia-smi binary (driver) changes, so startup does not spawn nvidia-smi.
     
     Returns:
         tuple: (bool, str) - (True if supported GPU found, GPU name or None)
     """
+    return TOOL_CAPABILITIES.nvidia_gpu(_detect_nvidia_gpu_uncached)
+
+def _detect_nvidia_gpu_uncached():
+    """Checks if an NVIDIA GPU is present using nvidia-smi and verifies
+    if it supports NVENC encoding (specifically targeting RTX 40xx/50xx series).
+    """
     
     def log(msg):
         """Biztonságos log írás"""
@@ -1238,15 +1474,11 @@ def find_program_in_path(program_name):
     # Először próbáljuk a PATH-ban
     log(f"  PATH ellenőrzése...")
     try:
-        result = subprocess.run(['where' if sys.platform == 'win32' else 'which', program_name], 
-                              capture_output=True, text=True, timeout=2)
-        if result.returncode == 0:
-            stdout_lines = result.stdout.strip().split('\n')
-            if stdout_lines and stdout_lines[0]:
-                path = stdout_lines[0]
-                if path and Path(path).exists():
-                    log(f"  ✓ MEGTALÁLVA PATH-ban: {path}")
-                    return path
+        # shutil.which: ugyanaz, mint a which/where, de subprocess nélkül
+        path = shutil.which(program_name)
+        if path and Path(path).exists():
+            log(f"  ✓ MEGTALÁLVA PATH-ban: {path}")
+            return path
         log(f"  ✗ Nem található PATH-ban")
     except Exception as e:
         log(f"  ✗ PATH ellenőrzés hiba: {e}")
@@ -1423,10 +1655,11 @@ def auto_detect_programs():
     Returns:
         dict: Dictionary containing paths for 'ffmpeg', 'virtualdub', and 'abav1'.
     """
+    # A legutóbb megtalált útvonalak a képesség registry-ből jönnek, ha a bináris nem változott
     return {
-        'ffmpeg': find_program_in_path('ffmpeg.exe' if sys.platform == 'win32' else 'ffmpeg'),
-        'virtualdub': find_virtualdub(),
-        'abav1': find_program_in_path('ab-av1.exe' if sys.platform == 'win32' else 'ab-av1'),
+        'ffmpeg': TOOL_CAPABILITIES.locate('ffmpeg.exe' if sys.platform == 'win32' else 'ffmpeg', find_program_in_path),
+        'virtualdub': TOOL_CAPABILITIES.locate('virtualdub', lambda _name: find_virtualdub()),
+        'abav1': TOOL_CAPABILITIES.locate('ab-av1.exe' if sys.platform == 'win32' else 'ab-av1', find_program_in_path),
     }
 
 def t(key: str) -> str:
@@ -1896,8 +2129,238 @@ AUDIO_EDIT_QUEUE = queue.Queue()
 # NVENC queue - több workeres NVENC kódoláshoz
 NVENC_QUEUE = queue.Queue()
 
-# KRITIKUS: Közös CPU worker lock - biztosítja, hogy csak 1 CPU worker (SVT-AV1 vagy VMAF/PSNR) fusson egyszerre
-CPU_WORKER_LOCK = threading.Lock()
+class CoreBudgetScheduler:
+    """CPU mag keret ütemező a CPU-s workerek (SVT-AV1, VMAF/PSNR, hang szerkesztés) között.
+
+    Minden feladat megadja a kívánt és a minimálisan elfogadható magszámot. A kérés akkor
+    indul, ha legalább a minimum szabad, és min(kívánt, szabad) magot kap - ezt a számot adja
+    tovább az SVT-nek (lp) és a libvmaf-nak (n_threads). A várakozók érkezési sorrendben
+    kapnak keretet, így egy nagy igényű feladatot a kicsik nem éheztetnek ki.
+    """
+
+    def __init__(self, total_cores=None):
+        self._total_override = total_cores
+        self._condition = threading.Condition()
+        self._in_use = 0
+        self._waiting = deque()  # ticketek érkezési sorrendben
+        self._grants = {}  # ticket -> (label, cores)
+        self._next_ticket = 0
+        self._cpu_nodes = None  # [[cpu, ...], ...] NUMA node-onként (lustán, Linuxon)
+        self._busy_cpus = set()
+        self._grant_cpus = {}  # ticket -> frozenset(cpu)
+        self._local = threading.local()
+
+    def _nodes(self):
+        if self._cpu_nodes is None:
+            self._cpu_nodes = linux_cpu_topology()
+        return self._cpu_nodes
+
+    def _pick_cpus(self, count):
+        """count darab szabad CPU, lehetőleg egy NUMA node-on belül (legszűkebb elég nagy node)."""
+        free_by_node = [[cpu for cpu in node if cpu not in self._busy_cpus] for node in self._nodes()]
+        free_by_node = [node for node in free_by_node if node]
+        fitting = [node for node in free_by_node if len(node) >= count]
+        if fitting:
+            return frozenset(min(fitting, key=len)[:count])
+        picked = []
+        for node in sorted(free_by_node, key=len, reverse=True):
+            picked.extend(node[:count - len(picked)])
+            if len(picked) >= count:
+                break
+        return frozenset(picked)
+
+    @property
+    def total_cores(self):
+        cpu_count = multiprocessing.cpu_count()
+        budget = self._total_override if self._total_override is not None else CPU_CORE_BUDGET
+        try:
+            budget = int(budget)
+        except (TypeError, ValueError):
+            budget = 0
+        if budget <= 0:
+            return cpu_count
+        return max(1, min(budget, cpu_count))
+
+    def acquire(self, cores, minimum=None, label='', blocking=True):
+        """Blokkol, amíg legalább minimum mag szabad; visszaadja a (ticket, kiosztott magok) párt.
+
+        blocking=False esetén nem vár: ha most nincs minimum szabad mag (vagy mások várnak), (None, 0).
+        """
+        total = self.total_cores
+        wanted = int(cores) if cores and int(cores) > 0 else total
+        wanted = max(1, min(wanted, total))
+        minimum = max(1, min(int(minimum) if minimum else wanted, wanted))
+        with self._condition:
+            if not blocking and (self._waiting or total - self._in_use < minimum):
+                return None, 0
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            self._waiting.append(ticket)
+            try:
+                while self._waiting[0] != ticket or total - self._in_use < minimum:
+                    self._condition.wait()
+            finally:
+                self._waiting.remove(ticket)
+                # A sor elejének változása a következő várakozót is érintheti
+                self._condition.notify_all()
+            granted = min(wanted, total - self._in_use)
+            self._in_use += granted
+            self._grants[ticket] = (label, granted)
+            # Konkrét magok a apply_process_placement affinitásához (SVT és VMAF diszjunkt halmazon)
+            cpus = self._pick_cpus(granted) if PROCESS_PLACEMENT_ENABLED and self._nodes() else frozenset()
+            self._busy_cpus |= cpus
+            self._grant_cpus[ticket] = cpus
+        return ticket, granted
+
+    def release(self, ticket):
+        with self._condition:
+            _, granted = self._grants.pop(ticket, ('', 0))
+            self._in_use -= granted
+            self._busy_cpus -= self._grant_cpus.pop(ticket, frozenset())
+            self._condition.notify_all()
+
+    def cpus_of(self, ticket):
+        with self._condition:
+            return self._grant_cpus.get(ticket) or None
+
+    def current_cpus(self):
+        """A hívó szál aktuális foglalásának CPU halmaza (None, ha nincs foglalás / nem Linux)."""
+        stack = getattr(self._local, 'cpus', None)
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def reserve(self, cores, minimum=None, label=''):
+        """with CORE_SCHEDULER.reserve(12, minimum=4, label='SVT') as granted: ..."""
+        ticket, granted = self.acquire(cores, minimum=minimum, label=label)
+        stack = getattr(self._local, 'cpus', None)
+        if stack is None:
+            stack = self._local.cpus = []
+        stack.append(self.cpus_of(ticket))
+        try:
+            yield granted
+        finally:
+            stack.pop()
+            self.release(ticket)
+
+    def snapshot(self):
+        """(foglalt magok, összes mag, [(label, magok), ...]) - naplózáshoz."""
+        with self._condition:
+            return self._in_use, self.total_cores, list(self._grants.values())
+
+
+def _parse_cpu_list(text):
+    """'0-3,8-11' → [0, 1, 2, 3, 8, 9, 10, 11] (sysfs cpulist formátum)."""
+    cpus = []
+    for part in text.strip().split(','):
+        if not part:
+            continue
+        if '-' in part:
+            first, last = part.split('-', 1)
+            cpus.extend(range(int(first), int(last) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def linux_cpu_topology():
+    """Az engedélyezett CPU-k NUMA node-onként ([[cpu, ...], ...]); [] ha nem Linux.
+
+    Egy node-os (vagy sysfs nélküli) gépen egyetlen lista az összes engedélyezett CPU-val.
+    """
+    if platform.system() != 'Linux' or not hasattr(os, 'sched_getaffinity'):
+        return []
+    try:
+        allowed = os.sched_getaffinity(0)
+    except OSError:
+        return []
+    nodes = []
+    node_root = Path('/sys/devices/system/node')
+    try:
+        node_dirs = sorted(node_root.glob('node[0-9]*'), key=lambda path: int(path.name[4:]))
+    except (OSError, ValueError):
+        node_dirs = []
+    for node_dir in node_dirs:
+        try:
+            cpus = [cpu for cpu in _parse_cpu_list((node_dir / 'cpulist').read_text()) if cpu in allowed]
+        except (OSError, ValueError):
+            continue
+        if cpus:
+            nodes.append(cpus)
+    covered = {cpu for node in nodes for cpu in node}
+    if not nodes or covered != allowed:
+        return [sorted(allowed)]
+    return nodes
+
+
+# ioprio_set syscall száma architektúránként (a Python stdlib nem ad rá függvényt)
+_IOPRIO_SET_SYSCALLS = {'x86_64': 251, 'amd64': 251, 'i386': 289, 'i686': 289, 'aarch64': 30, 'arm64': 30, 'armv7l': 314, 'ppc64le': 273, 'riscv64': 30}
+_IOPRIO_WHO_PROCESS = 1
+_IOPRIO_CLASS_SHIFT = 13
+_LINUX_LIBC = None
+if platform.system() == 'Linux':
+    try:
+        _LINUX_LIBC = ctypes.CDLL(None, use_errno=True)
+    except OSError:
+        _LINUX_LIBC = None
+
+
+def child_process_kwargs():
+    """Popen kwargs egy gyerekfolyamathoz: mindig saját process group.
+
+    Windows: CREATE_NEW_PROCESS_GROUP, egyébként start_new_session - így a terminate_process_tree a
+    teljes fát leállítja. A nice / ionice / CPU affinitás NEM a fork és exec között áll be (a preexec_fn
+    szálas programban nem biztonságos), hanem indítás után a szülőből: apply_process_placement().
+
+    Returns:
+        dict: creationflags / start_new_session.
+    """
+    if platform.system() == 'Windows':
+        return {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {'start_new_session': True}
+
+
+def apply_process_placement(process, job, cpus=None):
+    """A PROCESS_PRIORITY_PROFILES nice / ionice értéke és a CPU affinitás egy elindult gyerekfolyamatra.
+
+    Linuxon a nice, az ionice és az affinitás szálanként él: a /proc/<pid>/task összes szálára
+    beállítjuk (a később induló szálak a fő száltól öröklik). Minden hiba elnyelve - a folyamat
+    elhelyezés nélkül is fut.
+
+    Args:
+        process: subprocess.Popen példány.
+        job: Feladat típus (PROCESS_PRIORITY_PROFILES kulcs).
+        cpus: CPU halmaz az affinitáshoz; None esetén a hívó szál CORE_SCHEDULER foglalása.
+    """
+    if not PROCESS_PLACEMENT_ENABLED or platform.system() != 'Linux' or process is None:
+        return
+    nice, io_class, io_level = PROCESS_PRIORITY_PROFILES.get(job, (None, None, None))
+    if cpus is None:
+        cpus = CORE_SCHEDULER.current_cpus()
+    cpus = sorted(cpus) if cpus and hasattr(os, 'sched_setaffinity') else None
+    ioprio_syscall = _IOPRIO_SET_SYSCALLS.get(platform.machine().lower()) if _LINUX_LIBC is not None else None
+    ioprio = (io_class << _IOPRIO_CLASS_SHIFT) | (io_level or 0) if io_class and ioprio_syscall else None
+    try:
+        task_ids = [int(name) for name in os.listdir(f'/proc/{process.pid}/task')]
+    except (OSError, ValueError):
+        task_ids = [process.pid]
+    for task_id in task_ids:
+        if nice is not None:
+            try:
+                os.setpriority(os.PRIO_PROCESS, task_id, nice)
+            except OSError:
+                pass
+        if ioprio is not None:
+            _LINUX_LIBC.syscall(ioprio_syscall, _IOPRIO_WHO_PROCESS, task_id, ioprio)
+        if cpus:
+            try:
+                os.sched_setaffinity(task_id, cpus)
+            except OSError:
+                pass
+
+
+# KRITIKUS: Közös CPU mag keret - az SVT-AV1 és a VMAF/PSNR a valós kapacitás szerint futhat párhuzamosan
+# (a korábbi CPU_WORKER_LOCK egyszerre csak egy CPU workert engedett)
+CORE_SCHEDULER = CoreBudgetScheduler()
 
 # KRITIKUS: NVENC worker lock - biztosítja, hogy csak 1 NVENC worker fusson egyszerre (már nem használjuk, mert több worker van)
 # NVENC_WORKER_LOCK = threading.Lock()  # Megjegyzés: több workeres megoldásnál nincs szükség lock-ra
@@ -1921,7 +2384,6 @@ FFMPEG_PATH = DEFAULT_FFMPEG
 FFPROBE_PATH = DEFAULT_FFPROBE
 ABAV1_PATH = DEFAULT_ABAV1
 VDUB2_PATH = None
-LIBVMAF_SUPPORTS_PSNR = True
 
 
 def apply_external_tool_paths(ffmpeg_path=None, abav1_path=None, virtualdub_path=None):
@@ -2060,6 +2522,559 @@ def load_debug_log(message):
             pass
 
 
+# Modul szintű cache-ek adatbázisa (a GUI állítja be a save.db útvonalára)
+CACHE_DB_PATH = None
+CACHE_DB_LOCK = threading.Lock()
+
+
+def set_cache_db_path(db_path):
+    """Beállítja a modul szintű cache-ek (probe cache, ...) SQLite adatbázisát."""
+    global CACHE_DB_PATH
+    CACHE_DB_PATH = Path(db_path) if db_path else None
+
+
+def default_db_path():
+    """A save.db helye: mindig a script fájl tényleges mappája (fallback: munkakönyvtár)."""
+    try:
+        script_dir = Path(__file__).resolve().parent
+    except (OSError, ValueError, AttributeError):
+        script_dir = Path.cwd()
+    return script_dir / "save.db"
+
+
+def prepare_console_environment():
+    """A GUI indulásával azonos környezet konzolos futáshoz (pl. --benchmark-crf-search).
+
+    Ugyanaz a save.db (képesség / probe / CRF cache) és ugyanazok a felismert eszköz útvonalak,
+    mint a VideoEncoderGUI konstruktorában - enélkül a konzolos futás a PATH alapértelmezéseit és
+    cache nélküli felderítést használna.
+
+    Returns:
+        Path: A használt adatbázis útvonala.
+    """
+    db_path = default_db_path()
+    set_cache_db_path(db_path)
+    detected_programs = auto_detect_programs()
+    apply_external_tool_paths(detected_programs['ffmpeg'], detected_programs['abav1'], detected_programs['virtualdub'])
+    return db_path
+
+
+def ensure_cache_tables(cursor):
+    """Létrehozza a modul szintű cache táblákat (ha még nincsenek).
+
+    Args:
+        cursor: sqlite3 cursor (a hívó commit-ol).
+    """
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS probe_cache (
+        path TEXT PRIMARY KEY,
+        size INTEGER,
+        mtime_ns INTEGER,
+        inode INTEGER,
+        probe_json TEXT,
+        probed_at REAL
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS tool_capabilities (
+        tool_key TEXT PRIMARY KEY,
+        fingerprint TEXT,
+        capabilities_json TEXT,
+        probed_at REAL
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS content_fingerprints (
+        path TEXT PRIMARY KEY,
+        size INTEGER,
+        mtime_ns INTEGER,
+        inode INTEGER,
+        fingerprint TEXT,
+        hashed_at REAL
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS metric_cache (
+        reference_fp TEXT,
+        distorted_fp TEXT,
+        metric TEXT,
+        model TEXT,
+        options TEXT,
+        value REAL,
+        measured_at REAL,
+        PRIMARY KEY (reference_fp, distorted_fp, metric, model, options)
+    )
+    ''')
+    # CRF keresés minta görbék és teljes keresési eredmények (CrfSampleTable) - engine = engine opciók szövege
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS crf_search_samples (
+        source_fp TEXT,
+        encoder TEXT,
+        preset TEXT,
+        engine TEXT,
+        crf REAL,
+        vmaf REAL,
+        size_pct INTEGER,
+        measured_at REAL,
+        PRIMARY KEY (source_fp, encoder, preset, engine, crf)
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS crf_search_results (
+        source_fp TEXT,
+        encoder TEXT,
+        preset TEXT,
+        engine TEXT,
+        min_vmaf REAL,
+        vmaf_step REAL,
+        max_encoded_percent INTEGER,
+        crf REAL,
+        vmaf REAL,
+        exhausted INTEGER,
+        searched_at REAL,
+        PRIMARY KEY (source_fp, encoder, preset, engine, min_vmaf, vmaf_step, max_encoded_percent)
+    )
+    ''')
+    # CRF előrejelző statisztika encoderenként (találati arány, teljes keresés átlagideje, megtakarított idő)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS crf_predictor_stats (
+        encoder TEXT PRIMARY KEY,
+        predictions INTEGER,
+        hits INTEGER,
+        skips INTEGER,
+        full_searches INTEGER,
+        full_search_seconds REAL,
+        seconds_saved REAL,
+        updated_at REAL
+    )
+    ''')
+    # Metrika engine-ek mért áteresztőképessége (pixel/s) - az automatikus engine választáshoz
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS metric_engine_stats (
+        engine TEXT,
+        metric TEXT,
+        pixel_rate REAL,
+        runs INTEGER,
+        updated_at REAL,
+        PRIMARY KEY (engine, metric)
+    )
+    ''')
+    # Kihagyott kódolások statisztikája encoderenként (kihagyott tartalom, mért kódolási sebesség, túlméretes kódolások)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS skip_encode_stats (
+        encoder TEXT PRIMARY KEY,
+        skipped INTEGER,
+        skipped_content_seconds REAL,
+        encodes INTEGER,
+        encode_seconds REAL,
+        encoded_content_seconds REAL,
+        oversized INTEGER,
+        oversized_seconds REAL,
+        updated_at REAL
+    )
+    ''')
+    # Predikció alapján kihagyott (másolt) források: fájlonként egyszer számol a statisztikában, és ezek a
+    # 'completed_copy' sorok nem kerülnek vissza a CrfPredictor / SkipEncodePredictor tanító adatába
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS skip_encode_decisions (
+        path TEXT PRIMARY KEY,
+        size INTEGER,
+        mtime_ns INTEGER,
+        inode INTEGER,
+        encoder TEXT,
+        reason TEXT,
+        content_seconds REAL,
+        decided_at REAL
+    )
+    ''')
+    # CRF előrejelző kihagyott keresései: a becsült VMAF a későbbi teljes VMAF méréssel ellenőrizve (egyszer)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS crf_predictor_skips (
+        path TEXT PRIMARY KEY,
+        size INTEGER,
+        mtime_ns INTEGER,
+        inode INTEGER,
+        encoder TEXT,
+        crf REAL,
+        target_vmaf REAL,
+        predicted_vmaf REAL,
+        decided_at REAL,
+        measured_vmaf REAL,
+        checked_at REAL
+    )
+    ''')
+    # Per-frame metrika logok: scores = zlib(float32 little-endian), a többi oszlop ebből számolt összesítés
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS frame_metrics (
+        path TEXT,
+        metric TEXT,
+        size INTEGER,
+        mtime_ns INTEGER,
+        inode INTEGER,
+        frames INTEGER,
+        fps REAL,
+        scores BLOB,
+        mean REAL,
+        harmonic_mean REAL,
+        min REAL,
+        p1 REAL,
+        p5 REAL,
+        worst_json TEXT,
+        measured_at REAL,
+        PRIMARY KEY (path, metric)
+    )
+    ''')
+    # Régebbi DB: a frame_metrics tábla még csak size oszloppal készült
+    frame_metric_columns = {row[1] for row in cursor.execute('PRAGMA table_info(frame_metrics)').fetchall()}
+    for column in ('mtime_ns', 'inode'):
+        if column not in frame_metric_columns:
+            cursor.execute(f'ALTER TABLE frame_metrics ADD COLUMN {column} INTEGER')
+    # Mintavételes (becsült) metrikák 95%-os konfidencia intervallummal - nem mérés, külön a frame_metrics-től
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sampled_metric_estimates (
+        path TEXT,
+        metric TEXT,
+        size INTEGER,
+        mtime_ns INTEGER,
+        inode INTEGER,
+        mean REAL,
+        ci_low REAL,
+        ci_high REAL,
+        frames INTEGER,
+        clips INTEGER,
+        coverage REAL,
+        measured_at REAL,
+        PRIMARY KEY (path, metric)
+    )
+    ''')
+
+
+@contextmanager
+def cache_db_connection():
+    """Rövid timeout-os kapcsolat a cache adatbázishoz.
+
+    None-t ad vissza, ha nincs beállítva adatbázis vagy nem nyitható meg -
+    a cache ilyenkor csak memóriában működik, a hívónak ez nem hiba.
+    """
+    conn = None
+    db_path = CACHE_DB_PATH
+    if db_path is not None:
+        try:
+            conn = sqlite3.connect(str(db_path), timeout=CACHE_DB_TIMEOUT)
+        except (sqlite3.Error, OSError) as e:
+            load_debug_log(f"[cache_db_connection] Cache DB nem nyitható meg: {e}")
+            conn = None
+    try:
+        yield conn
+    finally:
+        if conn:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+class ToolCapabilityRegistry:
+    """Külső programok képességeinek perzisztens cache-e (bináris útvonal + méret + mtime kulccsal).
+
+    Amit korábban minden indításkor (vagy egy elrontott futás árán) fedeztünk fel:
+    - ffmpeg: verzió, encoderek, filterek, libvmaf feature-ök (pl. feature=name=psnr)
+    - ab-av1: verzió
+    - nvidia-smi: GPU név / NVENC támogatás
+    - programok helye (find_program_in_path)
+    A tool_capabilities táblában tárolódik; ha a bináris nem változott, nincs
+    felderítő subprocess.
+    """
+
+    def __init__(self):
+        self._memory = {}  # tool_key -> (fingerprint, data)
+        self._lock = threading.Lock()
+        # Felderítés egyszerre csak egy szálon (a háttér bemelegítés és az első worker ne fusson párhuzamosan)
+        self._probe_lock = threading.Lock()
+
+    @staticmethod
+    def resolve_binary(binary):
+        """Bináris abszolút útvonala (PATH-ból is), vagy None."""
+        if not binary:
+            return None
+        binary = os.fspath(binary)
+        if os.path.isfile(binary):
+            return os.path.abspath(binary)
+        return shutil.which(binary)
+
+    @staticmethod
+    def binary_fingerprint(resolved):
+        """'méret:mtime_ns' azonosító, vagy None ha a fájl nem érhető el."""
+        try:
+            stat_info = os.stat(resolved)
+        except (OSError, TypeError, ValueError):
+            return None
+        return f"{stat_info.st_size}:{stat_info.st_mtime_ns}"
+
+    def _cached(self, tool_key, fingerprint):
+        with self._lock:
+            entry = self._memory.get(tool_key)
+        if entry is not None and entry[0] == fingerprint:
+            return entry[1]
+        with cache_db_connection() as conn:
+            if conn is None:
+                return None
+            try:
+                row = conn.execute(
+                    'SELECT fingerprint, capabilities_json FROM tool_capabilities WHERE tool_key = ?',
+                    (tool_key,)
+                ).fetchone()
+            except sqlite3.Error:
+                return None
+        if not row or row[0] != fingerprint:
+            return None
+        try:
+            data = json.loads(row[1])
+        except (ValueError, TypeError):
+            return None
+        with self._lock:
+            self._memory[tool_key] = (fingerprint, data)
+        return data
+
+    def _store(self, tool_key, fingerprint, data):
+        with self._lock:
+            self._memory[tool_key] = (fingerprint, data)
+        with cache_db_connection() as conn:
+            if conn is None:
+                return
+            try:
+                with CACHE_DB_LOCK:
+                    # Induláskor a GUI adatbázis inicializálása előtt is írhatunk
+                    ensure_cache_tables(conn.cursor())
+                    conn.execute(
+                        'INSERT OR REPLACE INTO tool_capabilities (tool_key, fingerprint, capabilities_json, probed_at) VALUES (?, ?, ?, ?)',
+                        (tool_key, fingerprint, json.dumps(data), time.time())
+                    )
+                    conn.commit()
+            except sqlite3.Error as e:
+                load_debug_log(f"[ToolCapabilityRegistry] Cache írás hiba ({tool_key}): {e}")
+
+    def _get_or_probe(self, tool_key, fingerprint, probe_func):
+        data = self._cached(tool_key, fingerprint)
+        if data is not None:
+            return data
+        with self._probe_lock:
+            data = self._cached(tool_key, fingerprint)
+            if data is None:
+                data = probe_func()
+                if data is not None:
+                    self._store(tool_key, fingerprint, data)
+        return data
+
+    def locate(self, program_name, find_func):
+        """Program helye: a legutóbb megtalált útvonal, ha még létezik és nem változott; különben find_func()."""
+        tool_key = f"locate:{program_name}"
+        with self._lock:
+            entry = self._memory.get(tool_key)
+        if entry is None:
+            with cache_db_connection() as conn:
+                if conn is not None:
+                    try:
+                        row = conn.execute('SELECT fingerprint, capabilities_json FROM tool_capabilities WHERE tool_key = ?', (tool_key,)).fetchone()
+                        if row:
+                            entry = (row[0], json.loads(row[1]))
+                    except (sqlite3.Error, ValueError, TypeError):
+                        entry = None
+        if entry is not None:
+            cached_path = (entry[1] or {}).get('path')
+            if cached_path and self.binary_fingerprint(cached_path) == entry[0]:
+                return cached_path
+        found = find_func(program_name)
+        fingerprint = self.binary_fingerprint(found) if found else None
+        if found and fingerprint:
+            self._store(tool_key, fingerprint, {'path': found})
+        return found
+
+    def _run(self, cmd, cwd=None):
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=TOOL_PROBE_TIMEOUT, cwd=cwd, startupinfo=get_startup_info())
+        except (subprocess.SubprocessError, OSError):
+            return None
+        return result
+
+    def _probe_ffmpeg(self, resolved):
+        data = {'version': None, 'encoders': [], 'filters': [], 'libvmaf_features': {}}
+        result = self._run([resolved, '-hide_banner', '-version'])
+        if result is None or result.returncode != 0:
+            return None
+        first_line = (result.stdout or '').splitlines()[:1]
+        data['version'] = first_line[0].strip() if first_line else None
+
+        result = self._run([resolved, '-hide_banner', '-encoders'])
+        if result is not None and result.returncode == 0:
+            data['encoders'] = sorted({
+                match.group(1) for match in re.finditer(r'^\s*[VAS][\w.]{5}\s+(\S+)', result.stdout or '', re.MULTILINE)
+            })
+        result = self._run([resolved, '-hide_banner', '-filters'])
+        if result is not None and result.returncode == 0:
+            data['filters'] = sorted({
+                match.group(1) for match in re.finditer(r'^\s*[\w.]{2,3}\s+(\S+)\s+\S*->\S*', result.stdout or '', re.MULTILINE)
+            })
+
+        if 'libvmaf' in data['filters']:
+            # Apró szintetikus bemenettel teszteljük a feature-öket (nem egy valódi VMAF futás árán)
+            for feature in LIBVMAF_PROBE_FEATURES:
+                result = self._run([
+                    resolved, '-hide_banner', '-loglevel', 'error',
+                    '-f', 'lavfi', '-i', 'testsrc2=s=64x64:d=0.2',
+                    '-f', 'lavfi', '-i', 'testsrc2=s=64x64:d=0.2',
+                    '-lavfi', f'[0:v][1:v]libvmaf=feature=name={feature}',
+                    '-f', 'null', '-'
+                ])
+                data['libvmaf_features'][feature] = bool(result is not None and result.returncode == 0)
+            data['libvmaf_version'] = self._probe_libvmaf_version(resolved)
+        data.update(self._probe_loopback_decoding(resolved))
+        return data
+
+    def _probe_libvmaf_version(self, resolved):
+        """A linkelt libvmaf verziója a JSON log 'version' mezőjéből (None, ha nem derül ki)."""
+        # Relatív log név a munkakönyvtárban (nincs filter útvonal escape-elés)
+        with tempfile.TemporaryDirectory(prefix='libvmaf_probe_') as work_dir:
+            result = self._run([
+                resolved, '-hide_banner', '-loglevel', 'error',
+                '-f', 'lavfi', '-i', 'testsrc2=s=64x64:d=0.2',
+                '-f', 'lavfi', '-i', 'testsrc2=s=64x64:d=0.2',
+                '-lavfi', '[0:v][1:v]libvmaf=log_fmt=json:log_path=probe.json',
+                '-f', 'null', '-'
+            ], cwd=work_dir)
+            if result is None or result.returncode != 0:
+                return None
+            try:
+                with open(os.path.join(work_dir, 'probe.json'), 'r', encoding='utf-8') as fh:
+                    return json.load(fh).get('version')
+            except (OSError, ValueError, AttributeError):
+                return None
+
+    def _probe_loopback_decoding(self, resolved):
+        """Loopback dekóder (-dec, ffmpeg 7+) és szoftveres AV1 dekóderek (inline metrikákhoz)."""
+        data = {'decoders': [], 'loopback_decoder': False}
+        result = self._run([resolved, '-hide_banner', '-decoders'])
+        if result is not None and result.returncode == 0:
+            data['decoders'] = sorted({
+                match.group(1) for match in re.finditer(r'^\s*[VAS][\w.]{5}\s+(\S+)', result.stdout or '', re.MULTILINE)
+            })
+        result = self._run([
+            resolved, '-hide_banner', '-loglevel', 'error',
+            '-f', 'lavfi', '-i', 'testsrc2=s=64x64:d=0.2',
+            '-map', '0:v', '-c:v', 'rawvideo', '-f', 'null', '-',
+            '-dec', '0:0',
+            '-filter_complex', '[0:v][dec:0]psnr[m]', '-map', '[m]', '-f', 'null', '-'
+        ])
+        data['loopback_decoder'] = bool(result is not None and result.returncode == 0)
+        return data
+
+    def ffmpeg(self, ffmpeg_path=None):
+        """ffmpeg képességek dict-je ({} ha a bináris nem érhető el)."""
+        resolved = self.resolve_binary(ffmpeg_path or FFMPEG_PATH)
+        fingerprint = self.binary_fingerprint(resolved)
+        if fingerprint is None:
+            return {}
+        return self._get_or_probe(f"ffmpeg:{os.path.normcase(resolved)}", fingerprint, lambda: self._probe_ffmpeg(resolved)) or {}
+
+    def has_encoder(self, name, ffmpeg_path=None):
+        return name in self.ffmpeg(ffmpeg_path).get('encoders', [])
+
+    def has_filter(self, name, ffmpeg_path=None):
+        return name in self.ffmpeg(ffmpeg_path).get('filters', [])
+
+    def has_decoder(self, name, ffmpeg_path=None):
+        return name in self.ffmpeg(ffmpeg_path).get('decoders', [])
+
+    def supports_loopback_decoder(self, ffmpeg_path=None):
+        """-dec loopback dekóder támogatás; a korábbi (kulcs nélküli) cache bejegyzést egyszer kiegészíti."""
+        capabilities = self.ffmpeg(ffmpeg_path)
+        if not capabilities:
+            return False
+        if 'loopback_decoder' not in capabilities:
+            resolved = self.resolve_binary(ffmpeg_path or FFMPEG_PATH)
+            fingerprint = self.binary_fingerprint(resolved)
+            if fingerprint is None:
+                return False
+            capabilities = dict(capabilities)
+            capabilities.update(self._probe_loopback_decoding(resolved))
+            self._store(f"ffmpeg:{os.path.normcase(resolved)}", fingerprint, capabilities)
+        return bool(capabilities.get('loopback_decoder'))
+
+    def libvmaf_version(self, ffmpeg_path=None):
+        """A libvmaf verziója (None, ha nincs libvmaf); a korábbi (kulcs nélküli) cache bejegyzést egyszer kiegészíti."""
+        capabilities = self.ffmpeg(ffmpeg_path)
+        if 'libvmaf' not in capabilities.get('filters', []):
+            return None
+        if 'libvmaf_version' not in capabilities:
+            resolved = self.resolve_binary(ffmpeg_path or FFMPEG_PATH)
+            fingerprint = self.binary_fingerprint(resolved)
+            if fingerprint is None:
+                return None
+            capabilities = dict(capabilities)
+            capabilities['libvmaf_version'] = self._probe_libvmaf_version(resolved)
+            self._store(f"ffmpeg:{os.path.normcase(resolved)}", fingerprint, capabilities)
+        return capabilities.get('libvmaf_version')
+
+    def libvmaf_supports(self, feature, ffmpeg_path=None):
+        """libvmaf feature=name=<feature> támogatás. Ismeretlen bináris esetén True (a futás dönt)."""
+        capabilities = self.ffmpeg(ffmpeg_path)
+        if not capabilities:
+            return True
+        return bool(capabilities.get('libvmaf_features', {}).get(feature, False))
+
+    def mark_libvmaf_unsupported(self, feature, ffmpeg_path=None):
+        """Futás közben kiderült hiányzó feature rögzítése (perzisztensen, a következő indításra is)."""
+        resolved = self.resolve_binary(ffmpeg_path or FFMPEG_PATH)
+        fingerprint = self.binary_fingerprint(resolved)
+        if fingerprint is None:
+            return
+        tool_key = f"ffmpeg:{os.path.normcase(resolved)}"
+        data = dict(self._cached(tool_key, fingerprint) or {})
+        features = dict(data.get('libvmaf_features') or {})
+        features[feature] = False
+        data['libvmaf_features'] = features
+        self._store(tool_key, fingerprint, data)
+
+    def abav1(self, abav1_path=None):
+        """ab-av1 képességek ({'version': ...}), {} ha nem érhető el."""
+        resolved = self.resolve_binary(abav1_path or ABAV1_PATH)
+        fingerprint = self.binary_fingerprint(resolved)
+        if fingerprint is None:
+            return {}
+
+        def probe():
+            result = self._run([resolved, '--version'])
+            if result is None or result.returncode != 0:
+                return None
+            return {'version': (result.stdout or result.stderr or '').strip()}
+        return self._get_or_probe(f"abav1:{os.path.normcase(resolved)}", fingerprint, probe) or {}
+
+    def nvidia_gpu(self, detect_func):
+        """detect_func() eredménye ((bool, gpu_name)), az nvidia-smi bináris (driver) változásáig cache-elve."""
+        resolved = self.resolve_binary('nvidia-smi')
+        fingerprint = self.binary_fingerprint(resolved)
+        if fingerprint is None:
+            return detect_func()
+        data = self._cached('nvidia-smi', fingerprint)
+        if data is not None:
+            return bool(data.get('nvenc_supported')), data.get('gpu_name')
+        nvenc_supported, gpu_name = detect_func()
+        self._store('nvidia-smi', fingerprint, {'nvenc_supported': bool(nvenc_supported), 'gpu_name': gpu_name})
+        return nvenc_supported, gpu_name
+
+    def summary_text(self):
+        capabilities = self.ffmpeg()
+        if not capabilities:
+            return "ffmpeg képességek: nem elérhető"
+        features = capabilities.get('libvmaf_features', {})
+        feature_text = ', '.join(f"{name}={'✓' if ok else '✗'}" for name, ok in sorted(features.items())) or '-'
+        encoders = [name for name in ('av1_nvenc', 'libsvtav1') if name in capabilities.get('encoders', [])]
+        return f"{capabilities.get('version') or 'ffmpeg'} | AV1 encoderek: {', '.join(encoders) or '-'} | libvmaf: {feature_text}"
+
+
+TOOL_CAPABILITIES = ToolCapabilityRegistry()
+
+
 class EncodingStopped(Exception):
     """Jelzi, hogy felhasználói leállítás történt."""
     pass
@@ -2067,7 +3082,11 @@ class EncodingStopped(Exception):
 
 class NoSuitableCRFFound(Exception):
     """Jelzi, hogy ab-av1 nem talált megfelelő CRF értéket (VMAF >= 85 ÉS fájl <= 75%)."""
-    pass
+
+    def __init__(self, message='', final_min_vmaf=None):
+        super().__init__(message)
+        # Az utolsó próbált VMAF cél alatti érték; ha a küszöb felett van, a keresés hiba miatt állt le
+        self.final_min_vmaf = final_min_vmaf
 
 
 class NVENCFallbackRequired(Exception):
@@ -2155,8 +3174,10 @@ def managed_subprocess(cmd, cwd=None, stop_event=None, timeout=180):
             universal_newlines=True,
             bufsize=1,
             cwd=cwd,
-            startupinfo=get_startup_info()
+            startupinfo=get_startup_info(),
+            **child_process_kwargs()
         )
+        apply_process_placement(process, 'export')
         
         # Process regisztráció
         with ACTIVE_PROCESSES_LOCK:
@@ -2919,7 +3940,7 @@ def copy_non_video_files(source_root, dest_root, progress_callback=None):
 
 
 def calculate_psnr_only(reference_path, encoded_path, stop_event=None, logger=None):
-    """Calculate PSNR metric using FFmpeg.
+    """Calculate PSNR (luma) with the fastest available metric engine.
     
     Args:
         reference_path: Path to reference video.
@@ -2930,87 +3951,11 @@ def calculate_psnr_only(reference_path, encoded_path, stop_event=None, logger=No
     Returns:
         float: PSNR value or None on error.
     """
-
-    if stop_event is None:
-        stop_event = STOP_EVENT
-    
-    reference_str = os.fspath(reference_path.absolute())
-    encoded_str = os.fspath(encoded_path.absolute())
-    
-    psnr_cmd = [
-        FFMPEG_PATH,
-        '-i', reference_str,
-        '-i', encoded_str,
-        '-lavfi', 'psnr',
-        '-f', 'null',
-        '-'
-    ]
-    
-    if logger:
-        logger.write(f"\n{'='*80}\n")
-        logger.write(f"?? PSNR SZÁMÍTÁS (külön futtatás)\n")
-        logger.write(f"{'='*80}\n")
-        logger.write(' '.join(psnr_cmd) + '\n')
-        logger.write(f"{'='*80}\n\n")
-        logger.flush()
-    
+    reference_path = Path(reference_path)
+    duration_seconds, _ = get_video_info(reference_path)
     try:
-        process = subprocess.Popen(
-            psnr_cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1,
-            startupinfo=get_startup_info()
-        )
-        
-        with ACTIVE_PROCESSES_LOCK:
-            ACTIVE_PROCESSES.append(process)
-        
-        psnr_value = None
-        try:
-            for line in process.stdout:
-                if stop_event.is_set():
-                    process.terminate()
-                    try:
-                        process.wait(timeout=5)
-                    except subprocess.TimeoutExpired:
-                        process.kill()
-                    raise EncodingStopped()
-                
-                if logger:
-                    logger.write(line)
-                    logger.flush()
-                
-                avg_match = re.search(r'(?:avg|average)[:=]\s*([\d.]+)', line, re.IGNORECASE)
-                if avg_match:
-                    try:
-                        psnr_value = float(avg_match.group(1))
-                    except ValueError:
-                        pass
-        except EncodingStopped:
-            raise
-        finally:
-            with ACTIVE_PROCESSES_LOCK:
-                if process in ACTIVE_PROCESSES:
-                    ACTIVE_PROCESSES.remove(process)
-        
-        try:
-            process.wait()
-        except (OSError, subprocess.SubprocessError) as e:
-            if logger:
-                logger.write(f"PSNR process wait hiba: {e}\n")
-                logger.flush()
-        
-        if process.returncode != 0:
-            error_msg = f"✗ PSNR számítás hiba (return code: {process.returncode})"
-            if logger:
-                logger.write(error_msg + '\n')
-                logger.flush()
-            print(error_msg)
-            return psnr_value
-        
-        return psnr_value
+        return METRIC_ENGINES.measure(['PSNR'], reference_path, Path(encoded_path), stop_event=stop_event, logger=logger,
+                                      duration_seconds=duration_seconds).get('PSNR')
     except EncodingStopped:
         raise
     except Exception as e:
@@ -3132,7 +4077,52 @@ def format_metric_value(value, decimals=2):
             return str(value)
 
 
-def _run_abav1_metric(metric, reference_path, encoded_path, progress_callback=None, stop_event=None, logger=None, duration_seconds=None):
+def _metric_progress_payload(metric_label, percent=None, eta_seconds=None, eta_text=None, duration_seconds=None,
+                             interpolated=False, done=False, metrics=None):
+    """'abav1_progress' típusú progress payload a VMAF worker progress_callback-jének.
+
+    Args:
+        metric_label: Megjelenített metrika név (pl. 'VMAF', 'XPSNR', 'VMAF+PSNR').
+        metrics: Az egy futásban számolt metrikák listája (alapértelmezés: [metric_label]).
+
+    Returns:
+        dict: A payload ('text' mezővel a konzol/státusz kijelzéshez).
+    """
+    elapsed_seconds = None
+    if percent is not None and duration_seconds:
+        try:
+            elapsed_seconds = max(0.0, min(duration_seconds, duration_seconds * (percent / 100.0)))
+        except (TypeError, ValueError):
+            elapsed_seconds = None
+    payload = {
+        'type': 'abav1_progress',
+        'metric': metric_label,
+        'metrics': list(metrics) if metrics else [metric_label],
+        'percent': percent,
+        'eta_seconds': eta_seconds,
+        'eta_text': eta_text,
+        'duration_seconds': duration_seconds,
+        'interpolated': interpolated,
+        'done': done,
+        'timestamp': time.time(),
+        'elapsed_seconds': elapsed_seconds,
+    }
+    display_eta = eta_text
+    if display_eta is None and eta_seconds is not None:
+        display_eta = _format_eta_short(eta_seconds)
+    if percent is not None:
+        percent_display = f"{format_localized_number(percent, decimals=1)}%"
+    else:
+        percent_display = "?"
+    if display_eta is not None:
+        payload['text'] = f"{metric_label} {percent_display} (ETA {display_eta})"
+    else:
+        payload['text'] = f"{metric_label} {percent_display}"
+    return payload
+
+
+def _run_abav1_metric(metric, reference_path, encoded_path, progress_callback=None, stop_event=None, logger=None, duration_seconds=None,
+                      frame_scores_callback=None, core_budget=None):
     """Run an ab-av1 metric command (vmaf or xpsnr) and return the result.
     
     Args:
@@ -3143,6 +4133,9 @@ def _run_abav1_metric(metric, reference_path, encoded_path, progress_callback=No
         stop_event: Event to stop calculation.
         logger: Logger instance.
         duration_seconds: Video duration in seconds.
+        frame_scores_callback: Callback(metric_name, scores) - vmaf esetén a libvmaf
+            JSON log (--vmaf log_path=...) per-frame pontszámaival.
+        core_budget: vmaf esetén libvmaf n_threads (None = az ab-av1 alapértelmezése).
         
     Returns:
         float: Metric score or None on error.
@@ -3152,7 +4145,7 @@ def _run_abav1_metric(metric, reference_path, encoded_path, progress_callback=No
     if stop_event.is_set():
         raise EncodingStopped()
 
-    metric_name = metric_name.lower()
+    metric_name = metric.lower()
     reference_str = os.fspath(reference_path.absolute())
     encoded_str = os.fspath(encoded_path.absolute())
     cmd = [
@@ -3161,6 +4154,13 @@ def _run_abav1_metric(metric, reference_path, encoded_path, progress_callback=No
         '--reference', reference_str,
         '--distorted', encoded_str,
     ]
+    work_dir = None
+    if frame_scores_callback and metric_name == 'vmaf':
+        # Per-frame log a libvmaf-nak átadott opciókkal; relatív útvonal a munkakönyvtárban
+        work_dir = tempfile.mkdtemp(prefix='av1_vmaf_')
+        cmd += ['--vmaf', 'log_fmt=json', '--vmaf', 'log_path=vmaf_frames.json']
+    if core_budget and metric_name == 'vmaf':
+        cmd += ['--vmaf', f'n_threads={int(core_budget)}']
 
     try:
         duration_seconds = float(duration_seconds)
@@ -3192,35 +4192,8 @@ def _run_abav1_metric(metric, reference_path, encoded_path, progress_callback=No
     def _send_progress(percent=None, eta_seconds=None, eta_text=None, interpolated=False, done=False):
         if not progress_callback:
             return
-        elapsed_seconds = None
-        if percent is not None and duration_seconds:
-            try:
-                elapsed_seconds = max(0.0, min(duration_seconds, duration_seconds * (percent / 100.0)))
-            except (TypeError, ValueError):
-                elapsed_seconds = None
-        payload = {
-            'type': 'abav1_progress',
-            'metric': metric_name.upper(),
-            'percent': percent,
-            'eta_seconds': eta_seconds,
-            'eta_text': eta_text,
-            'duration_seconds': duration_seconds,
-            'interpolated': interpolated,
-            'done': done,
-            'timestamp': time.time(),
-            'elapsed_seconds': elapsed_seconds,
-        }
-        display_eta = eta_text
-        if display_eta is None and eta_seconds is not None:
-            display_eta = _format_eta_short(eta_seconds)
-        if percent is not None:
-            percent_display = f"{format_localized_number(percent, decimals=1)}%"
-        else:
-            percent_display = "?"
-        if display_eta is not None:
-            payload['text'] = f"{metric_name.upper()} {percent_display} (ETA {display_eta})"
-        else:
-            payload['text'] = f"{metric_name.upper()} {percent_display}"
+        payload = _metric_progress_payload(metric_name.upper(), percent=percent, eta_seconds=eta_seconds, eta_text=eta_text,
+                                           duration_seconds=duration_seconds, interpolated=interpolated, done=done)
         try:
             progress_callback(payload)
         except Exception:
@@ -3267,28 +4240,30 @@ def _run_abav1_metric(metric, reference_path, encoded_path, progress_callback=No
         thread.start()
         return thread
 
-    creationflags = 0
-    preexec_fn = None
-    if platform.system() == 'Windows':
-        creationflags = subprocess.CREATE_NEW_PROCESS_GROUP
-    else:
-        preexec_fn = os.setsid
+    placement = child_process_kwargs()
 
-    process = subprocess.Popen(
-        cmd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        bufsize=1,
-        startupinfo=get_startup_info(),
-        creationflags=creationflags,
-        preexec_fn=preexec_fn
-    )
+    try:
+        process = subprocess.Popen(
+            cmd,
+            cwd=work_dir,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+            startupinfo=get_startup_info(),
+            **placement
+        )
+        apply_process_placement(process, 'metric')
+    except BaseException:
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        raise
 
     with ACTIVE_PROCESSES_LOCK:
         ACTIVE_PROCESSES.append(process)
 
     interpolator_thread = _start_interpolator()
+    frame_scores = {}
     full_output = []
     last_percent_reported = None
     try:
@@ -3334,6 +4309,12 @@ def _run_abav1_metric(metric, reference_path, encoded_path, progress_callback=No
                     interpolation_state['reset_requested'] = True
                 _send_progress(percent=percent, eta_seconds=eta_seconds, eta_text=eta_text)
         process.wait()
+        if work_dir and process.returncode == 0:
+            try:
+                frame_scores = _libvmaf_log_scores(os.path.join(work_dir, 'vmaf_frames.json'), {'VMAF': 'vmaf'})
+            except (OSError, ValueError) as e:
+                if logger:
+                    logger.write(f"⚠ Per-frame VMAF log nem olvasható: {e}\n")
     finally:
         with ACTIVE_PROCESSES_LOCK:
             if process in ACTIVE_PROCESSES:
@@ -3341,6 +4322,8 @@ def _run_abav1_metric(metric, reference_path, encoded_path, progress_callback=No
         interpolator_stop.set()
         if interpolator_thread:
             interpolator_thread.join(timeout=2)
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
 
     if process.returncode != 0:
         raise RuntimeError(f"ab-av1 {metric_name} parancs hibával tért vissza (rc={process.returncode})")
@@ -3358,6 +4341,9 @@ def _run_abav1_metric(metric, reference_path, encoded_path, progress_callback=No
     if logger:
         logger.write(f"{metric_name.upper()} eredmény: {metric_value:.4f}\n")
         logger.flush()
+    if frame_scores_callback:
+        for name, scores in frame_scores.items():
+            frame_scores_callback(name, scores)
 
     return metric_value
 
@@ -3390,1824 +4376,6903 @@ def _extract_abav1_metric_value(metric_name, output_text):
     return None
 
 
-def calculate_full_vmaf(reference_path, encoded_path, progress_callback=None, stop_event=None, logger=None, check_vmaf=True, check_psnr=True, metric_done_callback=None):
-    """Calculate VMAF and/or PSNR metrics using ab-av1 (preferred) or FFmpeg fallback.
-    
-    Args:
-        reference_path: Path to reference video.
-        encoded_path: Path to encoded video.
-        progress_callback: Callback for progress updates.
-        stop_event: Event to stop calculation.
-        logger: Logger instance.
-        check_vmaf: Whether to calculate VMAF.
-        check_psnr: Whether to calculate PSNR.
-        metric_done_callback: Callback when a metric is done.
-        
-    Returns:
-        tuple: (vmaf_value, psnr_value)
-    """
-    """Teljes VMAF + XPSNR számítás ab-av1 segítségével, FFmpeg-es visszaeséssel."""
-    if stop_event is None:
-        stop_event = STOP_EVENT
-    reference_path = Path(reference_path)
-    encoded_path = Path(encoded_path)
-    if not check_vmaf and not check_psnr:
-        check_vmaf = True
+def vmaf_model_for_resolution(width, height):
+    """A VMAF modell, amit a mérés a referencia felbontásához választ (ab-av1 vmaf-scale auto szabály)."""
+    if width and height and width > 2560 and height > 1440:
+        return 'vmaf_4k_v0.6.1'
+    return 'vmaf_v0.6.1'
 
-    duration_seconds, _ = get_video_info(reference_path)
-    if _is_abav1_available():
-        try:
-            vmaf_value = None
-            psnr_value = None
-            if check_vmaf:
-                vmaf_value = _run_abav1_metric('vmaf', reference_path, encoded_path, progress_callback, stop_event, logger, duration_seconds=duration_seconds)
-                if metric_done_callback and vmaf_value is not None:
-                    metric_done_callback('VMAF', vmaf_value)
-            if check_psnr:
-                psnr_value = _run_abav1_metric('xpsnr', reference_path, encoded_path, progress_callback, stop_event, logger, duration_seconds=duration_seconds)
-                if metric_done_callback and psnr_value is not None:
-                    metric_done_callback('PSNR', psnr_value)
-            return vmaf_value, psnr_value
-        except EncodingStopped:
-            raise
-        except Exception as e:
-            fallback_msg = f"⚠ ab-av1 VMAF/XPSNR számítás hiba: {e} – FFmpeg fallback"
-            print(fallback_msg)
-            if logger:
-                logger.write(fallback_msg + "\n")
-                logger.flush()
 
-    vmaf_value, psnr_value = _calculate_full_vmaf_ffmpeg(reference_path, encoded_path, progress_callback, stop_event, logger)
-    if metric_done_callback:
-        if check_vmaf and vmaf_value is not None:
-            metric_done_callback('VMAF', vmaf_value)
-        if check_psnr and psnr_value is not None:
-            metric_done_callback('PSNR', psnr_value)
-    if not check_vmaf:
-        vmaf_value = None
-    if not check_psnr:
-        psnr_value = None
-    return vmaf_value, psnr_value
+METRIC_SUMMARY_PATTERNS = {
+    'VMAF': re.compile(r'VMAF\s+score[:\s=]+\s*([\d.]+)', re.IGNORECASE),
+    'XPSNR': re.compile(r'XPSNR\s+y:\s*([\d.]+)', re.IGNORECASE),
+    'PSNR': re.compile(r'(?<!X)PSNR\s+y:\s*([\d.]+)'),
+    'SSIM': re.compile(r'SSIM\s+Y:.*?All:\s*([\d.]+)'),
+}  # ffmpeg metrika filterek összesítő sorai (a filter lezárásakor íródnak ki)
 
+METRIC_STATS_PATTERNS = {
+    'XPSNR': re.compile(r'XPSNR\s+y:\s*(inf|[\d.]+)', re.IGNORECASE),
+    'PSNR': re.compile(r'psnr_y:\s*(inf|[\d.]+)'),
+}  # ffmpeg xpsnr / psnr filter stats_file per-frame sorai (luma)
+
+
+def _combined_metrics_filtergraph(metrics, reference_size, distorted_size, n_threads, libvmaf_extra=None,
+                                  reference_input='0:v', distorted_input='1:v', output_prefix=None, filter_options=None):
+    """Filtergraph, ami mindkét bemenetet egyszer dekódolja és split-tel osztja szét a metrikák között.
+
+    A VMAF ág az ab-av1 alapértelmezéseit követi (vmaf-scale auto: 1080p alatt felskálázás,
+    2560x1440 felett 4K modell), a PSNR/XPSNR/SSIM natív felbontáson fut.
+
+    Args:
+        metrics: Metrika nevek listája ('VMAF', 'PSNR', 'XPSNR', 'SSIM').
+        reference_size: (width, height) a referenciához (None értékek megengedettek).
+        distorted_size: (width, height) a kódolt fájlhoz.
+        n_threads: libvmaf szálak száma.
+        libvmaf_extra: További libvmaf opciók (pl. log_fmt/log_path/feature).
+        reference_input: A referencia bemenet címkéje (pl. '0:v').
+        distorted_input: A torzított bemenet címkéje (pl. '1:v' vagy loopback dekóder: 'dec:0').
+        output_prefix: Ha meg van adva, a metrika filterek kimenetei [<prefix><index>] címkét kapnak
+            (külön -map kell rájuk, különben az ffmpeg a fő kimenetbe tenné őket).
+        filter_options: {metrika: opciók} a PSNR/XPSNR/SSIM filterekhez (pl. {'XPSNR': 'stats_file=x.log'}).
+
+    Returns:
+        str: -filter_complex érték.
+    """
+    filter_options = filter_options or {}
+    ref_w, ref_h = reference_size
+    dist_w, dist_h = distorted_size
+    prep = 'format=yuv420p10le,setpts=PTS-STARTPTS'
+    dist_prep = prep
+    if ref_w and ref_h and (dist_w, dist_h) != (ref_w, ref_h):
+        # Átméretezett kódolás: a torzított képet a referencia felbontására hozzuk
+        dist_prep = f'scale={ref_w}:{ref_h}:flags=bicubic,{prep}'
+
+    count = len(metrics)
+    if count == 1:
+        parts = [f'[{distorted_input}]{dist_prep}[d0]', f'[{reference_input}]{prep}[r0]']
+    else:
+        dist_labels = ''.join(f'[d{i}]' for i in range(count))
+        ref_labels = ''.join(f'[r{i}]' for i in range(count))
+        parts = [f'[{distorted_input}]{dist_prep},split={count}{dist_labels}', f'[{reference_input}]{prep},split={count}{ref_labels}']
+
+    for index, metric in enumerate(metrics):
+        dist_label = f'd{index}'
+        ref_label = f'r{index}'
+        out_label = f'[{output_prefix}{index}]' if output_prefix else ''
+        if metric == 'VMAF':
+            libvmaf_options = f'n_threads={n_threads}'
+            if vmaf_model_for_resolution(ref_w, ref_h) == 'vmaf_4k_v0.6.1':
+                libvmaf_options += ':model=version=vmaf_4k_v0.6.1'
+            elif ref_w and ref_h and ref_w < 1920 and ref_h < 1080:
+                upscale = 'scale=1920:1080:force_original_aspect_ratio=decrease:force_divisible_by=2:flags=bicubic'
+                parts.append(f'[{dist_label}]{upscale}[{dist_label}s]')
+                parts.append(f'[{ref_label}]{upscale}[{ref_label}s]')
+                dist_label += 's'
+                ref_label += 's'
+            if libvmaf_extra:
+                libvmaf_options += f':{libvmaf_extra}'
+            parts.append(f'[{dist_label}][{ref_label}]libvmaf={libvmaf_options}{out_label}')
+        elif metric in ('XPSNR', 'PSNR', 'SSIM'):
+            options = f"={filter_options[metric]}" if filter_options.get(metric) else ''
+            parts.append(f'[{dist_label}][{ref_label}]{metric.lower()}{options}{out_label}')
+    return ';'.join(parts)
+
+
+def _calculate_combined_metrics_ffmpeg(reference_path, encoded_path, check_vmaf=True, check_psnr=True, check_ssim=False,
+                                       progress_callback=None, stop_event=None, logger=None, duration_seconds=None,
+                                       frame_scores_callback=None, core_budget=None, psnr_metric=None):
+    """VMAF + PSNR/XPSNR (+ SSIM) egyetlen ffmpeg futásban - mindkét bemenet egyszer dekódolva.
+
+    A PSNR ág az ffmpeg xpsnr filterét használja, ha elérhető (az ab-av1 xpsnr értékével
+    összevethető), különben a psnr filter luma értékét.
 
-def _calculate_full_vmaf_ffmpeg(reference_path, encoded_path, progress_callback=None, stop_event=None, logger=None):
-    """Calculate VMAF using FFmpeg directly (fallback method).
-    
     Args:
         reference_path: Path to reference video.
         encoded_path: Path to encoded video.
-        progress_callback: Callback for progress updates.
+        check_vmaf: Whether to calculate VMAF.
+        check_psnr: Whether to calculate PSNR/XPSNR.
+        check_ssim: Whether to calculate SSIM.
+        progress_callback: Callback for progress updates ('abav1_progress' payload).
         stop_event: Event to stop calculation.
         logger: Logger instance.
-        
+        duration_seconds: Reference duration in seconds (progress / ETA).
+        frame_scores_callback: Callback(metric_name, scores) - a VMAF per-frame tömb a libvmaf JSON logból.
+        core_budget: libvmaf szálak száma (None = METRIC_CORE_BUDGET).
+        psnr_metric: 'XPSNR' vagy 'PSNR' kényszerítése (None = XPSNR, ha az ffmpeg ismeri).
+
     Returns:
-        tuple: (vmaf_value, psnr_value) - PSNR is always None in this fallback.
-    """
-    """
-    Teljes VMAF és PSNR teszt futtatása ffmpeg libvmaf használatával.
-    Visszaadja a (VMAF érték, PSNR érték) tuple-t vagy (None, None)-t hiba esetén.
-    FFmpeg 8.0+ kompatibilis - VMAF és PSNR egy parancsban.
+        dict: {'VMAF': float, 'PSNR' vagy 'XPSNR': float, 'SSIM': float} a kért metrikákkal.
+
+    Raises:
+        EncodingStopped: Leállítás esetén.
+        RuntimeError: Ha a futás hibázik vagy egy kért metrika hiányzik (a hívó visszaesik).
     """
-    global LIBVMAF_SUPPORTS_PSNR
     if stop_event is None:
         stop_event = STOP_EVENT
-    
+    if stop_event.is_set():
+        raise EncodingStopped()
+
+    metrics = []
+    if check_vmaf:
+        if TOOL_CAPABILITIES.ffmpeg() and not TOOL_CAPABILITIES.has_filter('libvmaf'):
+            raise RuntimeError("az ffmpeg libvmaf nélkül készült")
+        metrics.append('VMAF')
+    if check_psnr:
+        metrics.append(psnr_metric or ('XPSNR' if TOOL_CAPABILITIES.has_filter('xpsnr') else 'PSNR'))
+    if check_ssim:
+        metrics.append('SSIM')
+    if not metrics:
+        return {}
+    metric_label = '+'.join(metrics)
+
     reference_str = os.fspath(reference_path.absolute())
     encoded_str = os.fspath(encoded_path.absolute())
-    
-    # Videó teljes hosszának lekérdezése
-    duration_seconds, _ = get_video_info(reference_path)
-    if duration_seconds is None:
-        duration_seconds = 0
-    
-    duration_hours = int(duration_seconds // 3600)
-    duration_mins = int((duration_seconds % 3600) // 60)
-    duration_secs = int(duration_seconds % 60)
-    
-    # FFmpeg parancs VMAF számításhoz
-    # libvmaf filter használata teljes videóra
-    # Automatikus processzormag detektálás és használat
-    cpu_count = multiprocessing.cpu_count()
-    
-    # FFmpeg 8.0+: VMAF és PSNR egy parancsban (feature=name=psnr)
-    base_libvmaf_filter = f'libvmaf=n_threads={cpu_count}:feature=name=psnr'
-    libvmaf_filter = base_libvmaf_filter
-    
-    ffmpeg_cmd = [
-        FFMPEG_PATH,
+    # Per-frame VMAF log relatív útvonallal a munkakönyvtárban (a filter opciókban a ':' / '\\' escape-elése elkerülhető)
+    work_dir = tempfile.mkdtemp(prefix='av1_vmaf_') if frame_scores_callback and 'VMAF' in metrics else None
+    filtergraph = _combined_metrics_filtergraph(
+        metrics, get_video_resolution(reference_path), get_video_resolution(encoded_path), get_metric_core_budget(core_budget),
+        libvmaf_extra="log_fmt=json:log_path=vmaf_frames.json" if work_dir else None)
+    cmd = [
+        FFMPEG_PATH, '-hide_banner',
         '-i', reference_str,
         '-i', encoded_str,
-        '-lavfi', libvmaf_filter,
-        '-f', 'null',
-        '-'
+        '-filter_complex', filtergraph,
+        '-f', 'null', '-'
     ]
-    
-    # FFmpeg parancs kiírása a logger-be
+
+    try:
+        duration_seconds = float(duration_seconds)
+        if duration_seconds <= 0:
+            duration_seconds = None
+    except (TypeError, ValueError):
+        duration_seconds = None
+
     if logger:
         logger.write(f"\n{'='*80}\n")
-        logger.write(f"🎬 VMAF/PSNR SZÁMÍTÁS PARANCS:\n")
+        logger.write(f"🎬 {metric_label} SZÁMÍTÁS (egy dekódolás):\n")
+        logger.write(' '.join(cmd) + '\n')
         logger.write(f"{'='*80}\n")
-        logger.write(' '.join(ffmpeg_cmd) + '\n')
-        logger.write(f"Videó hossza: {duration_hours:02d}:{duration_mins:02d}:{duration_secs:02d}\n")
-        logger.write(f"{'='*80}\n\n")
         logger.flush()
-    
+    if progress_callback:
+        progress_callback(f"{metric_label} (ffmpeg)")
+
+    def _send_progress(percent=None, eta_seconds=None, eta_text=None, done=False):
+        if not progress_callback:
+            return
+        try:
+            progress_callback(_metric_progress_payload(metric_label, percent=percent, eta_seconds=eta_seconds, eta_text=eta_text,
+                                                       duration_seconds=duration_seconds, done=done, metrics=metrics))
+        except Exception:
+            # A GUI callback hibája ne állítsa le a fő folyamatot
+            pass
+
+    results = {}
+
+    placement = child_process_kwargs()
+
     try:
         process = subprocess.Popen(
-            ffmpeg_cmd,
+            cmd,
+            cwd=work_dir,
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
             text=True,
             bufsize=1,
-            startupinfo=get_startup_info()
+            startupinfo=get_startup_info(),
+            **placement
         )
-        
-        with ACTIVE_PROCESSES_LOCK:
-            ACTIVE_PROCESSES.append(process)
-        
-        # VMAF és PSNR érték kinyerése a stdout-ból
-        vmaf_value = None
-        psnr_value = None
-        full_output = []
-        
-        try:
-            for line in process.stdout:
-                if stop_event.is_set():
-                    process.terminate()
-                    try:
-                        process.wait(timeout=5)
-                    except subprocess.TimeoutExpired:
-                        process.kill()
-                    raise EncodingStopped()
-                
-                full_output.append(line)
-                
-                # FFmpeg kimenet kiírása a logger-be
-                if logger:
-                    logger.write(line)
-                    logger.flush()
-                
-                # VMAF érték keresése a kimenetben
-                # libvmaf formátum: "VMAF score: XX.XXXX" vagy "VMAF score = XX.XXXX"
-                vmaf_match = re.search(r'VMAF\s+score[:\s=]+\s*([\d.]+)', line, re.IGNORECASE)
-                if vmaf_match:
-                    try:
-                        vmaf_value = float(vmaf_match.group(1))
-                    except ValueError:
-                        pass
-                
-                # PSNR érték keresése a kimenetben
-                # libvmaf formátum: "PSNR score: XX.XXXX" vagy "PSNR score = XX.XXXX" vagy "PSNR: XX.XXXX"
-                psnr_match = re.search(r'PSNR\s+(?:score[:\s=]+|:)\s*([\d.]+)', line, re.IGNORECASE)
-                if psnr_match:
-                    try:
-                        psnr_value = float(psnr_match.group(1))
-                    except ValueError:
-                        pass
-                
-                # Progress információ kinyerése - időtartam formátumban
-                if progress_callback and ('frame=' in line or 'time=' in line):
-                    if 'time=' in line:
-                        time_match = re.search(r'time=(\d+):(\d+):(\d+)(?:\.\d+)?', line)
-                        if time_match:
-                            hours, mins, secs = map(int, time_match.groups())
-                            elapsed_total = hours * 3600 + mins * 60 + secs
-                            # Korlátozzuk a videó hosszára
-                            elapsed_total = min(elapsed_total, duration_seconds) if duration_seconds > 0 else elapsed_total
-                            
-                            # Időtartam formátum: "HH:MM:SS / HH:MM:SS"
-                            progress_hours = int(elapsed_total // 3600)
-                            progress_mins = int((elapsed_total % 3600) // 60)
-                            progress_secs = int(elapsed_total % 60)
-                            
-                            progress_callback(f"{progress_hours:02d}:{progress_mins:02d}:{progress_secs:02d} / {duration_hours:02d}:{duration_mins:02d}:{duration_secs:02d}")
-        except EncodingStopped:
-            raise
-        except (OSError, IOError, BrokenPipeError, UnicodeDecodeError) as e:
-            if logger:
-                logger.write(f"Process output olvasás hiba: {e}\n")
-                logger.flush()
-            print(f"✗ Process output olvasás hiba: {e}")
-        finally:
-            # KÖZEPES JAVÍTÁS #9: Process törlése a listából - mindig végrehajtjuk
-            with ACTIVE_PROCESSES_LOCK:
-                if process in ACTIVE_PROCESSES:
-                    ACTIVE_PROCESSES.remove(process)
-        
-        # KÖZEPES JAVÍTÁS #9: process.wait() áthelyezve a try blokkba (2567. sor), így nincs duplikált cleanup
-        if process.returncode != 0:
-            error_msg = f"✗ VMAF számítás hiba (return code: {process.returncode})"
+        apply_process_placement(process, 'metric')
+    except BaseException:
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+    with ACTIVE_PROCESSES_LOCK:
+        ACTIVE_PROCESSES.append(process)
+
+    started = time.monotonic()
+    full_output = []
+    frame_scores = {}
+    try:
+        for line in process.stdout:
+            if stop_event.is_set():
+                terminate_process_tree(process)
+                try:
+                    process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    terminate_process_tree(process)
+                raise EncodingStopped()
+            full_output.append(line)
             if logger:
-                logger.write(error_msg + '\n')
-                logger.flush()
-            print(error_msg)
-            if LIBVMAF_SUPPORTS_PSNR and ("feature" in ''.join(full_output).lower()):
-                LIBVMAF_SUPPORTS_PSNR = False
-                print("⚠ Libvmaf nem támogatja a feature=name=psnr opciót – PSNR külön futtatásra váltok.")
-                return _calculate_full_vmaf_ffmpeg(reference_path, encoded_path, progress_callback, stop_event, logger)
-            return None
-        
-        if vmaf_value is None or psnr_value is None:
-            # Próbáljuk meg az összes sorban keresni
-            full_output_text = ''.join(full_output)
-            if vmaf_value is None:
-                vmaf_match = re.search(r'VMAF\s+score[:\s=]+\s*([\d.]+)', full_output_text, re.IGNORECASE)
-                if vmaf_match:
-                    try:
-                        vmaf_value = float(vmaf_match.group(1))
-                    except ValueError:
-                        pass
-            if psnr_value is None:
-                psnr_match = re.search(r'PSNR\s+(?:score[:\s=]+|:)\s*([\d.]+)', full_output_text, re.IGNORECASE)
-                if psnr_match:
+                logger.write(line)
+            for metric in metrics:
+                match = METRIC_SUMMARY_PATTERNS[metric].search(line)
+                if match:
                     try:
-                        psnr_value = float(psnr_match.group(1))
+                        results[metric] = float(match.group(1))
                     except ValueError:
                         pass
-        
-        return (vmaf_value, psnr_value)
-        
-    except EncodingStopped:
-        raise
-    except Exception as e:
-        error_msg = f"✗ VMAF/PSNR számítás hiba: {e}"
-        if logger:
-            logger.write(error_msg + '\n')
-            logger.flush()
-        print(error_msg)
-        return (None, None)
+            if duration_seconds and 'time=' in line:
+                time_match = re.search(r'time=(\d+):(\d+):(\d+(?:\.\d+)?)', line)
+                if time_match:
+                    hours, mins, secs = time_match.groups()
+                    position = int(hours) * 3600 + int(mins) * 60 + float(secs)
+                    percent = max(0.0, min(99.9, position / duration_seconds * 100.0))
+                    eta_seconds = None
+                    if percent > 0:
+                        wall_elapsed = time.monotonic() - started
+                        eta_seconds = wall_elapsed / percent * (100.0 - percent)
+                    _send_progress(percent=percent, eta_seconds=eta_seconds)
+        process.wait()
+        if work_dir and process.returncode == 0:
+            try:
+                frame_scores = _libvmaf_log_scores(os.path.join(work_dir, 'vmaf_frames.json'), {'VMAF': 'vmaf'})
+            except (OSError, ValueError) as e:
+                if logger:
+                    logger.write(f"⚠ Per-frame VMAF log nem olvasható: {e}\n")
+    finally:
+        with ACTIVE_PROCESSES_LOCK:
+            if process in ACTIVE_PROCESSES:
+                ACTIVE_PROCESSES.remove(process)
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
 
-def update_video_metadata_vmaf(video_path, vmaf_value, psnr_value=None, logger=None):
-    """Update video metadata with calculated VMAF and PSNR values.
-    
-    Writes the values to the file metadata using FFmpeg.
-    
-    Args:
-        video_path: Path to the video file.
-        vmaf_value: Calculated VMAF score.
-        psnr_value: Calculated PSNR score (optional).
-        logger: Logger instance.
-        
-    Returns:
-        bool: True if successful, False otherwise.
-    """
-    video_str = None
-    temp_path = None
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg {metric_label} hibával tért vissza (rc={process.returncode})")
+    missing = [metric for metric in metrics if metric not in results]
+    if missing:
+        raise RuntimeError(f"hiányzó metrika a kimenetben: {', '.join(missing)}")
+
+    _send_progress(percent=100, eta_seconds=0, eta_text="kész", done=True)
+    if progress_callback:
+        progress_callback(" | ".join(f"{metric}: {format_metric_value(results[metric], decimals=4 if metric == 'SSIM' else 2)}" for metric in metrics))
+    if logger:
+        logger.write(" | ".join(f"{metric} eredmény: {results[metric]:.4f}" for metric in metrics) + "\n")
+        logger.flush()
+    if frame_scores_callback:
+        for name, scores in frame_scores.items():
+            frame_scores_callback(name, scores)
+    return results
+
+
+def get_metric_core_budget(core_budget=None):
+    """Metrika számításra használható logikai magok száma (METRIC_CORE_BUDGET, 0 = összes mag)."""
+    cpu_count = multiprocessing.cpu_count()
+    budget = core_budget if core_budget is not None else METRIC_CORE_BUDGET
     try:
-        video_str = os.fspath(video_path.absolute())
-        
-        # Metaadatokhoz nyelvfüggetlen (angol) formátumot használunk
-        vmaf_str_formatted = format_number_en(vmaf_value, decimals=2) if vmaf_value is not None else None
-        psnr_str_formatted = format_number_en(psnr_value, decimals=2) if psnr_value is not None else None
+        budget = int(budget)
+    except (TypeError, ValueError):
+        budget = 0
+    if budget <= 0:
+        return cpu_count
+    return max(1, min(budget, cpu_count))
 
-        if logger:
-            logger.write(f"\n{'='*80}\n")
-            logger.write(f"📝 VMAF/PSNR METADATA FRISSÍTÉS: {video_path.name}\n")
-            logger.write(f"{'='*80}\n")
-            logger.write(f"Új VMAF érték: {vmaf_str_formatted}\n")
-            if psnr_value is not None:
-                logger.write(f"Új PSNR érték: {psnr_str_formatted}\n")
-            logger.flush()
-        
-        # Megkeressük a jelenlegi Settings metaadatot
-        probe_cmd = [
-            FFPROBE_PATH, '-v', 'error',
-            '-show_entries', 'format_tags=Settings',
-            '-of', 'default=noprint_wrappers=1:nokey=1',
-            video_str
-        ]
-        
-        result = subprocess.run(probe_cmd, capture_output=True, text=True, timeout=30, startupinfo=get_startup_info())
-        current_settings = result.stdout.strip() if result.stdout else ""
-        
-        if logger:
-            logger.write(f"Jelenlegi Settings: {current_settings}\n")
-            logger.flush()
-        
-        # Új Settings metaadat létrehozása VMAF értékkel
-        if current_settings:
-            # Ha már van Settings, frissítjük a VMAF részt
-            # Formátum: "FFMPEG NVENC - CQ:XX - Preset 7 - Planned VMAF: XX.X"
-            # Vagy: "FFMPEG SVT-AV1 - CRF:XX - Preset 2 - Planned VMAF: XX.X"
-            # Vagy: "... - Actual VMAF: XX.X" (ha már volt VMAF számítás)
-            new_settings = current_settings
-            
-            # Ha már van "Actual VMAF", azt frissítjük
-            # A regex kezeli a tizedesvesszőt és tizedespontot is
-            if 'Actual VMAF' in current_settings:
-                # Először eltávolítjuk az összes "Actual VMAF: ..." részt (akár több is lehet)
-                new_settings = re.sub(
-                    r'Actual VMAF:\s*[\d.,]+(?:\s*-\s*)?',
-                    '',
-                    current_settings
-                ).strip()
-                # Eltávolítjuk a felesleges " - " részeket
-                new_settings = re.sub(r'\s*-\s*-\s*', ' - ', new_settings)
-                new_settings = re.sub(r'^\s*-\s*', '', new_settings)
-                new_settings = re.sub(r'\s*-\s*$', '', new_settings)
-                # Hozzáadjuk az új "Actual VMAF" értéket
-                if new_settings:
-                    new_settings = f"{new_settings} - Actual VMAF: {vmaf_str_formatted}"
-                else:
-                    new_settings = f"Actual VMAF: {vmaf_str_formatted}"
-            # Ha van "Planned VMAF", azt cseréljük le "Actual VMAF"-ra
-            elif 'Planned VMAF' in current_settings:
-                new_settings = re.sub(
-                    r'Planned VMAF:\s*[\d.,]+',
-                    f'Actual VMAF: {vmaf_str_formatted}',
-                    current_settings
-                )
-            # Ha egyáltalán nem volt VMAF információ, hozzáadjuk
-            else:
-                new_settings = f"{current_settings} - Actual VMAF: {vmaf_str_formatted}"
-            
-            # PSNR hozzáadása/frissítése
-            # A regex kezeli a tizedesvesszőt és tizedespontot is
-            if psnr_value is not None:
-                if 'PSNR:' in new_settings:
-                    new_settings = re.sub(
-                        r'PSNR:\s*[\d.,]+',
-                        f'PSNR: {psnr_str_formatted}',
-                        new_settings
-                    )
-                else:
-                    new_settings = f"{new_settings} - PSNR: {psnr_str_formatted}"
-        else:
-            # Ha nincs Settings metaadat, létrehozzuk
-            if psnr_value is not None:
-                new_settings = f"Actual VMAF: {vmaf_str_formatted} - PSNR: {psnr_str_formatted}"
-            else:
-                new_settings = f"Actual VMAF: {vmaf_str_formatted}"
-        
-        # FFmpeg parancs metaadat frissítéshez (copy minden streamet, csak metaadatot módosítjuk)
-        # Temp fájl az eredeti kiterjesztéssel, hogy az FFmpeg felismerje a formátumot
-        # Kezeljük a több kiterjesztésű fájlokat is (pl. teszt.av1.mkv -> teszt.av1.tmp.mkv)
-        file_name = video_path.name
-        # Keresünk egy pontot, ahol be tudjuk szúrni a .tmp-ot a végső kiterjesztés elé
-        if '.' in file_name:
-            # Megkeressük az utolsó pontot (a végső kiterjesztés)
-            last_dot_index = file_name.rfind('.')
-            temp_name = file_name[:last_dot_index] + '.tmp' + file_name[last_dot_index:]
-        else:
-            # Ha nincs kiterjesztés, csak hozzáfűzzük a .tmp-ot
-            temp_name = file_name + '.tmp'
-        temp_path = Path(video_path.parent / temp_name)
-        ffmpeg_cmd = [
-            FFMPEG_PATH, '-i', video_str,
-            '-map', '0',            # Minden stream megőrzése (videó, hang, felirat, melléklet)
-            '-c', 'copy',           # Copy minden streamet
-            '-map_metadata', '0',   # Meglévő metaadatok megtartása
-            '-metadata', f'Settings={new_settings}',
-            '-y',  # Overwrite
-            os.fspath(temp_path)
-        ]
-        
-        if logger:
-            logger.write(f"Új Settings: {new_settings}\n")
-            logger.write(f"FFmpeg parancs: {' '.join(ffmpeg_cmd)}\n")
-            logger.flush()
-        
-        result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True, timeout=300, startupinfo=get_startup_info())
-        
-        if result.returncode == 0:
-            # Sikeres, átnevezzük a fájlt
-            if temp_path.exists():
-                temp_path.replace(video_path)
-                if logger:
-                    logger.write(f"✓ Metadata frissítés sikeres: {video_path.name}\n")
-                    logger.write(f"{'='*80}\n\n")
-                    logger.flush()
-                return True
-            else:
-                if logger:
-                    logger.write(f"✗ Hiba: Temp fájl nem jött létre: {temp_path}\n")
-                    logger.write(f"{'='*80}\n\n")
-                    logger.flush()
-        else:
-            if logger:
-                logger.write(f"✗ FFmpeg hiba (returncode: {result.returncode}):\n")
-                if result.stderr:
-                    logger.write(f"STDERR: {result.stderr}\n")
-                if result.stdout:
-                    logger.write(f"STDOUT: {result.stdout}\n")
-                logger.write(f"{'='*80}\n\n")
-                logger.flush()
-        
-        return False
-        
-    except Exception as e:
-        error_msg = f"✗ Metaadat frissítés hiba: {e}"
-        if logger:
-            logger.write(f"\n{error_msg}\n")
-            import traceback
-            logger.write(f"Traceback:\n{traceback.format_exc()}\n")
-            logger.write(f"{'='*80}\n\n")
-            logger.flush()
-        print(error_msg)
-        # Temp fájl törlése hiba esetén
-        try:
-            if temp_path and temp_path.exists():
-                temp_path.unlink()
-        except (OSError, PermissionError):
-            pass
-        return False
 
-def get_video_info(video_path):
-    """Retrieve basic video information using FFprobe.
-    
-    Args:
-        video_path: Path to the video file (Path or str).
-        
+def _probe_packet_times(video_path, timeout=FRAME_COUNT_PACKET_TIMEOUT):
+    """Videó packetek időbélyegei és a kulcskockák időbélyegei (csak demux, nincs dekódolás).
+
     Returns:
-        tuple: (duration, fps) where:
-            - duration: Video duration in seconds (float)
-            - fps: Frame rate (float)
-            Returns (None, None) on error.
+        tuple: (frame_times, keyframe_times) - rendezett pts_time listák (másodperc).
     """
-    try:
-        # Duration lekérdezése
-        cmd_duration = [
-            FFPROBE_PATH, '-v', 'error',
-            '-show_entries', 'format=duration',
-            '-of', 'default=noprint_wrappers=1:nokey=1',
-            os.fspath(video_path)
-        ]
-        result = subprocess.run(cmd_duration, capture_output=True, text=True, check=True, timeout=30, startupinfo=get_startup_info())
-        duration = float(result.stdout.strip())
-        
-        # FPS lekérdezése
-        cmd_fps = [
-            FFPROBE_PATH, '-v', 'error',
-            '-select_streams', 'v:0',
-            '-show_entries', 'stream=r_frame_rate',
-            '-of', 'default=noprint_wrappers=1:nokey=1',
-            os.fspath(video_path)
-        ]
+    cmd = [
+        FFPROBE_PATH, '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries', 'packet=pts_time,flags',
+        '-of', 'csv=p=0',
+        os.fspath(Path(video_path).absolute())
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout, startupinfo=get_startup_info())
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe packet lista hiba (rc={result.returncode})")
+    frame_times = []
+    keyframe_times = []
+    for line in result.stdout.splitlines():
+        parts = line.strip().split(',')
+        if len(parts) < 2:
+            continue
         try:
-            result_fps = subprocess.run(cmd_fps, capture_output=True, text=True, check=True, timeout=30, startupinfo=get_startup_info())
-            fps_str = result_fps.stdout.strip()
-            if fps_str and '/' in fps_str:
-                num, den = map(int, fps_str.split('/'))
-                fps = num / den if den > 0 else 25.0
-            else:
-                fps = 25.0
-        except (ValueError, ZeroDivisionError, AttributeError):
-            fps = 25.0
-        
-        return duration, fps
-    except Exception as e:
-        print(f"✗ FFprobe hiba: {e}")
-        return None, None
+            pts_time = float(parts[0])
+        except ValueError:
+            continue
+        frame_times.append(pts_time)
+        if 'K' in parts[1]:
+            keyframe_times.append(pts_time)
+    frame_times.sort()
+    keyframe_times.sort()
+    return frame_times, keyframe_times
+
+
+def plan_vmaf_segments(frame_times, keyframe_times, segment_count):
+    """Idővonal felosztása kulcskockához igazított szegmensekre.
+
+    A határok a kulcskocka és az előző frame közötti felezőpontra esnek, így a
+    milliszekundumos időbélyeg kerekítés nem tolhat át frame-et a szomszéd szegmensbe.
+    Minden belső határon egy frame átfedés van (a motion feature az előző és a
+    következő frame-et is használja); ezeket a pontszámokat az összesítés eldobja.
 
-def get_video_resolution(video_path):
-    """Get video resolution (width, height) using FFprobe.
-    
     Args:
-        video_path: Path to the video file.
-        
+        frame_times: A kódolt fájl rendezett frame időbélyegei.
+        keyframe_times: A kódolt fájl kulcskocka időbélyegei.
+        segment_count: Kért szegmensek száma.
+
     Returns:
-        tuple: (width, height) or (None, None) on error.
+        list: Szegmens dict-ek (start, duration - None = a fájl végéig, frames, drop_head, drop_tail),
+            vagy üres lista, ha nincs legalább két szegmens.
     """
-    try:
-        cmd = [
-            FFPROBE_PATH, '-v', 'error',
-            '-select_streams', 'v:0',
-            '-show_entries', 'stream=width,height',
-            '-of', 'default=noprint_wrappers=1:nokey=1',
-            os.fspath(video_path)
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=30, startupinfo=get_startup_info())
-        lines = result.stdout.strip().split('\n')
-        if len(lines) >= 2:
-            width = int(lines[0].strip())
-            height = int(lines[1].strip())
-            return width, height
-        return None, None
-    except (ValueError, subprocess.SubprocessError, OSError, AttributeError):
-        return None, None
+    total = len(frame_times)
+    if segment_count < 2 or total < 4 * segment_count:
+        return []
+    origin = frame_times[0]
+    span = frame_times[-1] - origin
+    keyframe_indices = sorted({
+        index for index in (bisect.bisect_left(frame_times, keyframe) for keyframe in keyframe_times)
+        if 2 <= index <= total - 2
+    })
+    if not keyframe_indices:
+        return []
+
+    boundaries = []
+    for k in range(1, segment_count):
+        target = origin + span * k / segment_count
+        position = bisect.bisect_left(keyframe_indices, bisect.bisect_left(frame_times, target))
+        candidates = keyframe_indices[max(0, position - 1):position + 1]
+        best = min(candidates, key=lambda index: abs(frame_times[index] - target))
+        if (not boundaries or best > boundaries[-1]) and best < total - 1:
+            boundaries.append(best)
+    if not boundaries:
+        return []
+
+    def midpoint(index):
+        # Az index. frame és az előtte lévő közötti időpont, a fájl kezdetéhez viszonyítva
+        return (frame_times[index - 1] + frame_times[index]) / 2.0 - origin
+
+    edges = [0] + boundaries + [total]
+    segments = []
+    for i in range(len(edges) - 1):
+        first, end = edges[i], edges[i + 1]
+        is_first = i == 0
+        is_last = i == len(edges) - 2
+        start = 0.0 if is_first else midpoint(first - 1)
+        stop = None if is_last else midpoint(end + 1)
+        segments.append({
+            'start': start,
+            'duration': None if stop is None else stop - start,
+            'frames': end - first,
+            'drop_head': 0 if is_first else 1,
+            'drop_tail': 0 if is_last else 1,
+        })
+    return segments
+
+
+def pool_metric_scores(scores, percentiles=VMAF_POOL_PERCENTILES):
+    """Per-frame pontszámok összesítése (a libvmaf pooling definícióival).
 
-def get_video_frame_count(video_path):
-    """Get video frame count using FFprobe.
-    
     Args:
-        video_path: Path to the video file.
-        
+        scores: Per-frame pontszámok (lista vagy numpy tömb).
+        percentiles: Számolt percentilisek.
+
     Returns:
-        int: Frame count or None on error.
+        dict: mean, harmonic_mean, min, max, frames és 'p<N>' percentilis kulcsok; None ha üres.
     """
-    if not video_path.exists():
+    values = np.asarray(scores, dtype=np.float64)
+    if values.size == 0:
         return None
+    pooled = {
+        'mean': float(values.mean()),
+        # libvmaf harmonic_mean: 1 / mean(1 / (x + 1)) - 1
+        'harmonic_mean': float(1.0 / np.mean(1.0 / (values + 1.0)) - 1.0),
+        'min': float(values.min()),
+        'max': float(values.max()),
+        'frames': int(values.size),
+    }
+    for percentile, value in zip(percentiles, np.percentile(values, percentiles)):
+        pooled[f'p{percentile}'] = float(value)
+    return pooled
 
-    cmd_frames = [
-        FFPROBE_PATH, '-v', 'error',
-        '-select_streams', 'v:0',
-        '-show_entries', 'stream=nb_frames',
-        '-of', 'default=noprint_wrappers=1:nokey=1',
-        os.fspath(video_path)
-    ]
-    try:
-        result = subprocess.run(cmd_frames, capture_output=True, text=True, check=True, timeout=30, startupinfo=get_startup_info())
-        frames_str = result.stdout.strip()
-        if frames_str:
-            return int(frames_str)
-    except (ValueError, subprocess.SubprocessError, OSError, AttributeError):
-        pass
 
-    duration, fps = get_video_info(video_path)
-    if duration and fps:
-        try:
-            return int(duration * fps)
-        except (ValueError, TypeError):
-            return None
-    return None
+def pool_psnr_frames(metric, scores):
+    """Per-frame PSNR/XPSNR (dB) összesítése az ffmpeg filter saját összegzésével azonosan.
+
+    A psnr filter az átlagos MSE-ből számol (-10·log10(mean(10^(-p/10)))), az xpsnr filter a
+    súlyozott SSE gyökének átlagából (-20·log10(mean(10^(-x/20)))) - a dB értékek számtani
+    átlaga ettől eltérne, így a szegmentált eredmény nem lenne összevethető az egy futásossal.
 
-def get_output_file_info(output_path):
-    """Get information about the output file using FFprobe.
-    
     Args:
-        output_path: Path to the output file.
-        
+        metric: 'PSNR' vagy 'XPSNR'.
+        scores: Per-frame dB értékek (inf = azonos frame).
+
     Returns:
-        tuple: (cq_crf, vmaf, psnr, frame_count, file_size, modified_date, encoder_type, should_delete)
-        
-        Returns (None, None, None, None, None, None, None, False, None) if the file does not exist or an error occurs.
+        float: Összesített dB (azonos frame-ek esetén 100.0, mint a NumPy engine-nél).
     """
-    if not output_path or not output_path.exists():
-        return None, None, None, None, None, None, None, False, None
+    values = np.asarray(scores, dtype=np.float64)
+    divisor = 20.0 if metric == 'XPSNR' else 10.0
+    mean_error = float(np.mean(np.power(10.0, -values / divisor)))
+    return -divisor * float(np.log10(mean_error)) if mean_error > 0 else 100.0
+
+
+def _metric_stats_scores(stats_path, metric):
+    """ffmpeg xpsnr / psnr stats_file → per-frame luma dB float64 tömb frame sorrendben."""
+    pattern = METRIC_STATS_PATTERNS[metric]
+    values = []
+    with open(stats_path, 'r', encoding='utf-8', errors='replace') as stats_file:
+        for line in stats_file:
+            match = pattern.search(line)
+            if match:
+                values.append(float(match.group(1)))
+    return np.asarray(values, dtype=np.float64)
 
-    try:
-        duration_seconds = None
-        try:
-            duration_seconds, _ = get_video_info(output_path)
-        except Exception:
-            duration_seconds = None
 
-        # Settings metaadat lekérdezése (CQ/CRF és VMAF)
-        probe_cmd = [
-            FFPROBE_PATH, '-v', 'error',
-            '-show_entries', 'format_tags=Settings',
-            '-of', 'default=noprint_wrappers=1:nokey=1',
-            os.fspath(output_path.absolute())
-        ]
-        result = subprocess.run(probe_cmd, capture_output=True, text=True, timeout=30, startupinfo=get_startup_info())
-        settings_str = result.stdout.strip() if result.stdout else ""
-        
-        cq_crf = None
-        vmaf = None
-        psnr = None
-        encoder_type = None
-        
-        if settings_str:
-            # Encoder típus kinyerése (NVENC vagy SVT-AV1)
-            # Először NVENC-et keresünk (mert lehet, hogy mindkettő benne van)
-            if 'NVENC' in settings_str.upper() or 'CQ:' in settings_str:
-                encoder_type = 'nvenc'
-            elif 'SVT-AV1' in settings_str.upper() or 'SVT' in settings_str.upper() or 'CRF:' in settings_str:
-                encoder_type = 'svt-av1'
-            
-            # CQ/CRF érték kinyerése
-            cq_match = re.search(r'CQ:(\d+)', settings_str)
-            crf_match = re.search(r'CRF:(\d+)', settings_str)
-            if cq_match:
-                cq_crf = int(cq_match.group(1))
-            elif crf_match:
-                cq_crf = int(crf_match.group(1))
-            
-            # VMAF érték kinyerése (Actual VMAF vagy Planned VMAF)
-            vmaf_match = re.search(r'(?:Actual|Planned)\s+VMAF:\s*([\d.]+)', settings_str)
-            if vmaf_match:
-                vmaf = float(vmaf_match.group(1))
-            
-            # PSNR érték kinyerése
-            psnr_match = re.search(r'PSNR:\s*([\d.]+)', settings_str)
-            if psnr_match:
-                psnr = float(psnr_match.group(1))
-        
-        # Frame szám lekérdezése
-        cmd_frames = [
-            FFPROBE_PATH, '-v', 'error',
-            '-select_streams', 'v:0',
-            '-show_entries', 'stream=nb_frames',
-            '-of', 'default=noprint_wrappers=1:nokey=1',
-            os.fspath(output_path.absolute())
-        ]
-        frame_count = None
-        try:
-            result_frames = subprocess.run(cmd_frames, capture_output=True, text=True, check=True, timeout=30, startupinfo=get_startup_info())
-            frames_str = result_frames.stdout.strip()
-            if frames_str:
-                frame_count = int(frames_str)
-        except (ValueError, TypeError, AttributeError):
-            # Ha nb_frames nem elérhető, próbáljuk duration és fps alapján számolni
-            try:
-                duration, fps = get_video_info(output_path)
-                if duration and fps:
-                    frame_count = int(duration * fps)
-            except (ValueError, TypeError, AttributeError, Exception):
-                pass
-        
-        # Fájlméret
-        if not output_path.exists():
-            return None, None, None, None, None, None, None, False, duration_seconds
-        file_size = output_path.stat().st_size
+def pack_frame_scores(scores):
+    """Per-frame pontszámok tömör bináris formája: zlib(float32 little-endian)."""
+    values = np.asarray(scores, dtype='<f4')
+    return zlib.compress(values.tobytes(), FRAME_METRICS_COMPRESS_LEVEL)
 
-        # Utolsó módosítási dátum
-        modified_timestamp = output_path.stat().st_mtime
-        modified_date = datetime.fromtimestamp(modified_timestamp).strftime('%Y-%m-%d %H:%M:%S')
 
-        return cq_crf, vmaf, psnr, frame_count, file_size, modified_date, encoder_type, False, duration_seconds
+def unpack_frame_scores(blob):
+    """pack_frame_scores() inverze - float32 numpy tömb."""
+    return np.frombuffer(zlib.decompress(blob), dtype='<f4')
 
-    except Exception as e:
-        print(f"✗ Célfájl FFprobe hiba ({output_path.name}): {e}")
-        return None, None, None, None, None, None, None, False, duration_seconds
 
+def worst_metric_segments(scores, fps=None, window_seconds=FRAME_METRICS_WORST_WINDOW_SECONDS,
+                          count=FRAME_METRICS_WORST_SEGMENTS):
+    """A legalacsonyabb átlagú, egymással nem átfedő window_seconds hosszú szakaszok.
 
-def frames_significantly_different(source_frames, output_frames):
-    """Eldönti, hogy a kimeneti frame szám jelentősen eltér-e a forrástól."""
-    if source_frames is None or output_frames is None:
-        return False
-    allowed_diff = max(FRAME_MISMATCH_MIN_DIFF, int(source_frames * FRAME_MISMATCH_RATIO))
-    return abs(source_frames - output_frames) > allowed_diff
+    Args:
+        scores: Per-frame pontszámok.
+        fps: Képkocka/másodperc (None = 24; csak az ablak frame-hosszához és a kezdő időhöz).
+        window_seconds: Ablak hossza másodpercben.
+        count: Visszaadott szakaszok száma.
 
-def normalize_audio_lang(lang_string):
-    """Normalizálja a hangsáv nyelv kódját az összehasonlításhoz"""
-    if not lang_string:
-        return 'unknown'
-    lang_clean = lang_string.strip().lower()
-    # Ha van kötőjel, csak az első részt vesszük (pl. "hun-HUN" -> "hun")
-    if '-' in lang_clean:
-        lang_clean = lang_clean.split('-')[0]
-    
-    # Ha már 2 karakteres kód, ellenőrizzük, hogy van-e a LANGUAGE_MAP-ban
-    if len(lang_clean) == 2:
-        if lang_clean in LANGUAGE_MAP:
-            return lang_clean
-        return lang_clean
-    
-    # Ha 3 karakteres vagy hosszabb, keresünk fordított mapping-et a LANGUAGE_MAP-ban
-    # LANGUAGE_MAP formátum: 'hu': 'hun', 'en': 'eng', stb.
-    # Keresünk olyan kulcsot, ahol az érték megegyezik a lang_clean-nel
-    for key, value in LANGUAGE_MAP.items():
-        if value == lang_clean:
-            # Ha a kulcs 2 karakteres, azt adjuk vissza
-            if len(key) == 2:
-                return key
-            # Ha a kulcs 3 karakteres, az első 2 karaktert adjuk vissza
-            if len(key) == 3:
-                return key[:2]
-        # Ha a kulcs megegyezik a lang_clean-nel és 2 karakteres
-        if key == lang_clean and len(key) == 2:
-            return key
-    
-    # Ha 3 karakteres nyelv kód (pl. "hun", "eng"), akkor az első 2 karaktert használjuk
-    if len(lang_clean) == 3:
-        return lang_clean[:2]
-    
-    return lang_clean
+    Returns:
+        list: [{'start_frame', 'frames', 'start_seconds', 'mean'}, ...] növekvő átlag szerint.
+    """
+    values = np.asarray(scores, dtype=np.float64)
+    if values.size == 0:
+        return []
+    fps = fps if fps and fps > 0 else 24.0
+    window = max(1, min(values.size, int(round(window_seconds * fps))))
+    cumulative = np.concatenate(([0.0], np.cumsum(values)))
+    window_means = (cumulative[window:] - cumulative[:-window]) / window
+    segments = []
+    for start in np.argsort(window_means, kind='stable'):
+        start = int(start)
+        if any(abs(start - segment['start_frame']) < window for segment in segments):
+            continue
+        segments.append({
+            'start_frame': start,
+            'frames': window,
+            'start_seconds': start / fps,
+            'mean': float(window_means[start]),
+        })
+        if len(segments) >= count:
+            break
+    return segments
+
+
+def summarize_frame_scores(scores, fps=None):
+    """pool_metric_scores() + legrosszabb szakaszok egy per-frame tömbből."""
+    pooled = pool_metric_scores(scores)
+    if pooled is None:
+        return None
+    pooled['worst_segments'] = worst_metric_segments(scores, fps=fps)
+    return pooled
+
+
+def store_frame_metrics(path, metric, scores, fps=None):
+    """Per-frame metrika log mentése a frame_metrics táblába (tömörített float32 + összesítés).
 
-def get_audio_streams_info(video_path):
-    """Analyze audio streams in the video.
-    
-    Identifies the default language and counts 5.1 and 2.0 streams per language.
-    
     Args:
-        video_path: Path to the video file.
-        
+        path: A mért (kódolt) fájl útvonala.
+        metric: Metrika neve ('VMAF', 'PSNR', ...).
+        scores: Per-frame pontszámok frame sorrendben.
+        fps: Képkocka/másodperc (legrosszabb szakaszok idejéhez).
+
     Returns:
-        tuple: (default_lang, lang_51_count, lang_20_count)
+        dict: summarize_frame_scores() eredménye (None, ha üres a tömb).
     """
-    """Visszaadja a hangsávok információit: default nyelv, 5.1 és 2.0 hangsávok száma nyelv szerint"""
-    try:
-        # Összes hangsáv információ lekérdezése (disposition is kell a default hangsávhoz)
-        cmd = [
-            FFPROBE_PATH, '-v', 'error',
-            '-select_streams', 'a',
-            '-show_entries', 'stream=index,channels,disposition',
-            '-show_entries', 'stream_tags=language,title',
-            '-of', 'json',
-            os.fspath(video_path)
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=30, startupinfo=get_startup_info())
-        data = json.loads(result.stdout)
-        
-        if 'streams' not in data or len(data['streams']) == 0:
-            return None, {}, {}
-        
-        default_lang = None
-        lang_51_count = {}  # Normalizált nyelv -> 5.1 hangsávok száma
-        lang_20_count = {}  # Normalizált nyelv -> 2.0 hangsávok száma
-        all_streams = []  # Összes hangsáv információ tárolása
-        
-        # Első körben összegyűjtjük az összes hangsáv információt
-        for stream in data['streams']:
-            channels = stream.get('channels', 0)
-            tags = stream.get('tags', {})
-            lang = tags.get('language', '') or tags.get('lang', '') or ''
-            disposition = stream.get('disposition', {})
-            # A disposition objektum tartalmazza a 'default' mezőt (0 vagy 1)
-            is_default = disposition.get('default', 0) == 1 if isinstance(disposition, dict) else False
-            
-            lang_normalized = normalize_audio_lang(lang) if lang else 'unknown'
-            
-            all_streams.append({
-                'lang': lang_normalized,
-                'channels': channels,
-                'is_default': is_default
-            })
-            
-            # 5.1 hangsávok számlálása nyelv szerint (6 csatorna)
-            if channels == 6:
-                lang_51_count[lang_normalized] = lang_51_count.get(lang_normalized, 0) + 1
-            # 2.0 hangsávok számlálása nyelv szerint (2 csatorna)
-            elif channels == 2:
-                lang_20_count[lang_normalized] = lang_20_count.get(lang_normalized, 0) + 1
-        
-        # Alapértelmezett nyelv meghatározása prioritás szerint:
-        # 1. Explicit default hangsáv (disposition:default=1)
-        for stream_info in all_streams:
-            if stream_info['is_default']:
-                default_lang = stream_info['lang']
-                break
-        
-        # 2. Ha nincs explicit default, az applikáció nyelvének megfelelő hangsáv
-        if default_lang is None or default_lang == 'unknown':
-            app_lang = CURRENT_LANGUAGE  # 'hu' vagy 'en'
-            # Keresünk olyan hangsávot, amelynek a normalizált nyelve megegyezik az applikáció nyelvével
-            for stream_info in all_streams:
-                if stream_info['lang'] == app_lang:
-                    default_lang = stream_info['lang']
-                    break
-        
-        # 3. Ha még mindig nincs, az első hangsávot használjuk
-        if default_lang is None or default_lang == 'unknown':
-            if len(all_streams) > 0:
-                default_lang = all_streams[0]['lang']
-            else:
-                default_lang = 'unknown'
-        
-        return default_lang, lang_51_count, lang_20_count
-    except Exception as e:
-        print(f"✗ FFprobe hangsáv info hiba: {e}")
-        return None, {}, {}
+    summary = summarize_frame_scores(scores, fps=fps)
+    if summary is None:
+        return None
+    key = ProbeCache.path_key(path)
+    # A log csak addig érvényes, amíg a fájl (size, mtime_ns, inode) azonosítója nem változik
+    size, mtime_ns, inode = ProbeCache.file_identity(path) or (None, None, None)
+    with cache_db_connection() as conn:
+        if conn is None:
+            return summary
+        try:
+            with CACHE_DB_LOCK:
+                ensure_cache_tables(conn.cursor())
+                conn.execute(
+                    'INSERT OR REPLACE INTO frame_metrics (path, metric, size, mtime_ns, inode, frames, fps, scores, mean, harmonic_mean, min, p1, p5, worst_json, measured_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (key, metric, size, mtime_ns, inode, summary['frames'], fps, sqlite3.Binary(pack_frame_scores(scores)),
+                     summary['mean'], summary['harmonic_mean'], summary['min'], summary.get('p1'), summary.get('p5'),
+                     json.dumps(summary['worst_segments'], separators=(',', ':')), time.time())
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            load_debug_log(f"[store_frame_metrics] Írás hiba ({key}, {metric}): {e}")
+    return summary
 
-def get_audio_stream_details(video_path):
-    """Részletes hangsáv-információk (menühöz, eltávolításhoz)."""
-    try:
-        # Első lekérdezés: stream információk
-        cmd = [
-            FFPROBE_PATH, '-v', 'error',
-            '-show_entries', 'stream=index,codec_name,codec_type,channels,channel_layout,bit_rate',
-            '-show_entries', 'stream_tags=language,title',
-            '-show_entries', 'format=duration',
-            '-of', 'json',
-            os.fspath(video_path)
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=30, startupinfo=get_startup_info())
-        data = json.loads(result.stdout) if result.stdout else {}
-        streams = data.get('streams', [])
-        format_info = data.get('format', {})
-        duration = float(format_info.get('duration', 0)) if format_info.get('duration') else 0
-        
-        details = []
-        audio_index = 0
-        for stream in streams:
-            if stream.get('codec_type') != 'audio':
-                continue
-            codec = (stream.get('codec_name') or '').upper() or 'UNKNOWN'
-            channels = stream.get('channels', 0)
-            channel_layout = stream.get('channel_layout') or ''
-            tags = stream.get('tags', {})
-            language = tags.get('language') or tags.get('lang') or 'unknown'
-            title = tags.get('title', '')
-            lang_normalized = normalize_audio_lang(language)
-            display_lang = language or lang_normalized or 'unknown'
-            
-            # Hangsáv méret számítása bitrate és hossz alapján
-            bit_rate = stream.get('bit_rate')
-            audio_size_mb = None
-            if bit_rate and duration:
-                try:
-                    bit_rate_int = int(bit_rate)
-                    # bit_rate bps-ben van, duration másodpercben
-                    audio_size_bytes = (bit_rate_int * duration) / 8
-                    audio_size_mb = audio_size_bytes / (1024 * 1024)
-                except (ValueError, TypeError):
-                    pass
-            
-            if channels == 6:
-                channel_label = '5.1'
-            elif channels == 2:
-                channel_label = '2.0'
-            elif channels and isinstance(channels, int):
-                channel_label = f'{channels} ch'
-            elif channel_layout:
-                channel_label = channel_layout
-            else:
-                channel_label = '?'
-            description_parts = [display_lang.upper(), channel_label, codec]
-            description = ' | '.join(part for part in description_parts if part)
-            if title:
-                description = f"{description} - {title}"
-            if audio_size_mb is not None:
-                # Lokalizált formátum: magyar = tizedesvessző, angol = tizedespont
-                size_str = format_localized_number(audio_size_mb, decimals=2)
-                description = f"{description} ({size_str} MB)"
-            details.append({
-                'ffmpeg_audio_index': audio_index,
-                'language': display_lang,
-                'language_normalized': lang_normalized,
-                'channels': channels,
-                'channel_layout': channel_layout,
-                'codec': codec,
-                'title': title,
-                'description': description,
-                'size_mb': audio_size_mb
-            })
-            audio_index += 1
-        return details
-    except Exception as e:
-        print(f"✗ Audio stream info hiba: {e}")
-        return []
 
-def get_51_audio_stream_index(video_path, default_lang):
-    """Get detailed information about audio streams.
-    
+def _stored_identity_valid(path, size, mtime_ns, inode):
+    """True, ha a tárolt (size, mtime_ns, inode) a fájl jelenlegi stat azonosítója (régi, hiányos sor: False)."""
+    if size is None or mtime_ns is None or inode is None:
+        return False
+    return ProbeCache.file_identity(path) == (size, mtime_ns, inode)
+
+
+def load_frame_metrics(path, metric, expected_frames=None):
+    """Tárolt per-frame log betöltése újraszámolás nélkül.
+
+    A log csak akkor érvényes, ha a fájl stat azonosítója (size, mtime_ns, inode) azonos
+    a méréskorival; csak metaadat változás után a carry_forward_frame_metrics() viszi tovább.
+
     Args:
-        video_path: Path to the video file.
-        
+        path: A mért (kódolt) fájl útvonala.
+        metric: Metrika neve.
+        expected_frames: Ha megadva és eltér a tárolt frame számtól, a log elavult (None).
+
     Returns:
-        list: List of audio stream details.
+        tuple: (scores float32 tömb, summary dict) vagy None.
     """
-    try:
-        cmd = [
-            FFPROBE_PATH, '-v', 'error',
-            '-select_streams', 'a',
-            '-show_entries', 'stream=index,channels',
-            '-show_entries', 'stream_tags=language,title',
-            '-of', 'json',
-            os.fspath(video_path)
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=30, startupinfo=get_startup_info())
-        data = json.loads(result.stdout)
-        
-        if 'streams' not in data or len(data['streams']) == 0:
+    key = ProbeCache.path_key(path)
+    with cache_db_connection() as conn:
+        if conn is None:
             return None
-        
-        # Hangsávok sorrendjében számoljuk (0, 1, 2, ...)
-        audio_stream_index = 0
-        for stream in data['streams']:
-            channels = stream.get('channels', 0)
-            tags = stream.get('tags', {})
-            lang = tags.get('language', '') or tags.get('lang', '') or ''
-            
-            # Normalizáljuk a nyelv kódot az összehasonlításhoz
-            lang_normalized = normalize_audio_lang(lang)
-            
-            # Ha 5.1 hangsáv (6 csatorna) és ugyanaz a normalizált nyelv, mint az alapértelmezett
-            if channels == 6 and lang_normalized == default_lang:
-                return audio_stream_index
-            
-            # Következő hangsáv index
-            audio_stream_index += 1
-        
+        try:
+            row = conn.execute(
+                'SELECT size, mtime_ns, inode, frames, fps, scores FROM frame_metrics WHERE path = ? AND metric = ?',
+                (key, metric)
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+    if not row or row[5] is None:
         return None
-    except Exception as e:
-        print(f"✗ 5.1 hangsáv index keresés hiba: {e}")
+    size, mtime_ns, inode, frames, fps, blob = row
+    if not _stored_identity_valid(path, size, mtime_ns, inode):
+        return None
+    if expected_frames is not None and frames != expected_frames:
+        return None
+    try:
+        scores = unpack_frame_scores(blob)
+    except (zlib.error, ValueError):
         return None
+    return scores, summarize_frame_scores(scores, fps=fps)
 
-def check_audio_compression_needed(video_path):
-    """Check if audio dynamic range compression is needed.
-    
-    Args:
-        video_path: Path to the video file.
-        
-    Returns:
-        bool: True if compression is recommended.
+
+def carry_forward_frame_metrics(path, old_identity):
+    """Csak metaadat változott (Settings tag / stream copy remux): a per-frame logok érvényesek maradnak.
+
+    Csak azok a sorok kapják meg az új stat azonosítót, amelyek a régivel (old_identity) lettek mérve.
     """
-    try:
-        default_lang, lang_51_count, lang_20_count = get_audio_streams_info(video_path)
-        
-        if default_lang is None:
-            return False
-        
-        # Ha az alapértelmezett nyelvhez nincs 5.1 hangsáv, nem kell kompresszió
-        if lang_51_count.get(default_lang, 0) == 0:
-            return False
-        
-        # Ha az alapértelmezett nyelvhez van 2.0 hangsáv, nem kell kompresszió
-        if lang_20_count.get(default_lang, 0) > 0:
-            return False
-        
-        # Ha az alapértelmezett nyelvhez van 5.1 hangsáv és nincs 2.0, akkor kell kompresszió
-        return True
-    except Exception as e:
-        print(f"✗ Hangdinamika kompresszió ellenőrzés hiba: {e}")
-        return False
+    if old_identity is None:
+        return
+    identity = ProbeCache.file_identity(path)
+    if identity is None or identity == tuple(old_identity):
+        return
+    key = ProbeCache.path_key(path)
+    with cache_db_connection() as conn:
+        if conn is None:
+            return
+        try:
+            with CACHE_DB_LOCK:
+                ensure_cache_tables(conn.cursor())
+                conn.execute(
+                    'UPDATE frame_metrics SET size = ?, mtime_ns = ?, inode = ? '
+                    'WHERE path = ? AND size = ? AND mtime_ns = ? AND inode = ?',
+                    (*identity, key, *old_identity)
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            load_debug_log(f"[carry_forward_frame_metrics] Írás hiba ({key}): {e}")
+
+
+def query_frame_metric_lows(metric='VMAF', column='p1', limit=50):
+    """A tárolt logok közül a leggyengébbek (pl. legrosszabb 1% low) - mérés futtatása nélkül.
+
+    Az elavult sorok (a fájl azóta változott vagy törölve lett) kimaradnak.
 
-def build_audio_conversion_filter(method='fast'):
-    """Build FFmpeg filter chain for 5.1 to 2.0 audio conversion.
-    
     Args:
-        method: 'fast' (simple mix) or 'high_quality' (compand/normalization).
-        
+        metric: Metrika neve.
+        column: Rendezési oszlop ('p1', 'p5', 'min', 'mean', 'harmonic_mean').
+        limit: Sorok száma.
+
     Returns:
-        str: FFmpeg filter string.
+        list: [(path, mean, p1, p5, min, worst_segments), ...] növekvő column szerint.
     """
-    method_key = (method or 'fast').lower()
-    if method_key == 'dialogue':
-        return 'pan=stereo|FL<FL+0.5*FC+BL+0.6*SL|FR<FR+0.5*FC+BR+0.6*SR,dynaudnorm=f=250:g=8:m=7.0,alimiter=limit=0.98:level=disabled'
-    return 'pan=stereo|FL<FL+0.5*FC+BL+0.6*SL|FR<FR+0.5*FC+BR+0.6*SR,acompressor=threshold=-18dB:ratio=4:attack=10:release=200:makeup=6:knee=2,alimiter=limit=0.9:level=disabled'
+    if column not in ('p1', 'p5', 'min', 'mean', 'harmonic_mean'):
+        raise ValueError(f"ismeretlen oszlop: {column}")
+    results = []
+    with cache_db_connection() as conn:
+        if conn is None:
+            return []
+        try:
+            cursor = conn.execute(
+                f'SELECT path, size, mtime_ns, inode, mean, p1, p5, min, worst_json FROM frame_metrics '
+                f'WHERE metric = ? AND {column} IS NOT NULL ORDER BY {column} ASC',
+                (metric,)
+            )
+            for path, size, mtime_ns, inode, mean, p1, p5, minimum, worst_json in cursor:
+                if not _stored_identity_valid(path, size, mtime_ns, inode):
+                    continue
+                try:
+                    worst = json.loads(worst_json) if worst_json else []
+                except ValueError:
+                    worst = []
+                results.append((path, mean, p1, p5, minimum, worst))
+                if len(results) >= limit:
+                    break
+        except sqlite3.Error:
+            return results
+    return results
 
-def get_audio_conversion_title(method):
-    """Metaadat cím generálása a kiválasztott konverziós módszerhez."""
-    method_key = (method or 'fast').lower()
-    if method_key == 'dialogue':
-        return t('audio_convert_title_dialogue')
-    return t('audio_convert_title_fast')
 
-def find_vdub2_path():
-    """Find VirtualDub2 executable in PATH or common locations.
-    
+def store_sampled_estimate(path, estimate):
+    """calculate_sampled_vmaf() eredményének mentése (metrikánként mean + 95% CI) a sampled_metric_estimates táblába.
+
+    Args:
+        path: A mért (kódolt) fájl útvonala.
+        estimate: calculate_sampled_vmaf() dict ('VMAF' / 'PSNR_Y' + 'clips', 'coverage').
+    """
+    rows = [(name, pooled) for name, pooled in estimate.items() if isinstance(pooled, dict)]
+    if not rows:
+        return
+    key = ProbeCache.path_key(path)
+    size, mtime_ns, inode = ProbeCache.file_identity(path) or (None, None, None)
+    measured_at = time.time()
+    with cache_db_connection() as conn:
+        if conn is None:
+            return
+        try:
+            with CACHE_DB_LOCK:
+                ensure_cache_tables(conn.cursor())
+                conn.executemany(
+                    'INSERT OR REPLACE INTO sampled_metric_estimates (path, metric, size, mtime_ns, inode, mean, ci_low, ci_high, frames, clips, coverage, measured_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    [(key, name, size, mtime_ns, inode, pooled['mean'], pooled.get('ci_low'), pooled.get('ci_high'), pooled.get('frames'),
+                      estimate.get('clips'), estimate.get('coverage'), measured_at) for name, pooled in rows]
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            load_debug_log(f"[store_sampled_estimate] Írás hiba ({key}): {e}")
+
+
+def load_sampled_estimate(path, metric='VMAF'):
+    """Tárolt mintavételes becslés (mean, ci_low, ci_high, clips, coverage) vagy None (nincs / elavult)."""
+    key = ProbeCache.path_key(path)
+    with cache_db_connection() as conn:
+        if conn is None:
+            return None
+        try:
+            row = conn.execute(
+                'SELECT size, mtime_ns, inode, mean, ci_low, ci_high, clips, coverage FROM sampled_metric_estimates WHERE path = ? AND metric = ?',
+                (key, metric)
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+    if not row or not _stored_identity_valid(path, *row[:3]):
+        return None
+    return {'mean': row[3], 'ci_low': row[4], 'ci_high': row[5], 'clips': row[6], 'coverage': row[7]}
+
+
+def _libvmaf_log_scores(log_path, metric_keys):
+    """libvmaf JSON log → {metrika név: float64 tömb} frame sorrendben (a hiányzó feature kimarad)."""
+    with open(log_path, 'r', encoding='utf-8') as log_file:
+        frames = json.load(log_file).get('frames', [])
+    frames.sort(key=lambda frame: frame.get('frameNum', 0))
+    scores = {}
+    for name, key in metric_keys.items():
+        if frames and all(key in frame.get('metrics', {}) for frame in frames):
+            scores[name] = np.fromiter((frame['metrics'][key] for frame in frames), dtype=np.float64, count=len(frames))
+    return scores
+
+
+# Student-t kritikus értékek (kétoldali 95%) szabadságfok szerint; 30 felett a normális 1.96
+_STUDENT_T_975 = {1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306,
+                  9: 2.262, 10: 2.228, 12: 2.179, 15: 2.131, 20: 2.086, 30: 2.042}
+
+
+def sampled_confidence_half_width(clip_means, population_seconds, clip_seconds):
+    """95%-os konfidencia intervallum fél-szélessége klip átlagokból.
+
+    A klipen belüli frame-ek erősen korreláltak, ezért a klip a mintavételi egység:
+    Student-t a klip átlagok szórásából, véges sokaság korrekcióval (a teljes videó
+    population_seconds / clip_seconds darab klipre osztható).
+
+    Args:
+        clip_means: Klipenkénti átlag pontszámok.
+        population_seconds: A teljes videó hossza másodpercben.
+        clip_seconds: Egy klip hossza másodpercben.
+
     Returns:
-        Path: Path to vdub2.exe/vdub64.exe or None.
+        float: Fél-szélesség (inf, ha kevesebb mint 2 klip van).
     """
-    """VirtualDub2 elérési út meghatározása felhasználói beállítás vagy automatikus keresés alapján."""
-    if VDUB2_PATH:
-        vdub_path = VDUB2_PATH if isinstance(VDUB2_PATH, Path) else Path(VDUB2_PATH)
-        if vdub_path.exists():
-            return vdub_path
-    
-    detected = find_virtualdub()
-    if detected:
-        detected_path = Path(detected)
-        if detected_path.exists():
-            return detected_path
-    
-    possible_paths = [
-        Path("vdub2.exe"),
-        Path("vdub64.exe"),
-        Path("C:/VirtualDub2_v2.4/vdub2.exe"),
-        Path("D:/VirtualDub2_v2.4/vdub2.exe"),
-        Path("C:/VirtualDub2/vdub2.exe"),
-        Path("D:/VirtualDub2/vdub2.exe"),
-        Path("C:/Program Files/VirtualDub2/vdub2.exe"),
-        Path("C:/Program Files (x86)/VirtualDub2/vdub2.exe"),
-    ]
-    for path in possible_paths:
-        if path.exists():
-            return path
-    
-    vdub2_path = shutil.which("vdub2.exe") or shutil.which("vdub64.exe")
-    if vdub2_path:
-        return Path(vdub2_path)
-    
-    return None
+    values = np.asarray(clip_means, dtype=np.float64)
+    if values.size < 2:
+        return float('inf')
+    degrees = values.size - 1
+    t_value = 1.96
+    for df_key in sorted(_STUDENT_T_975):
+        if df_key <= degrees:
+            t_value = _STUDENT_T_975[df_key]
+    if degrees > 30:
+        t_value = 1.96
+    standard_error = float(values.std(ddof=1)) / float(np.sqrt(values.size))
+    population_clips = population_seconds / clip_seconds if clip_seconds > 0 else values.size
+    finite_correction = float(np.sqrt(max(0.0, 1.0 - values.size / population_clips))) if population_clips > 0 else 0.0
+    return t_value * standard_error * finite_correction
+
+
+def sampled_vmaf_is_conclusive(estimate, min_vmaf):
+    """Eldönthető-e a mintavételes becslésből, hogy a videó eléri-e a min VMAF-ot.
 
-def extract_frames_with_vdub2(video_path, output_dir, num_frames=5, stop_event=None, use_percentage_positions=False):
-    """Export sample frames from video using VirtualDub2.
-    
     Args:
-        video_path: Path to the video file.
-        output_dir: Directory to save frames.
-        num_frames: Number of frames to export (if use_percentage_positions is False).
-        stop_event: Event to stop the process.
-        use_percentage_positions: If True, exports frames at 30%, 50%, 70%, and end.
-        
+        estimate: calculate_sampled_vmaf() 'VMAF' eredménye (ci_low/ci_high kulcsokkal).
+        min_vmaf: Küszöb (None = nincs küszöb, mindig eldönthető).
+
     Returns:
-        list: List of paths to extracted frames.
+        bool: False, ha a konfidencia intervallum átfedi a küszöböt (teljes mérés kell).
     """
-    vdub2_path = find_vdub2_path()
-    if not vdub2_path:
-        print("  ⚠ VirtualDub2 nem található")
-        return []
-    
-    duration, _ = get_video_info(video_path)
-    if not duration or duration < 1:
-        print("  ⚠ Nem sikerült a videó hosszát meghatározni")
-        return []
-    
-    if use_percentage_positions:
-        # 30%, 50%, 70% és vége (4db frame)
-        frame_times = [
-            duration * 0.30,  # 30%
-            duration * 0.50,  # 50%
-            duration * 0.70,  # 70%
-            duration - 0.1    # Vége (0.1 másodperccel a vég előtt, hogy biztosan legyen frame)
-        ]
-        print(f"  📹 VirtualDub2 frame export: 4 képkocka (30%, 50%, 70%, vége)")
-    else:
-        # Régi módszer: random pozíciók
-        frame_times = sorted([random.uniform(0, duration) for _ in range(num_frames)])
-        print(f"  📹 VirtualDub2 frame export: {num_frames} képkocka")
-    
-    duration_str = format_localized_number(duration, decimals=1)
-    print(f"  Videó hossza: {duration_str}s")
-    print(f"  VirtualDub2: {vdub2_path}")
-    
-    if stop_event is None:
-        stop_event = STOP_EVENT
+    if min_vmaf is None:
+        return True
+    return estimate['ci_low'] >= min_vmaf or estimate['ci_high'] < min_vmaf
 
-    source_frame_count = None
-    encoded_frame_count = None
-    frame_count_warning = False
-    last_frame_ok = True
 
+def _run_libvmaf_clip(reference_str, encoded_str, start, duration, filtergraph, work_dir, log_name, stop_event,
+                      abort_event=None, logger=None, label="klip", on_time=None, cpus=None):
+    """Egy idősáv (-ss/-t mindkét bemenetre) libvmaf mérése, JSON per-frame loggal.
+
+    Args:
+        reference_str: Referencia videó abszolút útvonala.
+        encoded_str: Kódolt videó abszolút útvonala.
+        start: Kezdő időpont másodpercben.
+        duration: Hossz másodpercben (None = a fájl végéig).
+        filtergraph: Kész filter_complex (a libvmaf log_path=log_name).
+        work_dir: Munkakönyvtár (cwd), ide kerül a JSON log.
+        log_name: A JSON log fájlneve a munkakönyvtárban.
+        stop_event: Leállítás event.
+        abort_event: Másik párhuzamos klip hibája esetén beállított event.
+        logger: Logger instance.
+        label: Megnevezés a loghoz és hibaüzenethez.
+        on_time: Callback(seconds) az ffmpeg time= pozíciójával.
+        cpus: CPU affinitás (a thread pool szálai nem látják a hívó CORE_SCHEDULER foglalását).
+
+    Returns:
+        list: A libvmaf 'frames' listája frameNum szerint rendezve.
+
+    Raises:
+        EncodingStopped: Leállítás esetén.
+        RuntimeError: ffmpeg hiba vagy megszakítás (abort_event).
+    """
+    seek_args = []
+    if start > 0:
+        seek_args += ['-ss', f"{start:.6f}"]
+    if duration is not None:
+        seek_args += ['-t', f"{duration:.6f}"]
+    cmd = [FFMPEG_PATH, '-hide_banner', '-nostdin']
+    cmd += seek_args + ['-i', reference_str]
+    cmd += seek_args + ['-i', encoded_str]
+    cmd += ['-filter_complex', filtergraph, '-f', 'null', '-']
+    if logger:
+        logger.write(f"[{label}] {' '.join(cmd)}\n")
+        logger.flush()
+
+    placement = child_process_kwargs()
+
+    process = subprocess.Popen(
+        cmd,
+        cwd=work_dir,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        bufsize=1,
+        startupinfo=get_startup_info(),
+        **placement
+    )
+    apply_process_placement(process, 'metric', cpus=cpus)
+    with ACTIVE_PROCESSES_LOCK:
+        ACTIVE_PROCESSES.append(process)
+    tail = deque(maxlen=20)
+    try:
+        for line in process.stdout:
+            if stop_event.is_set() or (abort_event is not None and abort_event.is_set()):
+                terminate_process_tree(process)
+                try:
+                    process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    terminate_process_tree(process)
+                if stop_event.is_set():
+                    raise EncodingStopped()
+                raise RuntimeError("megszakítva (másik párhuzamos mérés hibája)")
+            tail.append(line)
+            if on_time:
+                time_match = re.search(r'time=(\d+):(\d+):(\d+(?:\.\d+)?)', line)
+                if time_match:
+                    hours, mins, secs = time_match.groups()
+                    on_time(int(hours) * 3600 + int(mins) * 60 + float(secs))
+        process.wait()
+    finally:
+        with ACTIVE_PROCESSES_LOCK:
+            if process in ACTIVE_PROCESSES:
+                ACTIVE_PROCESSES.remove(process)
+    if process.returncode != 0:
+        raise RuntimeError(f"{label} hiba (rc={process.returncode}): {''.join(tail).strip()[-300:]}")
+
+    with open(os.path.join(work_dir, log_name), 'r', encoding='utf-8') as log_file:
+        frames = json.load(log_file).get('frames', [])
+    frames.sort(key=lambda frame: frame.get('frameNum', 0))
+    return frames
+
+
+def calculate_segmented_vmaf(reference_path, encoded_path, check_psnr=False, check_ssim=False, progress_callback=None,
+                             stop_event=None, logger=None, duration_seconds=None, core_budget=None, frame_scores_callback=None,
+                             psnr_metric=None):
+    """Szegmentált VMAF: az idővonal kulcskockához igazított darabjai párhuzamos libvmaf folyamatokban.
+
+    Minden szegmens saját ffmpeg folyamat (-ss/-t mindkét bemenetre), libvmaf JSON
+    per-frame loggal; a pontszámokat frame sorrendben összefűzzük, így a pooled
+    mean/harmonic mean/percentilisek pontosan megegyeznek az egy folyamatos futáséval.
+    A PSNR ugyanaz a változat, mint a nem szegmentált mérésé (preferred_psnr_variant()): a szegmens
+    filtergraph-ban külön xpsnr / psnr ág stats_file-lal, a 'mean' a filter saját összegzésével
+    (pool_psnr_frames). SSIM a libvmaf float_ssim feature-ből jön.
+
+    Folyamatok száma: legfeljebb budget // VMAF_SEGMENT_THREADS (és VMAF_SEGMENT_MAX_PROCESSES, valamint a
+    VMAF_SEGMENT_MIN_SECONDS szerinti darabszám); a mag keret a ténylegesen induló szegmensek között
+    egyenlően oszlik, így egy szegmens VMAF_SEGMENT_THREADS-nél több szálat is kaphat.
+
+    Args:
+        reference_path: Path to reference video.
+        encoded_path: Path to encoded video.
+        check_psnr: PSNR számítása is (ffmpeg xpsnr / psnr filter ág).
+        check_ssim: SSIM számítása is (libvmaf float_ssim feature).
+        progress_callback: Callback for progress updates ('abav1_progress' payload).
+        stop_event: Event to stop calculation.
+        logger: Logger instance.
+        duration_seconds: Reference duration in seconds.
+        core_budget: Magok száma (None = METRIC_CORE_BUDGET).
+        frame_scores_callback: Callback(metric_name, scores) a teljes per-frame tömbökkel.
+        psnr_metric: 'XPSNR' vagy 'PSNR' (None = preferred_psnr_variant()).
+
+    Returns:
+        dict: {'VMAF': pooled, psnr_metric: pooled, 'SSIM': pooled, 'segments': int} vagy None,
+            ha a videó túl rövid / a mag keret nem enged két szegmenst / a PSNR filter nem elérhető.
+
+    Raises:
+        EncodingStopped: Leállítás esetén.
+        RuntimeError: Szegmens hiba vagy frame szám eltérés (a hívó egy folyamatra esik vissza).
+    """
+    if stop_event is None:
+        stop_event = STOP_EVENT
     if stop_event.is_set():
         raise EncodingStopped()
+    if not duration_seconds or duration_seconds <= 0:
+        return None
 
-    extracted_frames = []
-    
-    for i, t in enumerate(frame_times, start=1):
-        if stop_event.is_set():
-            raise EncodingStopped()
-        frame_filename = "frame0000.png"
-        frame_path = output_dir / frame_filename
-        
-        time_str = format_localized_number(t, decimals=2)
-        print(f"    Frame #{i} @ {time_str}s...")
-        
-        # VirtualDub2 script létrehozása
-        script_path = output_dir / f"script_{i}.vdscript"
-        frame_index = int(t * 25)  # 25 fps feltételezése
-        
-        # Útvonalak dupla backslash-sel (Windows formátum)
-        video_path_str = str(video_path.absolute()).replace("\\", "\\\\")
-        output_dir_str = str(output_dir.absolute()).replace("\\", "\\\\")
-        
-        script_content = f"""VirtualDub.Open("{video_path_str}");
-VirtualDub.subset.Clear();
-VirtualDub.subset.AddRange({frame_index}, 1);
-VirtualDub.SaveImageSequence("{output_dir_str}\\\\frame", ".png", 4, 3);
-VirtualDub.Close();
-"""
-        
+    budget = get_metric_core_budget(core_budget)
+    segment_count = min(
+        VMAF_SEGMENT_MAX_PROCESSES,
+        max(1, budget // VMAF_SEGMENT_THREADS),
+        int(duration_seconds // VMAF_SEGMENT_MIN_SECONDS)
+    )
+    if segment_count < 2:
+        return None
+
+    features = []
+    metric_keys = {'VMAF': 'vmaf'}
+    filter_metrics = ['VMAF']
+    if check_psnr:
+        # FONTOS: ugyanaz a PSNR változat, mint a nem szegmentált útvonalon - különben a mért érték
+        # a videó hosszától / a mag kerettől függően XPSNR vagy libvmaf psnr_y lenne (nem összevethető)
+        psnr_metric = psnr_metric or preferred_psnr_variant()
+        if not TOOL_CAPABILITIES.has_filter(psnr_metric.lower()):
+            return None
+        filter_metrics.append(psnr_metric)
+        metric_keys[psnr_metric] = None
+    if check_ssim:
+        if not TOOL_CAPABILITIES.libvmaf_supports('float_ssim'):
+            return None
+        features.append('name=float_ssim')
+        metric_keys['SSIM'] = 'float_ssim'
+    metric_label = '+'.join(metric_keys)
+
+    frame_times, keyframe_times = _probe_packet_times(encoded_path)
+    segments = plan_vmaf_segments(frame_times, keyframe_times, segment_count)
+    if not segments:
+        return None
+
+    # A teljes keret egyenlően a ténylegesen induló szegmenseknek (≥ VMAF_SEGMENT_THREADS, ha a darabszámot nem a keret korlátozta)
+    threads_per_segment = max(1, budget // len(segments))
+    libvmaf_extra = "log_fmt=json:log_path={log_name}"
+    if features:
+        libvmaf_extra += ':feature=' + '|'.join(features)
+    filter_options = {psnr_metric: "stats_file={stats_name}"} if check_psnr else None
+    filtergraph_template = _combined_metrics_filtergraph(
+        filter_metrics, get_video_resolution(reference_path), get_video_resolution(encoded_path), threads_per_segment,
+        libvmaf_extra=libvmaf_extra, filter_options=filter_options)
+    reference_str = os.fspath(reference_path.absolute())
+    encoded_str = os.fspath(encoded_path.absolute())
+
+    if logger:
+        logger.write(f"\n{'='*80}\n")
+        logger.write(f"🎬 SZEGMENTÁLT {metric_label}: {len(segments)} szegmens × {threads_per_segment} szál ({len(frame_times)} frame)\n")
+        logger.write(f"{'='*80}\n")
+        logger.flush()
+    if progress_callback:
+        progress_callback(f"{metric_label} ({len(segments)} szegmens)")
+
+    work_dir = tempfile.mkdtemp(prefix='av1_vmaf_')
+    abort_event = threading.Event()
+    progress_lock = threading.Lock()
+    positions = [0.0] * len(segments)
+    segment_lengths = [
+        segment['duration'] if segment['duration'] is not None else max(0.0, duration_seconds - segment['start'])
+        for segment in segments
+    ]
+    started = time.monotonic()
+
+    def _report_progress():
+        if not progress_callback:
+            return
+        with progress_lock:
+            done_seconds = sum(min(position, length) for position, length in zip(positions, segment_lengths))
+        percent = max(0.0, min(99.9, done_seconds / duration_seconds * 100.0))
+        eta_seconds = None
+        if percent > 0:
+            eta_seconds = (time.monotonic() - started) / percent * (100.0 - percent)
         try:
-            if stop_event.is_set():
-                raise EncodingStopped()
-            with open(script_path, 'w', encoding='utf-8') as f:
+            progress_callback(_metric_progress_payload(metric_label, percent=percent, eta_seconds=eta_seconds,
+                                                       duration_seconds=duration_seconds, metrics=list(metric_keys)))
+        except Exception:
+            pass
+
+    def _set_position(index, seconds):
+        with progress_lock:
+            positions[index] = seconds
+        _report_progress()
+
+    # A klip folyamatok a hívó szál mag foglalásán belül futnak (affinitás)
+    clip_cpus = CORE_SCHEDULER.current_cpus()
+
+    def _run_segment(index):
+        segment = segments[index]
+        log_name = f"segment_{index:03d}.json"
+        stats_name = f"segment_{index:03d}_psnr.log"
+        filtergraph = filtergraph_template.replace('{log_name}', log_name).replace('{stats_name}', stats_name)
+        frames = _run_libvmaf_clip(
+            reference_str, encoded_str, segment['start'], segment['duration'],
+            filtergraph, work_dir, log_name, stop_event, abort_event=abort_event, logger=logger, label=f"szegmens {index + 1}/{len(segments)}",
+            on_time=lambda seconds: _set_position(index, seconds), cpus=clip_cpus)
+        scores = {
+            name: np.fromiter((frame['metrics'][key] for frame in frames), dtype=np.float64, count=len(frames))
+            for name, key in metric_keys.items() if key is not None
+        }
+        if check_psnr:
+            psnr_scores = _metric_stats_scores(os.path.join(work_dir, stats_name), psnr_metric)
+            if psnr_scores.size != len(frames):
+                raise RuntimeError(f"szegmens {index + 1}: {psnr_scores.size} {psnr_metric} frame a {len(frames)} VMAF frame helyett")
+            scores[psnr_metric] = psnr_scores
+        frame_count = len(frames)
+        for name, values in scores.items():
+            # Ugyanaz a vágás minden metrikára (a szegmens határain túli frame-ek nem számítanak)
+            scores[name] = values[segment['drop_head']:frame_count - segment['drop_tail']]
+        frame_count -= segment['drop_head'] + segment['drop_tail']
+        if frame_count != segment['frames']:
+            raise RuntimeError(f"szegmens {index + 1}: {max(0, frame_count)} frame a várt {segment['frames']} helyett")
+        with progress_lock:
+            positions[index] = segment_lengths[index]
+        return scores
+
+    try:
+        per_segment = [None] * len(segments)
+        with ThreadPoolExecutor(max_workers=len(segments)) as executor:
+            futures = {executor.submit(_run_segment, index): index for index in range(len(segments))}
+            try:
+                for future in as_completed(futures):
+                    per_segment[futures[future]] = future.result()
+            except BaseException:
+                abort_event.set()
+                raise
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    results = {'segments': len(segments)}
+    frame_scores = {name: np.concatenate([scores[name] for scores in per_segment]) for name in metric_keys}
+    for name in metric_keys:
+        results[name] = pool_metric_scores(frame_scores[name])
+    if check_psnr:
+        # 'mean' = az ffmpeg filter összegzése (MSE / gyök-SSE átlag), nem a dB értékek átlaga
+        results[psnr_metric]['mean'] = pool_psnr_frames(psnr_metric, frame_scores[psnr_metric])
+    if results['VMAF']['frames'] != len(frame_times):
+        raise RuntimeError(f"frame szám eltérés: {results['VMAF']['frames']} / {len(frame_times)}")
+    if frame_scores_callback:
+        for name, scores in frame_scores.items():
+            frame_scores_callback(name, scores)
+
+    if progress_callback:
+        try:
+            progress_callback(_metric_progress_payload(metric_label, percent=100, eta_seconds=0, eta_text="kész",
+                                                       duration_seconds=duration_seconds, done=True, metrics=list(metric_keys)))
+        except Exception:
+            pass
+    if logger:
+        for name in metric_keys:
+            pooled = results[name]
+            percentile_text = ", ".join(f"p{percentile}={pooled[f'p{percentile}']:.4f}" for percentile in VMAF_POOL_PERCENTILES)
+            logger.write(f"{name}: mean={pooled['mean']:.4f}, harmonic_mean={pooled['harmonic_mean']:.4f}, min={pooled['min']:.4f}, {percentile_text}\n")
+        logger.write(f"Szegmentált számítás: {time.monotonic() - started:.1f}s\n")
+        logger.flush()
+    return results
+
+
+def calculate_sampled_vmaf(reference_path, encoded_path, check_psnr=False, progress_callback=None, stop_event=None,
+                           logger=None, duration_seconds=None, clip_count=VMAF_SAMPLE_CLIPS,
+                           clip_seconds=VMAF_SAMPLE_SECONDS, core_budget=None):
+    """Mintavételes (gyors) VMAF becslés 95%-os konfidencia intervallummal tömeges ellenőrzéshez.
+
+    clip_count darab clip_seconds hosszú klip, az idővonal clip_count egyenlő sávjából egy-egy
+    (sávon belül véletlen, fájlonként reprodukálható helyen); a klipek párhuzamos libvmaf folyamatokban futnak. A becslés a mintavett frame-ek átlaga,
+    az intervallum a klip átlagokból jön (sampled_confidence_half_width).
+
+    Args:
+        reference_path: Path to reference video.
+        encoded_path: Path to encoded video.
+        check_psnr: PSNR becslés is (libvmaf psnr_y feature, 'PSNR_Y' néven - nem XPSNR).
+        progress_callback: Callback for progress updates ('abav1_progress' payload).
+        stop_event: Event to stop calculation.
+        logger: Logger instance.
+        duration_seconds: Reference duration in seconds (None = ffprobe).
+        clip_count: Klipek száma.
+        clip_seconds: Egy klip hossza másodpercben.
+        core_budget: Magok száma (None = METRIC_CORE_BUDGET).
+
+    Returns:
+        dict: {'VMAF': pooled + ci_low/ci_high/half_width, 'PSNR_Y': ..., 'clips': int, 'coverage': float}
+            vagy None, ha a videó túl rövid a mintavételhez (a hívó teljes mérést futtat).
+            Becslés: a hívó '≈'-vel jelzi, és a store_sampled_estimate() a CI-vel együtt tárolja.
+
+    Raises:
+        EncodingStopped: Leállítás esetén.
+        RuntimeError: Klip hiba vagy üres klip.
+    """
+    if stop_event is None:
+        stop_event = STOP_EVENT
+    if stop_event.is_set():
+        raise EncodingStopped()
+    reference_path = Path(reference_path)
+    encoded_path = Path(encoded_path)
+    if duration_seconds is None:
+        duration_seconds, _ = get_video_info(reference_path)
+    if not duration_seconds or clip_count < 2 or clip_seconds <= 0:
+        return None
+    if duration_seconds < clip_count * clip_seconds * VMAF_SAMPLE_MIN_COVERAGE_RATIO:
+        return None
+
+    features = []
+    metric_keys = {'VMAF': 'vmaf'}
+    if check_psnr:
+        if not TOOL_CAPABILITIES.libvmaf_supports('psnr'):
+            return None
+        features.append('name=psnr')
+        metric_keys['PSNR_Y'] = 'psnr_y'
+    metric_label = '+'.join(metric_keys)
+
+    # Rétegzett véletlen mintavétel: minden idősávból egy klip, sávon belül véletlen helyen
+    # (fix időközű minta periodikus tartalomnál torz lehet). A seed fájlonként állandó, így a mérés megismételhető.
+    stratum = duration_seconds / clip_count
+    rng = random.Random(f"{encoded_path.name}:{duration_seconds:.3f}")
+    clip_starts = [index * stratum + rng.uniform(0.0, stratum - clip_seconds) for index in range(clip_count)]
+
+    budget = get_metric_core_budget(core_budget)
+    workers = max(1, min(clip_count, budget // VMAF_SEGMENT_THREADS))
+    threads_per_clip = max(1, budget // workers)
+    libvmaf_extra = "log_fmt=json:log_path={log_name}"
+    if features:
+        libvmaf_extra += ':feature=' + '|'.join(features)
+    filtergraph_template = _combined_metrics_filtergraph(
+        ['VMAF'], get_video_resolution(reference_path), get_video_resolution(encoded_path), threads_per_clip,
+        libvmaf_extra=libvmaf_extra)
+    reference_str = os.fspath(reference_path.absolute())
+    encoded_str = os.fspath(encoded_path.absolute())
+
+    if logger:
+        logger.write(f"\n{'='*80}\n")
+        logger.write(f"🎯 MINTAVÉTELES {metric_label}: {clip_count} × {clip_seconds:g}s klip, {workers} párhuzamos folyamat\n")
+        logger.write(f"{'='*80}\n")
+        logger.flush()
+    if progress_callback:
+        progress_callback(f"{metric_label} ({clip_count} minta)")
+
+    work_dir = tempfile.mkdtemp(prefix='av1_vmaf_sample_')
+    abort_event = threading.Event()
+    progress_lock = threading.Lock()
+    positions = [0.0] * clip_count
+    total_seconds = clip_count * clip_seconds
+    started = time.monotonic()
+
+    def _set_position(index, seconds):
+        with progress_lock:
+            positions[index] = min(seconds, clip_seconds)
+            done_seconds = sum(positions)
+        if not progress_callback:
+            return
+        percent = max(0.0, min(99.9, done_seconds / total_seconds * 100.0))
+        eta_seconds = None
+        if percent > 0:
+            eta_seconds = (time.monotonic() - started) / percent * (100.0 - percent)
+        try:
+            progress_callback(_metric_progress_payload(metric_label, percent=percent, eta_seconds=eta_seconds,
+                                                       duration_seconds=total_seconds, metrics=list(metric_keys)))
+        except Exception:
+            pass
+
+    # A klip folyamatok a hívó szál mag foglalásán belül futnak (affinitás)
+    clip_cpus = CORE_SCHEDULER.current_cpus()
+
+    def _run_clip(index):
+        log_name = f"sample_{index:03d}.json"
+        frames = _run_libvmaf_clip(
+            reference_str, encoded_str, clip_starts[index], clip_seconds,
+            filtergraph_template.replace('{log_name}', log_name), work_dir, log_name, stop_event,
+            abort_event=abort_event, logger=logger, label=f"minta {index + 1}/{clip_count}",
+            on_time=lambda seconds: _set_position(index, seconds), cpus=clip_cpus)
+        if not frames:
+            raise RuntimeError(f"minta {index + 1}: üres klip ({clip_starts[index]:.1f}s)")
+        _set_position(index, clip_seconds)
+        return {
+            name: np.fromiter((frame['metrics'][key] for frame in frames), dtype=np.float64, count=len(frames))
+            for name, key in metric_keys.items()
+        }
+
+    try:
+        per_clip = [None] * clip_count
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_run_clip, index): index for index in range(clip_count)}
+            try:
+                for future in as_completed(futures):
+                    per_clip[futures[future]] = future.result()
+            except BaseException:
+                abort_event.set()
+                raise
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    results = {'clips': clip_count, 'coverage': total_seconds / duration_seconds}
+    for name in metric_keys:
+        pooled = pool_metric_scores(np.concatenate([scores[name] for scores in per_clip]))
+        half_width = sampled_confidence_half_width(
+            [float(scores[name].mean()) for scores in per_clip], duration_seconds, clip_seconds)
+        pooled.update(ci_low=pooled['mean'] - half_width, ci_high=pooled['mean'] + half_width, half_width=half_width)
+        results[name] = pooled
+
+    if progress_callback:
+        try:
+            progress_callback(_metric_progress_payload(metric_label, percent=100, eta_seconds=0, eta_text="kész",
+                                                       duration_seconds=total_seconds, done=True, metrics=list(metric_keys)))
+        except Exception:
+            pass
+    if logger:
+        for name in metric_keys:
+            pooled = results[name]
+            logger.write(f"{name} ≈ {pooled['mean']:.4f} (95% CI: {pooled['ci_low']:.4f} – {pooled['ci_high']:.4f}, "
+                         f"{pooled['frames']} frame, lefedettség {results['coverage'] * 100:.1f}%)\n")
+        logger.write(f"Mintavételes számítás: {time.monotonic() - started:.1f}s\n")
+        logger.flush()
+    return results
+
+
+def _ssim_plane(reference, distorted, peak):
+    """Egy sík SSIM értéke az ffmpeg ssim filterével azonos módon.
+
+    4x4 blokk összegekből 8x8 ablakok 4-es lépéssel (2x2 szomszédos blokk), egész
+    aritmetikával összegezve - a végső képlet float64.
+
+    Args:
+        reference: 2D egész tömb (referencia sík).
+        distorted: 2D egész tömb (torzított sík, azonos méret).
+        peak: Maximális mintaérték ((1 << bitmélység) - 1).
+
+    Returns:
+        float: Az ablakok SSIM átlaga (None, ha a sík kisebb 8x8-nál).
+    """
+    height = (reference.shape[0] // 4) * 4
+    width = (reference.shape[1] // 4) * 4
+    if height < 8 or width < 8:
+        return None
+    x = reference[:height, :width].astype(np.int64)
+    y = distorted[:height, :width].astype(np.int64)
+
+    def _blocks(values):
+        return values.reshape(height // 4, 4, width // 4, 4).sum(axis=(1, 3))
+
+    def _windows(blocks):
+        return (blocks[:-1, :-1] + blocks[1:, :-1] + blocks[:-1, 1:] + blocks[1:, 1:]).astype(np.float64)
+
+    s1 = _windows(_blocks(x))
+    s2 = _windows(_blocks(y))
+    ss = _windows(_blocks(x * x) + _blocks(y * y))
+    s12 = _windows(_blocks(x * y))
+    c1 = 0.01 * 0.01 * peak * peak * 64
+    c2 = 0.03 * 0.03 * peak * peak * 64 * 63
+    variance = ss * 64 - s1 * s1 - s2 * s2
+    covariance = s12 * 64 - s1 * s2
+    ssim_map = (2 * s1 * s2 + c1) * (2 * covariance + c2) / ((s1 * s1 + s2 * s2 + c1) * (variance + c2))
+    return float(ssim_map.mean())
+
+
+def calculate_native_psnr_ssim(reference_path, encoded_path, metrics=('PSNR', 'SSIM'), progress_callback=None, stop_event=None,
+                               logger=None, duration_seconds=None):
+    """PSNR (luma) és SSIM NumPy-val, két ffmpeg rawvideo pipe-ból olvasott frame-eken.
+
+    Mindkét bemenetet egy-egy ffmpeg dekódolja 10 bites nyers síkokra (a kódoltat a referencia
+    felbontására skálázva, mint a kombinált filtergraph); csak PSNR esetén gray10le (Y sík),
+    SSIM-hez yuv420p10le. A frame-ek sorrendben párosulnak.
+
+    Args:
+        reference_path: Path to reference video.
+        encoded_path: Path to encoded video.
+        metrics: A kért metrikák ('PSNR' és/vagy 'SSIM').
+        progress_callback: Callback for progress updates ('abav1_progress' payload).
+        stop_event: Event to stop calculation.
+        logger: Logger instance.
+        duration_seconds: Reference duration in seconds (progress / ETA).
+
+    Returns:
+        dict: {'PSNR': float, 'SSIM': float} a kért metrikákkal.
+
+    Raises:
+        EncodingStopped: Leállítás esetén.
+        RuntimeError: Ha a dekódolás hibázik vagy nincs összevethető frame.
+    """
+    if stop_event is None:
+        stop_event = STOP_EVENT
+    if stop_event.is_set():
+        raise EncodingStopped()
+    metrics = [metric for metric in ('PSNR', 'SSIM') if metric in metrics]
+    if not metrics:
+        return {}
+    metric_label = '+'.join(metrics)
+
+    width, height = get_video_resolution(reference_path)
+    if not width or not height:
+        raise RuntimeError("a referencia felbontása nem határozható meg")
+    distorted_size = get_video_resolution(encoded_path)
+    with_chroma = 'SSIM' in metrics
+    pix_fmt = 'yuv420p10le' if with_chroma else 'gray10le'
+    peak = (1 << 10) - 1
+    chroma_width, chroma_height = (width + 1) // 2, (height + 1) // 2
+    plane_shapes = [(height, width)] + ([(chroma_height, chroma_width)] * 2 if with_chroma else [])
+    frame_samples = sum(h * w for h, w in plane_shapes)
+    plane_weights = [h * w / frame_samples for h, w in plane_shapes]
+
+    try:
+        duration_seconds = float(duration_seconds)
+        if duration_seconds <= 0:
+            duration_seconds = None
+    except (TypeError, ValueError):
+        duration_seconds = None
+    _, video_fps = get_video_info(reference_path) if duration_seconds else (None, None)
+    expected_frames = duration_seconds * video_fps if duration_seconds and video_fps else None
+
+    def _decoder_cmd(path, rescale):
+        video_filter = f'scale={width}:{height}:flags=bicubic,format={pix_fmt}' if rescale else f'format={pix_fmt}'
+        return [
+            FFMPEG_PATH, '-hide_banner', '-nostdin', '-v', 'error',
+            '-i', os.fspath(Path(path).absolute()),
+            '-map', '0:v:0', '-vf', video_filter,
+            '-f', 'rawvideo', '-pix_fmt', pix_fmt, '-'
+        ]
+
+    commands = [_decoder_cmd(reference_path, False), _decoder_cmd(encoded_path, tuple(distorted_size) != (width, height))]
+    if logger:
+        logger.write(f"\n{'='*80}\n")
+        logger.write(f"🎬 {metric_label} SZÁMÍTÁS (NumPy, rawvideo pipe):\n")
+        for cmd in commands:
+            logger.write(' '.join(cmd) + '\n')
+        logger.write(f"{'='*80}\n")
+        logger.flush()
+    if progress_callback:
+        progress_callback(f"{metric_label} (NumPy)")
+
+    def _send_progress(percent=None, eta_seconds=None, eta_text=None, done=False):
+        if not progress_callback:
+            return
+        try:
+            progress_callback(_metric_progress_payload(metric_label, percent=percent, eta_seconds=eta_seconds, eta_text=eta_text,
+                                                       duration_seconds=duration_seconds, done=done, metrics=metrics))
+        except Exception:
+            # A GUI callback hibája ne állítsa le a fő folyamatot
+            pass
+
+    processes = []
+    try:
+        for cmd in commands:
+            # stderr eldobva: két párhuzamos pipe-nál a nem olvasott stderr holtpontot okozhatna
+            process = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                bufsize=frame_samples * 2,
+                startupinfo=get_startup_info(),
+                **child_process_kwargs()
+            )
+            apply_process_placement(process, 'metric')
+            processes.append(process)
+            with ACTIVE_PROCESSES_LOCK:
+                ACTIVE_PROCESSES.append(process)
+
+        def _read_frame(process):
+            data = process.stdout.read(frame_samples * 2)
+            if len(data) < frame_samples * 2:
+                return None
+            samples = np.frombuffer(data, dtype='<u2')
+            planes = []
+            offset = 0
+            for plane_height, plane_width in plane_shapes:
+                size = plane_height * plane_width
+                planes.append(samples[offset:offset + size].reshape(plane_height, plane_width))
+                offset += size
+            return planes
+
+        started = time.monotonic()
+        last_progress = started
+        frames = 0
+        mse_total = 0.0
+        ssim_total = 0.0
+        while True:
+            if stop_event.is_set():
+                raise EncodingStopped()
+            reference_planes = _read_frame(processes[0])
+            distorted_planes = _read_frame(processes[1])
+            if reference_planes is None or distorted_planes is None:
+                if (reference_planes is None) != (distorted_planes is None) and logger:
+                    logger.write(f"⚠ Eltérő frame szám a két bemenetben - {frames} frame pár összevetve\n")
+                break
+            if 'PSNR' in metrics:
+                diff = reference_planes[0].astype(np.int32) - distorted_planes[0].astype(np.int32)
+                mse_total += float(np.mean(np.square(diff, dtype=np.int64)))
+            if with_chroma:
+                ssim_total += sum(weight * (_ssim_plane(ref_plane, dist_plane, peak) or 0.0)
+                                  for weight, ref_plane, dist_plane in zip(plane_weights, reference_planes, distorted_planes))
+            frames += 1
+            now = time.monotonic()
+            if expected_frames and now - last_progress >= NATIVE_METRIC_PROGRESS_INTERVAL:
+                last_progress = now
+                percent = max(0.0, min(99.9, frames / expected_frames * 100.0))
+                eta_seconds = (now - started) / percent * (100.0 - percent) if percent > 0 else None
+                _send_progress(percent=percent, eta_seconds=eta_seconds)
+    finally:
+        for process in processes:
+            # A pipe lezárása után a még író dekóder EPIPE-pal kilép (hosszabb bemenet / leállítás)
+            if process.stdout:
+                process.stdout.close()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                terminate_process_tree(process)
+                process.wait()
+            with ACTIVE_PROCESSES_LOCK:
+                if process in ACTIVE_PROCESSES:
+                    ACTIVE_PROCESSES.remove(process)
+
+    if frames == 0:
+        return_codes = ', '.join(str(process.returncode) for process in processes)
+        raise RuntimeError(f"nincs dekódolt frame pár (rc={return_codes})")
+
+    results = {}
+    if 'PSNR' in metrics:
+        # Mint az ffmpeg psnr filter: az átlagos MSE-ből számolt PSNR (azonos frame-ek: 'inf' helyett felső korlát)
+        mean_mse = mse_total / frames
+        results['PSNR'] = 10.0 * np.log10(peak * peak / mean_mse) if mean_mse > 0 else 100.0
+    if 'SSIM' in metrics:
+        results['SSIM'] = ssim_total / frames
+
+    _send_progress(percent=100, eta_seconds=0, eta_text="kész", done=True)
+    if progress_callback:
+        progress_callback(" | ".join(f"{metric}: {format_metric_value(results[metric], decimals=4 if metric == 'SSIM' else 2)}" for metric in metrics))
+    if logger:
+        logger.write(" | ".join(f"{metric} eredmény: {results[metric]:.4f}" for metric in metrics) + f" ({frames} frame)\n")
+        logger.flush()
+    return {metric: float(value) for metric, value in results.items()}
+
+
+class MetricEngine(abc.ABC):
+    """Metrika backend közös interfésze.
+
+    Egy engine egy futásban a `metrics` bármely részhalmazát méri; a measure() {metric: érték}
+    dict-et ad vissza, hiba esetén kivételt dob (a MetricEngineRegistry ilyenkor a következő
+    engine-re lép). Az áteresztőképességet a registry méri és tárolja.
+    """
+
+    name = 'base'
+    metrics = ()
+    default_fps = 30.0  # 1080p frame/s becslés, amíg nincs mért érték
+    provides_frame_scores = False  # Ad-e per-frame VMAF pontszámokat (frame_scores_callback)
+
+    def available(self):
+        """Futtatható-e az engine ezen a gépen (bináris / filter jelen van)."""
+        return True
+
+    def supported_metrics(self):
+        """Az ezen a gépen ténylegesen mérhető metrikák."""
+        return tuple(self.metrics) if self.available() else ()
+
+    @abc.abstractmethod
+    def measure(self, reference_path, encoded_path, metrics, progress_callback=None, stop_event=None, logger=None,
+                duration_seconds=None, core_budget=None, frame_scores_callback=None):
+        """A kért metrikák mérése.
+
+        Returns:
+            dict: {metric: float} - minden kért metrikával.
+        """
+
+
+class FfmpegFilterMetricEngine(MetricEngine):
+    """ffmpeg filterek (libvmaf, xpsnr/psnr, ssim) egy futásban, mindkét bemenet egyszer dekódolva."""
+
+    name = 'ffmpeg'
+    default_fps = 60.0
+    provides_frame_scores = True
+
+    def supported_metrics(self):
+        metrics = []
+        if not TOOL_CAPABILITIES.ffmpeg() or TOOL_CAPABILITIES.has_filter('libvmaf'):
+            metrics.append('VMAF')
+        if TOOL_CAPABILITIES.has_filter('xpsnr'):
+            metrics.append('XPSNR')
+        metrics.extend(['PSNR', 'SSIM'])
+        return tuple(metrics)
+
+    def measure(self, reference_path, encoded_path, metrics, progress_callback=None, stop_event=None, logger=None,
+                duration_seconds=None, core_budget=None, frame_scores_callback=None):
+        psnr_metric = 'XPSNR' if 'XPSNR' in metrics else ('PSNR' if 'PSNR' in metrics else None)
+        return _calculate_combined_metrics_ffmpeg(
+            reference_path, encoded_path, check_vmaf='VMAF' in metrics, check_psnr=psnr_metric is not None,
+            check_ssim='SSIM' in metrics, progress_callback=progress_callback, stop_event=stop_event, logger=logger,
+            duration_seconds=duration_seconds, frame_scores_callback=frame_scores_callback, core_budget=core_budget,
+            psnr_metric=psnr_metric)
+
+
+class AbAv1MetricEngine(MetricEngine):
+    """ab-av1 vmaf / xpsnr alparancsok (metrikánként külön futás)."""
+
+    name = 'ab-av1'
+    metrics = ('VMAF', 'XPSNR')
+    default_fps = 45.0
+    provides_frame_scores = True
+
+    def available(self):
+        return _is_abav1_available()
+
+    def measure(self, reference_path, encoded_path, metrics, progress_callback=None, stop_event=None, logger=None,
+                duration_seconds=None, core_budget=None, frame_scores_callback=None):
+        results = {}
+        for metric in metrics:
+            value = _run_abav1_metric(metric.lower(), reference_path, encoded_path, progress_callback, stop_event, logger,
+                                      duration_seconds=duration_seconds, core_budget=core_budget,
+                                      frame_scores_callback=frame_scores_callback if metric == 'VMAF' else None)
+            if value is None:
+                raise RuntimeError(f"ab-av1 {metric.lower()} nem adott eredményt")
+            results[metric] = value
+        return results
+
+
+class NumpyMetricEngine(MetricEngine):
+    """PSNR (luma) / SSIM NumPy-val ffmpeg rawvideo pipe-okból (calculate_native_psnr_ssim)."""
+
+    name = 'numpy'
+    metrics = ('PSNR', 'SSIM')
+    default_fps = 30.0
+
+    def measure(self, reference_path, encoded_path, metrics, progress_callback=None, stop_event=None, logger=None,
+                duration_seconds=None, core_budget=None, frame_scores_callback=None):
+        return calculate_native_psnr_ssim(reference_path, encoded_path, metrics=metrics, progress_callback=progress_callback,
+                                          stop_event=stop_event, logger=logger, duration_seconds=duration_seconds)
+
+
+class MetricEngineRegistry:
+    """Metrika engine-ek mért áteresztőképessége és automatikus választás.
+
+    Az áteresztőképesség pixel/s-ként tárolódik (engine, metrika) kulccsal - így egy 4K és egy
+    720p mérés összevethető -, EWMA-val simítva, a metric_engine_stats táblában megőrizve.
+    Mért érték hiányában az engine default_fps becslése (1080p) számít.
+
+    Felderítés: a még nem mért engine-ek (munkamenetenként egyszer) kapnak egy futást, és minden
+    METRIC_ENGINE_EXPLORE_INTERVAL. választás a legkevesebbet futott alternatívára esik - így a
+    default_fps becslés nem dönti el végleg a sorrendet. Alternatíva csak a legjobb engine teljes
+    metrika halmazát lefedő engine lehet (részleges lefedésnél a maradék külön futást igényelne).
+    Ha egy metrikát (XPSNR) már egyik engine sem tud mérni, a _SUBSTITUTES szerinti helyettesítő
+    (PSNR luma) mérődik - így a NumPy engine hiba esetén is elérhető tartalék.
+    """
+
+    _REFERENCE_PIXELS = 1920 * 1080
+    _SUBSTITUTES = {'XPSNR': 'PSNR'}
+
+    def __init__(self, engines):
+        self.engines = list(engines)
+        self._rates = {}
+        self._runs = {}
+        self._attempted = set()  # Felderítésre már kiválasztott (még nem mért) engine-ek ebben a munkamenetben
+        self._plans = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        with cache_db_connection() as conn:
+            if conn is None:
+                return
+            try:
+                rows = conn.execute('SELECT engine, metric, pixel_rate, runs FROM metric_engine_stats').fetchall()
+            except sqlite3.Error:
+                return
+        for engine_name, metric, pixel_rate, runs in rows:
+            if pixel_rate:
+                self._rates.setdefault((engine_name, metric), float(pixel_rate))
+                self._runs.setdefault((engine_name, metric), int(runs or 0))
+
+    def pixel_rate(self, engine, metric):
+        """Mért (vagy becsült) áteresztőképesség pixel/s-ban."""
+        with self._lock:
+            self._ensure_loaded()
+            rate = self._rates.get((engine.name, metric))
+        return rate if rate else engine.default_fps * self._REFERENCE_PIXELS
+
+    def throughput(self, engine, metrics, resolution=None):
+        """Várható frame/s az adott felbontáson (több metrikánál a leglassabb)."""
+        width, height = resolution or (None, None)
+        pixels = width * height if width and height else self._REFERENCE_PIXELS
+        return min(self.pixel_rate(engine, metric) for metric in metrics) / pixels
+
+    def record(self, engine, metrics, frames, seconds, resolution):
+        """Egy sikeres futás áteresztőképességének rögzítése (memória + metric_engine_stats)."""
+        width, height = resolution or (None, None)
+        if not frames or not seconds or seconds <= 0 or not width or not height:
+            return None
+        measured = frames * width * height / seconds
+        updated = []
+        with self._lock:
+            self._ensure_loaded()
+            for metric in metrics:
+                previous = self._rates.get((engine.name, metric))
+                rate = measured if previous is None else previous + METRIC_ENGINE_FPS_SMOOTHING * (measured - previous)
+                self._rates[(engine.name, metric)] = rate
+                self._runs[(engine.name, metric)] = self._runs.get((engine.name, metric), 0) + 1
+                updated.append((engine.name, metric, rate))
+        with cache_db_connection() as conn:
+            if conn is not None:
+                try:
+                    with CACHE_DB_LOCK:
+                        ensure_cache_tables(conn.cursor())
+                        conn.executemany(
+                            'INSERT INTO metric_engine_stats (engine, metric, pixel_rate, runs, updated_at) VALUES (?, ?, ?, 1, ?) '
+                            'ON CONFLICT(engine, metric) DO UPDATE SET pixel_rate = excluded.pixel_rate, runs = runs + 1, updated_at = excluded.updated_at',
+                            [(name, metric, rate, time.time()) for name, metric, rate in updated]
+                        )
+                        conn.commit()
+                except sqlite3.Error as e:
+                    load_debug_log(f"[MetricEngineRegistry] Stat írás hiba: {e}")
+        return frames / seconds
+
+    def supports(self, metric):
+        """Van-e elérhető engine a metrikára."""
+        return any(metric in engine.supported_metrics() for engine in self.engines)
+
+    def plan(self, metrics, resolution=None, exclude=(), need_frame_scores=False):
+        """A következő futás: (engine, metrika lista, felderítés-e) vagy (None, [], False) ha nincs elérhető engine.
+
+        Mohó választás a lefedett metrikák száma × várható frame/s szerint - egy dekódolásban több
+        metrika általában olcsóbb, mint több külön futás. Per-frame VMAF igénynél a VMAF-ot adó
+        engine-ek közül csak a per-frame pontszámot adók jönnek szóba (ha van ilyen).
+        Felderítő futás: még nem mért engine (munkamenetenként egyszer), illetve minden
+        METRIC_ENGINE_EXPLORE_INTERVAL. választásnál a legkevesebbet futott alternatíva - csak olyan
+        engine, ami a legjobb engine összes metrikáját méri (a felderítés nem jár plusz futással).
+        """
+        candidates = []
+        for engine in self.engines:
+            if engine.name in exclude:
+                continue
+            covered = [metric for metric in metrics if metric in engine.supported_metrics()]
+            if not covered:
+                continue
+            score = len(covered) * self.throughput(engine, covered, resolution)
+            if need_frame_scores and 'VMAF' in covered and engine.provides_frame_scores:
+                score *= 1000.0
+            candidates.append((score, engine, covered))
+        if not candidates:
+            return None, [], False
+        best_score, best_engine, best_covered = max(candidates, key=lambda candidate: candidate[0])
+        # KRITIKUS: felderítő futás csak a legjobb engine metrikáit teljesen lefedő engine-nel - a felderítés
+        # éles, teljes hosszú mérés, egy részleges lefedésű engine (pl. NumPy SSIM) órákat adna hozzá;
+        # és nem veszítheti el a per-frame VMAF logot
+        explorable = [(engine, covered) for _, engine, covered in candidates
+                      if engine is not best_engine and set(covered) >= set(best_covered)
+                      and not (need_frame_scores and 'VMAF' in covered and not engine.provides_frame_scores
+                               and best_engine.provides_frame_scores)]
+        with self._lock:
+            self._ensure_loaded()
+            for engine, covered in explorable:
+                if engine.name not in self._attempted and any((engine.name, metric) not in self._rates for metric in covered):
+                    self._attempted.add(engine.name)
+                    return engine, covered, True
+            self._plans += 1
+            if explorable and self._plans % METRIC_ENGINE_EXPLORE_INTERVAL == 0:
+                engine, covered = min(explorable, key=lambda item: min(self._runs.get((item[0].name, metric), 0) for metric in item[1]))
+                return engine, covered, True
+        return best_engine, best_covered, False
+
+    def measure(self, metrics, reference_path, encoded_path, progress_callback=None, stop_event=None, logger=None,
+                duration_seconds=None, core_budget=None, frame_scores_callback=None):
+        """A kért metrikák mérése a leggyorsabb elérhető engine-ekkel, hibánál a következő engine-nel.
+
+        Returns:
+            dict: {metric: float} - minden kért metrikával.
+
+        Raises:
+            EncodingStopped: Leállítás esetén.
+            RuntimeError: Ha valamelyik metrikát egyik engine sem tudta mérni.
+        """
+        resolution = get_video_resolution(reference_path)
+        _, video_fps = get_video_info(reference_path)
+        frames = duration_seconds * video_fps if duration_seconds and video_fps else None
+        results = {}
+        failed = set()
+        remaining = list(metrics)
+        while remaining:
+            engine, subset, exploring = self.plan(remaining, resolution, exclude=failed, need_frame_scores=frame_scores_callback is not None)
+            if engine is None:
+                substituted = self._substitute(remaining, results, failed, logger)
+                if substituted is None:
+                    raise RuntimeError(f"nincs működő metrika engine: {', '.join(remaining)}")
+                remaining = substituted
+                continue
+            if logger:
+                logger.write(f"ℹ Metrika engine: {engine.name} → {'+'.join(subset)} "
+                             f"(~{self.throughput(engine, subset, resolution):.1f} fps"
+                             f"{', felderítő mérés' if exploring else ''})\n")
+                logger.flush()
+            started = time.monotonic()
+            try:
+                values = engine.measure(reference_path, encoded_path, subset, progress_callback=progress_callback, stop_event=stop_event,
+                                        logger=logger, duration_seconds=duration_seconds, core_budget=core_budget,
+                                        frame_scores_callback=frame_scores_callback)
+            except EncodingStopped:
+                raise
+            except Exception as e:
+                failed.add(engine.name)
+                fallback_msg = f"⚠ {engine.name} metrika engine hiba ({'+'.join(subset)}): {e} – következő engine"
+                print(fallback_msg)
+                if logger:
+                    logger.write(fallback_msg + "\n")
+                    logger.flush()
+                continue
+            measured_fps = self.record(engine, subset, frames, time.monotonic() - started, resolution)
+            if measured_fps and logger:
+                logger.write(f"✓ {engine.name}: {measured_fps:.1f} fps\n")
+                logger.flush()
+            results.update({metric: values[metric] for metric in subset if values.get(metric) is not None})
+            if any(metric not in results for metric in subset):
+                failed.add(engine.name)
+            remaining = [metric for metric in remaining if metric not in results]
+        return results
+
+    def _substitute(self, remaining, results, failed, logger=None):
+        """A már nem mérhető metrikák cseréje a _SUBSTITUTES helyettesítőre (None, ha nincs mit cserélni)."""
+        substituted = []
+        changed = False
+        for metric in remaining:
+            substitute = self._SUBSTITUTES.get(metric)
+            if substitute and substitute not in remaining and substitute not in results \
+                    and any(engine.name not in failed and substitute in engine.supported_metrics() for engine in self.engines):
+                if logger:
+                    logger.write(f"⚠ {metric} egyik engine-nel sem mérhető – {substitute} helyette\n")
+                    logger.flush()
+                substituted.append(substitute)
+                changed = True
+            else:
+                substituted.append(metric)
+        return substituted if changed else None
+
+
+METRIC_ENGINES = MetricEngineRegistry([FfmpegFilterMetricEngine(), AbAv1MetricEngine(), NumpyMetricEngine()])
+
+
+def preferred_psnr_variant():
+    """A teljes mérés PSNR változata: 'XPSNR', ha valamelyik engine méri, különben 'PSNR' (luma).
+
+    A PSNR oszlop és a metrika cache ezzel a névvel különbözteti meg a nem összevethető
+    értékeket (XPSNR / ffmpeg psnr luma / libvmaf psnr_y = 'PSNR_Y').
+    """
+    return 'XPSNR' if METRIC_ENGINES.supports('XPSNR') else 'PSNR'
+
+
+def calculate_full_vmaf(reference_path, encoded_path, progress_callback=None, stop_event=None, logger=None, check_vmaf=True, check_psnr=True, metric_done_callback=None, check_ssim=False,
+                        persist_frame_scores=True, core_budget=None):
+    """Calculate VMAF and/or PSNR metrics using ab-av1 (preferred) or FFmpeg fallback.
+    
+    Args:
+        reference_path: Path to reference video.
+        encoded_path: Path to encoded video.
+        progress_callback: Callback for progress updates.
+        stop_event: Event to stop calculation.
+        logger: Logger instance.
+        check_vmaf: Whether to calculate VMAF.
+        check_psnr: Whether to calculate PSNR.
+        metric_done_callback: Callback when a metric is done.
+        check_ssim: Whether to calculate SSIM as well (reported via metric_done_callback only).
+        persist_frame_scores: Store per-frame scores (libvmaf JSON log) in the frame_metrics table.
+        core_budget: libvmaf szálak összesen (a CORE_SCHEDULER által kiosztott magok; None = METRIC_CORE_BUDGET).
+        
+    Returns:
+        tuple: (vmaf_value, psnr_value)
+    """
+    """Teljes VMAF + XPSNR számítás ab-av1 segítségével, FFmpeg-es visszaeséssel."""
+    if stop_event is None:
+        stop_event = STOP_EVENT
+    reference_path = Path(reference_path)
+    encoded_path = Path(encoded_path)
+    if not check_vmaf and not check_psnr:
+        check_vmaf = True
+
+    duration_seconds, _ = get_video_info(reference_path)
+
+    # OPTIMALIZÁCIÓ: per-frame pontszámok tömörített float32 tárolása - 1%/5% low, legrosszabb szakaszok
+    # később a tárolt adatból lekérdezhetők, nem kell újabb több órás mérés
+    def _store_frame_scores(metric_name, scores):
+        fps = len(scores) / duration_seconds if duration_seconds else None
+        summary = store_frame_metrics(encoded_path, metric_name, scores, fps=fps)
+        if summary and logger:
+            worst = summary['worst_segments'][0] if summary['worst_segments'] else None
+            worst_text = f", legrosszabb {FRAME_METRICS_WORST_WINDOW_SECONDS:g}s @ {format_seconds_hms(worst['start_seconds'])} = {worst['mean']:.2f}" if worst else ""
+            logger.write(f"📈 {metric_name} per-frame log mentve: {summary['frames']} frame, "
+                         f"1% low={summary['p1']:.2f}, 5% low={summary['p5']:.2f}{worst_text}\n")
+            logger.flush()
+
+    frame_scores_callback = _store_frame_scores if persist_frame_scores else None
+
+    # OPTIMALIZÁCIÓ: hosszú videónál szegmentált VMAF - kulcskockához igazított darabok párhuzamos
+    # libvmaf folyamatokban a METRIC_CORE_BUDGET keretén belül (sok magos gépen a dekóder sem szűk keresztmetszet)
+    psnr_metric = preferred_psnr_variant()
+    if check_vmaf:
+        try:
+            segmented = calculate_segmented_vmaf(
+                reference_path, encoded_path, check_psnr=check_psnr, check_ssim=check_ssim,
+                progress_callback=progress_callback, stop_event=stop_event, logger=logger, duration_seconds=duration_seconds,
+                core_budget=core_budget, frame_scores_callback=frame_scores_callback, psnr_metric=psnr_metric)
+        except EncodingStopped:
+            raise
+        except Exception as e:
+            segmented = None
+            fallback_msg = f"⚠ Szegmentált VMAF hiba: {e} – egy folyamatos számítás"
+            print(fallback_msg)
+            if logger:
+                logger.write(fallback_msg + "\n")
+                logger.flush()
+        if segmented:
+            vmaf_value = segmented['VMAF']['mean']
+            psnr_value = segmented[psnr_metric]['mean'] if segmented.get(psnr_metric) else None
+            if metric_done_callback:
+                metric_done_callback('VMAF', vmaf_value)
+                if psnr_value is not None:
+                    metric_done_callback(psnr_metric, psnr_value)
+                if segmented.get('SSIM'):
+                    metric_done_callback('SSIM', segmented['SSIM']['mean'])
+            return vmaf_value, psnr_value
+
+    # OPTIMALIZÁCIÓ: metrika engine-ek (ffmpeg filterek egy dekódolással / ab-av1 / NumPy PSNR+SSIM) közül
+    # a mért áteresztőképesség alapján a leggyorsabb; hiba esetén a következő engine mér
+    requested = (['VMAF'] if check_vmaf else []) + ([psnr_metric] if check_psnr else []) + (['SSIM'] if check_ssim else [])
+    try:
+        measured = METRIC_ENGINES.measure(
+            requested, reference_path, encoded_path, progress_callback=progress_callback, stop_event=stop_event, logger=logger,
+            duration_seconds=duration_seconds, core_budget=core_budget, frame_scores_callback=frame_scores_callback)
+        vmaf_value = measured.get('VMAF')
+        if check_psnr and psnr_metric not in measured and 'PSNR' in measured:
+            # XPSNR helyett PSNR (luma) mérődött (MetricEngineRegistry._SUBSTITUTES) - a címke is ez legyen
+            psnr_metric = 'PSNR'
+        psnr_value = measured.get(psnr_metric)
+        if metric_done_callback:
+            if vmaf_value is not None:
+                metric_done_callback('VMAF', vmaf_value)
+            if psnr_value is not None:
+                metric_done_callback(psnr_metric, psnr_value)
+            if measured.get('SSIM') is not None:
+                metric_done_callback('SSIM', measured['SSIM'])
+        return vmaf_value, psnr_value
+    except EncodingStopped:
+        raise
+    except Exception as e:
+        fallback_msg = f"⚠ Metrika engine hiba: {e} – FFmpeg libvmaf fallback"
+        print(fallback_msg)
+        if logger:
+            logger.write(fallback_msg + "\n")
+            logger.flush()
+
+    vmaf_value, psnr_value = _calculate_full_vmaf_ffmpeg(reference_path, encoded_path, progress_callback, stop_event, logger,
+                                                         frame_scores_callback=frame_scores_callback, core_budget=core_budget)
+    if metric_done_callback:
+        if check_vmaf and vmaf_value is not None:
+            metric_done_callback('VMAF', vmaf_value)
+        if check_psnr and psnr_value is not None:
+            metric_done_callback('PSNR_Y', psnr_value)
+    if not check_vmaf:
+        vmaf_value = None
+    if not check_psnr:
+        psnr_value = None
+    return vmaf_value, psnr_value
+
+
+def _calculate_full_vmaf_ffmpeg(reference_path, encoded_path, progress_callback=None, stop_event=None, logger=None,
+                                frame_scores_callback=None, core_budget=None):
+    """Calculate VMAF using FFmpeg directly (fallback method).
+    
+    Args:
+        reference_path: Path to reference video.
+        encoded_path: Path to encoded video.
+        progress_callback: Callback for progress updates.
+        stop_event: Event to stop calculation.
+        logger: Logger instance.
+        frame_scores_callback: Callback(metric_name, scores) with per-frame VMAF (and
+            libvmaf PSNR) scores from the libvmaf JSON log.
+        
+    Returns:
+        tuple: (vmaf_value, psnr_value) - PSNR is always None in this fallback.
+    """
+    """
+    Teljes VMAF és PSNR teszt futtatása ffmpeg libvmaf használatával.
+    Visszaadja a (VMAF érték, PSNR érték) tuple-t vagy (None, None)-t hiba esetén.
+    FFmpeg 8.0+ kompatibilis - VMAF és PSNR egy parancsban.
+    """
+    if stop_event is None:
+        stop_event = STOP_EVENT
+    
+    reference_str = os.fspath(reference_path.absolute())
+    encoded_str = os.fspath(encoded_path.absolute())
+    
+    # Videó teljes hosszának lekérdezése
+    duration_seconds, _ = get_video_info(reference_path)
+    if duration_seconds is None:
+        duration_seconds = 0
+    
+    duration_hours = int(duration_seconds // 3600)
+    duration_mins = int((duration_seconds % 3600) // 60)
+    duration_secs = int(duration_seconds % 60)
+    
+    # FFmpeg parancs VMAF számításhoz
+    # libvmaf filter használata teljes videóra
+    # A CORE_SCHEDULER által kiosztott magok (önálló hívásnál METRIC_CORE_BUDGET / összes mag)
+    cpu_count = get_metric_core_budget(core_budget)
+    
+    # FFmpeg 8.0+: VMAF és PSNR egy parancsban (feature=name=psnr)
+    # Ha a libvmaf nem ismeri a psnr feature-t (képesség registry), ugyanabban a futásban
+    # az ffmpeg psnr filterével számolunk - nem futtatunk egy elrontott VMAF-ot a felderítéshez
+    libvmaf_psnr_supported = TOOL_CAPABILITIES.libvmaf_supports('psnr')
+    # Per-frame JSON log relatív útvonallal a munkakönyvtárban
+    work_dir = tempfile.mkdtemp(prefix='av1_vmaf_') if frame_scores_callback else None
+    log_options = ':log_fmt=json:log_path=vmaf_frames.json' if work_dir else ''
+    if libvmaf_psnr_supported:
+        libvmaf_filter = f'libvmaf=n_threads={cpu_count}:feature=name=psnr{log_options}'
+    else:
+        libvmaf_filter = f'[0:v]split[a_vmaf][a_psnr];[1:v]split[b_vmaf][b_psnr];[a_vmaf][b_vmaf]libvmaf=n_threads={cpu_count}{log_options};[a_psnr][b_psnr]psnr'
+    
+    ffmpeg_cmd = [
+        FFMPEG_PATH,
+        '-i', reference_str,
+        '-i', encoded_str,
+        '-lavfi', libvmaf_filter,
+        '-f', 'null',
+        '-'
+    ]
+    
+    # FFmpeg parancs kiírása a logger-be
+    if logger:
+        logger.write(f"\n{'='*80}\n")
+        logger.write(f"🎬 VMAF/PSNR SZÁMÍTÁS PARANCS:\n")
+        logger.write(f"{'='*80}\n")
+        logger.write(' '.join(ffmpeg_cmd) + '\n')
+        logger.write(f"Videó hossza: {duration_hours:02d}:{duration_mins:02d}:{duration_secs:02d}\n")
+        logger.write(f"{'='*80}\n\n")
+        logger.flush()
+    
+    try:
+        process = subprocess.Popen(
+            ffmpeg_cmd,
+            cwd=work_dir,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+            startupinfo=get_startup_info(),
+            **child_process_kwargs()
+        )
+        apply_process_placement(process, 'metric')
+        
+        with ACTIVE_PROCESSES_LOCK:
+            ACTIVE_PROCESSES.append(process)
+        
+        # VMAF és PSNR érték kinyerése a stdout-ból
+        vmaf_value = None
+        psnr_value = None
+        full_output = []
+        
+        try:
+            for line in process.stdout:
+                if stop_event.is_set():
+                    process.terminate()
+                    try:
+                        process.wait(timeout=5)
+                    except subprocess.TimeoutExpired:
+                        process.kill()
+                    raise EncodingStopped()
+                
+                full_output.append(line)
+                
+                # FFmpeg kimenet kiírása a logger-be
+                if logger:
+                    logger.write(line)
+                    logger.flush()
+                
+                # VMAF érték keresése a kimenetben
+                # libvmaf formátum: "VMAF score: XX.XXXX" vagy "VMAF score = XX.XXXX"
+                vmaf_match = re.search(r'VMAF\s+score[:\s=]+\s*([\d.]+)', line, re.IGNORECASE)
+                if vmaf_match:
+                    try:
+                        vmaf_value = float(vmaf_match.group(1))
+                    except ValueError:
+                        pass
+                
+                # PSNR érték keresése a kimenetben
+                # libvmaf formátum: "PSNR score: XX.XXXX" vagy "PSNR score = XX.XXXX" vagy "PSNR: XX.XXXX"
+                psnr_match = re.search(r'PSNR\s+(?:score[:\s=]+|:)\s*([\d.]+)', line, re.IGNORECASE)
+                if not psnr_match and not libvmaf_psnr_supported:
+                    # ffmpeg psnr filter összegzés: "PSNR y:44.12 u:... average:..." - a luma (psnr_y) kell
+                    psnr_match = re.search(r'PSNR\s+y:\s*([\d.]+)', line)
+                if psnr_match:
+                    try:
+                        psnr_value = float(psnr_match.group(1))
+                    except ValueError:
+                        pass
+                
+                # Progress információ kinyerése - időtartam formátumban
+                if progress_callback and ('frame=' in line or 'time=' in line):
+                    if 'time=' in line:
+                        time_match = re.search(r'time=(\d+):(\d+):(\d+)(?:\.\d+)?', line)
+                        if time_match:
+                            hours, mins, secs = map(int, time_match.groups())
+                            elapsed_total = hours * 3600 + mins * 60 + secs
+                            # Korlátozzuk a videó hosszára
+                            elapsed_total = min(elapsed_total, duration_seconds) if duration_seconds > 0 else elapsed_total
+                            
+                            # Időtartam formátum: "HH:MM:SS / HH:MM:SS"
+                            progress_hours = int(elapsed_total // 3600)
+                            progress_mins = int((elapsed_total % 3600) // 60)
+                            progress_secs = int(elapsed_total % 60)
+                            
+                            progress_callback(f"{progress_hours:02d}:{progress_mins:02d}:{progress_secs:02d} / {duration_hours:02d}:{duration_mins:02d}:{duration_secs:02d}")
+        except EncodingStopped:
+            raise
+        except (OSError, IOError, BrokenPipeError, UnicodeDecodeError) as e:
+            if logger:
+                logger.write(f"Process output olvasás hiba: {e}\n")
+                logger.flush()
+            print(f"✗ Process output olvasás hiba: {e}")
+        finally:
+            # KÖZEPES JAVÍTÁS #9: Process törlése a listából - mindig végrehajtjuk
+            with ACTIVE_PROCESSES_LOCK:
+                if process in ACTIVE_PROCESSES:
+                    ACTIVE_PROCESSES.remove(process)
+        
+        # KÖZEPES JAVÍTÁS #9: process.wait() áthelyezve a try blokkba (2567. sor), így nincs duplikált cleanup
+        if process.returncode != 0:
+            error_msg = f"✗ VMAF számítás hiba (return code: {process.returncode})"
+            if logger:
+                logger.write(error_msg + '\n')
+                logger.flush()
+            print(error_msg)
+            if libvmaf_psnr_supported and ("feature" in ''.join(full_output).lower()):
+                # A registry szerint támogatott volt, mégis hibázott: rögzítjük, hogy a következő futás (és indítás) már ne próbálja
+                TOOL_CAPABILITIES.mark_libvmaf_unsupported('psnr')
+                print("⚠ Libvmaf nem támogatja a feature=name=psnr opciót – ffmpeg psnr filterre váltok.")
+                return _calculate_full_vmaf_ffmpeg(reference_path, encoded_path, progress_callback, stop_event, logger,
+                                                   frame_scores_callback=frame_scores_callback, core_budget=core_budget)
+            return None
+
+        if work_dir:
+            try:
+                frame_scores = _libvmaf_log_scores(os.path.join(work_dir, 'vmaf_frames.json'), {'VMAF': 'vmaf', 'PSNR_Y': 'psnr_y'})
+            except (OSError, ValueError) as e:
+                frame_scores = {}
+                if logger:
+                    logger.write(f"⚠ Per-frame VMAF log nem olvasható: {e}\n")
+            for name, scores in frame_scores.items():
+                frame_scores_callback(name, scores)
+        
+        if vmaf_value is None or psnr_value is None:
+            # Próbáljuk meg az összes sorban keresni
+            full_output_text = ''.join(full_output)
+            if vmaf_value is None:
+                vmaf_match = re.search(r'VMAF\s+score[:\s=]+\s*([\d.]+)', full_output_text, re.IGNORECASE)
+                if vmaf_match:
+                    try:
+                        vmaf_value = float(vmaf_match.group(1))
+                    except ValueError:
+                        pass
+            if psnr_value is None:
+                psnr_match = re.search(r'PSNR\s+(?:score[:\s=]+|:)\s*([\d.]+)', full_output_text, re.IGNORECASE)
+                if psnr_match:
+                    try:
+                        psnr_value = float(psnr_match.group(1))
+                    except ValueError:
+                        pass
+        
+        return (vmaf_value, psnr_value)
+        
+    except EncodingStopped:
+        raise
+    except Exception as e:
+        error_msg = f"✗ VMAF/PSNR számítás hiba: {e}"
+        if logger:
+            logger.write(error_msg + '\n')
+            logger.flush()
+        print(error_msg)
+        return (None, None)
+    finally:
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+def update_video_metadata_vmaf(video_path, vmaf_value, psnr_value=None, logger=None):
+    """Update video metadata with calculated VMAF and PSNR values.
+    
+    Writes the values to the file metadata using FFmpeg.
+    
+    Args:
+        video_path: Path to the video file.
+        vmaf_value: Calculated VMAF score.
+        psnr_value: Calculated PSNR score (optional).
+        logger: Logger instance.
+        
+    Returns:
+        bool: True if successful, False otherwise.
+    """
+    video_str = None
+    temp_path = None
+    # Csak a Settings tag változik: a tartalom ujjlenyomat (metrika cache kulcs) átvihető az új stat azonosítóra
+    old_identity = ProbeCache.file_identity(video_path)
+    try:
+        video_str = os.fspath(video_path.absolute())
+        
+        # Metaadatokhoz nyelvfüggetlen (angol) formátumot használunk
+        vmaf_str_formatted = format_number_en(vmaf_value, decimals=2) if vmaf_value is not None else None
+        psnr_str_formatted = format_number_en(psnr_value, decimals=2) if psnr_value is not None else None
+
+        if logger:
+            logger.write(f"\n{'='*80}\n")
+            logger.write(f"📝 VMAF/PSNR METADATA FRISSÍTÉS: {video_path.name}\n")
+            logger.write(f"{'='*80}\n")
+            logger.write(f"Új VMAF érték: {vmaf_str_formatted}\n")
+            if psnr_value is not None:
+                logger.write(f"Új PSNR érték: {psnr_str_formatted}\n")
+            logger.flush()
+        
+        # Megkeressük a jelenlegi Settings metaadatot (probe cache-ből, ha a fájl nem változott)
+        try:
+            current_settings = probe_media_header(video_str).settings
+        except (subprocess.SubprocessError, OSError, ValueError):
+            current_settings = ""
+        
+        if logger:
+            logger.write(f"Jelenlegi Settings: {current_settings}\n")
+            logger.flush()
+        
+        # Új Settings metaadat létrehozása VMAF értékkel
+        if current_settings:
+            # Ha már van Settings, frissítjük a VMAF részt
+            # Formátum: "FFMPEG NVENC - CQ:XX - Preset 7 - Planned VMAF: XX.X"
+            # Vagy: "FFMPEG SVT-AV1 - CRF:XX - Preset 2 - Planned VMAF: XX.X"
+            # Vagy: "... - Predicted VMAF: ≈XX.X" (kihagyott CRF keresés becslése)
+            # Vagy: "... - Actual VMAF: XX.X" (ha már volt VMAF számítás)
+            new_settings = current_settings
+            
+            # Ha már van "Actual VMAF", azt frissítjük
+            # A regex kezeli a tizedesvesszőt és tizedespontot is
+            if 'Actual VMAF' in current_settings:
+                # Először eltávolítjuk az összes "Actual VMAF: ..." részt (akár több is lehet)
+                new_settings = re.sub(
+                    r'Actual VMAF:\s*[\d.,]+(?:\s*-\s*)?',
+                    '',
+                    current_settings
+                ).strip()
+                # Eltávolítjuk a felesleges " - " részeket
+                new_settings = re.sub(r'\s*-\s*-\s*', ' - ', new_settings)
+                new_settings = re.sub(r'^\s*-\s*', '', new_settings)
+                new_settings = re.sub(r'\s*-\s*$', '', new_settings)
+                # Hozzáadjuk az új "Actual VMAF" értéket
+                if new_settings:
+                    new_settings = f"{new_settings} - Actual VMAF: {vmaf_str_formatted}"
+                else:
+                    new_settings = f"Actual VMAF: {vmaf_str_formatted}"
+            # Ha van "Planned VMAF" / "Predicted VMAF" (kihagyott keresés becslése), azt cseréljük le "Actual VMAF"-ra
+            elif 'Planned VMAF' in current_settings or 'Predicted VMAF' in current_settings:
+                new_settings = re.sub(
+                    r'(?:Planned VMAF:\s*|Predicted VMAF:\s*≈?)[\d.,]+',
+                    f'Actual VMAF: {vmaf_str_formatted}',
+                    current_settings
+                )
+            # Ha egyáltalán nem volt VMAF információ, hozzáadjuk
+            else:
+                new_settings = f"{current_settings} - Actual VMAF: {vmaf_str_formatted}"
+            
+            # PSNR hozzáadása/frissítése
+            # A regex kezeli a tizedesvesszőt és tizedespontot is
+            if psnr_value is not None:
+                if 'PSNR:' in new_settings:
+                    new_settings = re.sub(
+                        r'PSNR:\s*[\d.,]+',
+                        f'PSNR: {psnr_str_formatted}',
+                        new_settings
+                    )
+                else:
+                    new_settings = f"{new_settings} - PSNR: {psnr_str_formatted}"
+        else:
+            # Ha nincs Settings metaadat, létrehozzuk
+            if psnr_value is not None:
+                new_settings = f"Actual VMAF: {vmaf_str_formatted} - PSNR: {psnr_str_formatted}"
+            else:
+                new_settings = f"Actual VMAF: {vmaf_str_formatted}"
+
+        # OPTIMALIZÁCIÓ: Matroska esetén a Settings tag-et helyben írjuk át (nincs teljes fájl másolás)
+        if video_path.suffix.lower() in ('.mkv', '.webm'):
+            strategy = update_matroska_tag_inplace(video_path, 'Settings', new_settings, logger=logger)
+            if strategy:
+                if logger:
+                    logger.write(f"Új Settings: {new_settings}\n")
+                    logger.write(f"✓ Metadata frissítés sikeres (helyben, {strategy})\n")
+                    logger.write(f"{'='*80}\n\n")
+                    logger.flush()
+                CONTENT_FINGERPRINTS.carry_forward(video_path, old_identity)
+                carry_forward_frame_metrics(video_path, old_identity)
+                return True
+            if logger:
+                logger.write("⚠ Helyben frissítés nem lehetséges - remux FFmpeg-gel\n")
+                logger.flush()
+
+        # FFmpeg parancs metaadat frissítéshez (copy minden streamet, csak metaadatot módosítjuk)
+        # Temp fájl az eredeti kiterjesztéssel, hogy az FFmpeg felismerje a formátumot
+        # Kezeljük a több kiterjesztésű fájlokat is (pl. teszt.av1.mkv -> teszt.av1.tmp.mkv)
+        file_name = video_path.name
+        # Keresünk egy pontot, ahol be tudjuk szúrni a .tmp-ot a végső kiterjesztés elé
+        if '.' in file_name:
+            # Megkeressük az utolsó pontot (a végső kiterjesztés)
+            last_dot_index = file_name.rfind('.')
+            temp_name = file_name[:last_dot_index] + '.tmp' + file_name[last_dot_index:]
+        else:
+            # Ha nincs kiterjesztés, csak hozzáfűzzük a .tmp-ot
+            temp_name = file_name + '.tmp'
+        temp_path = Path(video_path.parent / temp_name)
+        ffmpeg_cmd = [
+            FFMPEG_PATH, '-i', video_str,
+            '-map', '0',            # Minden stream megőrzése (videó, hang, felirat, melléklet)
+            '-c', 'copy',           # Copy minden streamet
+            '-map_metadata', '0',   # Meglévő metaadatok megtartása
+            '-metadata', f'Settings={new_settings}',
+            '-y',  # Overwrite
+            os.fspath(temp_path)
+        ]
+        
+        if logger:
+            logger.write(f"Új Settings: {new_settings}\n")
+            logger.write(f"FFmpeg parancs: {' '.join(ffmpeg_cmd)}\n")
+            logger.flush()
+        
+        result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True, timeout=300, startupinfo=get_startup_info())
+        
+        if result.returncode == 0:
+            # Sikeres, átnevezzük a fájlt
+            if temp_path.exists():
+                if temp_path.suffix.lower() in ('.mkv', '.webm'):
+                    reserve_matroska_tag_space(temp_path, logger=logger)
+                temp_path.replace(video_path)
+                if logger:
+                    logger.write(f"✓ Metadata frissítés sikeres: {video_path.name}\n")
+                    logger.write(f"{'='*80}\n\n")
+                    logger.flush()
+                CONTENT_FINGERPRINTS.carry_forward(video_path, old_identity)
+                carry_forward_frame_metrics(video_path, old_identity)
+                return True
+            else:
+                if logger:
+                    logger.write(f"✗ Hiba: Temp fájl nem jött létre: {temp_path}\n")
+                    logger.write(f"{'='*80}\n\n")
+                    logger.flush()
+        else:
+            if logger:
+                logger.write(f"✗ FFmpeg hiba (returncode: {result.returncode}):\n")
+                if result.stderr:
+                    logger.write(f"STDERR: {result.stderr}\n")
+                if result.stdout:
+                    logger.write(f"STDOUT: {result.stdout}\n")
+                logger.write(f"{'='*80}\n\n")
+                logger.flush()
+        
+        return False
+        
+    except Exception as e:
+        error_msg = f"✗ Metaadat frissítés hiba: {e}"
+        if logger:
+            logger.write(f"\n{error_msg}\n")
+            import traceback
+            logger.write(f"Traceback:\n{traceback.format_exc()}\n")
+            logger.write(f"{'='*80}\n\n")
+            logger.flush()
+        print(error_msg)
+        # Temp fájl törlése hiba esetén
+        try:
+            if temp_path and temp_path.exists():
+                temp_path.unlink()
+        except (OSError, PermissionError):
+            pass
+        return False
+
+class ProbeCache:
+    """Perzisztens ffprobe eredmény cache in-memory LRU-val.
+
+    Kulcs: normalizált útvonal; érvényesség: (size, mtime_ns, inode) stat
+    azonosító. Ha a fájl megváltozott (más méret, módosítási idő vagy inode),
+    a bejegyzés érvénytelen és új ffprobe fut. A teljes ffprobe JSON tárolódik,
+    így minden helper (duration, fps, hangsávok, Settings tag) ugyanazt
+    használja futások, workerek és fázisok között.
+    """
+
+    def __init__(self, max_entries=PROBE_CACHE_MEMORY_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # path_key -> (identity, data)
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def path_key(path):
+        return os.path.normcase(os.path.abspath(os.fspath(path)))
+
+    @staticmethod
+    def file_identity(path):
+        """(size, mtime_ns, inode) stat azonosító, vagy None ha a fájl nem érhető el."""
+        try:
+            stat_info = os.stat(os.fspath(path))
+        except (OSError, ValueError):
+            return None
+        return (stat_info.st_size, stat_info.st_mtime_ns, stat_info.st_ino)
+
+    def _remember(self, key, identity, data):
+        with self._lock:
+            self._entries[key] = (identity, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, path, identity):
+        """Cache-elt ffprobe adat (dict), ha a stat azonosító egyezik, különben None."""
+        if identity is None:
+            return None
+        key = self.path_key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] == identity:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    return entry[1]
+                # Elavult bejegyzés (fájl módosult)
+                del self._entries[key]
+        data = None
+        with cache_db_connection() as conn:
+            if conn is not None:
+                try:
+                    row = conn.execute(
+                        'SELECT size, mtime_ns, inode, probe_json FROM probe_cache WHERE path = ?',
+                        (key,)
+                    ).fetchone()
+                    if row and tuple(row[:3]) == tuple(identity):
+                        data = json.loads(row[3])
+                except (sqlite3.Error, ValueError, TypeError):
+                    data = None
+        if data is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.db_hits += 1
+        self._remember(key, identity, data)
+        return data
+
+    def put(self, path, identity, data):
+        """Eltárolja a friss ffprobe adatot memóriában és a cache táblában."""
+        if identity is None or not data:
+            return
+        key = self.path_key(path)
+        self._remember(key, identity, data)
+        with cache_db_connection() as conn:
+            if conn is None:
+                return
+            try:
+                with CACHE_DB_LOCK:
+                    conn.execute(
+                        'INSERT OR REPLACE INTO probe_cache (path, size, mtime_ns, inode, probe_json, probed_at) VALUES (?, ?, ?, ?, ?, ?)',
+                        (key, identity[0], identity[1], identity[2], json.dumps(data, separators=(',', ':')), time.time())
+                    )
+                    conn.commit()
+            except sqlite3.Error as e:
+                load_debug_log(f"[ProbeCache.put] Cache írás hiba ({key}): {e}")
+
+    def invalidate(self, path):
+        """Eldobja a fájl bejegyzését (pl. helyben módosított metaadat után)."""
+        key = self.path_key(path)
+        with self._lock:
+            self._entries.pop(key, None)
+        with cache_db_connection() as conn:
+            if conn is None:
+                return
+            try:
+                with CACHE_DB_LOCK:
+                    conn.execute('DELETE FROM probe_cache WHERE path = ?', (key,))
+                    conn.commit()
+            except sqlite3.Error:
+                pass
+
+    def stats_text(self):
+        with self._lock:
+            return f"probe cache: memória={self.memory_hits}, DB={self.db_hits}, ffprobe={self.misses}"
+
+
+PROBE_CACHE = ProbeCache()
+
+
+class ContentFingerprintCache:
+    """Videó stream tartalom ujjlenyomat (sha256 a demuxolt video packetekből, dekódolás nélkül).
+
+    Érvényesség a ProbeCache-hez hasonlóan (size, mtime_ns, inode) stat azonosítóval: amíg a
+    fájl nem változik, nincs hash futás. Saját, csak metaadatot érintő átírás (Settings tag)
+    után a carry_forward() átviszi az ujjlenyomatot az új stat azonosítóra.
+    """
+
+    def __init__(self):
+        self._entries = {}  # path_key -> (identity, fingerprint)
+        self._lock = threading.Lock()
+        self._hash_locks = {}  # path_key -> (Lock, várakozók száma): egy fájlt egyszerre csak egy szál hash-el
+
+    def _cached(self, key, identity):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] == identity:
+            return entry[1]
+        with cache_db_connection() as conn:
+            if conn is None:
+                return None
+            try:
+                row = conn.execute(
+                    'SELECT size, mtime_ns, inode, fingerprint FROM content_fingerprints WHERE path = ?',
+                    (key,)
+                ).fetchone()
+            except sqlite3.Error:
+                return None
+        if not row or tuple(row[:3]) != tuple(identity):
+            return None
+        with self._lock:
+            self._entries[key] = (identity, row[3])
+        return row[3]
+
+    def _store(self, key, identity, fingerprint):
+        with self._lock:
+            self._entries[key] = (identity, fingerprint)
+        with cache_db_connection() as conn:
+            if conn is None:
+                return
+            try:
+                with CACHE_DB_LOCK:
+                    ensure_cache_tables(conn.cursor())
+                    conn.execute(
+                        'INSERT OR REPLACE INTO content_fingerprints (path, size, mtime_ns, inode, fingerprint, hashed_at) VALUES (?, ?, ?, ?, ?, ?)',
+                        (key, identity[0], identity[1], identity[2], fingerprint, time.time())
+                    )
+                    conn.commit()
+            except sqlite3.Error as e:
+                load_debug_log(f"[ContentFingerprintCache] Cache írás hiba ({key}): {e}")
+
+    @staticmethod
+    def _hash_video_stream(path):
+        cmd = [
+            FFMPEG_PATH, '-hide_banner', '-nostdin', '-v', 'error',
+            '-i', os.fspath(Path(path).absolute()),
+            '-map', '0:v:0', '-c', 'copy',
+            '-f', 'hash', '-hash', 'sha256', '-'
+        ]
+        placement = child_process_kwargs()
+        # ACTIVE_PROCESSES-ben, hogy az azonnali leállítás egy nagy forrás hash-elését is megszakítsa
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                   startupinfo=get_startup_info(), **placement)
+        apply_process_placement(process, 'hash')
+        with ACTIVE_PROCESSES_LOCK:
+            ACTIVE_PROCESSES.append(process)
+        try:
+            stdout, stderr = process.communicate(timeout=CONTENT_FINGERPRINT_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            terminate_process_tree(process)
+            process.communicate()
+            raise
+        finally:
+            with ACTIVE_PROCESSES_LOCK:
+                if process in ACTIVE_PROCESSES:
+                    ACTIVE_PROCESSES.remove(process)
+        match = re.search(r'SHA256=([0-9a-fA-F]{64})', stdout or '')
+        if process.returncode != 0 or not match:
+            raise RuntimeError(f"video stream hash hiba (rc={process.returncode}): {(stderr or '').strip()[-200:]}")
+        return 'sha256:' + match.group(1).lower()
+
+    def get(self, path, compute=True):
+        """A fájl tartalom ujjlenyomata; compute=False esetén csak cache-ből (különben None)."""
+        identity = ProbeCache.file_identity(path)
+        if identity is None:
+            return None
+        key = ProbeCache.path_key(path)
+        fingerprint = self._cached(key, identity)
+        if fingerprint is None and compute:
+            with self._lock:
+                hash_lock, users = self._hash_locks.get(key, (None, 0))
+                if hash_lock is None:
+                    hash_lock = threading.Lock()
+                self._hash_locks[key] = (hash_lock, users + 1)
+            try:
+                with hash_lock:
+                    # Közben egy másik szál (pl. az üresjárati metrika cache mentés) már kiszámolhatta
+                    fingerprint = self._cached(key, identity)
+                    if fingerprint is None:
+                        fingerprint = self._hash_video_stream(path)
+                        self._store(key, identity, fingerprint)
+            finally:
+                # Az utolsó várakozó eltávolítja a zárat - a dict nem nő a valaha hash-elt fájlok számával
+                with self._lock:
+                    hash_lock, users = self._hash_locks[key]
+                    if users <= 1:
+                        del self._hash_locks[key]
+                    else:
+                        self._hash_locks[key] = (hash_lock, users - 1)
+        return fingerprint
+
+    def remember(self, path, fingerprint, identity=None):
+        """Máshol (pl. a kódoló folyamat hash kimenetéből) kiszámolt ujjlenyomat rögzítése."""
+        identity = identity or ProbeCache.file_identity(path)
+        if identity is None or not fingerprint:
+            return
+        self._store(ProbeCache.path_key(path), identity, fingerprint)
+
+    def carry_forward(self, path, old_identity):
+        """Csak metaadat változott (pl. Settings tag): a régi ujjlenyomat érvényes az új stat azonosítóra is."""
+        if old_identity is None:
+            return
+        key = ProbeCache.path_key(path)
+        fingerprint = self._cached(key, old_identity)
+        identity = ProbeCache.file_identity(path)
+        if fingerprint and identity is not None:
+            self._store(key, identity, fingerprint)
+
+
+CONTENT_FINGERPRINTS = ContentFingerprintCache()
+
+
+class MetricResultCache:
+    """Metrika eredmény cache (reference_fp, distorted_fp, metric, model, options) kulccsal.
+
+    Ha sem a forrás, sem a kódolt fájl videó tartalma nem változott, a VMAF/PSNR
+    mérés dekódolás nélkül a tárolt értéket adja vissza (DB visszaállítás vagy
+    metaadat átírás után is). A PSNR sor 'model' mezője a mért változat (xpsnr / psnr /
+    psnr_y), így egy libvmaf psnr_y érték nem jön vissza XPSNR-ként: a lookup a ténylegesen
+    talált változat nevével adja vissza (pl. {'VMAF': ..., 'PSNR_Y': ...}).
+
+    A mérés előtti lookup csak a már ismert ujjlenyomatokkal dolgozik (nincs hash futás);
+    a frissen mért értékek a store_when_idle() sorába kerülnek, és egy alacsony prioritású
+    háttér szál akkor hash-eli a fájlokat, amikor a VMAF_QUEUE üres.
+    """
+
+    def __init__(self):
+        self._idle_lock = threading.Lock()
+        self._idle_pending = deque()
+        self._idle_thread = None
+
+    @staticmethod
+    def _keys(reference_path, metrics, psnr_variant=None):
+        width, height = get_video_resolution(reference_path)
+        model = vmaf_model_for_resolution(width, height)
+        psnr_model = (psnr_variant or preferred_psnr_variant()).lower()
+        return {metric: (model if metric == 'VMAF' else (psnr_model if metric == 'PSNR' else '')) for metric in metrics}
+
+    def fingerprints(self, reference_path, encoded_path, compute=True):
+        """(reference_fp, distorted_fp) vagy None, ha valamelyik nem határozható meg."""
+        try:
+            reference_fp = CONTENT_FINGERPRINTS.get(reference_path, compute=compute)
+            distorted_fp = CONTENT_FINGERPRINTS.get(encoded_path, compute=compute) if reference_fp else None
+        except (subprocess.SubprocessError, OSError, RuntimeError) as e:
+            load_debug_log(f"[MetricResultCache] Ujjlenyomat hiba: {e}")
+            return None
+        if not reference_fp or not distorted_fp:
+            return None
+        return reference_fp, distorted_fp
+
+    def lookup(self, reference_path, encoded_path, metrics, fingerprints=None, psnr_variant=None):
+        """{metric: value}, ha minden kért metrika a cache-ben van, különben None.
+
+        A 'PSNR' kérés bármelyik PSNR_VARIANTS változattal teljesülhet (a mérés útja - szegmentált
+        libvmaf, XPSNR helyettesítés, fallback - dönti el, melyik készült); az eredményben a kulcs
+        a talált változat neve ('XPSNR' / 'PSNR' / 'PSNR_Y').
+
+        psnr_variant: csak ez a változat fogadható el (None = bármelyik, a preferred_psnr_variant() előre).
+        """
+        fingerprints = fingerprints or self.fingerprints(reference_path, encoded_path)
+        if not fingerprints or not metrics:
+            return None
+        if psnr_variant:
+            psnr_variants = [psnr_variant]
+        else:
+            preferred = preferred_psnr_variant()
+            psnr_variants = [preferred] + [variant for variant in PSNR_VARIANTS if variant != preferred]
+        values = {}
+        with cache_db_connection() as conn:
+            if conn is None:
+                return None
+            try:
+                for metric in metrics:
+                    variants = psnr_variants if metric == 'PSNR' else [None]
+                    for variant in variants:
+                        model = self._keys(reference_path, [metric], variant)[metric]
+                        row = conn.execute(
+                            'SELECT value FROM metric_cache WHERE reference_fp = ? AND distorted_fp = ? AND metric = ? AND model = ? AND options = ?',
+                            (fingerprints[0], fingerprints[1], metric, model, METRIC_CACHE_OPTIONS)
+                        ).fetchone()
+                        if row is not None and row[0] is not None:
+                            values[variant or metric] = float(row[0])
+                            break
+                    else:
+                        return None
+            except sqlite3.Error:
+                return None
+        return values
+
+    def store(self, reference_path, encoded_path, values, fingerprints=None, psnr_variant=None):
+        """Mért értékek ({metric: value}) mentése; None értékek kimaradnak.
+
+        psnr_variant: a ténylegesen mért PSNR változat ('XPSNR' / 'PSNR' / 'PSNR_Y').
+        """
+        values = {metric: value for metric, value in values.items() if value is not None}
+        if not values:
+            return
+        fingerprints = fingerprints or self.fingerprints(reference_path, encoded_path)
+        if not fingerprints:
+            return
+        models = self._keys(reference_path, values, psnr_variant)
+        with cache_db_connection() as conn:
+            if conn is None:
+                return
+            try:
+                with CACHE_DB_LOCK:
+                    ensure_cache_tables(conn.cursor())
+                    conn.executemany(
+                        'INSERT OR REPLACE INTO metric_cache (reference_fp, distorted_fp, metric, model, options, value, measured_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                        [(fingerprints[0], fingerprints[1], metric, models[metric], METRIC_CACHE_OPTIONS, float(value), time.time())
+                         for metric, value in values.items()]
+                    )
+                    conn.commit()
+            except sqlite3.Error as e:
+                load_debug_log(f"[MetricResultCache] Cache írás hiba: {e}")
+
+    def store_when_idle(self, reference_path, encoded_path, values, psnr_variant=None):
+        """Mentés később: a hiányzó ujjlenyomatok hash-elése csak üres VMAF_QUEUE mellett.
+
+        A két fájl stat azonosítója most rögzül; ha a hash előtt bármelyik megváltozik (új
+        kódolás, forrás csere), a bejegyzés elvész - így nem kerülhet régi érték új tartalomhoz.
+        """
+        values = {metric: value for metric, value in values.items() if value is not None}
+        identities = (ProbeCache.file_identity(reference_path), ProbeCache.file_identity(encoded_path))
+        if not values or None in identities:
+            return
+        # Ha mindkét ujjlenyomat ismert (pl. korábbi mentés / inline hash), nincs mire várni
+        fingerprints = self.fingerprints(reference_path, encoded_path, compute=False)
+        if fingerprints:
+            self.store(reference_path, encoded_path, values, fingerprints=fingerprints, psnr_variant=psnr_variant)
+            return
+        with self._idle_lock:
+            self._idle_pending.append((Path(reference_path), Path(encoded_path), values, psnr_variant, identities))
+            if self._idle_thread is None or not self._idle_thread.is_alive():
+                self._idle_thread = threading.Thread(target=self._run_idle, daemon=True, name='metric-cache-store')
+                self._idle_thread.start()
+
+    def _run_idle(self):
+        set_low_priority()
+        while True:
+            # OPTIMALIZÁCIÓ: a hash (teljes fájl olvasás) nem versenyez a futó / sorban álló mérésekkel
+            while VMAF_QUEUE.unfinished_tasks or STOP_EVENT.is_set():
+                time.sleep(METRIC_CACHE_IDLE_POLL_SECONDS)
+            with self._idle_lock:
+                if not self._idle_pending:
+                    self._idle_thread = None
+                    return
+                reference_path, encoded_path, values, psnr_variant, identities = self._idle_pending.popleft()
+            if (ProbeCache.file_identity(reference_path), ProbeCache.file_identity(encoded_path)) != identities:
+                load_debug_log(f"[MetricResultCache] {encoded_path.name}: a fájl mérés óta változott – nem kerül a cache-be")
+                continue
+            try:
+                self.store(reference_path, encoded_path, values, psnr_variant=psnr_variant)
+            except Exception as e:
+                load_debug_log(f"[MetricResultCache] Halasztott mentés hiba ({encoded_path.name}): {e}")
+
+
+METRIC_CACHE = MetricResultCache()
+
+
+def warm_page_cache(path, max_bytes=VMAF_PREFETCH_MAX_BYTES, blocking=False):
+    """Fájl page cache előtöltése a későbbi dekódolás elé.
+
+    posix_fadvise(WILLNEED) ahol elérhető (aszinkron kernel readahead, nem blokkol), különben
+    a fájl elejének beolvasása - legfeljebb VMAF_PREFETCH_READ_MAX_BYTES, mert a szinkron olvasás a
+    háttér szálat (és a lemezt) a teljes méretig lefoglalná.
+
+    Args:
+        path: A fájl útvonala.
+        max_bytes: Legfeljebb ennyi bájt a fájl elejéről (0 = teljes fájl).
+        blocking: True = mindig szinkron beolvasás (a visszatéréskor a kért rész a page cache-ben van).
+
+    Returns:
+        int: Az előtöltésre kért (blocking / olvasás esetén a beolvasott) bájtok száma (0 hiba esetén).
+    """
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return 0
+    length = min(size, max_bytes) if max_bytes else size
+    try:
+        if hasattr(os, 'posix_fadvise') and not blocking:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, length, os.POSIX_FADV_WILLNEED)
+            finally:
+                os.close(fd)
+            return length
+        if not blocking:
+            # OPTIMALIZÁCIÓ: fadvise nélkül csak a fájl eleje (a dekóder indulása) - a többit a dekóder olvassa
+            length = min(length, VMAF_PREFETCH_READ_MAX_BYTES)
+        remaining = length
+        with open(path, 'rb', buffering=0) as handle:
+            while remaining > 0 and not STOP_EVENT.is_set():
+                chunk = handle.read(min(8 * 1024 * 1024, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+        return length - remaining
+    except OSError:
+        return 0
+
+
+class VmafPrefetcher:
+    """VMAF batch pipeline: a sorban következő párok előkészítése, amíg az aktuális pár mérése fut.
+
+    Egy alacsony prioritású háttér szál páronként: page cache előtöltés (warm_page_cache),
+    probe (ProbeCache) és a már ismert tartalom ujjlenyomatok betöltése a DB-ből. A mérés
+    CPU-igényes szakaszai alatt így a lemez / hálózati tároló is dolgozik, a következő pár
+    pedig nem a fájl megnyitására és első olvasására vár.
+
+    Ujjlenyomatot NEM számol: a teljes fájl hash-elése a futó mérés dekóderével versenyezne a
+    (hálózati) tároló sávszélességéért; az új ujjlenyomatok a METRIC_CACHE üresjárati mentésekor készülnek.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = deque()
+        self._seen = OrderedDict()  # (ref_key, enc_key) -> True, a már ütemezett párok (korlátos)
+        self._thread = None
+
+    def schedule(self, tasks):
+        """A VMAF_QUEUE következő feladatainak (video_path / output_file) előkészítése."""
+        if VMAF_PREFETCH_LOOKAHEAD <= 0:
+            return
+        with self._lock:
+            for task in tasks:
+                reference_path, encoded_path = task.get('video_path'), task.get('output_file')
+                if not reference_path or not encoded_path:
+                    continue
+                key = (ProbeCache.path_key(reference_path), ProbeCache.path_key(encoded_path))
+                if key in self._seen:
+                    continue
+                self._seen[key] = True
+                while len(self._seen) > 256:
+                    self._seen.popitem(last=False)
+                self._pending.append((Path(reference_path), Path(encoded_path)))
+            if self._pending and (self._thread is None or not self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._run, daemon=True, name='vmaf-prefetch')
+                self._thread.start()
+
+    def _run(self):
+        set_low_priority()
+        while not STOP_EVENT.is_set():
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+                reference_path, encoded_path = self._pending.popleft()
+            try:
+                self._prefetch_pair(reference_path, encoded_path)
+            except Exception as e:
+                # Az előkészítés hibája nem hiba: a worker ugyanezt a mérés előtt úgyis elvégzi
+                load_debug_log(f"[VmafPrefetcher] {reference_path.name}: {e}")
+        # Leállítás: a visszasorolt feladatok a következő indításkor újra előkészíthetők
+        with self._lock:
+            self._pending.clear()
+            self._seen.clear()
+            self._thread = None
+
+    @staticmethod
+    def _prefetch_pair(reference_path, encoded_path):
+        if not reference_path.exists() or not encoded_path.exists():
+            return
+        for path in (encoded_path, reference_path):
+            warm_page_cache(path)
+        for path in (reference_path, encoded_path):
+            if STOP_EVENT.is_set():
+                return
+            try:
+                probe_media(path)
+            except (subprocess.SubprocessError, OSError, ValueError):
+                pass
+        if STOP_EVENT.is_set():
+            return
+        # Csak DB olvasás (compute=False) - a mérés előtti metrika cache lookup memóriából kapja
+        METRIC_CACHE.fingerprints(reference_path, encoded_path, compute=False)
+
+
+VMAF_PREFETCHER = VmafPrefetcher()
+
+
+class ProbeIoMeter:
+    """Szálankénti mérő a ténylegesen lemezhez nyúló probe olvasásokhoz.
+
+    A probe cache találat nem mond semmit az eszköz terheltségéről, ezért csak
+    a valódi ffprobe futások és natív fejléc olvasások idejét gyűjtjük.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def begin(self):
+        self._local.reads = 0
+        self._local.seconds = 0.0
+
+    def record(self, seconds):
+        if getattr(self._local, 'reads', None) is None:
+            return
+        self._local.reads += 1
+        self._local.seconds += seconds
+
+    def end(self):
+        """Returns: egy valódi olvasás átlagos ideje, vagy None, ha csak cache találat volt."""
+        reads = getattr(self._local, 'reads', None) or 0
+        seconds = getattr(self._local, 'seconds', 0.0)
+        self._local.reads = None
+        return seconds / reads if reads else None
+
+
+PROBE_IO_METER = ProbeIoMeter()
+
+
+class DeviceProbeLimiter:
+    """Egy tárolóeszköz adaptív (AIMD) párhuzamossági korlátja.
+
+    Minden 'limit' darab valódi (nem cache-ből kiszolgált) olvasás egy mérési
+    ablak. Az ablak átlagos latenciáját az alap latenciához hasonlítjuk, ami
+    az új minimumra azonnal lesüllyed, felfelé pedig PROBE_POOL_BASELINE_DECAY
+    arányban követi a friss ablakokat (így egy korai, szerencsés ablak nem
+    rögzíti örökre):
+    - nincs torlódás → növelés (slow start: duplázás az első torlódásig, utána +1)
+    - latencia > alap × PROBE_POOL_CONGESTION_RATIO → limit × PROBE_POOL_DECREASE_FACTOR
+    Így a lokális NVMe gyorsan felfut 32+ párhuzamos probe-ra, a forgó lemezes
+    NAS-t viszont nem terheljük túl.
+    """
+
+    def __init__(self, device_key, initial=PROBE_POOL_INITIAL_CONCURRENCY, maximum=PROBE_POOL_MAX_CONCURRENCY):
+        self.device_key = device_key
+        self.limit = max(1, initial)
+        self.maximum = max(self.limit, maximum)
+        self.in_flight = 0
+        self.completed = 0
+        self.slow_start = True
+        self.base_latency = None
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._window_latencies = []
+
+    def try_acquire(self):
+        with self._lock:
+            if self.in_flight >= self.limit:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, latency):
+        """Hely felszabadítása; latency=None, ha a probe nem olvasott az eszközről (cache találat)."""
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+            if latency is None:
+                return
+            self._window_latencies.append(latency)
+            if len(self._window_latencies) >= self.limit:
+                self._adjust()
+
+    def _adjust(self):
+        latencies = self._window_latencies
+        avg_latency = sum(latencies) / len(latencies)
+        self._window_latencies = []
+        if self.base_latency is None or avg_latency < self.base_latency:
+            self.base_latency = avg_latency
+        else:
+            self.base_latency += (avg_latency - self.base_latency) * PROBE_POOL_BASELINE_DECAY
+        if avg_latency > self.base_latency * PROBE_POOL_CONGESTION_RATIO:
+            self.limit = max(1, int(self.limit * PROBE_POOL_DECREASE_FACTOR))
+            self.slow_start = False
+        elif self.slow_start:
+            self.limit = min(self.maximum, self.limit * 2)
+        else:
+            self.limit = min(self.maximum, self.limit + 1)
+
+    def probes_per_second(self):
+        with self._lock:
+            elapsed = time.monotonic() - self.started_at
+            return self.completed / elapsed if elapsed > 0 else 0.0
+
+
+class ProbeScheduler:
+    """Betöltéskori probe ütemező: eszközönként (st_dev) külön AIMD korláttal.
+
+    Eszközönkénti várakozási sorokból csak akkor ad feladatot a thread poolnak,
+    ha az adott eszköznek van szabad helye, így egy lassú NAS soha nem foglalja
+    le a pool szálait a gyors lemezek elől.
+    """
+
+    def __init__(self):
+        self._limiters = {}
+        self._device_by_dir = {}
+        self._pending = {}
+        self._executor = None
+        self._func = None
+        self._lock = threading.Lock()
+
+    def device_key(self, path):
+        """Eszköz azonosító (st_dev) a fájl mappája alapján, mappánként egyszer stat()-olva."""
+        parent = os.path.dirname(os.path.abspath(os.fspath(path)))
+        with self._lock:
+            cached = self._device_by_dir.get(parent)
+        if cached is not None:
+            return cached
+        try:
+            device = os.stat(parent).st_dev
+        except OSError:
+            device = os.path.splitdrive(parent)[0] or parent
+        with self._lock:
+            self._device_by_dir[parent] = device
+        return device
+
+    def submit_all(self, executor, paths, func):
+        """func(path) ütemezése minden útvonalra.
+
+        Returns:
+            dict: Future -> path (as_completed-del használható).
+        """
+        futures = {}
+        pending = {}
+        for path in paths:
+            future = Future()
+            futures[future] = path
+            pending.setdefault(self.device_key(path), deque()).append((path, future))
+        with self._lock:
+            self._executor = executor
+            self._func = func
+            self._pending = pending
+            for device in pending:
+                self._limiters.setdefault(device, DeviceProbeLimiter(device))
+        self._dispatch()
+        return futures
+
+    def _dispatch(self):
+        with self._lock:
+            for device, waiting in self._pending.items():
+                limiter = self._limiters[device]
+                while waiting and limiter.try_acquire():
+                    path, future = waiting.popleft()
+                    try:
+                        self._executor.submit(self._run_one, limiter, path, future)
+                    except RuntimeError as e:
+                        # Executor már leállt (pl. alkalmazás bezárás)
+                        limiter.release(None)
+                        future.set_exception(e)
+
+    def _run_one(self, limiter, path, future):
+        # Csak a valódi eszköz olvasások latenciája számít (cache találat nem minta)
+        PROBE_IO_METER.begin()
+        try:
+            result = self._func(path)
+        except BaseException as e:
+            limiter.release(PROBE_IO_METER.end())
+            self._dispatch()
+            future.set_exception(e)
+            return
+        limiter.release(PROBE_IO_METER.end())
+        self._dispatch()
+        future.set_result(result)
+
+    def total_concurrency(self):
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return sum(limiter.limit for limiter in limiters)
+
+    def probes_per_second(self):
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return sum(limiter.probes_per_second() for limiter in limiters)
+
+    def stats_text(self):
+        with self._lock:
+            limiters = list(self._limiters.values())
+        parts = [
+            f"eszköz {limiter.device_key}: {limiter.limit} párh., {limiter.probes_per_second():.1f} probe/s ({limiter.completed} db)"
+            for limiter in limiters
+        ]
+        return "probe ütemező: " + ("; ".join(parts) if parts else "nincs adat")
+
+
+class ProbeResult:
+    """Egyetlen ffprobe futás (-show_format -show_streams) strukturált eredménye.
+
+    A get_video_info, get_video_resolution, get_video_frame_count és a hangsáv
+    helperek mind ebből olvasnak, így egy fájlhoz elég egyetlen ffprobe process.
+
+    Attributes:
+        path: A probolt fájl útvonala (Path).
+        format: Az ffprobe 'format' szekciója (dict).
+        streams: Az ffprobe 'streams' listája (list of dict).
+    """
+
+    def __init__(self, path, data):
+        self.path = Path(path)
+        data = data or {}
+        self.format = data.get('format') or {}
+        self.streams = data.get('streams') or []
+
+    @staticmethod
+    def _tag_lookup(tags, name):
+        """Kis-nagybetű független tag keresés (MKV-ben a tag nevek kisbetűsek is lehetnek)."""
+        if not tags:
+            return None
+        if name in tags:
+            return tags[name]
+        name_lower = name.lower()
+        for key, value in tags.items():
+            if key.lower() == name_lower:
+                return value
+        return None
+
+    @property
+    def format_tags(self):
+        return self.format.get('tags') or {}
+
+    def get_format_tag(self, name):
+        """Konténer szintű tag értéke (pl. 'Settings') vagy None."""
+        return self._tag_lookup(self.format_tags, name)
+
+    @staticmethod
+    def get_stream_tag(stream, name):
+        """Stream szintű tag értéke (pl. 'language', 'title') vagy None."""
+        return ProbeResult._tag_lookup((stream or {}).get('tags') or {}, name)
+
+    @property
+    def video_stream(self):
+        """Az első videó stream (ffprobe -select_streams v:0 megfelelője)."""
+        for stream in self.streams:
+            if stream.get('codec_type') == 'video':
+                return stream
+        return None
+
+    @property
+    def audio_streams(self):
+        """Hangsávok a fájlbeli sorrendben (a:0, a:1, ...)."""
+        return [stream for stream in self.streams if stream.get('codec_type') == 'audio']
+
+    @property
+    def subtitle_streams(self):
+        """Beágyazott feliratok a fájlbeli sorrendben (s:0, s:1, ...)."""
+        return [stream for stream in self.streams if stream.get('codec_type') == 'subtitle']
+
+    @property
+    def duration(self):
+        """Konténer időtartam másodpercben, vagy None."""
+        try:
+            duration = float(self.format.get('duration'))
+        except (TypeError, ValueError):
+            return None
+        return duration if duration > 0 else None
+
+    @property
+    def fps(self):
+        """Az első videó stream r_frame_rate értéke float-ként, vagy None."""
+        stream = self.video_stream
+        fps_str = (stream or {}).get('r_frame_rate') or ''
+        try:
+            if '/' in fps_str:
+                num, den = map(int, fps_str.split('/'))
+                return num / den if den > 0 and num > 0 else None
+            fps = float(fps_str)
+            return fps if fps > 0 else None
+        except (ValueError, ZeroDivisionError):
+            return None
+
+    @property
+    def resolution(self):
+        """(width, height) az első videó streamből, vagy (None, None)."""
+        stream = self.video_stream
+        try:
+            width = int(stream.get('width'))
+            height = int(stream.get('height'))
+            return width, height
+        except (AttributeError, TypeError, ValueError):
+            return None, None
+
+    @property
+    def nb_frames(self):
+        """A videó stream nb_frames mezője (MKV-ben jellemzően hiányzik), vagy None."""
+        stream = self.video_stream
+        try:
+            frames = int((stream or {}).get('nb_frames'))
+        except (TypeError, ValueError):
+            return None
+        return frames if frames > 0 else None
+
+    @property
+    def statistics_frame_count(self):
+        """A videó stream NUMBER_OF_FRAMES statisztika tag-je (mkvmerge írja), vagy None, ha hiányzik / elavult.
+
+        Az ffmpeg maga soha nem ír statisztika tag-et, de remuxnál / kódolásnál változatlanul átmásolja a
+        forrásét. Ha a fájlt az ffmpeg írta ('encoder' = Lavf...) és a statisztikát nem, az érték a FORRÁS
+        frame száma - a validáció ilyenkor a forrást hasonlítaná önmagához. Natív fejléc és ffprobe
+        eredményre egyformán érvényes.
+        """
+        stream = self.video_stream
+        if not stream:
+            return None
+        stats_app = (self.get_stream_tag(stream, '_STATISTICS_WRITING_APP') or '').strip()
+        muxer = (self.get_format_tag('encoder') or '').strip()
+        if stats_app and muxer.startswith('Lavf') and not stats_app.startswith('Lavf'):
+            return None
+        value = self.get_stream_tag(stream, 'NUMBER_OF_FRAMES') or self.get_stream_tag(stream, 'NUMBER_OF_FRAMES-eng')
+        try:
+            frames = int(str(value).strip())
+        except (TypeError, ValueError):
+            return None
+        return frames if frames > 0 else None
+
+    @property
+    def settings(self):
+        """A 'Settings' format tag (CQ/CRF, Planned/Predicted/Actual VMAF, PSNR), üres string ha nincs."""
+        return (self.get_format_tag('Settings') or '').strip()
+
+
+def probe_media(video_path, timeout=30, use_cache=True):
+    """Probe a media file with a single FFprobe process.
+
+    Runs ``ffprobe -show_format -show_streams -of json`` once and wraps the
+    output in a ProbeResult, which every metadata helper reads from. Results
+    are served from PROBE_CACHE while the file's (size, mtime_ns, inode)
+    identity is unchanged, so unchanged files are never probed twice.
+
+    Args:
+        video_path: Path to the media file (Path or str).
+        timeout: FFprobe timeout in seconds.
+        use_cache: Whether to read/write the probe cache.
+
+    Returns:
+        ProbeResult: Parsed format and stream information.
+
+    Raises:
+        subprocess.SubprocessError, OSError, ValueError: If FFprobe fails or
+            its output is not valid JSON.
+    """
+    identity = ProbeCache.file_identity(video_path) if use_cache else None
+    if identity is not None:
+        cached = PROBE_CACHE.get(video_path, identity)
+        if cached is not None:
+            return ProbeResult(video_path, cached)
+
+    cmd = [
+        FFPROBE_PATH, '-v', 'error',
+        '-show_format', '-show_streams',
+        '-of', 'json',
+        os.fspath(video_path)
+    ]
+    started = time.monotonic()
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=timeout, startupinfo=get_startup_info())
+    finally:
+        PROBE_IO_METER.record(time.monotonic() - started)
+    data = json.loads(result.stdout) if result.stdout else {}
+
+    # Csak akkor cache-eljük, ha a fájl nem változott a probolás alatt (pl. még íródó output)
+    if identity is not None and ProbeCache.file_identity(video_path) == identity:
+        PROBE_CACHE.put(video_path, identity, data)
+    return ProbeResult(video_path, data)
+
+
+# ================================================================================
+# NATÍV KONTÉNER FEJLÉC OLVASÓ (Matroska/EBML és ISO-BMFF/MP4)
+# ================================================================================
+# Metaadat-only lekérdezésekhez (duration, fps, felbontás, sávlista, Settings tag)
+# nem kell ffprobe process: a konténer fejlécéből néhány read() hívással kiolvassuk.
+# Az eredmény ffprobe-kompatibilis dict (format/streams), így ProbeResult-ba csomagolható.
+
+MKV_ID_EBML = 0x1A45DFA3
+MKV_ID_DOCTYPE = 0x4282
+MKV_ID_SEGMENT = 0x18538067
+MKV_ID_SEEKHEAD = 0x114D9B74
+MKV_ID_SEEK = 0x4DBB
+MKV_ID_SEEKID = 0x53AB
+MKV_ID_SEEKPOSITION = 0x53AC
+MKV_ID_INFO = 0x1549A966
+MKV_ID_TIMECODESCALE = 0x2AD7B1
+MKV_ID_DURATION = 0x4489
+MKV_ID_TITLE = 0x7BA9
+MKV_ID_MUXINGAPP = 0x4D80
+MKV_ID_TRACKS = 0x1654AE6B
+MKV_ID_TRACKENTRY = 0xAE
+MKV_ID_TRACKNUMBER = 0xD7
+MKV_ID_TRACKUID = 0x73C5
+MKV_ID_TRACKTYPE = 0x83
+MKV_ID_FLAGDEFAULT = 0x88
+MKV_ID_DEFAULTDURATION = 0x23E383
+MKV_ID_NAME = 0x536E
+MKV_ID_LANGUAGE = 0x22B59C
+MKV_ID_LANGUAGE_BCP47 = 0x22B59D
+MKV_ID_CODECID = 0x86
+MKV_ID_VIDEO = 0xE0
+MKV_ID_PIXELWIDTH = 0xB0
+MKV_ID_PIXELHEIGHT = 0xBA
+MKV_ID_AUDIO = 0xE1
+MKV_ID_CHANNELS = 0x9F
+MKV_ID_TAGS = 0x1254C367
+MKV_ID_TAG = 0x7373
+MKV_ID_TARGETS = 0x63C0
+MKV_ID_TAGTRACKUID = 0x63C5
+MKV_ID_SIMPLETAG = 0x67C8
+MKV_ID_TAGNAME = 0x45A3
+MKV_ID_TAGSTRING = 0x4487
+MKV_ID_CLUSTER = 0x1F43B675
+MKV_ID_CUES = 0x1C53BB6B
+MKV_ID_VOID = 0xEC
+
+MKV_TRACK_TYPES = {1: 'video', 2: 'audio', 17: 'subtitle'}
+MKV_CODEC_NAMES = {
+    'V_AV1': 'av1', 'V_MPEGH/ISO/HEVC': 'hevc', 'V_MPEG4/ISO/AVC': 'h264', 'V_VP9': 'vp9', 'V_VP8': 'vp8',
+    'V_MPEG2': 'mpeg2video', 'V_MPEG4/ISO/ASP': 'mpeg4', 'V_MS/VFW/FOURCC': 'vfw',
+    'A_AAC': 'aac', 'A_AC3': 'ac3', 'A_EAC3': 'eac3', 'A_DTS': 'dts', 'A_OPUS': 'opus', 'A_FLAC': 'flac',
+    'A_VORBIS': 'vorbis', 'A_MPEG/L3': 'mp3', 'A_TRUEHD': 'truehd', 'A_PCM/INT/LIT': 'pcm_s16le',
+    'S_TEXT/UTF8': 'subrip', 'S_TEXT/ASS': 'ass', 'S_TEXT/SSA': 'ssa', 'S_TEXT/WEBVTT': 'webvtt',
+    'S_HDMV/PGS': 'hdmv_pgs_subtitle', 'S_VOBSUB': 'dvd_subtitle',
+}
+MP4_CODEC_NAMES = {
+    'av01': 'av1', 'hvc1': 'hevc', 'hev1': 'hevc', 'avc1': 'h264', 'avc3': 'h264', 'vp09': 'vp9',
+    'mp4a': 'aac', 'ac-3': 'ac3', 'ec-3': 'eac3', 'Opus': 'opus', 'fLaC': 'flac', 'tx3g': 'mov_text',
+}
+MP4_HANDLER_TYPES = {'vide': 'video', 'soun': 'audio', 'subt': 'subtitle', 'sbtl': 'subtitle', 'text': 'subtitle'}
+
+CONTAINER_HEADER_MAX_ELEMENT_BYTES = 16 * 1024 * 1024  # Info/Tracks/Tags/moov max. mérete, amit beolvasunk
+
+
+def _ebml_parse_vint(data, pos, keep_marker):
+    """EBML változó hosszúságú egész dekódolása bytes-ból.
+
+    Returns:
+        tuple: (value, length, is_unknown_size)
+    """
+    if pos >= len(data):
+        raise EOFError("EBML vint: váratlan adatvég")
+    first = data[pos]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not (first & mask):
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise ValueError("Érvénytelen EBML vint")
+    if pos + length > len(data):
+        raise EOFError("EBML vint: váratlan adatvég")
+    value = first if keep_marker else (first & (mask - 1))
+    for byte in data[pos + 1:pos + length]:
+        value = (value << 8) | byte
+    unknown = (not keep_marker) and value == (1 << (7 * length)) - 1
+    return value, length, unknown
+
+
+def _ebml_parse_header(data, pos):
+    """Elem fejléc (ID + méret) dekódolása. Returns: (element_id, size vagy None, header_len)."""
+    element_id, id_len, _ = _ebml_parse_vint(data, pos, keep_marker=True)
+    size, size_len, unknown = _ebml_parse_vint(data, pos + id_len, keep_marker=False)
+    return element_id, (None if unknown else size), id_len + size_len
+
+
+def _ebml_read_header_at(fh, offset):
+    """Elem fejléc olvasása a fájl adott pozíciójáról."""
+    fh.seek(offset)
+    return _ebml_parse_header(fh.read(12), 0)
+
+
+def _ebml_iter_children(data):
+    """Egy master elem payload-jának gyermekei: (element_id, payload_start, payload_len, header_len)."""
+    pos = 0
+    end = len(data)
+    while pos < end:
+        element_id, size, header_len = _ebml_parse_header(data, pos)
+        if size is None:
+            size = end - pos - header_len
+        yield element_id, pos + header_len, size, header_len
+        pos += header_len + size
+
+
+def _ebml_uint(payload):
+    return int.from_bytes(payload, 'big') if payload else 0
+
+
+def _ebml_float(payload):
+    if len(payload) == 4:
+        return struct.unpack('>f', payload)[0]
+    if len(payload) == 8:
+        return struct.unpack('>d', payload)[0]
+    return 0.0
+
+
+def _ebml_string(payload):
+    return bytes(payload).split(b'\x00', 1)[0].decode('utf-8', 'replace')
+
+
+def _frame_rate_fraction(fps):
+    """FPS float → ffprobe stílusú 'num/den' string (NTSC rátákat /1001 alakban)."""
+    if not fps or fps <= 0:
+        return '0/0'
+    ntsc_num = round(fps * 1001)
+    if ntsc_num % 1000 == 0 and abs(ntsc_num / 1001 - fps) < 1e-4 and abs(fps - round(fps)) > 1e-3:
+        return f"{ntsc_num}/1001"
+    if abs(fps - round(fps)) < 1e-4:
+        return f"{int(round(fps))}/1"
+    from fractions import Fraction
+    fraction = Fraction(fps).limit_denominator(1001)
+    return f"{fraction.numerator}/{fraction.denominator}"
+
+
+class MatroskaHeader:
+    """Matroska/WebM fejléc: Segment szintű elemek pozíciói és a dekódolt Info/Tracks/Tags.
+
+    Csak a Segment első Cluster-éig olvas lineárisan, a később elhelyezett
+    elemeket (pl. mkvmerge Tags a fájl végén) a SeekHead alapján éri el.
+    A Cluster-eket soha nem olvassa be.
+
+    Attributes:
+        path: A fájl útvonala.
+        file_size: Fájlméret bájtban.
+        doc_type: 'matroska' vagy 'webm'.
+        segment_data_start: A Segment payload abszolút kezdőpozíciója.
+        elements: element_id -> [(offset, header_len, size), ...] a Segment szintű elemekre.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.file_size = 0
+        self.doc_type = None
+        self.segment_offset = None
+        self.segment_data_start = None
+        self.segment_size_known = True
+        self.elements = {}
+        self.timecode_scale = 1000000
+        self.duration_seconds = None
+        self.title = None
+        self.muxing_app = None
+        self.tracks = []
+        self.global_tags = {}
+        self.track_tags = {}  # TrackUID -> {name: value}
+
+    @classmethod
+    def read(cls, path, fh=None):
+        """Fejléc beolvasása. ValueError/EOFError, ha a fájl nem értelmezhető Matroska."""
+        header = cls(path)
+        if fh is None:
+            with open(os.fspath(path), 'rb') as own_fh:
+                header._parse(own_fh)
+        else:
+            header._parse(fh)
+        return header
+
+    def _record(self, element_id, offset, header_len, size):
+        entries = self.elements.setdefault(element_id, [])
+        if all(entry[0] != offset for entry in entries):
+            entries.append((offset, header_len, size))
+
+    def _read_payload(self, fh, offset, header_len, size):
+        if size > CONTAINER_HEADER_MAX_ELEMENT_BYTES:
+            raise ValueError(f"Túl nagy fejléc elem ({size} bájt)")
+        fh.seek(offset + header_len)
+        payload = fh.read(size)
+        if len(payload) != size:
+            raise EOFError("Csonka fejléc elem")
+        return payload
+
+    def _parse_seekhead(self, payload):
+        targets = []
+        for child_id, start, length, _ in _ebml_iter_children(payload):
+            if child_id != MKV_ID_SEEK:
+                continue
+            seek_id = None
+            seek_pos = None
+            for sub_id, sub_start, sub_len, _ in _ebml_iter_children(payload[start:start + length]):
+                sub_payload = payload[start + sub_start:start + sub_start + sub_len]
+                if sub_id == MKV_ID_SEEKID:
+                    seek_id = _ebml_uint(sub_payload)
+                elif sub_id == MKV_ID_SEEKPOSITION:
+                    seek_pos = _ebml_uint(sub_payload)
+            if seek_id is not None and seek_pos is not None:
+                targets.append((seek_id, self.segment_data_start + seek_pos))
+        return targets
+
+    def _parse(self, fh):
+        fh.seek(0, os.SEEK_END)
+        self.file_size = fh.tell()
+
+        element_id, size, header_len = _ebml_read_header_at(fh, 0)
+        if element_id != MKV_ID_EBML or size is None:
+            raise ValueError("Nem EBML fájl")
+        ebml_payload = self._read_payload(fh, 0, header_len, size)
+        for child_id, start, length, _ in _ebml_iter_children(ebml_payload):
+            if child_id == MKV_ID_DOCTYPE:
+                self.doc_type = _ebml_string(ebml_payload[start:start + length])
+        if self.doc_type not in ('matroska', 'webm'):
+            raise ValueError(f"Ismeretlen DocType: {self.doc_type}")
+
+        segment_offset = header_len + size
+        element_id, size, header_len = _ebml_read_header_at(fh, segment_offset)
+        if element_id != MKV_ID_SEGMENT:
+            raise ValueError("Hiányzó Segment elem")
+        self.segment_offset = segment_offset
+        self.segment_data_start = segment_offset + header_len
+        self.segment_size_known = size is not None
+        segment_end = self.file_size if size is None else min(self.file_size, self.segment_data_start + size)
+
+        # 1) Lineáris bejárás az első Cluster-ig (a tipikus fejléc néhány száz KB)
+        seek_targets = []
+        pos = self.segment_data_start
+        while pos + 2 <= segment_end:
+            element_id, size, header_len = _ebml_read_header_at(fh, pos)
+            if element_id == MKV_ID_CLUSTER or size is None:
+                break
+            self._record(element_id, pos, header_len, size)
+            if element_id == MKV_ID_SEEKHEAD:
+                seek_targets.extend(self._parse_seekhead(self._read_payload(fh, pos, header_len, size)))
+            pos += header_len + size
+
+        # 2) SeekHead által hivatkozott, még nem látott elemek (pl. Tags/Cues a fájl végén)
+        visited_seekheads = {entry[0] for entry in self.elements.get(MKV_ID_SEEKHEAD, [])}
+        while seek_targets:
+            target_id, target_offset = seek_targets.pop(0)
+            if target_id not in (MKV_ID_INFO, MKV_ID_TRACKS, MKV_ID_TAGS, MKV_ID_CUES, MKV_ID_SEEKHEAD):
+                continue
+            if target_offset >= segment_end or any(entry[0] == target_offset for entry in self.elements.get(target_id, [])):
+                continue
+            try:
+                element_id, size, header_len = _ebml_read_header_at(fh, target_offset)
+            except (EOFError, ValueError):
+                continue
+            if element_id != target_id or size is None:
+                continue
+            self._record(element_id, target_offset, header_len, size)
+            if element_id == MKV_ID_SEEKHEAD and target_offset not in visited_seekheads:
+                visited_seekheads.add(target_offset)
+                seek_targets.extend(self._parse_seekhead(self._read_payload(fh, target_offset, header_len, size)))
+
+        if not self.elements.get(MKV_ID_TRACKS):
+            raise ValueError("Hiányzó Tracks elem")
+
+        for offset, header_len, size in self.elements.get(MKV_ID_INFO, [])[:1]:
+            self._parse_info(self._read_payload(fh, offset, header_len, size))
+        for offset, header_len, size in self.elements.get(MKV_ID_TRACKS, [])[:1]:
+            self._parse_tracks(self._read_payload(fh, offset, header_len, size))
+        for offset, header_len, size in self.elements.get(MKV_ID_TAGS, []):
+            self._parse_tags(self._read_payload(fh, offset, header_len, size))
+
+    def _parse_info(self, payload):
+        raw_duration = None
+        for child_id, start, length, _ in _ebml_iter_children(payload):
+            value = payload[start:start + length]
+            if child_id == MKV_ID_TIMECODESCALE:
+                self.timecode_scale = _ebml_uint(value) or 1000000
+            elif child_id == MKV_ID_DURATION:
+                raw_duration = _ebml_float(value)
+            elif child_id == MKV_ID_TITLE:
+                self.title = _ebml_string(value)
+            elif child_id == MKV_ID_MUXINGAPP:
+                self.muxing_app = _ebml_string(value)
+        if raw_duration:
+            self.duration_seconds = raw_duration * self.timecode_scale / 1e9
+
+    def _parse_tracks(self, payload):
+        for child_id, start, length, _ in _ebml_iter_children(payload):
+            if child_id != MKV_ID_TRACKENTRY:
+                continue
+            entry = payload[start:start + length]
+            track = {'number': None, 'uid': None, 'type': None, 'codec_id': '', 'default': 1,
+                     'default_duration': None, 'name': '', 'language': 'eng', 'width': None,
+                     'height': None, 'channels': None}
+            for sub_id, sub_start, sub_len, _ in _ebml_iter_children(entry):
+                value = entry[sub_start:sub_start + sub_len]
+                if sub_id == MKV_ID_TRACKNUMBER:
+                    track['number'] = _ebml_uint(value)
+                elif sub_id == MKV_ID_TRACKUID:
+                    track['uid'] = _ebml_uint(value)
+                elif sub_id == MKV_ID_TRACKTYPE:
+                    track['type'] = _ebml_uint(value)
+                elif sub_id == MKV_ID_CODECID:
+                    track['codec_id'] = _ebml_string(value)
+                elif sub_id == MKV_ID_FLAGDEFAULT:
+                    track['default'] = _ebml_uint(value)
+                elif sub_id == MKV_ID_DEFAULTDURATION:
+                    track['default_duration'] = _ebml_uint(value)
+                elif sub_id == MKV_ID_NAME:
+                    track['name'] = _ebml_string(value)
+                elif sub_id == MKV_ID_LANGUAGE:
+                    track['language'] = _ebml_string(value)
+                elif sub_id == MKV_ID_LANGUAGE_BCP47:
+                    track['language_bcp47'] = _ebml_string(value)
+                elif sub_id in (MKV_ID_VIDEO, MKV_ID_AUDIO):
+                    for leaf_id, leaf_start, leaf_len, _ in _ebml_iter_children(value):
+                        leaf = value[leaf_start:leaf_start + leaf_len]
+                        if leaf_id == MKV_ID_PIXELWIDTH:
+                            track['width'] = _ebml_uint(leaf)
+                        elif leaf_id == MKV_ID_PIXELHEIGHT:
+                            track['height'] = _ebml_uint(leaf)
+                        elif leaf_id == MKV_ID_CHANNELS:
+                            track['channels'] = _ebml_uint(leaf)
+            self.tracks.append(track)
+
+    def _parse_tags(self, payload):
+        for child_id, start, length, _ in _ebml_iter_children(payload):
+            if child_id != MKV_ID_TAG:
+                continue
+            tag = payload[start:start + length]
+            track_uids = []
+            simple_tags = {}
+            for sub_id, sub_start, sub_len, _ in _ebml_iter_children(tag):
+                value = tag[sub_start:sub_start + sub_len]
+                if sub_id == MKV_ID_TARGETS:
+                    for leaf_id, leaf_start, leaf_len, _ in _ebml_iter_children(value):
+                        if leaf_id == MKV_ID_TAGTRACKUID:
+                            track_uids.append(_ebml_uint(value[leaf_start:leaf_start + leaf_len]))
+                elif sub_id == MKV_ID_SIMPLETAG:
+                    name = None
+                    text = None
+                    for leaf_id, leaf_start, leaf_len, _ in _ebml_iter_children(value):
+                        leaf = value[leaf_start:leaf_start + leaf_len]
+                        if leaf_id == MKV_ID_TAGNAME:
+                            name = _ebml_string(leaf)
+                        elif leaf_id == MKV_ID_TAGSTRING:
+                            text = _ebml_string(leaf)
+                    if name and text is not None:
+                        simple_tags[name] = text
+            track_uids = [uid for uid in track_uids if uid]
+            if track_uids:
+                for uid in track_uids:
+                    self.track_tags.setdefault(uid, {}).update(simple_tags)
+            else:
+                self.global_tags.update(simple_tags)
+
+    def to_probe_data(self):
+        """ffprobe -show_format -show_streams kompatibilis dict."""
+        streams = []
+        for track in self.tracks:
+            codec_type = MKV_TRACK_TYPES.get(track['type'])
+            if codec_type is None:
+                continue
+            codec_id = track['codec_id'] or ''
+            stream = {
+                'index': len(streams),
+                'codec_type': codec_type,
+                'codec_name': MKV_CODEC_NAMES.get(codec_id, codec_id.split('_', 1)[-1].lower()),
+                'disposition': {'default': 1 if track['default'] else 0},
+                'tags': {},
+            }
+            language = track.get('language_bcp47') or track['language']
+            if language and language != 'und':
+                stream['tags']['language'] = language
+            if track['name']:
+                stream['tags']['title'] = track['name']
+            if track['uid'] in self.track_tags:
+                stream['tags'].update(self.track_tags[track['uid']])
+            if codec_type == 'video':
+                if track['width']:
+                    stream['width'] = track['width']
+                if track['height']:
+                    stream['height'] = track['height']
+                if track['default_duration']:
+                    stream['r_frame_rate'] = _frame_rate_fraction(1e9 / track['default_duration'])
+            elif codec_type == 'audio' and track['channels']:
+                stream['channels'] = track['channels']
+            streams.append(stream)
+
+        duration = self.duration_seconds
+        if not duration:
+            # Info/Duration hiányában a sávonkénti DURATION tag (pl. "01:23:45.678000000")
+            for stream in streams:
+                parsed = parse_hms_duration(ProbeResult.get_stream_tag(stream, 'DURATION'))
+                if parsed and (duration is None or parsed > duration):
+                    duration = parsed
+        format_info = {
+            'filename': os.fspath(self.path),
+            'format_name': 'matroska,webm',
+            'size': str(self.file_size),
+            'tags': dict(self.global_tags),
+        }
+        if self.title:
+            format_info['tags'].setdefault('title', self.title)
+        if self.muxing_app:
+            # Mint az ffprobe (matroska demuxer): a MuxingApp az 'encoder' tag - a ProbeResult.statistics_frame_count
+            # ebből dönti el, hogy a statisztika tag-ek elavultak-e
+            format_info['tags'].setdefault('encoder', self.muxing_app)
+        if duration:
+            format_info['duration'] = f"{duration:.6f}"
+        return {'format': format_info, 'streams': streams}
+
+
+def parse_hms_duration(value):
+    """'HH:MM:SS.fffffffff' formátumú Matroska DURATION tag → másodperc (float) vagy None."""
+    if not value:
+        return None
+    match = re.match(r'^\s*(\d+):(\d{1,2}):(\d{1,2}(?:\.\d+)?)\s*$', str(value))
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def _mp4_iter_boxes(data, pos=0, end=None):
+    """ISO-BMFF box-ok bejárása bytes-ban: (box_type, payload_start, payload_end)."""
+    end = len(data) if end is None else end
+    while pos + 8 <= end:
+        size, box_type = struct.unpack('>I4s', data[pos:pos + 8])
+        header_len = 8
+        if size == 1:
+            if pos + 16 > end:
+                break
+            size = struct.unpack('>Q', data[pos + 8:pos + 16])[0]
+            header_len = 16
+        elif size == 0:
+            size = end - pos
+        if size < header_len or pos + size > end:
+            break
+        yield box_type.decode('latin-1'), pos + header_len, pos + size
+        pos += size
+
+
+def _mp4_find_box(data, path, pos=0, end=None):
+    """Első box a megadott útvonalon (pl. ['mdia', 'hdlr']) → (payload_start, payload_end) vagy None."""
+    for box_type, start, stop in _mp4_iter_boxes(data, pos, end):
+        if box_type == path[0]:
+            if len(path) == 1:
+                return start, stop
+            found = _mp4_find_box(data, path[1:], start, stop)
+            if found:
+                return found
+    return None
+
+
+def _read_isobmff_probe_data(fh, path):
+    """MP4/MOV moov box feldolgozása ffprobe-kompatibilis dict-re, vagy None."""
+    fh.seek(0, os.SEEK_END)
+    file_size = fh.tell()
+    pos = 0
+    moov = None
+    seen_ftyp = False
+    while pos + 8 <= file_size:
+        fh.seek(pos)
+        head = fh.read(16)
+        if len(head) < 8:
+            break
+        size, box_type = struct.unpack('>I4s', head[:8])
+        header_len = 8
+        if size == 1:
+            size = struct.unpack('>Q', head[8:16])[0]
+            header_len = 16
+        elif size == 0:
+            size = file_size - pos
+        if size < header_len:
+            return None
+        if box_type == b'ftyp':
+            seen_ftyp = True
+        elif box_type == b'moov':
+            if size - header_len > CONTAINER_HEADER_MAX_ELEMENT_BYTES:
+                return None
+            fh.seek(pos + header_len)
+            moov = fh.read(size - header_len)
+            break
+        pos += size
+    if not seen_ftyp or not moov:
+        return None
+
+    format_info = {'filename': os.fspath(path), 'format_name': 'mov,mp4,m4a,3gp,3g2,mj2', 'size': str(file_size), 'tags': {}}
+    mvhd = _mp4_find_box(moov, ['mvhd'])
+    if mvhd:
+        start = mvhd[0]
+        if moov[start] == 1:
+            timescale, duration = struct.unpack('>IQ', moov[start + 20:start + 32])
+        else:
+            timescale, duration = struct.unpack('>II', moov[start + 12:start + 20])
+        if timescale:
+            format_info['duration'] = f"{duration / timescale:.6f}"
+
+    streams = []
+    for box_type, start, stop in _mp4_iter_boxes(moov):
+        if box_type != 'trak':
+            continue
+        hdlr = _mp4_find_box(moov, ['mdia', 'hdlr'], start, stop)
+        codec_type = MP4_HANDLER_TYPES.get(moov[hdlr[0] + 8:hdlr[0] + 12].decode('latin-1')) if hdlr else None
+        if codec_type is None:
+            continue
+        stream = {'index': len(streams), 'codec_type': codec_type, 'disposition': {'default': 1 if not streams else 0}, 'tags': {}}
+        mdhd = _mp4_find_box(moov, ['mdia', 'mdhd'], start, stop)
+        media_timescale = media_duration = 0
+        if mdhd:
+            mdhd_start = mdhd[0]
+            if moov[mdhd_start] == 1:
+                media_timescale, media_duration = struct.unpack('>IQ', moov[mdhd_start + 20:mdhd_start + 32])
+                lang_offset = mdhd_start + 32
+            else:
+                media_timescale, media_duration = struct.unpack('>II', moov[mdhd_start + 12:mdhd_start + 20])
+                lang_offset = mdhd_start + 20
+            packed = struct.unpack('>H', moov[lang_offset:lang_offset + 2])[0]
+            language = ''.join(chr(((packed >> shift) & 0x1F) + 0x60) for shift in (10, 5, 0))
+            if language.isalpha() and language != 'und':
+                stream['tags']['language'] = language
+        stsd = _mp4_find_box(moov, ['mdia', 'minf', 'stbl', 'stsd'], start, stop)
+        if stsd and stsd[1] - stsd[0] >= 16:
+            entry = stsd[0] + 8
+            fourcc = moov[entry + 4:entry + 8].decode('latin-1')
+            stream['codec_name'] = MP4_CODEC_NAMES.get(fourcc, fourcc.strip().lower())
+            if codec_type == 'video' and stsd[1] - entry >= 36:
+                stream['width'], stream['height'] = struct.unpack('>HH', moov[entry + 32:entry + 36])
+            elif codec_type == 'audio' and stsd[1] - entry >= 26:
+                stream['channels'] = struct.unpack('>H', moov[entry + 24:entry + 26])[0]
+        stts = _mp4_find_box(moov, ['mdia', 'minf', 'stbl', 'stts'], start, stop)
+        if stts and codec_type == 'video':
+            entry_count = struct.unpack('>I', moov[stts[0] + 4:stts[0] + 8])[0]
+            sample_total = 0
+            dominant = (0, 0)
+            for i in range(min(entry_count, (stts[1] - stts[0] - 8) // 8)):
+                count, delta = struct.unpack('>II', moov[stts[0] + 8 + i * 8:stts[0] + 16 + i * 8])
+                sample_total += count
+                if count > dominant[0]:
+                    dominant = (count, delta)
+            if sample_total:
+                stream['nb_frames'] = str(sample_total)
+            if media_timescale and dominant[1]:
+                stream['r_frame_rate'] = _frame_rate_fraction(media_timescale / dominant[1])
+        if media_timescale and media_duration:
+            stream['duration'] = f"{media_duration / media_timescale:.6f}"
+        streams.append(stream)
+
+    # ffmpeg -movflags use_metadata_tags: moov/meta (keys + ilst), iTunes stílus: moov/udta/meta
+    for meta in (_mp4_find_box(moov, ['udta', 'meta']), _mp4_find_box(moov, ['meta'])):
+        if not meta:
+            continue
+        meta_start = meta[0] + 4 if _mp4_find_box(moov, ['hdlr'], meta[0] + 4, meta[1]) else meta[0]
+        keys_box = _mp4_find_box(moov, ['keys'], meta_start, meta[1])
+        ilst_box = _mp4_find_box(moov, ['ilst'], meta_start, meta[1])
+        key_names = []
+        if keys_box:
+            key_pos = keys_box[0] + 8
+            while key_pos + 8 <= keys_box[1]:
+                key_size = struct.unpack('>I', moov[key_pos:key_pos + 4])[0]
+                if key_size < 8:
+                    break
+                key_names.append(moov[key_pos + 8:key_pos + key_size].decode('utf-8', 'replace'))
+                key_pos += key_size
+        if ilst_box:
+            for item_type, item_start, item_stop in _mp4_iter_boxes(moov, ilst_box[0], ilst_box[1]):
+                data_box = _mp4_find_box(moov, ['data'], item_start, item_stop)
+                if not data_box:
+                    continue
+                value = moov[data_box[0] + 8:data_box[1]].decode('utf-8', 'replace')
+                key_index = int.from_bytes(item_type.encode('latin-1'), 'big')
+                if 1 <= key_index <= len(key_names):
+                    format_info['tags'][key_names[key_index - 1]] = value
+                elif item_type == '\xa9too':
+                    format_info['tags']['encoder'] = value
+                elif item_type == '\xa9nam':
+                    format_info['tags']['title'] = value
+    return {'format': format_info, 'streams': streams}
+
+
+def read_container_header(video_path):
+    """Read container metadata natively, without spawning FFprobe.
+
+    Supports Matroska/WebM (EBML) and ISO-BMFF (MP4/MOV). Only the header
+    elements are read (Info, Tracks, Tags via SeekHead, or the moov box);
+    cluster/media data is never touched.
+
+    Args:
+        video_path: Path to the media file.
+
+    Returns:
+        ProbeResult: ffprobe-compatible result, or None if the file could not
+            be parsed (callers then fall back to FFprobe).
+    """
+    started = time.monotonic()
+    try:
+        with open(os.fspath(video_path), 'rb', buffering=65536) as fh:
+            magic = fh.read(12)
+            if magic[:4] == b'\x1a\x45\xdf\xa3':
+                data = MatroskaHeader.read(video_path, fh=fh).to_probe_data()
+            elif magic[4:8] in (b'ftyp', b'moov', b'free', b'mdat', b'wide'):
+                data = _read_isobmff_probe_data(fh, video_path)
+            else:
+                return None
+    except (OSError, ValueError, EOFError, struct.error, IndexError) as e:
+        load_debug_log(f"[read_container_header] Natív fejléc olvasás sikertelen ({video_path}): {e}")
+        return None
+    finally:
+        PROBE_IO_METER.record(time.monotonic() - started)
+    if not data or not data.get('streams') or 'duration' not in data.get('format', {}):
+        return None
+    return ProbeResult(video_path, data)
+
+
+def probe_media_header(video_path):
+    """Metaadat-only probe: probe cache → natív konténer olvasó → ffprobe.
+
+    Duration, fps, felbontás, sávlista és Settings tag lekérdezéséhez elég,
+    részletes stream adatokhoz (bit_rate, codec paraméterek) a probe_media() kell.
+    """
+    identity = ProbeCache.file_identity(video_path)
+    if identity is not None:
+        cached = PROBE_CACHE.get(video_path, identity)
+        if cached is not None:
+            return ProbeResult(video_path, cached)
+    native = read_container_header(video_path)
+    if native is not None:
+        return native
+    return probe_media(video_path)
+
+
+# ================================================================================
+# MATROSKA TAG HELYBEN FRISSÍTÉS (remux nélkül)
+# ================================================================================
+# update_video_metadata_vmaf a Settings tag frissítéséhez nem másolja újra a teljes
+# fájlt, hanem a Tags elemet írja át helyben:
+#   1. 'inplace': az új érték elfér a régi TagString helyén (nullákkal kitöltve)
+#   2. 'void':    a TagString mögötti EBML Void (padding) terhére bővítünk
+#   3. 'append':  új Tags elem a fájl végére + SeekHead átlinkelés, a régi Tags → Void
+# Ha egyik sem lehetséges, a hívó visszaesik az ffmpeg remux-ra.
+
+MKV_ID_CRC32 = 0xBF
+MKV_TARGET_UID_IDS = (0x63C5, 0x63C9, 0x63C4, 0x63C6)  # TagTrackUID, TagEditionUID, TagChapterUID, TagAttachmentUID
+MKV_TAG_RESERVE_BYTES = 512  # Az új (append) Tags mögé tett Void, hogy a következő frissítés már helyben menjen
+MKV_TAG_SIZE_WIDTH = 8  # Az általunk írt Tags/Tag/SimpleTag méret mezők fix szélessége (a Void terhére bővíthetők maradnak)
+
+
+def _ebml_encode_id(element_id):
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, 'big')
+
+
+def _ebml_encode_size(size, width=None):
+    """EBML méret vint kódolás. ValueError, ha nem fér el a megadott szélességen."""
+    if width is None:
+        width = 1
+        while size >= (1 << (7 * width)) - 1:
+            width += 1
+    if width > 8 or size >= (1 << (7 * width)) - 1:
+        raise ValueError(f"EBML méret ({size}) nem fér el {width} bájton")
+    return ((1 << (7 * width)) | size).to_bytes(width, 'big')
+
+
+def _ebml_element(element_id, payload, size_width=None):
+    return _ebml_encode_id(element_id) + _ebml_encode_size(len(payload), size_width) + payload
+
+
+def _ebml_void(total_len):
+    """Pontosan total_len bájtos Void elem (total_len >= 2)."""
+    for width in range(1, 9):
+        payload_len = total_len - 1 - width
+        if payload_len >= 0 and payload_len < (1 << (7 * width)) - 1:
+            return _ebml_element(MKV_ID_VOID, b'\x00' * payload_len, width)
+    raise ValueError(f"Void nem készíthető {total_len} bájtra")
+
+
+def _ebml_with_crc(payload):
+    """Ha a payload CRC-32 elemmel kezdődik, újraszámolja (a CRC a többi gyermek bájtjaira vonatkozik)."""
+    children = list(_ebml_iter_children(payload))
+    if not children or children[0][0] != MKV_ID_CRC32:
+        return payload
+    _, start, length, _ = children[0]
+    rest = payload[start + length:]
+    return _ebml_element(MKV_ID_CRC32, (zlib.crc32(rest) & 0xFFFFFFFF).to_bytes(4, 'little')) + rest
+
+
+def _mkv_refresh_crc(fh, offset, header_len, size):
+    """Egy level-1 elem CRC-32 gyermekének újraszámolása helyben (ha van)."""
+    fh.seek(offset + header_len)
+    payload = fh.read(size)
+    refreshed = _ebml_with_crc(payload)
+    if refreshed != payload:
+        fh.seek(offset + header_len)
+        fh.write(refreshed[:size])
+
+
+def _mkv_rewrite_size(fh, element, new_size):
+    """Elem méret mezőjének átírása a meglévő vint szélességen."""
+    offset, element_id, header_len, _ = element
+    id_len = len(_ebml_encode_id(element_id))
+    fh.seek(offset + id_len)
+    fh.write(_ebml_encode_size(new_size, header_len - id_len))
+
+
+class _MkvPatchJournal:
+    """Írási napló egy helyben módosított fájlhoz: minden write() előtt elmenti a felülírt bájtokat.
+
+    A fájl objektum helyett adjuk át a patch függvényeknek (seek/read/write/tell
+    továbbítva). Sikertelen ellenőrzés vagy írás közbeni hiba esetén restore()
+    visszaírja az eredeti bájtokat és visszavágja a fájlt az eredeti méretre.
+    """
+
+    def __init__(self, fh):
+        self._fh = fh
+        fh.seek(0, os.SEEK_END)
+        self.original_size = fh.tell()
+        self._entries = []
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        return self._fh.seek(offset, whence)
+
+    def tell(self):
+        return self._fh.tell()
+
+    def read(self, size=-1):
+        return self._fh.read(size)
+
+    def write(self, data):
+        offset = self._fh.tell()
+        if offset < self.original_size:
+            original = self._fh.read(min(len(data), self.original_size - offset))
+            self._entries.append((offset, original))
+            self._fh.seek(offset)
+        return self._fh.write(data)
+
+    def flush(self):
+        self._fh.flush()
+
+    def fileno(self):
+        return self._fh.fileno()
+
+    @property
+    def modified(self):
+        return bool(self._entries) or self._size() != self.original_size
+
+    def _size(self):
+        position = self._fh.tell()
+        self._fh.seek(0, os.SEEK_END)
+        size = self._fh.tell()
+        self._fh.seek(position)
+        return size
+
+    def restore(self, video_path):
+        """Eredeti bájtok visszaírása (fordított sorrendben) és a hozzáfűzött rész levágása."""
+        with open(os.fspath(video_path), 'r+b') as fh:
+            for offset, original in reversed(self._entries):
+                fh.seek(offset)
+                fh.write(original)
+            fh.truncate(self.original_size)
+            fh.flush()
+            os.fsync(fh.fileno())
+        self._entries = []
+
+
+def _mkv_locate_simple_tag(fh, header, tag_name):
+    """Globális SimpleTag helyének megkeresése a Tags elemekben.
+
+    Returns:
+        dict: 'tags', 'tag', 'simple', 'string' elemek (offset, id, header_len, size)
+              formában ('simple'/'string' None, ha a tag nem létezik, de van globális Tag),
+              valamint 'voids': [(offset, total_len, grow_depth)] a bővítéshez használható
+              Void elemek (grow_depth: hány szülő elem mérete nő, belülről kifelé);
+              vagy None, ha nincs globális Tag.
+    """
+    wanted = tag_name.lower()
+    fallback = None
+    for tags_offset, tags_hlen, tags_size in header.elements.get(MKV_ID_TAGS, []):
+        payload = header._read_payload(fh, tags_offset, tags_hlen, tags_size)
+        tags_el = (tags_offset, MKV_ID_TAGS, tags_hlen, tags_size)
+        base = tags_offset + tags_hlen
+        tag_children = list(_ebml_iter_children(payload))
+        for tag_index, (tag_id, tag_start, tag_len, tag_hlen) in enumerate(tag_children):
+            if tag_id != MKV_ID_TAG:
+                continue
+            tag_el = (base + tag_start - tag_hlen, MKV_ID_TAG, tag_hlen, tag_len)
+            tag_payload = payload[tag_start:tag_start + tag_len]
+            tag_base = base + tag_start
+            is_global = True
+            found = None
+            simple_children = list(_ebml_iter_children(tag_payload))
+            for simple_index, (sub_id, sub_start, sub_len, sub_hlen) in enumerate(simple_children):
+                sub_payload = tag_payload[sub_start:sub_start + sub_len]
+                if sub_id == MKV_ID_TARGETS:
+                    for leaf_id, leaf_start, leaf_len, _ in _ebml_iter_children(sub_payload):
+                        if leaf_id in MKV_TARGET_UID_IDS and _ebml_uint(sub_payload[leaf_start:leaf_start + leaf_len]):
+                            is_global = False
+                elif sub_id == MKV_ID_SIMPLETAG and found is None:
+                    name = None
+                    string_el = None
+                    for leaf_id, leaf_start, leaf_len, leaf_hlen in _ebml_iter_children(sub_payload):
+                        if leaf_id == MKV_ID_TAGNAME:
+                            name = _ebml_string(sub_payload[leaf_start:leaf_start + leaf_len])
+                        elif leaf_id == MKV_ID_TAGSTRING:
+                            string_el = (tag_base + sub_start + leaf_start - leaf_hlen, MKV_ID_TAGSTRING, leaf_hlen, leaf_len)
+                    if name and name.lower() == wanted and string_el:
+                        found = ((tag_base + sub_start - sub_hlen, MKV_ID_SIMPLETAG, sub_hlen, sub_len), string_el, simple_index)
+            if not is_global:
+                continue
+            # Bővítésre használható Void elemek: Tag-en belül a SimpleTag után (csak a SimpleTag nő),
+            # Tags-en belül a Tag után (SimpleTag + Tag nő)
+            voids = []
+            first_after = found[2] + 1 if found else len(simple_children)
+            for sub_id, sub_start, sub_len, sub_hlen in simple_children[first_after:]:
+                if sub_id == MKV_ID_VOID:
+                    voids.append((tag_base + sub_start - sub_hlen, sub_hlen + sub_len, 1 if found else 0))
+            for sub_id, sub_start, sub_len, sub_hlen in tag_children[tag_index + 1:]:
+                if sub_id == MKV_ID_VOID:
+                    voids.append((base + sub_start - sub_hlen, sub_hlen + sub_len, 2 if found else 1))
+            # Segment szinten csak a Tags után közvetlenül álló Void jó (minden elem nő: SimpleTag + Tag + Tags)
+            tags_end = tags_offset + tags_hlen + tags_size
+            try:
+                void_id, void_size, void_hlen = _ebml_read_header_at(fh, tags_end)
+                if void_id == MKV_ID_VOID and void_size is not None and tags_end + void_hlen + void_size <= header.file_size:
+                    voids.append((tags_end, void_hlen + void_size, 3 if found else 2))
+            except (EOFError, ValueError):
+                pass
+            result = {
+                'tags': tags_el, 'tag': tag_el,
+                'simple': found[0] if found else None,
+                'string': found[1] if found else None,
+                'voids': voids,
+            }
+            if found:
+                return result
+            if fallback is None:
+                fallback = result
+    return fallback
+
+
+def _mkv_seek_entries(fh, header):
+    """SeekHead bejegyzések abszolút pozíciókkal: [(seekhead_el, seek_id_pos, seek_id, pos_value_offset, pos_width, target_offset)]."""
+    entries = []
+    for sh_offset, sh_hlen, sh_size in header.elements.get(MKV_ID_SEEKHEAD, []):
+        payload = header._read_payload(fh, sh_offset, sh_hlen, sh_size)
+        base = sh_offset + sh_hlen
+        for child_id, start, length, _ in _ebml_iter_children(payload):
+            if child_id != MKV_ID_SEEK:
+                continue
+            seek_id = seek_id_pos = pos_offset = pos_width = target = None
+            for sub_id, sub_start, sub_len, _ in _ebml_iter_children(payload[start:start + length]):
+                value = payload[start + sub_start:start + sub_start + sub_len]
+                if sub_id == MKV_ID_SEEKID:
+                    seek_id = _ebml_uint(value)
+                    seek_id_pos = (base + start + sub_start, sub_len)
+                elif sub_id == MKV_ID_SEEKPOSITION:
+                    pos_offset = base + start + sub_start
+                    pos_width = sub_len
+                    target = header.segment_data_start + _ebml_uint(value)
+            if seek_id is not None and pos_offset is not None:
+                entries.append(((sh_offset, sh_hlen, sh_size), seek_id_pos, seek_id, pos_offset, pos_width, target))
+    return entries
+
+
+def update_matroska_tag_inplace(video_path, tag_name, new_value, logger=None):
+    """Rewrite a global Matroska SimpleTag without remuxing the file.
+
+    Tries, in order: overwrite in place (zero-padded string), grow into a
+    following EBML Void element, or append a new Tags element at the end of
+    the file and relink it via the SeekHead (the old Tags becomes Void).
+    CRC-32 elements of touched level-1 elements are recomputed.
+
+    Args:
+        video_path: Path to the .mkv/.webm file.
+        tag_name: SimpleTag name (case-insensitive match, e.g. 'Settings').
+        new_value: New tag string.
+        logger: Logger instance.
+
+    Returns:
+        str: The strategy used ('inplace', 'void' or 'append'), or None if the
+            tag could not be patched and the caller should remux.
+    """
+    new_bytes = str(new_value).encode('utf-8')
+    strategy = None
+    journal = None
+    try:
+        with open(os.fspath(video_path), 'r+b') as raw_fh:
+            header = MatroskaHeader.read(video_path, fh=raw_fh)
+            journal = fh = _MkvPatchJournal(raw_fh)
+            location = _mkv_locate_simple_tag(fh, header, tag_name)
+            if location is None:
+                return None
+            tags_el = location['tags']
+            tag_el = location['tag']
+
+            if location['string'] is not None:
+                string_off, _, string_hlen, string_size = location['string']
+                # 1) Helyben: elfér a régi payload helyén (EBML string nullákkal kitölthető)
+                if len(new_bytes) <= string_size:
+                    fh.seek(string_off + string_hlen)
+                    fh.write(new_bytes + b'\x00' * (string_size - len(new_bytes)))
+                    strategy = 'inplace'
+                region_start = string_off
+                region_end = string_off + string_hlen + string_size
+                try:
+                    # Lehetőleg a régi méret mező szélességével, hogy a bővülés csak az új bájtok száma legyen
+                    replacement = _ebml_element(MKV_ID_TAGSTRING, new_bytes, string_hlen - len(_ebml_encode_id(MKV_ID_TAGSTRING)))
+                except ValueError:
+                    replacement = _ebml_element(MKV_ID_TAGSTRING, new_bytes)
+                ancestors = [location['simple'], tag_el, tags_el]
+            else:
+                # Nincs még ilyen SimpleTag: a globális Tag végére szúrjuk be (fix szélességű méret mezővel)
+                region_start = region_end = tag_el[0] + tag_el[2] + tag_el[3]
+                replacement = _ebml_element(
+                    MKV_ID_SIMPLETAG,
+                    _ebml_element(MKV_ID_TAGNAME, tag_name.encode('utf-8')) + _ebml_element(MKV_ID_TAGSTRING, new_bytes),
+                    MKV_TAG_SIZE_WIDTH)
+                ancestors = [tag_el, tags_el]
+            delta = len(replacement) - (region_end - region_start)
+
+            # 2) Void padding terhére bővítés
+            if strategy is None:
+                for void_offset, void_total, grow_depth in location['voids']:
+                    remaining = void_total - delta
+                    if void_offset < region_end or remaining < 0 or remaining == 1:
+                        continue
+                    grown = ancestors[:grow_depth]
+                    try:
+                        size_fields = [_ebml_encode_size(el[3] + delta, el[2] - len(_ebml_encode_id(el[1]))) for el in grown]
+                    except ValueError:
+                        continue
+                    fh.seek(region_end)
+                    middle = fh.read(void_offset - region_end)
+                    fh.seek(region_start)
+                    fh.write(replacement + middle + (_ebml_void(remaining) if remaining else b''))
+                    for el, _ in zip(grown, size_fields):
+                        _mkv_rewrite_size(fh, el, el[3] + delta)
+                    if tags_el in grown:
+                        tags_el = (tags_el[0], tags_el[1], tags_el[2], tags_el[3] + delta)
+                    _mkv_refresh_crc(fh, tags_el[0], tags_el[2], tags_el[3])
+                    strategy = 'void'
+                    break
+            elif strategy == 'inplace':
+                _mkv_refresh_crc(fh, tags_el[0], tags_el[2], tags_el[3])
+
+            # 3) Új Tags a fájl végére + SeekHead átlinkelés
+            if strategy is None:
+                strategy = _mkv_append_tags(fh, header, location, region_start, region_end, replacement)
+
+            if strategy:
+                fh.flush()
+                os.fsync(fh.fileno())
+    except (OSError, ValueError, EOFError, struct.error) as e:
+        if logger:
+            logger.write(f"⚠ Matroska tag helyben frissítés sikertelen: {e}\n")
+            logger.flush()
+        # KRITIKUS: félbemaradt írás után a fájl nem maradhat köztes állapotban
+        _mkv_restore_patch(video_path, journal, logger)
+        return None
+    finally:
+        PROBE_CACHE.invalidate(video_path)
+
+    if strategy:
+        # Ellenőrzés: a fejléc újraolvasva a várt értéket adja-e
+        check = read_container_header(video_path)
+        if check is None or (check.get_format_tag(tag_name) or '').strip() != str(new_value).strip():
+            if logger:
+                logger.write(f"✗ Matroska tag ellenőrzés sikertelen ({strategy}) - eredeti bájtok visszaállítva, remux szükséges\n")
+                logger.flush()
+            _mkv_restore_patch(video_path, journal, logger)
+            return None
+    return strategy
+
+
+def _mkv_restore_patch(video_path, journal, logger=None):
+    """Sikertelen helyben frissítés visszagörgetése a napló alapján (a hívó ezután remuxolhat)."""
+    if journal is None or not journal.modified:
+        return
+    try:
+        journal.restore(video_path)
+    except OSError as e:
+        if logger:
+            logger.write(f"✗ Matroska tag visszaállítás sikertelen: {e}\n")
+            logger.flush()
+    finally:
+        PROBE_CACHE.invalidate(video_path)
+
+
+def _mkv_append_tags(fh, header, location, region_start, region_end, replacement, reserve_bytes=MKV_TAG_RESERVE_BYTES):
+    """'append' stratégia: módosított Tags a fájl végére, régi Tags → Void vagy másodlagos SeekHead."""
+    tags_off, _, tags_hlen, tags_size = location['tags']
+    tag_off, _, tag_hlen, tag_size = location['tag']
+    segment_end = header.file_size
+    segment_offset = segment_hlen = segment_size = None
+    if header.segment_size_known:
+        segment_offset = header.segment_offset
+        segment_id, segment_size, segment_hlen = _ebml_read_header_at(fh, segment_offset)
+        if segment_id != MKV_ID_SEGMENT or segment_offset + segment_hlen + segment_size != header.file_size:
+            return None  # A Segment után más adat is van - nem fűzhetünk a végére
+
+    # Módosított Tags payload összeállítása (SimpleTag/Tag méretek újrakódolva, CRC újraszámolva)
+    tags_payload = header._read_payload(fh, tags_off, tags_hlen, tags_size)
+    tag_payload_start = tag_off + tag_hlen - (tags_off + tags_hlen)
+    tag_payload = tags_payload[tag_payload_start:tag_payload_start + tag_size]
+    rel_start = region_start - (tag_off + tag_hlen)
+    rel_end = region_end - (tag_off + tag_hlen)
+    if location['simple'] is not None:
+        simple_off, _, simple_hlen, simple_size = location['simple']
+        simple_rel = simple_off - (tag_off + tag_hlen)
+        simple_payload = tag_payload[simple_rel + simple_hlen:simple_rel + simple_hlen + simple_size]
+        inner_start = rel_start - simple_rel - simple_hlen
+        inner_end = rel_end - simple_rel - simple_hlen
+        new_simple = _ebml_element(MKV_ID_SIMPLETAG, simple_payload[:inner_start] + replacement + simple_payload[inner_end:], MKV_TAG_SIZE_WIDTH)
+        new_tag_payload = tag_payload[:simple_rel] + new_simple + tag_payload[simple_rel + simple_hlen + simple_size:]
+    else:
+        new_tag_payload = tag_payload[:rel_start] + replacement + tag_payload[rel_end:]
+    tag_rel = tag_off - (tags_off + tags_hlen)
+    # FONTOS: fix 8 bájtos méret mezők - minimális szélességnél a következő 'void' bővítés
+    # a méret mező szélességhatárán elbukna, és a lefoglalt Void kihasználatlan maradna
+    new_tags_payload = tags_payload[:tag_rel] + _ebml_element(MKV_ID_TAG, new_tag_payload, MKV_TAG_SIZE_WIDTH) + tags_payload[tag_rel + tag_hlen + tag_size:]
+    appended = _ebml_element(MKV_ID_TAGS, _ebml_with_crc(new_tags_payload), MKV_TAG_SIZE_WIDTH) + _ebml_void(reserve_bytes)
+    new_tags_rel = segment_end - header.segment_data_start
+    old_total = tags_hlen + tags_size
+
+    # Átlinkelés terve: (A) a meglévő SeekPosition átírása, vagy (B) másodlagos SeekHead a régi Tags helyén
+    primary = None
+    for entry in _mkv_seek_entries(fh, header):
+        if entry[2] == MKV_ID_TAGS and entry[5] == tags_off:
+            primary = entry
+            break
+    secondary = None
+    if primary is None or new_tags_rel >= (1 << (8 * primary[4])):
+        seek = _ebml_element(MKV_ID_SEEK, _ebml_element(MKV_ID_SEEKID, _ebml_encode_id(MKV_ID_TAGS)) + _ebml_element(MKV_ID_SEEKPOSITION, new_tags_rel.to_bytes(8, 'big')))
+        secondary = _ebml_element(MKV_ID_SEEKHEAD, seek)
+        filler = old_total - len(secondary)
+        if filler < 0 or filler == 1:
+            return None
+        secondary += _ebml_void(filler) if filler else b''
+        if primary is not None and primary[1][1] != len(_ebml_encode_id(MKV_ID_SEEKHEAD)):
+            return None
+    if segment_offset is not None:
+        try:
+            new_segment_size = _ebml_encode_size(segment_size + len(appended), segment_hlen - len(_ebml_encode_id(MKV_ID_SEGMENT)))
+        except ValueError:
+            return None
+
+    # Írás: először az új Tags (a régi még érvényes), utána Segment méret, majd a linkek
+    fh.seek(segment_end)
+    fh.write(appended)
+    if segment_offset is not None:
+        fh.seek(segment_offset + len(_ebml_encode_id(MKV_ID_SEGMENT)))
+        fh.write(new_segment_size)
+    if secondary is None:
+        fh.seek(primary[3])
+        fh.write(new_tags_rel.to_bytes(primary[4], 'big'))
+        fh.seek(tags_off)
+        fh.write(_ebml_void(old_total))
+    else:
+        fh.seek(tags_off)
+        fh.write(secondary)
+        if primary is not None:
+            fh.seek(primary[1][0])
+            fh.write(_ebml_encode_id(MKV_ID_SEEKHEAD))
+    if primary is not None:
+        seekhead_off, seekhead_hlen, seekhead_size = primary[0]
+        _mkv_refresh_crc(fh, seekhead_off, seekhead_hlen, seekhead_size)
+    return 'append'
+
+
+def reserve_matroska_tag_space(video_path, tag_name='Settings', reserve_bytes=MKV_TAG_RESERVE_BYTES, logger=None):
+    """Biztosítja, hogy a Settings tag mögött legyen Void padding a későbbi helyben frissítéshez.
+
+    Kódolás / audio szerkesztés után hívjuk, amíg a fájl még a page cache-ben van:
+    ha a Tags mögött nincs legalább reserve_bytes méretű Void, a Tags elemet egyszer
+    áthelyezzük a fájl végére egy reserve_bytes méretű Void-dal. Így minden későbbi
+    VMAF/PSNR/re-tag művelet az 'inplace' vagy 'void' úton fut (nincs adatmozgatás).
+
+    Returns:
+        bool: True, ha a tartalék rendelkezésre áll (már volt, vagy most létrehoztuk).
+    """
+    journal = None
+    try:
+        with open(os.fspath(video_path), 'r+b') as raw_fh:
+            header = MatroskaHeader.read(video_path, fh=raw_fh)
+            journal = fh = _MkvPatchJournal(raw_fh)
+            location = _mkv_locate_simple_tag(fh, header, tag_name)
+            if location is None or location['string'] is None:
+                return False
+            if any(void_total >= reserve_bytes for _, void_total, _ in location['voids']):
+                return True
+            expected = ProbeResult(video_path, header.to_probe_data()).get_format_tag(tag_name)
+            string_off, _, string_hlen, string_size = location['string']
+            fh.seek(string_off)
+            current = fh.read(string_hlen + string_size)
+            reserved = _mkv_append_tags(fh, header, location, string_off, string_off + len(current), current, reserve_bytes=reserve_bytes)
+            if reserved:
+                fh.flush()
+                os.fsync(fh.fileno())
+    except (OSError, ValueError, EOFError, struct.error) as e:
+        if logger:
+            logger.write(f"⚠ Tag padding foglalás sikertelen: {e}\n")
+            logger.flush()
+        _mkv_restore_patch(video_path, journal, logger)
+        return False
+    finally:
+        PROBE_CACHE.invalidate(video_path)
+    if reserved:
+        check = read_container_header(video_path)
+        if check is None or check.get_format_tag(tag_name) != expected:
+            if logger:
+                logger.write("✗ Tag padding ellenőrzés sikertelen - eredeti bájtok visszaállítva\n")
+                logger.flush()
+            _mkv_restore_patch(video_path, journal, logger)
+            return False
+    if reserved and logger:
+        logger.write(f"✓ Tag padding lefoglalva ({reserve_bytes} bájt): {Path(video_path).name}\n")
+        logger.flush()
+    return bool(reserved)
+
+
+def get_video_info(video_path, probe=None):
+    """Retrieve basic video information using FFprobe.
+    
+    Args:
+        video_path: Path to the video file (Path or str).
+        probe: Optional ProbeResult already obtained for this file.
+        
+    Returns:
+        tuple: (duration, fps) where:
+            - duration: Video duration in seconds (float)
+            - fps: Frame rate (float)
+            Returns (None, None) on error.
+    """
+    try:
+        if probe is None:
+            probe = probe_media(video_path)
+        duration = probe.duration
+        if duration is None:
+            raise ValueError("hiányzó format=duration")
+        fps = probe.fps or 25.0
+        return duration, fps
+    except Exception as e:
+        print(f"✗ FFprobe hiba: {e}")
+        return None, None
+
+def get_video_resolution(video_path, probe=None):
+    """Get video resolution (width, height) using FFprobe.
+    
+    Args:
+        video_path: Path to the video file.
+        probe: Optional ProbeResult already obtained for this file.
+        
+    Returns:
+        tuple: (width, height) or (None, None) on error.
+    """
+    try:
+        if probe is None:
+            probe = probe_media(video_path)
+        return probe.resolution
+    except (ValueError, subprocess.SubprocessError, OSError, AttributeError):
+        return None, None
+
+FRAME_COUNT_CACHE = {}  # path kulcs -> (file_identity, frame_count, method) - csak a drága packet számláláshoz
+FRAME_COUNT_CACHE_LOCK = threading.Lock()
+
+
+def _count_video_packets(video_path, timeout=FRAME_COUNT_PACKET_TIMEOUT):
+    """Videó packetek megszámolása demux-szal (ffprobe -count_packets, nincs dekódolás)."""
+    cmd = [
+        FFPROBE_PATH, '-v', 'error',
+        '-select_streams', 'v:0',
+        '-count_packets',
+        '-show_entries', 'stream=nb_read_packets',
+        '-of', 'csv=p=0',
+        os.fspath(video_path)
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout, startupinfo=get_startup_info())
+    if result.returncode != 0:
+        return None
+    try:
+        count = int(result.stdout.strip().splitlines()[0].strip().rstrip(','))
+    except (ValueError, IndexError):
+        return None
+    return count if count > 0 else None
+
+
+def count_video_frames(video_path, probe=None, exact=True):
+    """Frame szám lekérdezése szintenként, dekódolás nélkül.
+
+    Szintek:
+        1. 'tag':       NUMBER_OF_FRAMES statisztika tag (mkvmerge), ha nem elavult
+        2. 'container': nb_frames a konténerből (MP4 stts, ffprobe)
+        3. 'packets':   ffprobe -count_packets (csak demux, I/O-kötött) - csak exact=True esetén,
+                        az eredményt fájl identitás szerint cache-eljük
+        4. 'estimate':  duration × fps becslés (utolsó lehetőség)
+
+    Args:
+        video_path: Path to the video file.
+        probe: Optional ProbeResult already obtained for this file.
+        exact: Ha True, a becslés előtt packet számlálással pontos értéket ad.
+
+    Returns:
+        tuple: (frame_count, method) vagy (None, None).
+    """
+    video_path = Path(video_path)
+    if not video_path.exists():
+        return None, None
+
+    try:
+        if probe is None:
+            probe = probe_media_header(video_path)
+    except (ValueError, subprocess.SubprocessError, OSError, AttributeError):
+        probe = None
+
+    if probe is not None:
+        if probe.statistics_frame_count:
+            return probe.statistics_frame_count, 'tag'
+        if probe.nb_frames:
+            return probe.nb_frames, 'container'
+
+    if exact:
+        key = ProbeCache.path_key(video_path)
+        identity = ProbeCache.file_identity(video_path)
+        with FRAME_COUNT_CACHE_LOCK:
+            cached = FRAME_COUNT_CACHE.get(key)
+        if cached is not None and identity is not None and cached[0] == identity:
+            return cached[1], cached[2]
+        try:
+            packets = _count_video_packets(video_path)
+        except (subprocess.SubprocessError, OSError):
+            packets = None
+        if packets:
+            if identity is not None:
+                with FRAME_COUNT_CACHE_LOCK:
+                    FRAME_COUNT_CACHE[key] = (identity, packets, 'packets')
+            return packets, 'packets'
+
+    if probe is not None:
+        duration, fps = get_video_info(video_path, probe=probe)
+        if duration and fps:
+            try:
+                return int(duration * fps), 'estimate'
+            except (ValueError, TypeError):
+                pass
+    return None, None
+
+
+def get_video_frame_count(video_path, probe=None, exact=False):
+    """Get video frame count without decoding.
+    
+    Args:
+        video_path: Path to the video file.
+        probe: Optional ProbeResult already obtained for this file.
+        exact: Count packets (demux only) when the container has no frame count,
+            instead of estimating from duration × fps.
+        
+    Returns:
+        int: Frame count or None on error.
+    """
+    return count_video_frames(video_path, probe=probe, exact=exact)[0]
+
+def parse_settings_metadata(settings_str):
+    """A Settings tag feldolgozása.
+
+    Args:
+        settings_str: A Settings format tag értéke (lehet üres vagy None).
+
+    Returns:
+        tuple: (cq_crf, vmaf, psnr, encoder_type) - a hiányzó mezők None értékűek.
+    """
+    cq_crf = None
+    vmaf = None
+    psnr = None
+    encoder_type = None
+    if not settings_str:
+        return cq_crf, vmaf, psnr, encoder_type
+
+    # Encoder típus kinyerése (NVENC vagy SVT-AV1)
+    # Először NVENC-et keresünk (mert lehet, hogy mindkettő benne van)
+    if 'NVENC' in settings_str.upper() or 'CQ:' in settings_str:
+        encoder_type = 'nvenc'
+    elif 'SVT-AV1' in settings_str.upper() or 'SVT' in settings_str.upper() or 'CRF:' in settings_str:
+        encoder_type = 'svt-av1'
+
+    # CQ/CRF érték kinyerése
+    cq_match = re.search(r'CQ:(\d+)', settings_str)
+    crf_match = re.search(r'CRF:(\d+)', settings_str)
+    if cq_match:
+        cq_crf = int(cq_match.group(1))
+    elif crf_match:
+        cq_crf = int(crf_match.group(1))
+
+    # VMAF érték kinyerése (Actual VMAF vagy Planned VMAF; a "Predicted VMAF: ≈" becslés nem VMAF érték)
+    vmaf_match = re.search(r'(?:Actual|Planned)\s+VMAF:\s*([\d.]+)', settings_str)
+    if vmaf_match:
+        vmaf = float(vmaf_match.group(1))
+
+    # PSNR érték kinyerése
+    psnr_match = re.search(r'PSNR:\s*([\d.]+)', settings_str)
+    if psnr_match:
+        psnr = float(psnr_match.group(1))
+
+    return cq_crf, vmaf, psnr, encoder_type
+
+
+def get_output_file_info(output_path, probe=None, stat_info=None):
+    """Get information about the output file using FFprobe.
+    
+    Args:
+        output_path: Path to the output file.
+        probe: Optional ProbeResult already obtained for this file.
+        stat_info: Optional {'size', 'mtime'} dict from batch_scan_directory();
+            when given, the file is not stat()-ed again.
+        
+    Returns:
+        tuple: (cq_crf, vmaf, psnr, frame_count, file_size, modified_date, encoder_type, should_delete, duration_seconds)
+        
+        Returns (None, None, None, None, None, None, None, False, None) if the file does not exist or an error occurs.
+    """
+    if not output_path or (stat_info is None and not output_path.exists()):
+        return None, None, None, None, None, None, None, False, None
+
+    duration_seconds = None
+    try:
+        # Natív fejléc olvasás (vagy probe cache / egyetlen ffprobe): duration, fps, Settings tag, nb_frames
+        if probe is None:
+            probe = probe_media_header(output_path.absolute())
+        duration_seconds = probe.duration
+
+        # Settings metaadat (CQ/CRF, VMAF, PSNR, encoder)
+        cq_crf, vmaf, psnr, encoder_type = parse_settings_metadata(probe.settings)
+        
+        # Frame szám: statisztika tag vagy nb_frames, ha nincs (MKV), akkor duration és fps alapján
+        frame_count = probe.statistics_frame_count or probe.nb_frames
+        if frame_count is None and duration_seconds:
+            try:
+                frame_count = int(duration_seconds * (probe.fps or 25.0))
+            except (ValueError, TypeError):
+                frame_count = None
+        
+        # Fájlméret és utolsó módosítási dátum (egyetlen stat hívás, vagy a könyvtár scan eredménye)
+        if stat_info is None:
+            try:
+                output_stat = output_path.stat()
+            except (OSError, PermissionError):
+                return None, None, None, None, None, None, None, False, duration_seconds
+            stat_info = {'size': output_stat.st_size, 'mtime': output_stat.st_mtime}
+        file_size = stat_info['size']
+        modified_date = datetime.fromtimestamp(stat_info['mtime']).strftime('%Y-%m-%d %H:%M:%S')
+
+        return cq_crf, vmaf, psnr, frame_count, file_size, modified_date, encoder_type, False, duration_seconds
+
+    except Exception as e:
+        print(f"✗ Célfájl FFprobe hiba ({output_path.name}): {e}")
+        return None, None, None, None, None, None, None, False, duration_seconds
+
+
+def get_output_files_info_batch(output_stats, scheduler=None, max_workers=PROBE_POOL_MAX_WORKERS, progress_callback=None):
+    """Több kimeneti fájl metaadatainak kinyerése egyetlen menetben.
+
+    Fájlonként egyetlen fejléc olvasás (probe_media_header) adja a Settings tag-et
+    (CQ/CRF, VMAF, PSNR, encoder), a frame számot és a duration-t; a méret és a
+    dátum a könyvtár scan eredményéből jön, így nincs külön stat() sem.
+    A párhuzamosságot eszközönként a ProbeScheduler szabja meg.
+
+    Args:
+        output_stats: {Path: {'size': int, 'mtime': float}} (batch_scan_directory formátum).
+        scheduler: Optional ProbeScheduler (a betöltés a tanult korlátokat újrahasznosítja).
+        max_workers: A thread pool felső korlátja.
+        progress_callback: Optional callable(done, total).
+
+    Returns:
+        dict: {ProbeCache.path_key(path): get_output_file_info() tuple}.
+    """
+    results = {}
+    if not output_stats:
+        return results
+    if scheduler is None:
+        scheduler = ProbeScheduler()
+    paths = list(output_stats)
+    total = len(paths)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, total))) as executor:
+        future_to_path = scheduler.submit_all(
+            executor, paths,
+            lambda path: get_output_file_info(path, stat_info=output_stats[path]))
+        for done, future in enumerate(as_completed(future_to_path), 1):
+            path = future_to_path[future]
+            try:
+                results[ProbeCache.path_key(path)] = future.result()
+            except Exception as e:
+                print(f"✗ Célfájl metaadat hiba ({path.name}): {e}")
+            if progress_callback:
+                progress_callback(done, total)
+    return results
+
+
+def frames_significantly_different(source_frames, output_frames):
+    """Eldönti, hogy a kimeneti frame szám jelentősen eltér-e a forrástól."""
+    if source_frames is None or output_frames is None:
+        return False
+    allowed_diff = max(FRAME_MISMATCH_MIN_DIFF, int(source_frames * FRAME_MISMATCH_RATIO))
+    return abs(source_frames - output_frames) > allowed_diff
+
+def normalize_audio_lang(lang_string):
+    """Normalizálja a hangsáv nyelv kódját az összehasonlításhoz"""
+    if not lang_string:
+        return 'unknown'
+    lang_clean = lang_string.strip().lower()
+    # Ha van kötőjel, csak az első részt vesszük (pl. "hun-HUN" -> "hun")
+    if '-' in lang_clean:
+        lang_clean = lang_clean.split('-')[0]
+    
+    # Ha már 2 karakteres kód, ellenőrizzük, hogy van-e a LANGUAGE_MAP-ban
+    if len(lang_clean) == 2:
+        if lang_clean in LANGUAGE_MAP:
+            return lang_clean
+        return lang_clean
+    
+    # Ha 3 karakteres vagy hosszabb, keresünk fordított mapping-et a LANGUAGE_MAP-ban
+    # LANGUAGE_MAP formátum: 'hu': 'hun', 'en': 'eng', stb.
+    # Keresünk olyan kulcsot, ahol az érték megegyezik a lang_clean-nel
+    for key, value in LANGUAGE_MAP.items():
+        if value == lang_clean:
+            # Ha a kulcs 2 karakteres, azt adjuk vissza
+            if len(key) == 2:
+                return key
+            # Ha a kulcs 3 karakteres, az első 2 karaktert adjuk vissza
+            if len(key) == 3:
+                return key[:2]
+        # Ha a kulcs megegyezik a lang_clean-nel és 2 karakteres
+        if key == lang_clean and len(key) == 2:
+            return key
+    
+    # Ha 3 karakteres nyelv kód (pl. "hun", "eng"), akkor az első 2 karaktert használjuk
+    if len(lang_clean) == 3:
+        return lang_clean[:2]
+    
+    return lang_clean
+
+def get_audio_streams_info(video_path, probe=None):
+    """Analyze audio streams in the video.
+    
+    Identifies the default language and counts 5.1 and 2.0 streams per language.
+    
+    Args:
+        video_path: Path to the video file.
+        probe: Optional ProbeResult already obtained for this file.
+        
+    Returns:
+        tuple: (default_lang, lang_51_count, lang_20_count)
+    """
+    """Visszaadja a hangsávok információit: default nyelv, 5.1 és 2.0 hangsávok száma nyelv szerint"""
+    try:
+        # Összes hangsáv információ (disposition is kell a default hangsávhoz) - közös probe_media eredményből
+        if probe is None:
+            probe = probe_media(video_path)
+        audio_streams = probe.audio_streams
+        
+        if len(audio_streams) == 0:
+            return None, {}, {}
+        
+        default_lang = None
+        lang_51_count = {}  # Normalizált nyelv -> 5.1 hangsávok száma
+        lang_20_count = {}  # Normalizált nyelv -> 2.0 hangsávok száma
+        all_streams = []  # Összes hangsáv információ tárolása
+        
+        # Első körben összegyűjtjük az összes hangsáv információt
+        for stream in audio_streams:
+            channels = stream.get('channels', 0)
+            lang = ProbeResult.get_stream_tag(stream, 'language') or ProbeResult.get_stream_tag(stream, 'lang') or ''
+            disposition = stream.get('disposition', {})
+            # A disposition objektum tartalmazza a 'default' mezőt (0 vagy 1)
+            is_default = disposition.get('default', 0) == 1 if isinstance(disposition, dict) else False
+            
+            lang_normalized = normalize_audio_lang(lang) if lang else 'unknown'
+            
+            all_streams.append({
+                'lang': lang_normalized,
+                'channels': channels,
+                'is_default': is_default
+            })
+            
+            # 5.1 hangsávok számlálása nyelv szerint (6 csatorna)
+            if channels == 6:
+                lang_51_count[lang_normalized] = lang_51_count.get(lang_normalized, 0) + 1
+            # 2.0 hangsávok számlálása nyelv szerint (2 csatorna)
+            elif channels == 2:
+                lang_20_count[lang_normalized] = lang_20_count.get(lang_normalized, 0) + 1
+        
+        # Alapértelmezett nyelv meghatározása prioritás szerint:
+        # 1. Explicit default hangsáv (disposition:default=1)
+        for stream_info in all_streams:
+            if stream_info['is_default']:
+                default_lang = stream_info['lang']
+                break
+        
+        # 2. Ha nincs explicit default, az applikáció nyelvének megfelelő hangsáv
+        if default_lang is None or default_lang == 'unknown':
+            app_lang = CURRENT_LANGUAGE  # 'hu' vagy 'en'
+            # Keresünk olyan hangsávot, amelynek a normalizált nyelve megegyezik az applikáció nyelvével
+            for stream_info in all_streams:
+                if stream_info['lang'] == app_lang:
+                    default_lang = stream_info['lang']
+                    break
+        
+        # 3. Ha még mindig nincs, az első hangsávot használjuk
+        if default_lang is None or default_lang == 'unknown':
+            if len(all_streams) > 0:
+                default_lang = all_streams[0]['lang']
+            else:
+                default_lang = 'unknown'
+        
+        return default_lang, lang_51_count, lang_20_count
+    except Exception as e:
+        print(f"✗ FFprobe hangsáv info hiba: {e}")
+        return None, {}, {}
+
+def get_audio_stream_details(video_path, probe=None):
+    """Részletes hangsáv-információk (menühöz, eltávolításhoz)."""
+    try:
+        # Stream és format információk a közös probe_media eredményből
+        if probe is None:
+            probe = probe_media(video_path)
+        duration = probe.duration or 0
+        
+        details = []
+        audio_index = 0
+        for stream in probe.audio_streams:
+            codec = (stream.get('codec_name') or '').upper() or 'UNKNOWN'
+            channels = stream.get('channels', 0)
+            channel_layout = stream.get('channel_layout') or ''
+            language = ProbeResult.get_stream_tag(stream, 'language') or ProbeResult.get_stream_tag(stream, 'lang') or 'unknown'
+            title = ProbeResult.get_stream_tag(stream, 'title') or ''
+            lang_normalized = normalize_audio_lang(language)
+            display_lang = language or lang_normalized or 'unknown'
+            
+            # Hangsáv méret számítása bitrate és hossz alapján
+            bit_rate = stream.get('bit_rate')
+            audio_size_mb = None
+            if bit_rate and duration:
+                try:
+                    bit_rate_int = int(bit_rate)
+                    # bit_rate bps-ben van, duration másodpercben
+                    audio_size_bytes = (bit_rate_int * duration) / 8
+                    audio_size_mb = audio_size_bytes / (1024 * 1024)
+                except (ValueError, TypeError):
+                    pass
+            
+            if channels == 6:
+                channel_label = '5.1'
+            elif channels == 2:
+                channel_label = '2.0'
+            elif channels and isinstance(channels, int):
+                channel_label = f'{channels} ch'
+            elif channel_layout:
+                channel_label = channel_layout
+            else:
+                channel_label = '?'
+            description_parts = [display_lang.upper(), channel_label, codec]
+            description = ' | '.join(part for part in description_parts if part)
+            if title:
+                description = f"{description} - {title}"
+            if audio_size_mb is not None:
+                # Lokalizált formátum: magyar = tizedesvessző, angol = tizedespont
+                size_str = format_localized_number(audio_size_mb, decimals=2)
+                description = f"{description} ({size_str} MB)"
+            details.append({
+                'ffmpeg_audio_index': audio_index,
+                'language': display_lang,
+                'language_normalized': lang_normalized,
+                'channels': channels,
+                'channel_layout': channel_layout,
+                'codec': codec,
+                'title': title,
+                'description': description,
+                'size_mb': audio_size_mb
+            })
+            audio_index += 1
+        return details
+    except Exception as e:
+        print(f"✗ Audio stream info hiba: {e}")
+        return []
+
+def get_51_audio_stream_index(video_path, default_lang, probe=None):
+    """Find the first 5.1 audio stream matching the default language.
+    
+    Args:
+        video_path: Path to the video file.
+        default_lang: Normalized language code to match.
+        probe: Optional ProbeResult already obtained for this file.
+        
+    Returns:
+        int: Audio-relative stream index (a:N) or None if not found.
+    """
+    try:
+        if probe is None:
+            probe = probe_media(video_path)
+        audio_streams = probe.audio_streams
+        
+        if len(audio_streams) == 0:
+            return None
+        
+        # Hangsávok sorrendjében számoljuk (0, 1, 2, ...)
+        audio_stream_index = 0
+        for stream in audio_streams:
+            channels = stream.get('channels', 0)
+            lang = ProbeResult.get_stream_tag(stream, 'language') or ProbeResult.get_stream_tag(stream, 'lang') or ''
+            
+            # Normalizáljuk a nyelv kódot az összehasonlításhoz
+            lang_normalized = normalize_audio_lang(lang)
+            
+            # Ha 5.1 hangsáv (6 csatorna) és ugyanaz a normalizált nyelv, mint az alapértelmezett
+            if channels == 6 and lang_normalized == default_lang:
+                return audio_stream_index
+            
+            # Következő hangsáv index
+            audio_stream_index += 1
+        
+        return None
+    except Exception as e:
+        print(f"✗ 5.1 hangsáv index keresés hiba: {e}")
+        return None
+
+def check_audio_compression_needed(video_path, probe=None):
+    """Check if audio dynamic range compression is needed.
+    
+    Args:
+        video_path: Path to the video file.
+        probe: Optional ProbeResult already obtained for this file.
+        
+    Returns:
+        bool: True if compression is recommended.
+    """
+    try:
+        default_lang, lang_51_count, lang_20_count = get_audio_streams_info(video_path, probe=probe)
+        
+        if default_lang is None:
+            return False
+        
+        # Ha az alapértelmezett nyelvhez nincs 5.1 hangsáv, nem kell kompresszió
+        if lang_51_count.get(default_lang, 0) == 0:
+            return False
+        
+        # Ha az alapértelmezett nyelvhez van 2.0 hangsáv, nem kell kompresszió
+        if lang_20_count.get(default_lang, 0) > 0:
+            return False
+        
+        # Ha az alapértelmezett nyelvhez van 5.1 hangsáv és nincs 2.0, akkor kell kompresszió
+        return True
+    except Exception as e:
+        print(f"✗ Hangdinamika kompresszió ellenőrzés hiba: {e}")
+        return False
+
+def build_audio_conversion_filter(method='fast'):
+    """Build FFmpeg filter chain for 5.1 to 2.0 audio conversion.
+    
+    Args:
+        method: 'fast' (simple mix) or 'high_quality' (compand/normalization).
+        
+    Returns:
+        str: FFmpeg filter string.
+    """
+    method_key = (method or 'fast').lower()
+    if method_key == 'dialogue':
+        return 'pan=stereo|FL<FL+0.5*FC+BL+0.6*SL|FR<FR+0.5*FC+BR+0.6*SR,dynaudnorm=f=250:g=8:m=7.0,alimiter=limit=0.98:level=disabled'
+    return 'pan=stereo|FL<FL+0.5*FC+BL+0.6*SL|FR<FR+0.5*FC+BR+0.6*SR,acompressor=threshold=-18dB:ratio=4:attack=10:release=200:makeup=6:knee=2,alimiter=limit=0.9:level=disabled'
+
+def get_audio_conversion_title(method):
+    """Metaadat cím generálása a kiválasztott konverziós módszerhez."""
+    method_key = (method or 'fast').lower()
+    if method_key == 'dialogue':
+        return t('audio_convert_title_dialogue')
+    return t('audio_convert_title_fast')
+
+class AudioPlan:
+    """Egy kódolási feladat hangsáv terve - feladatonként EGYSZER számoljuk, minden CQ/CRF
+    próbálkozás ugyanazt kapja (nincs ismételt hangsáv elemzés).
+
+    Megváltoztathatatlan: létrehozás után az attribútumok nem írhatók.
+
+    Attributes:
+        compression_enabled: A hangdinamika kompresszió be van-e kapcsolva.
+        method: 'fast' vagy 'dialogue'.
+        default_lang: Alapértelmezett (normalizált) hangsáv nyelv, vagy None.
+        lang_51_count / lang_20_count: Nyelv -> 5.1 / 2.0 hangsávok száma.
+        audio_stream_count: Eredeti hangsávok száma.
+        source_51_index: A kompresszálandó 5.1 hangsáv a:N indexe, vagy None.
+        target_language: A hozzáadott 2.0 hangsáv nyelv tag-je (3 betűs).
+        filter_graph: -filter_complex érték ('[0:a:N]...[acompressed]'), vagy None.
+        title: A hozzáadott hangsáv címe.
+    """
+
+    __slots__ = ('compression_enabled', 'method', 'default_lang', 'lang_51_count', 'lang_20_count',
+                 'audio_stream_count', 'compression_needed', 'source_51_index', 'target_language',
+                 'filter_graph', 'title')
+
+    def __init__(self, compression_enabled=False, method='fast', default_lang=None, lang_51_count=None,
+                 lang_20_count=None, audio_stream_count=0, compression_needed=False, source_51_index=None,
+                 target_language=None, filter_graph=None, title=None):
+        values = {
+            'compression_enabled': compression_enabled, 'method': method, 'default_lang': default_lang,
+            'lang_51_count': dict(lang_51_count or {}), 'lang_20_count': dict(lang_20_count or {}),
+            'audio_stream_count': audio_stream_count, 'compression_needed': compression_needed,
+            'source_51_index': source_51_index, 'target_language': target_language,
+            'filter_graph': filter_graph, 'title': title,
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("AudioPlan nem módosítható")
+
+    @property
+    def use_compression(self):
+        return self.filter_graph is not None and self.source_51_index is not None
+
+    @staticmethod
+    def normalize_method(method):
+        """A combobox (fordított) értékét 'fast' / 'dialogue' kulcsra alakítja."""
+        if method == t('audio_compression_dialogue'):
+            return 'dialogue'
+        if method == t('audio_compression_fast'):
+            return 'fast'
+        return method or 'fast'
+
+    @classmethod
+    def build(cls, video_path, probe=None, compression_enabled=False, method='fast'):
+        """Terv készítése. Kikapcsolt kompresszió esetén nincs hangsáv elemzés (és probe sem)."""
+        method = cls.normalize_method(method)
+        if not compression_enabled:
+            return cls(compression_enabled=False, method=method)
+        if probe is None:
+            try:
+                probe = probe_media(video_path)
+            except (ValueError, subprocess.SubprocessError, OSError):
+                probe = ProbeResult(video_path, {})
+
+        default_lang, lang_51_count, lang_20_count = get_audio_streams_info(video_path, probe=probe)
+        audio_stream_count = len(probe.audio_streams)
+        if audio_stream_count == 0 and not probe.streams:
+            # Ha a probe nem sikerült, feltételezzük, hogy 1 hangsáv van
+            audio_stream_count = 1
+        compression_needed = check_audio_compression_needed(video_path, probe=probe)
+
+        source_51_index = None
+        target_language = None
+        filter_graph = None
+        if compression_needed and default_lang:
+            source_51_index = get_51_audio_stream_index(video_path, default_lang, probe=probe)
+        if source_51_index is not None:
+            try:
+                lang_raw = (ProbeResult.get_stream_tag(probe.audio_streams[source_51_index], 'language') or '').strip()
+                if lang_raw:
+                    # Normalizáljuk a nyelv kódot (3 betűs -> 2 betűs, ha szükséges)
+                    target_language = normalize_audio_lang(lang_raw)
+                    # Ha 2 betűs, akkor a LANGUAGE_MAP-ból kérjük a 3 betűs verziót
+                    if len(target_language) == 2 and target_language in LANGUAGE_MAP:
+                        target_language = LANGUAGE_MAP[target_language]
+                    else:
+                        target_language = lang_raw if len(lang_raw) == 3 else target_language
+            except (ValueError, TypeError, AttributeError, KeyError, IndexError):
+                # Ha nem sikerül, az alapértelmezett nyelvet használjuk
+                target_language = LANGUAGE_MAP.get(default_lang, default_lang)
+            filter_graph = f'[0:a:{source_51_index}]{build_audio_conversion_filter(method)}[acompressed]'
+
+        return cls(
+            compression_enabled=True, method=method, default_lang=default_lang,
+            lang_51_count=lang_51_count, lang_20_count=lang_20_count,
+            audio_stream_count=audio_stream_count, compression_needed=compression_needed,
+            source_51_index=source_51_index, target_language=target_language,
+            filter_graph=filter_graph, title=get_audio_conversion_title(method),
+        )
+
+
+def find_vdub2_path():
+    """Find VirtualDub2 executable in PATH or common locations.
+    
+    Returns:
+        Path: Path to vdub2.exe/vdub64.exe or None.
+    """
+    """VirtualDub2 elérési út meghatározása felhasználói beállítás vagy automatikus keresés alapján."""
+    if VDUB2_PATH:
+        vdub_path = VDUB2_PATH if isinstance(VDUB2_PATH, Path) else Path(VDUB2_PATH)
+        if vdub_path.exists():
+            return vdub_path
+    
+    detected = find_virtualdub()
+    if detected:
+        detected_path = Path(detected)
+        if detected_path.exists():
+            return detected_path
+    
+    possible_paths = [
+        Path("vdub2.exe"),
+        Path("vdub64.exe"),
+        Path("C:/VirtualDub2_v2.4/vdub2.exe"),
+        Path("D:/VirtualDub2_v2.4/vdub2.exe"),
+        Path("C:/VirtualDub2/vdub2.exe"),
+        Path("D:/VirtualDub2/vdub2.exe"),
+        Path("C:/Program Files/VirtualDub2/vdub2.exe"),
+        Path("C:/Program Files (x86)/VirtualDub2/vdub2.exe"),
+    ]
+    for path in possible_paths:
+        if path.exists():
+            return path
+    
+    vdub2_path = shutil.which("vdub2.exe") or shutil.which("vdub64.exe")
+    if vdub2_path:
+        return Path(vdub2_path)
+    
+    return None
+
+def extract_frames_with_vdub2(video_path, output_dir, num_frames=5, stop_event=None, use_percentage_positions=False):
+    """Export sample frames from video using VirtualDub2.
+    
+    Args:
+        video_path: Path to the video file.
+        output_dir: Directory to save frames.
+        num_frames: Number of frames to export (if use_percentage_positions is False).
+        stop_event: Event to stop the process.
+        use_percentage_positions: If True, exports frames at 30%, 50%, 70%, and end.
+        
+    Returns:
+        list: List of paths to extracted frames.
+    """
+    vdub2_path = find_vdub2_path()
+    if not vdub2_path:
+        print("  ⚠ VirtualDub2 nem található")
+        return []
+    
+    duration, _ = get_video_info(video_path)
+    if not duration or duration < 1:
+        print("  ⚠ Nem sikerült a videó hosszát meghatározni")
+        return []
+    
+    if use_percentage_positions:
+        # 30%, 50%, 70% és vége (4db frame)
+        frame_times = [
+            duration * 0.30,  # 30%
+            duration * 0.50,  # 50%
+            duration * 0.70,  # 70%
+            duration - 0.1    # Vége (0.1 másodperccel a vég előtt, hogy biztosan legyen frame)
+        ]
+        print(f"  📹 VirtualDub2 frame export: 4 képkocka (30%, 50%, 70%, vége)")
+    else:
+        # Régi módszer: random pozíciók
+        frame_times = sorted([random.uniform(0, duration) for _ in range(num_frames)])
+        print(f"  📹 VirtualDub2 frame export: {num_frames} képkocka")
+    
+    duration_str = format_localized_number(duration, decimals=1)
+    print(f"  Videó hossza: {duration_str}s")
+    print(f"  VirtualDub2: {vdub2_path}")
+    
+    if stop_event is None:
+        stop_event = STOP_EVENT
+
+    source_frame_count = None
+    encoded_frame_count = None
+    frame_count_warning = False
+    last_frame_ok = True
+
+    if stop_event.is_set():
+        raise EncodingStopped()
+
+    extracted_frames = []
+    
+    for i, t in enumerate(frame_times, start=1):
+        if stop_event.is_set():
+            raise EncodingStopped()
+        frame_filename = "frame0000.png"
+        frame_path = output_dir / frame_filename
+        
+        time_str = format_localized_number(t, decimals=2)
+        print(f"    Frame #{i} @ {time_str}s...")
+        
+        # VirtualDub2 script létrehozása
+        script_path = output_dir / f"script_{i}.vdscript"
+        frame_index = int(t * 25)  # 25 fps feltételezése
+        
+        # Útvonalak dupla backslash-sel (Windows formátum)
+        video_path_str = str(video_path.absolute()).replace("\\", "\\\\")
+        output_dir_str = str(output_dir.absolute()).replace("\\", "\\\\")
+        
+        script_content = f"""VirtualDub.Open("{video_path_str}");
+VirtualDub.subset.Clear();
+VirtualDub.subset.AddRange({frame_index}, 1);
+VirtualDub.SaveImageSequence("{output_dir_str}\\\\frame", ".png", 4, 3);
+VirtualDub.Close();
+"""
+        
+        try:
+            if stop_event.is_set():
+                raise EncodingStopped()
+            with open(script_path, 'w', encoding='utf-8') as f:
                 f.write(script_content)
         except (OSError, PermissionError, IOError) as e:
             print(f"      ✗ Script írási hiba: {e}")
             continue
         
-        # Script tartalmának kiírása konzolra
-        print(f"\n{'='*80}")
-        print("VDUB2 SCRIPT TARTALOM:")
-        print(f"{'='*80}")
-        print(script_content)
-        print(f"{'='*80}\n")
+        # Script tartalmának kiírása konzolra
+        print(f"\n{'='*80}")
+        print("VDUB2 SCRIPT TARTALOM:")
+        print(f"{'='*80}")
+        print(script_content)
+        print(f"{'='*80}\n")
+        
+        cmd = [
+            os.fspath(vdub2_path),
+            "/s", os.fspath(script_path),
+            "/x"
+        ]
+        
+        print(f"\n{'='*80}")
+        print("VDUB2 PARANCS:")
+        print(f"{'='*80}")
+        print(" ".join(cmd))
+        print(f"{'='*80}\n")
+        
+        try:
+            if stop_event.is_set():
+                raise EncodingStopped()
+            
+            full_output = []
+            # Context manager használata a process kezeléshez
+            with managed_subprocess(cmd, cwd=output_dir, stop_event=stop_event, timeout=180) as process:
+                try:
+                    for line in process.stdout:
+                        if stop_event and stop_event.is_set():
+                            raise EncodingStopped()
+                        print(line.rstrip())
+                        full_output.append(line)
+                except EncodingStopped:
+                    raise
+                except (OSError, IOError, BrokenPipeError, UnicodeDecodeError) as e:
+                    print(f"VirtualDub2 output olvasás hiba: {e}")
+                
+                # Várakozás a process befejezésére
+                try:
+                    process.wait(timeout=180)
+                except subprocess.TimeoutExpired:
+                    # A context manager finally blokkja kezeli a cleanup-ot
+                    raise
+            
+            full_output_text = ''.join(full_output)
+            
+            if stop_event.is_set():
+                raise EncodingStopped()
+            
+            print(f"\n{'='*80}")
+            print(f"VDUB2 BEFEJEZVE - Return code: {process.returncode}")
+            print(f"{'='*80}\n")
+            
+            # "unexpected end of stream" detektálása
+            if "unexpected end of stream" in full_output_text.lower():
+                print(f"      ✗ 'unexpected end of stream' - videó lejátszható-e?")
+                return None  # Speciális jelzés az újrakódoláshoz
+            
+            # Frame keresése és átnevezése
+            if frame_path.exists():
+                # Átnevezés egyedi névre
+                final_frame_path = output_dir / f"frame_{i:04d}.png"
+                frame_path.rename(final_frame_path)
+                extracted_frames.append(final_frame_path)
+                print(f"      ✓ Frame mentve: {final_frame_path.name}")
+            else:
+                print(f"      ✗ Nem készült frame")
+                
+        except EncodingStopped:
+            raise
+        except subprocess.TimeoutExpired:
+            print(f"      ✗ Timeout")
+        except (OSError, subprocess.SubprocessError, ValueError, AttributeError) as e:
+            print(f"      ✗ Hiba: {e}")
+        except Exception as e:
+            # Váratlan hibák esetén is logoljuk, de ne akadjon el
+            print(f"      ✗ Váratlan hiba: {type(e).__name__}: {e}")
+        finally:
+            # Script törlése
+            try:
+                script_path.unlink()
+            except (OSError, PermissionError, FileNotFoundError):
+                pass
+    
+    print(f"  Összesen {len(extracted_frames)}/{num_frames} frame exportálva")
+    
+    debug_pause(
+        f"VirtualDub2 frame export kész: {len(extracted_frames)} frame",
+        "Frame tartalom ellenőrzés (fekete/üres detektálás)",
+        f"Frame-ek: {output_dir}"
+    )
+    
+    return extracted_frames
+
+def is_frame_black_or_empty(frame_path, max_mean_brightness=MAX_MEAN_BRIGHTNESS, min_std_dev=MIN_STD_DEV):
+    try:
+        with Image.open(frame_path) as img:
+            img_array = np.array(img)
+            
+            file_size = frame_path.stat().st_size
+            # KISEBB JAVÍTÁS #16: Konstans használata
+            if file_size < MIN_FRAME_FILE_SIZE:
+                print(f"      ⚠ Túl kicsi: {file_size} byte")
+                return True
+            
+            if len(img_array.shape) == 3:
+                img_gray = np.dot(img_array[...,:3], [0.299, 0.587, 0.114])
+            else:
+                img_gray = img_array
+            
+            mean_brightness = np.mean(img_gray)
+            std_dev = np.std(img_gray)
+            
+            brightness_str = format_localized_number(mean_brightness, decimals=1)
+            stddev_str = format_localized_number(std_dev, decimals=1)
+            print(f"      Fényerő: {brightness_str}, Szórás: {stddev_str}")
+            
+            is_black = mean_brightness < max_mean_brightness and std_dev < min_std_dev
+            
+            if is_black:
+                print(f"      ✗ Fekete/üres")
+                return True
+            else:
+                print(f"      ✓ Valódi tartalom")
+                return False
+    except Exception as e:
+        print(f"      ✗ Hiba: {e}")
+        return True
+
+def _write_vdub_script(script_path, video_path, start_frame, frame_count, output_prefix):
+    video_path_str = str(video_path.absolute()).replace("\\", "\\\\")
+    output_prefix_str = str(output_prefix).replace("\\", "\\\\")
+    script_content = (
+        f'VirtualDub.Open("{video_path_str}");\n'
+        "VirtualDub.subset.Clear();\n"
+        f"VirtualDub.subset.AddRange({start_frame}, {frame_count});\n"
+        f'VirtualDub.SaveImageSequence("{output_prefix_str}", ".png", 4, 3);\n'
+        "VirtualDub.Close();\n"
+    )
+    script_path.write_text(script_content, encoding='utf-8')
+
+def export_specific_frame_with_vdub2(video_path, frame_index, output_path, stop_event=None):
+    """Exportál egy konkrét frame-et VirtualDub2 segítségével."""
+    vdub2_path = find_vdub2_path()
+    if not vdub2_path:
+        print("    ✗ VirtualDub2 nem található az utolsó frame exporthoz")
+        return False
+
+    if frame_index is None or frame_index < 0:
+        print("    ✗ Érvénytelen frame index VirtualDub2 exporthoz")
+        return False
+
+    temp_dir = Path(tempfile.mkdtemp())
+    try:
+        if stop_event is not None and stop_event.is_set():
+            raise EncodingStopped()
+
+        script_path = temp_dir / "single_frame.vdscript"
+        output_prefix = temp_dir / "frame_last"
+        _write_vdub_script(script_path, video_path, frame_index, 1, output_prefix)
+
+        # Script tartalmának ellenőrzése (debug)
+        try:
+            script_content = script_path.read_text(encoding='utf-8')
+            print(f"    VirtualDub2 utolsó frame export ({frame_index}. frame)...")
+            print(f"      Script: {script_path}")
+            print(f"      Script tartalom:\n        " + "\n        ".join(script_content.strip().splitlines()))
+        except Exception as e:
+            print(f"    ⚠ Script olvasási hiba: {e}")
+
+        cmd = [
+            os.fspath(vdub2_path),
+            "/s", os.fspath(script_path),
+            "/x"
+        ]
+        print(f"      Parancs: {' '.join(str(part) for part in cmd)}")
+        result = subprocess.run(
+            cmd,
+            capture_output=True,
+            text=True,
+            startupinfo=get_startup_info(),
+            timeout=300
+        )
+        if result.stdout:
+            print("      VDUB2 STDOUT:")
+            print("        " + "\n        ".join(result.stdout.strip().splitlines()))
+        if result.stderr:
+            print("      VDUB2 STDERR:")
+            print("        " + "\n        ".join(result.stderr.strip().splitlines()))
+        if result.returncode != 0:
+            print(f"    ✗ VirtualDub2 hiba ({result.returncode}): {result.stderr.strip() or result.stdout.strip()}")
+            return False
+
+        # VirtualDub2 általában "frame_last0000.png" néven hozza létre (aláhúzás nélkül)
+        generated_frame = temp_dir / "frame_last0000.png"
+        if not generated_frame.exists():
+            # Fallback: próbáljuk a "frame_last_0000.png" nevet is (aláhúzással)
+            generated_frame = temp_dir / "frame_last_0000.png"
+            if not generated_frame.exists():
+                # Keresünk minden PNG fájlt a temp könyvtárban
+                png_files = list(temp_dir.glob("*.png"))
+                if png_files:
+                    # Ha találtunk PNG fájlt, használjuk azt
+                    generated_frame = png_files[0]
+                    print(f"      ⚠ VirtualDub2 más néven hozta létre a fájlt: {generated_frame.name}")
+                else:
+                    # Ha nem találtunk PNG fájlt, kiírjuk a könyvtár tartalmát
+                    try:
+                        contents = os.listdir(temp_dir)
+                        print(f"      ⚠ VirtualDub2 output könyvtár tartalma: {contents}")
+                    except OSError:
+                        pass
+                    print("    ✗ VirtualDub2 nem hozta létre az utolsó frame képet")
+                    return False
+
+        shutil.copy2(generated_frame, output_path)
+        return True
+    except EncodingStopped:
+        raise
+    except Exception as e:
+        print(f"    ✗ VirtualDub2 utolsó frame export hiba: {e}")
+        return False
+    finally:
+        try:
+            shutil.rmtree(temp_dir)
+        except OSError:
+            pass
+
+def export_last_frame_with_vdub2(video_path, output_path, frame_count_hint=None, stop_event=None):
+    """Megpróbálja VirtualDub2-vel kinyerni az utolsó frame-et."""
+    frame_count = frame_count_hint
+    if frame_count is None:
+        try:
+            frame_count = get_video_frame_count(video_path)
+        except Exception:
+            frame_count = None
+
+    if not frame_count or frame_count <= 0:
+        print("    ✗ VirtualDub2: nem sikerült meghatározni a frame számot")
+        return False
+
+    last_frame_index = max(frame_count - 1, 0)
+    return export_specific_frame_with_vdub2(video_path, last_frame_index, output_path, stop_event=stop_event)
+
+def validate_encoded_video_vlc(video_path, encoder='av1_nvenc', stop_event=None, source_path=None):
+    """Validate encoded video using various checks (VLC-like validation).
+    
+    Checks for:
+    - File existence and size
+    - Duration match with source (if provided)
+    - Frame count match (if source provided)
+    - Black/empty frames in sample export
+    - Last frame readability
+    
+    Args:
+        video_path: Path to the encoded video.
+        encoder: Encoder name used.
+        stop_event: Event to stop validation.
+        source_path: Path to source video (optional, for comparison).
+        
+    Returns:
+        bool: True if validation passes, False otherwise.
+    """
+    print(f"\n{'='*60}")
+    print(f"Videó validáció (VirtualDub2 frame): {video_path.name}")
+    print(f"Encoder: {encoder}")
+    print(f"{'='*60}")
+    
+    if stop_event is None:
+        stop_event = STOP_EVENT
+
+    if stop_event.is_set():
+        raise EncodingStopped()
+    
+    # KRITIKUS JAVÍTÁS: Változók inicializálása
+    source_frame_count = None
+    encoded_frame_count = None
+    is_valid = True
+    success_rate = 0.0
+    min_success_rate = 0.4
+    frame_count_warning = False
+    
+    file_size = video_path.stat().st_size
+    file_size_mb = file_size / (1024**2)
+    print(f"\n1. Fájlméret: {format_localized_number(file_size_mb, decimals=2)} MB")
+    
+    # KISEBB JAVÍTÁS #16: Konstans használata
+    if file_size < MIN_FILE_SIZE_BYTES:
+        print("  ✗ Fájl túl kicsi!")
+        return False
+    
+    print("\n2. VirtualDub2 frame export és tartalom ellenőrzés...")
+    
+    temp_dir = Path(tempfile.mkdtemp())
+    try:
+        # 30%, 50%, 70% és vége (4db frame összesen)
+        print(f"   {encoder}: 4 frame teszt (30%, 50%, 70%, vége)")
+        
+        extracted_frames = extract_frames_with_vdub2(video_path, temp_dir, num_frames=4, stop_event=stop_event, use_percentage_positions=True)
+        
+        # "unexpected end of stream" detektálása - speciális jelzés (None)
+        if extracted_frames is None:
+            print("  ✗ VirtualDub2: 'unexpected end of stream' - videó újrakódolásra szorul!")
+            return None  # Speciális érték: újrakódolás szükséges
+        
+        if not extracted_frames:
+            print("  ✗ Nem sikerült frame-eket exportálni!")
+            return False
+        
+        if stop_event.is_set():
+            raise EncodingStopped()
+        
+        print(f"\n3. Frame tartalom ellenőrzés ({len(extracted_frames)} db)...")
+        valid_frames = 0
+        black_frames = 0
+        
+        for frame_path in extracted_frames:
+            if stop_event.is_set():
+                raise EncodingStopped()
+            print(f"    Vizsgálat: {frame_path.name}")
+            is_black = is_frame_black_or_empty(frame_path)
+            
+            if not is_black:
+                valid_frames += 1
+            else:
+                black_frames += 1
+        
+        success_rate = valid_frames / len(extracted_frames)
+        min_success_rate = 0.33 if encoder == 'svt-av1' else 0.4
+        
+        is_valid = success_rate >= min_success_rate
+
+        print(f"\n4. Frame statisztika (forrás/cél)...")
+        if source_path:
+            try:
+                source_path_obj = Path(source_path)
+            except (OSError, ValueError, TypeError):
+                source_path_obj = None
+            if source_path_obj and source_path_obj.exists():
+                try:
+                    source_frame_count, source_count_method = count_video_frames(source_path_obj, exact=True)
+                    if source_frame_count is not None:
+                        print(f"    Forrás frame-ek: {source_frame_count} ({source_count_method})")
+                    else:
+                        print("    Forrás frame-ek: ismeretlen")
+                except Exception as e:
+                    print(f"    ✗ Forrás frame lekérdezés hiba: {e}")
+            else:
+                print("    Forrás frame-ek: forrás fájl nem elérhető")
+        else:
+            print("    Forrás frame-ek: nincs megadva")
+
+        try:
+            encoded_frame_count, encoded_count_method = count_video_frames(video_path, exact=True)
+            if encoded_frame_count is not None:
+                print(f"    Cél frame-ek: {encoded_frame_count} ({encoded_count_method})")
+            else:
+                print("    Cél frame-ek: ismeretlen")
+        except Exception as e:
+            print(f"    ✗ Cél frame lekérdezés hiba: {e}")
+            encoded_frame_count = None
+
+        if source_frame_count and encoded_frame_count:
+            allowed_diff = max(FRAME_MISMATCH_MIN_DIFF, int(source_frame_count * FRAME_MISMATCH_RATIO))
+            diff = encoded_frame_count - source_frame_count
+            if frames_significantly_different(source_frame_count, encoded_frame_count):
+                frame_count_warning = True
+                print(f"    ⚠ Jelentős eltérés a frame számokban (különbség: {diff:+d}, tolerancia: +/-{allowed_diff})")
+            else:
+                print(f"    ✓ Frame eltérés a tolerancián belül (különbség: {diff:+d})")
+
+        print(f"\n5. Utolsó frame ellenőrzés...")
+        last_frame_ok = False
+        last_frame_warning = False
+        last_frame_path = temp_dir / "frame_last.png"
+
+        if last_frame_path.exists():
+            try:
+                last_frame_path.unlink()
+            except OSError:
+                pass
+
+        vdub_success = export_last_frame_with_vdub2(
+            video_path,
+            last_frame_path,
+            frame_count_hint=encoded_frame_count,
+            stop_event=stop_event
+        )
+
+        if vdub_success:
+            try:
+                with Image.open(last_frame_path) as last_img:
+                    last_img.verify()
+                print(f"    ✓ Utolsó frame beolvasható VirtualDub2-vel ({last_frame_path.name})")
+                last_frame_ok = True
+            except Exception as exc:
+                print(f"    ✗ VirtualDub2 által exportált utolsó frame sérült: {exc}")
+                last_frame_ok = False
+        else:
+            print("    ⚠ VirtualDub2 nem tudta kinyerni az utolsó frame-et – FFmpeg fallback")
+
+        def run_last_frame_attempt(cmd, description):
+            print(description)
+            print(f"      Parancs: {' '.join(cmd)}")
+            try:
+                if stop_event is not None and stop_event.is_set():
+                    raise EncodingStopped()
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=240, startupinfo=get_startup_info())
+                if result.stdout:
+                    print("      FFmpeg STDOUT:")
+                    print("        " + "\n        ".join(result.stdout.strip().splitlines()))
+                if result.stderr:
+                    print("      FFmpeg STDERR:")
+                    print("        " + "\n        ".join(result.stderr.strip().splitlines()))
+                if result.returncode != 0:
+                    err_text = result.stderr.strip() or result.stdout.strip() or str(result.returncode)
+                    print(f"    ✗ FFmpeg hiba: {err_text}")
+                    return "error"
+                if not last_frame_path.exists():
+                    print("    ⚠ Utolsó frame fájl nem készült el – ellenőrzés kihagyva")
+                    try:
+                        parent_dir = Path(last_frame_path).parent
+                        if parent_dir.exists():
+                            contents = os.listdir(parent_dir)
+                            print(f"      ⚠ Cél könyvtár tartalma: {contents}")
+                    except OSError:
+                        pass
+                    return "missing"
+                try:
+                    with Image.open(last_frame_path) as last_img:
+                        last_img.verify()
+                    print(f"    ✓ Utolsó frame beolvasható ({last_frame_path.name})")
+                    return "success"
+                except Exception as exc:
+                    print(f"    ✗ Utolsó frame beolvasási hiba: {exc}")
+                    return "error"
+            except EncodingStopped:
+                raise
+            except Exception as exc:
+                print(f"    ✗ Utolsó frame export hibázott: {exc}")
+                return "error"
+
+        if not last_frame_ok:
+            primary_cmd = [
+                FFMPEG_PATH, '-hide_banner', '-loglevel', 'error', '-y',
+                '-sseof', '-0.1',
+                '-i', os.fspath(video_path),
+                '-frames:v', '1',
+                os.fspath(last_frame_path)
+            ]
+            attempt_result = run_last_frame_attempt(primary_cmd, "    FFmpeg utolsó frame export indítása...")
+            if attempt_result == "success":
+                last_frame_ok = True
+            else:
+                if attempt_result == "missing":
+                    last_frame_warning = True
+                # OPTIMALIZÁCIÓ: teljes dekódolás (select=eq(n,...)) helyett csak a fájl vége:
+                # -update 1 mellett minden frame felülírja a képet, így az utolsó dekódolt frame marad meg
+                fallback_cmd = [
+                    FFMPEG_PATH, '-hide_banner', '-loglevel', 'error', '-y',
+                    '-sseof', f'-{LAST_FRAME_TAIL_SECONDS}',
+                    '-i', os.fspath(video_path),
+                    '-map', '0:v:0',
+                    '-vsync', '0',
+                    '-update', '1',
+                    os.fspath(last_frame_path)
+                ]
+                fallback_result = run_last_frame_attempt(fallback_cmd, f"    FFmpeg utolsó frame export (utolsó {LAST_FRAME_TAIL_SECONDS}s)...")
+                if fallback_result == "success":
+                    last_frame_ok = True
+                    last_frame_warning = False
+                elif fallback_result == "missing":
+                    last_frame_warning = True
+                else:
+                    last_frame_ok = False
+
+        if not last_frame_ok and not last_frame_warning:
+            is_valid = False
+
+        print(f"\n{'='*60}")
+        print(f"VALIDÁCIÓ EREDMÉNYE:")
+        file_size_mb = file_size / (1024**2)
+        print(f"  Fájlméret: OK ({format_localized_number(file_size_mb, decimals=2)} MB)")
+        print(f"  VirtualDub2 frame export: {len(extracted_frames)}/4 OK")
+        success_percent = format_localized_number(success_rate * 100, decimals=1)
+        print(f"  Valódi tartalom: {valid_frames}/{len(extracted_frames)} ({success_percent}%)")
+        print(f"  Fekete/üres: {black_frames}")
+        print(f"  Követelmény: ≥{min_success_rate*100:.0f}% valódi tartalom")
+        if source_frame_count is not None or encoded_frame_count is not None:
+            src_display = str(source_frame_count) if source_frame_count is not None else "ismeretlen"
+            dst_display = str(encoded_frame_count) if encoded_frame_count is not None else "ismeretlen"
+            print(f"  Frame-ek (forrás/cél): {src_display} / {dst_display}")
+            if source_frame_count and encoded_frame_count:
+                diff = encoded_frame_count - source_frame_count
+                status_text = "⚠ eltérés" if frame_count_warning else "OK"
+                print(f"  Frame különbség: {diff:+d} ({status_text})")
+        if last_frame_warning:
+            print(f"  Utolsó frame: ⚠ Nem sikerült ellenőrizni (fájl nem jött létre)")
+        else:
+            print(f"  Utolsó frame: {'OK' if last_frame_ok else '✗ HIBA'}")
+        print(f"  Végső eredmény: {'✓ ÉRVÉNYES' if is_valid else '✗ ÉRVÉNYTELEN'}")
+        print(f"{'='*60}")
+        
+        debug_pause(
+            f"Validáció kész: {'ÉRVÉNYES' if is_valid else 'ÉRVÉNYTELEN'} ({valid_frames}/{len(extracted_frames)} jó)",
+            "Temp könyvtár törlése" if not DEBUG_MODE else "Temp MEGŐRIZVE (debug)",
+            f"Temp: {temp_dir}, Videó: {video_path}"
+        )
         
-        cmd = [
-            os.fspath(vdub2_path),
-            "/s", os.fspath(script_path),
-            "/x"
-        ]
+        return is_valid
+    except EncodingStopped:
+        raise
+    finally:
+        if not DEBUG_MODE:
+            try:
+                shutil.rmtree(temp_dir)
+            except (OSError, PermissionError, FileNotFoundError):
+                pass
+        else:
+            print(f"  🛑 DEBUG: Temp MEGŐRIZVE: {temp_dir}")
+
+def find_video_files(root_dir: Union[str, Path], include_av1: bool = False) -> List[Path]:
+    """Recursively find video files in a directory.
+    
+    Args:
+        root_dir: Path to the root directory.
+        include_av1: If False, skips files ending with .av1.
+        
+    Returns:
+        list: List of found video files as Path objects.
+    """
+    video_files = []
+    root_path = Path(root_dir)
+    
+    try:
+        for file_path in root_path.rglob('*'):
+            try:
+                if file_path.is_file() and file_path.suffix.lower() in VIDEO_EXTENSIONS:
+                    # Kihagyjuk a .ab-av1-* almappákban lévő fájlokat (ab-av1 temp fájlok)
+                    path_parts = file_path.parts
+                    if any('.ab-av1-' in part for part in path_parts):
+                        continue
+                    
+                    if include_av1:
+                        # Ha include_av1=True, akkor minden videó fájlt hozzáadunk
+                        video_files.append(file_path)
+                    else:
+                        # Alapértelmezett: kihagyjuk az .av1 fájlokat
+                        if not file_path.stem.endswith('.av1'):
+                            video_files.append(file_path)
+            except (OSError, PermissionError):
+                # Egyedi fájl hozzáférési hiba - folytatjuk a következővel
+                continue
+    except (OSError, PermissionError, FileNotFoundError):
+        # Root könyvtár hozzáférési hiba - üres lista visszaadása
+        return []
+    
+    return video_files
+
+def get_output_filename(input_path: Path, source_root: Optional[Union[str, Path]], dest_root: Optional[Union[str, Path]]) -> Optional[Path]:
+    """Determine the output file path.
+    
+    Args:
+        input_path: Path to the input video (Path).
+        source_root: Source root directory (Path or None).
+        dest_root: Destination root directory (Path or None).
+        
+    Returns:
+        Path: Output file path (with .av1.mkv extension), or None on error.
+    """
+    try:
+        if dest_root is None:
+            return input_path.parent / f"{input_path.stem}.av1.mkv"
+        else:
+            source_path = Path(source_root)
+            dest_path = Path(dest_root)
+            relative_path = input_path.relative_to(source_path)
+            new_filename = f"{input_path.stem}.av1.mkv"
+            output_path = dest_path / relative_path.parent / new_filename
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            return output_path
+    except (OSError, PermissionError, ValueError) as e:
+        # ValueError: relative_to lehet hogy hibázik, ha input_path nincs source_path alatt
+        # OSError/PermissionError: mkdir hiba
+        if LOAD_DEBUG:
+            load_debug_log(f"[get_output_filename] Hiba output path generáláskor: {e}")
+        return None
+
+
+def get_copy_filename(input_path: Path, source_root: Optional[Union[str, Path]], dest_root: Optional[Union[str, Path]]) -> Optional[Path]:
+    """Generate output path with ORIGINAL extension (for copy fallback).
+    
+    Used when encoding fails and video must be copied unchanged.
+    Preserves original filename and extension (e.g. video.mp4 stays video.mp4).
+    
+    Args:
+        input_path: Path to input video (Path).
+        source_root: Source root directory (Path or None).
+        dest_root: Destination root directory (Path or None).
+        
+    Returns:
+        Path: Output path with original extension, or None on error.
+    """
+    try:
+        if dest_root is None:
+            # Same directory: keep original path
+            return input_path
+        else:
+            source_path = Path(source_root)
+            dest_path = Path(dest_root)
+            relative_path = input_path.relative_to(source_path)
+            # Preserve original filename AND extension
+            output_path = dest_path / relative_path
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            return output_path
+    except (OSError, PermissionError, ValueError) as e:
+        # ValueError: relative_to hiba
+        # OSError/PermissionError: mkdir hiba
+        if LOAD_DEBUG:
+            load_debug_log(f"[get_copy_filename] Hiba copy path generáláskor: {e}")
+        return None
+
+
+def is_misnamed_copy(source_path, dest_av1_path):
+    """Check if .av1.mkv file is actually unchanged copy of source.
+    
+    Detects cases where a video was copied (not encoded) but incorrectly
+    saved with .av1.mkv extension. Uses file size comparison as the
+    primary indicator.
+    
+    Args:
+        source_path: Original source video path (Path).
+        dest_av1_path: Destination .av1.mkv file path (Path).
+        
+    Returns:
+        bool: True if dest file is unchanged copy (same size as source).
+    """
+    # Check both files exist
+    if not source_path.exists() or not dest_av1_path.exists():
+        return False
+    
+    # Check extension is .av1.mkv
+    if dest_av1_path.suffix.lower() != '.mkv':
+        return False
+    if '.av1' not in dest_av1_path.stem:
+        return False
+    
+    # Compare file sizes (most reliable indicator of unchanged copy)
+    try:
+        source_size = source_path.stat().st_size
+        dest_size = dest_av1_path.stat().st_size
+        
+        # Same size = likely unchanged copy  
+        # Encoded files are typically 50-75% of original size
+        return source_size == dest_size
+    except (OSError, PermissionError):
+        return False
+
+
+def rename_misnamed_copy_file(dest_av1_path, source_path, logger=None):
+    """Rename misnamed .av1.mkv copy to original extension.
+    
+    Takes a .av1.mkv file that is actually an unchanged copy and renames
+    it to match the original source file's extension.
+    
+    Args:
+        dest_av1_path: Current .av1.mkv file path (Path).
+        source_path: Original source file for extension reference (Path).
+        logger: Optional logger for console output (ConsoleLogger).
+        
+    Returns:
+        Path: New path with original extension, or None on error.
+    """
+    try:
+        # Generate new name with original extension
+        original_ext = source_path.suffix
+        # Remove .av1 from stem
+        new_stem = dest_av1_path.stem.replace('.av1', '')
+        new_name = new_stem + original_ext
+        new_path = dest_av1_path.with_name(new_name)
+        
+        # Check if target already exists
+        if new_path.exists() and new_path != dest_av1_path:
+            if logger:
+                with console_redirect(logger):
+                    print(f"⚠ Cél fájl már létezik: {new_path.name}")
+            return None
+        
+        # Atomic rename
+        dest_av1_path.rename(new_path)
+        
+        if logger:
+            with console_redirect(logger):
+                print(f"✓ Átnevezve: {dest_av1_path.name} → {new_path.name}")
+        
+        return new_path
+        
+    except (OSError, PermissionError) as e:
+        if logger:
+            with console_redirect(logger):
+                print(f"✗ Átnevezés hiba: {e}")
+        return None
+
+
+def verify_and_copy_subtitles(source_path, dest_path, logger=None):
+    """Verify and copy missing subtitle files from source to dest location.
+    
+    Ensures all subtitle files associated with the source video are also
+    present at the destination location. Copies any missing subtitles.
+    
+    Args:
+        source_path: Source video path (Path).
+        dest_path: Destination video path (Path).
+        logger: Optional logger for console output (ConsoleLogger).
+        
+    Returns:
+        int: Number of subtitles copied.
+    """
+    # Find source subtitles
+    source_subs = find_subtitle_files(source_path)
+    if not source_subs:
+        return 0
+    
+    copied_count = 0
+    
+    for sub_path, lang_code in source_subs:
+        # Generate destination subtitle name
+        if lang_code:
+            # Insert language code before extension
+            dest_sub_name = f"{dest_path.stem}.{lang_code}{sub_path.suffix}"
+        else:
+            dest_sub_name = dest_path.stem + sub_path.suffix
         
-        print(f"\n{'='*80}")
-        print("VDUB2 PARANCS:")
-        print(f"{'='*80}")
-        print(" ".join(cmd))
-        print(f"{'='*80}\n")
+        dest_sub_path = dest_path.parent / dest_sub_name
         
-        try:
-            if stop_event.is_set():
-                raise EncodingStopped()
-            
-            full_output = []
-            # Context manager használata a process kezeléshez
-            with managed_subprocess(cmd, cwd=output_dir, stop_event=stop_event, timeout=180) as process:
-                try:
-                    for line in process.stdout:
-                        if stop_event and stop_event.is_set():
-                            raise EncodingStopped()
-                        print(line.rstrip())
-                        full_output.append(line)
-                except EncodingStopped:
-                    raise
-                except (OSError, IOError, BrokenPipeError, UnicodeDecodeError) as e:
-                    print(f"VirtualDub2 output olvasás hiba: {e}")
-                
-                # Várakozás a process befejezésére
-                try:
-                    process.wait(timeout=180)
-                except subprocess.TimeoutExpired:
-                    # A context manager finally blokkja kezeli a cleanup-ot
-                    raise
-            
-            full_output_text = ''.join(full_output)
-            
-            if stop_event.is_set():
-                raise EncodingStopped()
-            
-            print(f"\n{'='*80}")
-            print(f"VDUB2 BEFEJEZVE - Return code: {process.returncode}")
-            print(f"{'='*80}\n")
-            
-            # "unexpected end of stream" detektálása
-            if "unexpected end of stream" in full_output_text.lower():
-                print(f"      ✗ 'unexpected end of stream' - videó lejátszható-e?")
-                return None  # Speciális jelzés az újrakódoláshoz
-            
-            # Frame keresése és átnevezése
-            if frame_path.exists():
-                # Átnevezés egyedi névre
-                final_frame_path = output_dir / f"frame_{i:04d}.png"
-                frame_path.rename(final_frame_path)
-                extracted_frames.append(final_frame_path)
-                print(f"      ✓ Frame mentve: {final_frame_path.name}")
-            else:
-                print(f"      ✗ Nem készült frame")
-                
-        except EncodingStopped:
-            raise
-        except subprocess.TimeoutExpired:
-            print(f"      ✗ Timeout")
-        except (OSError, subprocess.SubprocessError, ValueError, AttributeError) as e:
-            print(f"      ✗ Hiba: {e}")
-        except Exception as e:
-            # Váratlan hibák esetén is logoljuk, de ne akadjon el
-            print(f"      ✗ Váratlan hiba: {type(e).__name__}: {e}")
-        finally:
-            # Script törlése
+        # Copy if doesn't exist
+        if not dest_sub_path.exists():
             try:
-                script_path.unlink()
-            except (OSError, PermissionError, FileNotFoundError):
-                pass
-    
-    print(f"  Összesen {len(extracted_frames)}/{num_frames} frame exportálva")
-    
-    debug_pause(
-        f"VirtualDub2 frame export kész: {len(extracted_frames)} frame",
-        "Frame tartalom ellenőrzés (fekete/üres detektálás)",
-        f"Frame-ek: {output_dir}"
-    )
+                shutil.copy2(sub_path, dest_sub_path)
+                copied_count += 1
+                if logger:
+                    with console_redirect(logger):
+                        print(f"✓ Felirat másolva: {dest_sub_path.name}")
+            except (OSError, PermissionError) as e:
+                if logger:
+                    with console_redirect(logger):
+                        print(f"⚠ Felirat másolás hiba: {e}")
     
-    return extracted_frames
-
-def is_frame_black_or_empty(frame_path, max_mean_brightness=MAX_MEAN_BRIGHTNESS, min_std_dev=MIN_STD_DEV):
-    try:
-        with Image.open(frame_path) as img:
-            img_array = np.array(img)
-            
-            file_size = frame_path.stat().st_size
-            # KISEBB JAVÍTÁS #16: Konstans használata
-            if file_size < MIN_FRAME_FILE_SIZE:
-                print(f"      ⚠ Túl kicsi: {file_size} byte")
-                return True
-            
-            if len(img_array.shape) == 3:
-                img_gray = np.dot(img_array[...,:3], [0.299, 0.587, 0.114])
-            else:
-                img_gray = img_array
-            
-            mean_brightness = np.mean(img_gray)
-            std_dev = np.std(img_gray)
-            
-            brightness_str = format_localized_number(mean_brightness, decimals=1)
-            stddev_str = format_localized_number(std_dev, decimals=1)
-            print(f"      Fényerő: {brightness_str}, Szórás: {stddev_str}")
-            
-            is_black = mean_brightness < max_mean_brightness and std_dev < min_std_dev
-            
-            if is_black:
-                print(f"      ✗ Fekete/üres")
-                return True
-            else:
-                print(f"      ✓ Valódi tartalom")
-                return False
-    except Exception as e:
-        print(f"      ✗ Hiba: {e}")
-        return True
+    return copied_count
 
-def _write_vdub_script(script_path, video_path, start_frame, frame_count, output_prefix):
-    video_path_str = str(video_path.absolute()).replace("\\", "\\\\")
-    output_prefix_str = str(output_prefix).replace("\\", "\\\\")
-    script_content = (
-        f'VirtualDub.Open("{video_path_str}");\n'
-        "VirtualDub.subset.Clear();\n"
-        f"VirtualDub.subset.AddRange({start_frame}, {frame_count});\n"
-        f'VirtualDub.SaveImageSequence("{output_prefix_str}", ".png", 4, 3);\n'
-        "VirtualDub.Close();\n"
-    )
-    script_path.write_text(script_content, encoding='utf-8')
 
-def export_specific_frame_with_vdub2(video_path, frame_index, output_path, stop_event=None):
-    """Exportál egy konkrét frame-et VirtualDub2 segítségével."""
-    vdub2_path = find_vdub2_path()
-    if not vdub2_path:
-        print("    ✗ VirtualDub2 nem található az utolsó frame exporthoz")
-        return False
+CRF_SAMPLE_PATTERN = re.compile(r'crf\s+(\d+(?:\.\d+)?)\s+VMAF\s+([\d.]+)\s+predicted\s+video\s+stream\s+size\s+[\d.]+\s+\w+\s+\((\d+)%\)')
 
-    if frame_index is None or frame_index < 0:
-        print("    ✗ Érvénytelen frame index VirtualDub2 exporthoz")
-        return False
 
-    temp_dir = Path(tempfile.mkdtemp())
-    try:
-        if stop_event is not None and stop_event.is_set():
-            raise EncodingStopped()
+class CrfSampleTable:
+    """Fájlonkénti CRF keresés minta mérések (crf → VMAF, méret%) és keresési eredmények.
 
-        script_path = temp_dir / "single_frame.vdscript"
-        output_prefix = temp_dir / "frame_last"
-        _write_vdub_script(script_path, video_path, frame_index, 1, output_prefix)
+    A crf-search minden kiírt mintáját megőrzi, így egy alacsonyabb VMAF célnál a válasz a már
+    mért görbéből adódik, és új minta kódolás csak a még nem próbált CRF tartományra indul. A
+    görbét CRF-ben monoton csökkenő VMAF-nak és méretnek tekinti (ahogy az ab-av1 bináris
+    keresése is).
 
-        # Script tartalmának ellenőrzése (debug)
-        try:
-            script_content = script_path.read_text(encoding='utf-8')
-            print(f"    VirtualDub2 utolsó frame export ({frame_index}. frame)...")
-            print(f"      Script: {script_path}")
-            print(f"      Script tartalom:\n        " + "\n        ".join(script_content.strip().splitlines()))
-        except Exception as e:
-            print(f"    ⚠ Script olvasási hiba: {e}")
+    Kulcs: (forrás tartalom ujjlenyomat, encoder, preset, engine opciók). Ujjlenyomattal a minták és
+    a teljes keresések eredménye a crf_search_samples / crf_search_results táblákba is kerül - leállítás,
+    összeomlás vagy kézi újrakódolás után ugyanaz a keresés nem fut újra. Ujjlenyomat nélkül (hash
+    hiba) útvonal + méret + mtime_ns a kulcs, és csak memóriában él.
+    """
 
-        cmd = [
-            os.fspath(vdub2_path),
-            "/s", os.fspath(script_path),
-            "/x"
-        ]
-        print(f"      Parancs: {' '.join(str(part) for part in cmd)}")
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            startupinfo=get_startup_info(),
-            timeout=300
-        )
-        if result.stdout:
-            print("      VDUB2 STDOUT:")
-            print("        " + "\n        ".join(result.stdout.strip().splitlines()))
-        if result.stderr:
-            print("      VDUB2 STDERR:")
-            print("        " + "\n        ".join(result.stderr.strip().splitlines()))
-        if result.returncode != 0:
-            print(f"    ✗ VirtualDub2 hiba ({result.returncode}): {result.stderr.strip() or result.stdout.strip()}")
-            return False
+    def __init__(self, max_files=CRF_SAMPLE_TABLE_MAX_FILES):
+        self.max_files = max_files
+        self._tables = OrderedDict()
+        self._outcomes = {}
+        self._lock = threading.Lock()
 
-        # VirtualDub2 általában "frame_last0000.png" néven hozza létre (aláhúzás nélkül)
-        generated_frame = temp_dir / "frame_last0000.png"
-        if not generated_frame.exists():
-            # Fallback: próbáljuk a "frame_last_0000.png" nevet is (aláhúzással)
-            generated_frame = temp_dir / "frame_last_0000.png"
-            if not generated_frame.exists():
-                # Keresünk minden PNG fájlt a temp könyvtárban
-                png_files = list(temp_dir.glob("*.png"))
-                if png_files:
-                    # Ha találtunk PNG fájlt, használjuk azt
-                    generated_frame = png_files[0]
-                    print(f"      ⚠ VirtualDub2 más néven hozta létre a fájlt: {generated_frame.name}")
-                else:
-                    # Ha nem találtunk PNG fájlt, kiírjuk a könyvtár tartalmát
-                    try:
-                        contents = os.listdir(temp_dir)
-                        print(f"      ⚠ VirtualDub2 output könyvtár tartalma: {contents}")
-                    except OSError:
-                        pass
-                    print("    ✗ VirtualDub2 nem hozta létre az utolsó frame képet")
-                    return False
+    @staticmethod
+    def engine_options(engine, encoder=None, svt_preset=None):
+        """Az eredményt befolyásoló engine beállítások (a kulcs része; változáskor új kulcs).
 
-        shutil.copy2(generated_frame, output_path)
-        return True
-    except EncodingStopped:
-        raise
-    except Exception as e:
-        print(f"    ✗ VirtualDub2 utolsó frame export hiba: {e}")
-        return False
-    finally:
+        Natív engine: minta terv, ffmpeg és libvmaf verzió, valamint a video_encoder_args opciói
+        (a CRF érték és a mag keret nélkül) - bármelyik változásakor a régi minták nem használhatók.
+        ab-av1: az ab-av1 és az általa hívott ffmpeg verziója.
+        """
+        ffmpeg_version = TOOL_CAPABILITIES.ffmpeg().get('version') or ''
+        if engine == 'native':
+            encoder_args = video_encoder_args(encoder, 0, svt_preset=svt_preset if svt_preset is not None else 2) if encoder else []
+            # A CRF/CQ érték a minta kulcsa, nem az engine opcióké
+            encoder_args = [arg for index, arg in enumerate(encoder_args) if index == 0 or encoder_args[index - 1] not in ('-crf', '-cq')]
+            options = '|'.join([ffmpeg_version, TOOL_CAPABILITIES.libvmaf_version() or '', ' '.join(encoder_args)])
+            digest = hashlib.sha1(options.encode('utf-8')).hexdigest()[:12]
+            return f"native;{NATIVE_CRF_SAMPLE_SECONDS:g}s/{NATIVE_CRF_SAMPLE_EVERY_SECONDS:g}s;{digest}"
+        return f"{engine};{TOOL_CAPABILITIES.abav1().get('version', '')};{ffmpeg_version}"
+
+    @staticmethod
+    def key(input_path, encoder, svt_preset=None, engine='ab-av1'):
+        """Tábla kulcs a fájl jelenlegi tartalmához (None, ha a fájl nem érhető el).
+
+        Az engine is a kulcs része: az ab-av1 és a natív keresés más minta klipeket mér.
+        """
         try:
-            shutil.rmtree(temp_dir)
+            stat_result = Path(input_path).stat()
         except OSError:
-            pass
-
-def export_last_frame_with_vdub2(video_path, output_path, frame_count_hint=None, stop_event=None):
-    """Megpróbálja VirtualDub2-vel kinyerni az utolsó frame-et."""
-    frame_count = frame_count_hint
-    if frame_count is None:
+            return None
         try:
-            frame_count = get_video_frame_count(video_path)
-        except Exception:
-            frame_count = None
+            source_id = CONTENT_FINGERPRINTS.get(input_path)
+        except (subprocess.SubprocessError, OSError, RuntimeError) as e:
+            load_debug_log(f"[CrfSampleTable] Ujjlenyomat hiba: {e}")
+            source_id = None
+        if not source_id:
+            source_id = f"stat:{os.fspath(Path(input_path).absolute())}|{stat_result.st_size}|{stat_result.st_mtime_ns}"
+        preset = str(svt_preset) if encoder == 'svt-av1' else ''
+        return (source_id, encoder, preset, CrfSampleTable.engine_options(engine, encoder, svt_preset))
+
+    @staticmethod
+    def _persistent(key):
+        return key is not None and not key[0].startswith('stat:')
+
+    def _table(self, key):
+        """A kulcs mintái (memória, első eléréskor a crf_search_samples táblából) - a hívó fogja a lockot."""
+        table = self._tables.pop(key, None)
+        if table is None:
+            table = {}
+            if self._persistent(key):
+                with cache_db_connection() as conn:
+                    if conn is not None:
+                        try:
+                            rows = conn.execute(
+                                'SELECT crf, vmaf, size_pct FROM crf_search_samples WHERE source_fp = ? AND encoder = ? AND preset = ? AND engine = ?',
+                                key
+                            ).fetchall()
+                        except sqlite3.Error:
+                            rows = []
+                        for crf, vmaf, size_pct in rows:
+                            table[float(crf)] = (float(vmaf), int(size_pct))
+        self._tables[key] = table
+        while len(self._tables) > self.max_files:
+            self._tables.popitem(last=False)
+        return table
+
+    def record(self, key, samples):
+        """Minták (crf, vmaf, size_pct) felvétele; ugyanarra a CRF-re az újabb mérés nyer."""
+        if key is None:
+            return
+        rows = [(float(crf), float(vmaf), int(size_pct)) for crf, vmaf, size_pct in samples]
+        if not rows:
+            return
+        with self._lock:
+            table = self._table(key)
+            for crf, vmaf, size_pct in rows:
+                table[crf] = (vmaf, size_pct)
+        if not self._persistent(key):
+            return
+        with cache_db_connection() as conn:
+            if conn is None:
+                return
+            try:
+                with CACHE_DB_LOCK:
+                    ensure_cache_tables(conn.cursor())
+                    conn.executemany(
+                        'INSERT OR REPLACE INTO crf_search_samples (source_fp, encoder, preset, engine, crf, vmaf, size_pct, measured_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                        [key + (crf, vmaf, size_pct, time.time()) for crf, vmaf, size_pct in rows]
+                    )
+                    conn.commit()
+            except sqlite3.Error as e:
+                load_debug_log(f"[CrfSampleTable] Minta írás hiba: {e}")
 
-    if not frame_count or frame_count <= 0:
-        print("    ✗ VirtualDub2: nem sikerült meghatározni a frame számot")
-        return False
+    def forget(self, key):
+        """A fájl mintáinak és keresési eredményeinek eldobása (pl. benchmark előtt)."""
+        if key is None:
+            return
+        with self._lock:
+            self._tables.pop(key, None)
+            for outcome_key in [outcome_key for outcome_key in self._outcomes if outcome_key[:4] == key]:
+                del self._outcomes[outcome_key]
+        if not self._persistent(key):
+            return
+        with cache_db_connection() as conn:
+            if conn is None:
+                return
+            try:
+                with CACHE_DB_LOCK:
+                    ensure_cache_tables(conn.cursor())
+                    for table_name in ('crf_search_samples', 'crf_search_results'):
+                        conn.execute(f'DELETE FROM {table_name} WHERE source_fp = ? AND encoder = ? AND preset = ? AND engine = ?', key)
+                    conn.commit()
+            except sqlite3.Error as e:
+                load_debug_log(f"[CrfSampleTable] Törlés hiba: {e}")
+
+    def samples(self, key):
+        """[(crf, vmaf, size_pct)] CRF szerint rendezve."""
+        if key is None:
+            return []
+        with self._lock:
+            table = dict(self._table(key))
+        return [(crf, vmaf, size_pct) for crf, (vmaf, size_pct) in sorted(table.items())]
+
+    def outcome(self, key, min_vmaf, vmaf_step, max_encoded_percent):
+        """Korábbi teljes keresés eredménye ugyanezekkel a paraméterekkel.
+
+        Returns:
+            dict: {'crf', 'vmaf', 'exhausted'} vagy None.
+        """
+        if key is None:
+            return None
+        outcome_key = key + (float(min_vmaf), float(vmaf_step), int(max_encoded_percent))
+        with self._lock:
+            cached = self._outcomes.get(outcome_key)
+        if cached is not None or not self._persistent(key):
+            return cached
+        with cache_db_connection() as conn:
+            if conn is None:
+                return None
+            try:
+                row = conn.execute(
+                    'SELECT crf, vmaf, exhausted FROM crf_search_results WHERE source_fp = ? AND encoder = ? AND preset = ? AND engine = ? '
+                    'AND min_vmaf = ? AND vmaf_step = ? AND max_encoded_percent = ?',
+                    outcome_key
+                ).fetchone()
+            except sqlite3.Error:
+                return None
+        if row is None:
+            return None
+        cached = {'crf': row[0], 'vmaf': row[1], 'exhausted': bool(row[2])}
+        with self._lock:
+            self._outcomes[outcome_key] = cached
+        return cached
+
+    def store_outcome(self, key, min_vmaf, vmaf_step, max_encoded_percent, crf, vmaf, exhausted=False):
+        """Teljes keresés eredményének mentése (exhausted: a VMAF fallback a küszöbig elfogyott)."""
+        if key is None:
+            return
+        outcome_key = key + (float(min_vmaf), float(vmaf_step), int(max_encoded_percent))
+        cached = {'crf': crf, 'vmaf': vmaf, 'exhausted': bool(exhausted)}
+        with self._lock:
+            self._outcomes[outcome_key] = cached
+        if not self._persistent(key):
+            return
+        with cache_db_connection() as conn:
+            if conn is None:
+                return
+            try:
+                with CACHE_DB_LOCK:
+                    ensure_cache_tables(conn.cursor())
+                    conn.execute(
+                        'INSERT OR REPLACE INTO crf_search_results (source_fp, encoder, preset, engine, min_vmaf, vmaf_step, max_encoded_percent, '
+                        'crf, vmaf, exhausted, searched_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        outcome_key + (crf, vmaf, int(bool(exhausted)), time.time())
+                    )
+                    conn.commit()
+            except sqlite3.Error as e:
+                load_debug_log(f"[CrfSampleTable] Eredmény írás hiba: {e}")
 
-    last_frame_index = max(frame_count - 1, 0)
-    return export_specific_frame_with_vdub2(video_path, last_frame_index, output_path, stop_event=stop_event)
+    def resolve(self, key, min_vmaf, max_encoded_percent):
+        """Döntés a mért görbéből egy VMAF célra.
 
-def validate_encoded_video_vlc(video_path, encoder='av1_nvenc', stop_event=None, source_path=None):
-    """Validate encoded video using various checks (VLC-like validation).
-    
-    Checks for:
-    - File existence and size
-    - Duration match with source (if provided)
-    - Frame count match (if source provided)
-    - Black/empty frames in sample export
-    - Last frame readability
-    
-    Args:
-        video_path: Path to the encoded video.
-        encoder: Encoder name used.
-        stop_event: Event to stop validation.
-        source_path: Path to source video (optional, for comparison).
-        
-    Returns:
-        bool: True if validation passes, False otherwise.
+        Returns:
+            tuple: (művelet, adat):
+                ('hit', (crf, vmaf, size_pct)) - a legnagyobb megfelelő CRF, és a következő CRF már elbukott;
+                ('skip', None) - a határ ismert, de ott a méret túllépi a korlátot (nincs megoldás);
+                ('search', (min_crf, max_crf)) - csak a még nem próbált tartományt kell keresni (None = nyitott);
+                ('run', None) - nincs minta, teljes keresés.
+        """
+        samples = self.samples(key)
+        if not samples:
+            return ('run', None)
+        passing = [sample for sample in samples if sample[1] >= min_vmaf]
+        failing_crfs = [crf for crf, vmaf, _ in samples if vmaf < min_vmaf]
+        if not passing:
+            return ('search', (None, min(failing_crfs)))
+        upper = max(crf for crf, _, _ in passing)
+        above = [crf for crf in failing_crfs if crf > upper]
+        ceiling = min(above) if above else None
+        if ceiling is None or ceiling - upper > CRF_SEARCH_CRF_INCREMENT + 1e-6:
+            return ('search', (upper, ceiling))
+        valid = [sample for sample in passing if sample[2] <= max_encoded_percent]
+        if not valid:
+            return ('skip', None)
+        return ('hit', max(valid, key=lambda sample: sample[0]))
+
+
+CRF_SAMPLES = CrfSampleTable()
+
+
+class EstimatedVmaf(float):
+    """Becsült (nem mért) VMAF: a CRF előrejelző kihagyott keresésének eredménye.
+
+    Számolásban sima float; kijelzésben (format_search_vmaf) '≈' jelöli, és az így mentett
+    sor nem kerül a CrfPredictor tanító adatába.
     """
-    print(f"\n{'='*60}")
-    print(f"Videó validáció (VirtualDub2 frame): {video_path.name}")
-    print(f"Encoder: {encoder}")
-    print(f"{'='*60}")
-    
-    if stop_event is None:
-        stop_event = STOP_EVENT
 
-    if stop_event.is_set():
-        raise EncodingStopped()
-    
-    # KRITIKUS JAVÍTÁS: Változók inicializálása
-    source_frame_count = None
-    encoded_frame_count = None
-    is_valid = True
-    success_rate = 0.0
-    min_success_rate = 0.4
-    frame_count_warning = False
-    
-    file_size = video_path.stat().st_size
-    file_size_mb = file_size / (1024**2)
-    print(f"\n1. Fájlméret: {format_localized_number(file_size_mb, decimals=2)} MB")
-    
-    # KISEBB JAVÍTÁS #16: Konstans használata
-    if file_size < MIN_FILE_SIZE_BYTES:
-        print("  ✗ Fájl túl kicsi!")
-        return False
-    
-    print("\n2. VirtualDub2 frame export és tartalom ellenőrzés...")
-    
-    temp_dir = Path(tempfile.mkdtemp())
-    try:
-        # 30%, 50%, 70% és vége (4db frame összesen)
-        print(f"   {encoder}: 4 frame teszt (30%, 50%, 70%, vége)")
-        
-        extracted_frames = extract_frames_with_vdub2(video_path, temp_dir, num_frames=4, stop_event=stop_event, use_percentage_positions=True)
-        
-        # "unexpected end of stream" detektálása - speciális jelzés (None)
-        if extracted_frames is None:
-            print("  ✗ VirtualDub2: 'unexpected end of stream' - videó újrakódolásra szorul!")
-            return None  # Speciális érték: újrakódolás szükséges
-        
-        if not extracted_frames:
-            print("  ✗ Nem sikerült frame-eket exportálni!")
-            return False
-        
-        if stop_event.is_set():
-            raise EncodingStopped()
-        
-        print(f"\n3. Frame tartalom ellenőrzés ({len(extracted_frames)} db)...")
-        valid_frames = 0
-        black_frames = 0
-        
-        for frame_path in extracted_frames:
-            if stop_event.is_set():
-                raise EncodingStopped()
-            print(f"    Vizsgálat: {frame_path.name}")
-            is_black = is_frame_black_or_empty(frame_path)
-            
-            if not is_black:
-                valid_frames += 1
-            else:
-                black_frames += 1
-        
-        success_rate = valid_frames / len(extracted_frames)
-        min_success_rate = 0.33 if encoder == 'svt-av1' else 0.4
-        
-        is_valid = success_rate >= min_success_rate
 
-        print(f"\n4. Frame statisztika (forrás/cél)...")
-        if source_path:
+def format_search_vmaf(value):
+    """CRF keresés VMAF értékének kijelzése: '-' ha nincs, '≈' előtaggal, ha becsült (EstimatedVmaf)."""
+    if value is None:
+        return "-"
+    if isinstance(value, str):
+        return value
+    formatted = format_localized_number(value, decimals=1)
+    return f"≈{formatted}" if isinstance(value, EstimatedVmaf) else formatted
+
+
+class CrfPredictor:
+    """CRF becslés a korábbi kódolásokból (súlyozott legközelebbi szomszéd).
+
+    Tanító adat a videos tábla kész NVENC/SVT sorai: a választott CQ/CRF és a mért VMAF (a másolt sorok
+    'copy' encoderrel, CRF nélkül - ezeket a SkipEncodePredictor használja; a predikció miatt kihagyott
+    forrásokat (skip_encode_decisions) és a még nem ellenőrzött kihagyott kereséseket (crf_predictor_skips)
+    kivéve). A forrás
+    jellemzői a probe_cache-ből jönnek (codec, log2 pixelszám, log2 bit/pixel, log2 fps), új ffprobe
+    nélkül. Egy szomszéd becslése a cél VMAF-ra: crf + (vmaf - cél) / NATIVE_CRF_INITIAL_SLOPE.
+    A becslés a keresést egy szűk CRF ablakra korlátozza (natív: kezdő CRF + tartomány, ab-av1:
+    --min-crf/--max-crf). Sok, egybehangzó közeli szomszédnál a keresés el is maradhat; ilyenkor a
+    visszaadott VMAF becslés (EstimatedVmaf), és a döntést a kimenet későbbi teljes VMAF mérése
+    ellenőrzi (crf_predictor_skips) - a kihagyások külön találati arányt kapnak.
+    """
+
+    COMPLETED_STATUSES = ('completed', 'completed_nvenc', 'completed_svt', 'completed_copy')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = {}  # path_key -> (encoder, features, crf, vmaf, size_pct) - videos táblából
+        self._session_rows = {}  # path_key -> ugyanez, az ebben a futásban befejezett keresésekből
+        self._loaded_at = None
+        self._stats = None  # encoder -> statisztika dict (crf_predictor_stats)
+
+    @staticmethod
+    def _number(text):
+        """Első szám egy tree/DB szövegből ('32', '95,3', '95.3 (SVT)'), vagy None."""
+        match = re.search(r'\d+(?:[.,]\d+)?', str(text or ''))
+        return float(match.group(0).replace(',', '.')) if match else None
+
+    @staticmethod
+    def features(probe, size_bytes=None):
+        """Forrás jellemzők: (codec, log2 pixel, log2 bit/pixel, log2 fps), vagy None ha hiányos a probe."""
+        width, height = probe.resolution
+        fps = probe.fps
+        if not width or not height or not fps:
+            return None
+        stream = probe.video_stream or {}
+        bitrate = None
+        for value in (stream.get('bit_rate'), probe.format.get('bit_rate')):
             try:
-                source_path_obj = Path(source_path)
-            except (OSError, ValueError, TypeError):
-                source_path_obj = None
-            if source_path_obj and source_path_obj.exists():
-                try:
-                    source_frame_count = get_video_frame_count(source_path_obj)
-                    if source_frame_count is not None:
-                        print(f"    Forrás frame-ek: {source_frame_count}")
-                    else:
-                        print("    Forrás frame-ek: ismeretlen")
-                except Exception as e:
-                    print(f"    ✗ Forrás frame lekérdezés hiba: {e}")
-            else:
-                print("    Forrás frame-ek: forrás fájl nem elérhető")
-        else:
-            print("    Forrás frame-ek: nincs megadva")
+                bitrate = float(value)
+            except (TypeError, ValueError):
+                continue
+            if bitrate > 0:
+                break
+            bitrate = None
+        if bitrate is None and size_bytes and probe.duration:
+            bitrate = size_bytes * 8 / probe.duration
+        if not bitrate:
+            return None
+        pixels = width * height
+        return (str(stream.get('codec_name') or ''), float(np.log2(pixels)), float(np.log2(bitrate / (pixels * fps))), float(np.log2(fps)))
 
+    @staticmethod
+    def distance(a, b):
+        codec = 0.0 if a[0] == b[0] else CRF_PREDICTOR_CODEC_PENALTY
+        return float(np.sqrt(codec ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2 + (0.5 * (a[3] - b[3])) ** 2))
+
+    def source_features(self, input_path):
         try:
-            encoded_frame_count = get_video_frame_count(video_path)
-            if encoded_frame_count is not None:
-                print(f"    Cél frame-ek: {encoded_frame_count}")
-            else:
-                print("    Cél frame-ek: ismeretlen")
-        except Exception as e:
-            print(f"    ✗ Cél frame lekérdezés hiba: {e}")
-            encoded_frame_count = None
+            size_bytes = os.stat(os.fspath(input_path)).st_size
+            return self.features(probe_media(input_path), size_bytes)
+        except (OSError, ValueError, subprocess.SubprocessError) as e:
+            load_debug_log(f"[CrfPredictor] Forrás jellemzők hiba: {e}")
+            return None
 
-        if source_frame_count and encoded_frame_count:
-            allowed_diff = max(FRAME_MISMATCH_MIN_DIFF, int(source_frame_count * FRAME_MISMATCH_RATIO))
-            diff = encoded_frame_count - source_frame_count
-            if frames_significantly_different(source_frame_count, encoded_frame_count):
-                frame_count_warning = True
-                print(f"    ⚠ Jelentős eltérés a frame számokban (különbség: {diff:+d}, tolerancia: +/-{allowed_diff})")
+    def _load_rows(self):
+        """Tanító sorok a videos + probe_cache táblákból (path_key -> sor)."""
+        rows = {}
+        with cache_db_connection() as conn:
+            if conn is None:
+                return rows
+            try:
+                probes = dict(conn.execute('SELECT path, probe_json FROM probe_cache').fetchall())
+                videos = conn.execute(
+                    'SELECT video_path, cq, vmaf, orig_size_bytes, new_size_bytes, output_encoder_type, status_code FROM videos '
+                    f'WHERE status_code IN ({", ".join("?" * len(self.COMPLETED_STATUSES))})',
+                    self.COMPLETED_STATUSES
+                ).fetchall()
+            except sqlite3.Error as e:
+                # Első indításnál a videos tábla még nem létezik
+                load_debug_log(f"[CrfPredictor] Tanító adat olvasás hiba: {e}")
+                return rows
+            try:
+                predicted_skips = {row[0] for row in conn.execute('SELECT path FROM skip_encode_decisions').fetchall()}
+            except sqlite3.Error:
+                predicted_skips = set()
+            try:
+                unchecked_crf_skips = {row[0] for row in conn.execute(
+                    'SELECT path FROM crf_predictor_skips WHERE checked_at IS NULL').fetchall()}
+            except sqlite3.Error:
+                unchecked_crf_skips = set()
+        for video_path, cq, vmaf, orig_size, new_size, encoder_type, status_code in videos:
+            if status_code == 'completed_copy':
+                encoder = 'copy'
+            elif encoder_type == 'nvenc' or status_code == 'completed_nvenc':
+                encoder = 'av1_nvenc'
+            elif encoder_type == 'svt-av1' or status_code == 'completed_svt':
+                encoder = 'svt-av1'
             else:
-                print(f"    ✓ Frame eltérés a tolerancián belül (különbség: {diff:+d})")
+                continue
+            path_key = ProbeCache.path_key(video_path)
+            # KRITIKUS: a predikció miatt másolt forrás nem bizonyíték - különben a kihagyás önmagát erősítené
+            if encoder == 'copy' and path_key in predicted_skips:
+                continue
+            # KRITIKUS: kihagyott CRF keresés teljes VMAF ellenőrzés nélkül - a CRF/VMAF pár becslés, nem mérés
+            if encoder != 'copy' and path_key in unchecked_crf_skips:
+                continue
+            crf = self._number(cq)
+            # A becsült (≈) VMAF nem mérés - nem tanító adat
+            vmaf = None if str(vmaf or '').lstrip().startswith('≈') else self._number(vmaf)
+            probe_json = probes.get(path_key)
+            if not probe_json or (encoder != 'copy' and (crf is None or vmaf is None)):
+                continue
+            try:
+                features = self.features(ProbeResult(video_path, json.loads(probe_json)), orig_size)
+            except (ValueError, TypeError):
+                continue
+            if features is None:
+                continue
+            size_pct = new_size / orig_size * 100 if orig_size and new_size else None
+            if encoder == 'copy':
+                size_pct = 100.0
+            rows[path_key] = (encoder, features, crf, vmaf, size_pct)
+        return rows
+
+    def _ensure_loaded(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._loaded_at is not None and now - self._loaded_at < CRF_PREDICTOR_REFRESH_SECONDS:
+                return
+            self._loaded_at = now
+        rows = self._load_rows()
+        with self._lock:
+            self._rows = rows
+
+    def neighbors(self, features, encoders):
+        """A legközelebbi korábbi kódolások: [(távolság, sor)] a megadott encoderekből, távolság szerint."""
+        self._ensure_loaded()
+        with self._lock:
+            rows = dict(self._session_rows)
+            rows.update(self._rows)
+        candidates = sorted(
+            ((self.distance(features, row[1]), row) for row in rows.values() if row[0] in encoders),
+            key=lambda item: item[0]
+        )
+        return [item for item in candidates if item[0] <= CRF_PREDICTOR_MAX_DISTANCE][:CRF_PREDICTOR_NEIGHBORS]
 
-        print(f"\n5. Utolsó frame ellenőrzés...")
-        last_frame_ok = False
-        last_frame_warning = False
-        last_frame_path = temp_dir / "frame_last.png"
+    def predict(self, input_path, encoder, target_vmaf, max_encoded_percent):
+        """CRF becslés a cél VMAF-ra.
 
-        if last_frame_path.exists():
+        Returns:
+            dict vagy None: {'crf', 'estimate', 'spread', 'window': (min_crf, max_crf), 'neighbors', 'skip',
+                'vmaf'} ('vmaf': a becsült VMAF a választott CRF-en); None, ha ki van kapcsolva vagy nincs
+                elég közeli korábbi kódolás.
+        """
+        if not CRF_PREDICTOR_ENABLED:
+            return None
+        features = self.source_features(input_path)
+        if features is None:
+            return None
+        neighbors = self.neighbors(features, (encoder,))
+        if len(neighbors) < CRF_PREDICTOR_MIN_NEIGHBORS:
+            return None
+        weights = np.array([1.0 / (dist + 0.25) for dist, _ in neighbors])
+        estimates = np.array([row[2] + (row[3] - target_vmaf) / NATIVE_CRF_INITIAL_SLOPE for _, row in neighbors])
+        estimate = float(np.average(estimates, weights=weights))
+        spread = float(np.sqrt(np.average((estimates - estimate) ** 2, weights=weights)))
+        crf_range = CRF_SEARCH_RANGE.get(encoder, (10, 63))
+        half = max(CRF_PREDICTOR_WINDOW, 2 * spread)
+        window = (float(max(crf_range[0], np.floor(estimate - half))), float(min(crf_range[1], np.ceil(estimate + half))))
+        if window[0] >= window[1]:
+            return None
+        # Óvatos kerekítés: a szórással lefelé (jobb minőség felé)
+        crf = float(min(max(np.floor((estimate - spread) / CRF_SEARCH_CRF_INCREMENT) * CRF_SEARCH_CRF_INCREMENT, crf_range[0]), crf_range[1]))
+        skip = (len(neighbors) >= CRF_PREDICTOR_SKIP_NEIGHBORS and spread <= CRF_PREDICTOR_SKIP_SPREAD
+                and all(row[4] is not None and row[4] <= max_encoded_percent and abs(row[3] - target_vmaf) <= CRF_PREDICTOR_SKIP_VMAF_DELTA
+                        for _, row in neighbors))
+        predicted_vmaf = min(100.0, target_vmaf + (estimate - crf) * NATIVE_CRF_INITIAL_SLOPE)
+        return {'crf': crf, 'estimate': estimate, 'spread': spread, 'window': window, 'neighbors': len(neighbors), 'skip': skip,
+                'vmaf': float(predicted_vmaf)}
+
+    def observe(self, input_path, encoder, crf, vmaf):
+        """Befejezett keresés eredménye tanító sorként (a kódolás után a videos tábla sora felülírja)."""
+        features = self.source_features(input_path)
+        if features is None:
+            return
+        with self._lock:
+            self._session_rows[ProbeCache.path_key(input_path)] = (encoder, features, float(crf), float(vmaf), None)
+
+    @staticmethod
+    def record_skip(input_path, encoder, prediction, target_vmaf):
+        """Kihagyott keresés rögzítése a későbbi ellenőrzéshez (forrás azonosítóval, ellenőrizetlenül)."""
+        identity = ProbeCache.file_identity(input_path)
+        if identity is None:
+            return
+        with cache_db_connection() as conn:
+            if conn is None:
+                return
             try:
-                last_frame_path.unlink()
-            except OSError:
-                pass
+                with CACHE_DB_LOCK:
+                    ensure_cache_tables(conn.cursor())
+                    conn.execute(
+                        'INSERT OR REPLACE INTO crf_predictor_skips (path, size, mtime_ns, inode, encoder, crf, target_vmaf, predicted_vmaf, '
+                        'decided_at, measured_vmaf, checked_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, NULL)',
+                        (ProbeCache.path_key(input_path),) + tuple(identity)
+                        + (encoder, float(prediction['crf']), float(target_vmaf), float(prediction['vmaf']), time.time())
+                    )
+                    conn.commit()
+            except sqlite3.Error as e:
+                load_debug_log(f"[CrfPredictor] Kihagyás rögzítés hiba: {e}")
 
-        vdub_success = export_last_frame_with_vdub2(
-            video_path,
-            last_frame_path,
-            frame_count_hint=encoded_frame_count,
-            stop_event=stop_event
-        )
+    def verify_skip(self, input_path, encoder_type, crf, measured_vmaf, logger=None):
+        """Kihagyott keresés becslésének ellenőrzése a kimenet teljes VMAF mérésével (forrásonként egyszer).
 
-        if vdub_success:
-            try:
-                with Image.open(last_frame_path) as last_img:
-                    last_img.verify()
-                print(f"    ✓ Utolsó frame beolvasható VirtualDub2-vel ({last_frame_path.name})")
-                last_frame_ok = True
-            except Exception as exc:
-                print(f"    ✗ VirtualDub2 által exportált utolsó frame sérült: {exc}")
-                last_frame_ok = False
-        else:
-            print("    ⚠ VirtualDub2 nem tudta kinyerni az utolsó frame-et – FFmpeg fallback")
+        Csak akkor számít, ha a forrás azóta nem változott, és a kimenet a becsült CRF-fel, ugyanazzal az
+        encoderrel készült (túlméretes kimenet utáni újrakódolás más CRF-et mér).
 
-        def run_last_frame_attempt(cmd, description):
-            print(description)
-            print(f"      Parancs: {' '.join(cmd)}")
+        Args:
+            encoder_type: A kimenet Settings tag-jéből ('nvenc' / 'svt-av1').
+            crf: A kimenet CQ/CRF értéke.
+            measured_vmaf: A teljes (nem mintavételes) VMAF mérés.
+        """
+        if measured_vmaf is None or crf is None:
+            return
+        key = ProbeCache.path_key(input_path)
+        identity = ProbeCache.file_identity(input_path)
+        with cache_db_connection() as conn:
+            if conn is None:
+                return
             try:
-                if stop_event is not None and stop_event.is_set():
-                    raise EncodingStopped()
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=240, startupinfo=get_startup_info())
-                if result.stdout:
-                    print("      FFmpeg STDOUT:")
-                    print("        " + "\n        ".join(result.stdout.strip().splitlines()))
-                if result.stderr:
-                    print("      FFmpeg STDERR:")
-                    print("        " + "\n        ".join(result.stderr.strip().splitlines()))
-                if result.returncode != 0:
-                    err_text = result.stderr.strip() or result.stdout.strip() or str(result.returncode)
-                    print(f"    ✗ FFmpeg hiba: {err_text}")
-                    return "error"
-                if not last_frame_path.exists():
-                    print("    ⚠ Utolsó frame fájl nem készült el – ellenőrzés kihagyva")
-                    try:
-                        parent_dir = Path(last_frame_path).parent
-                        if parent_dir.exists():
-                            contents = os.listdir(parent_dir)
-                            print(f"      ⚠ Cél könyvtár tartalma: {contents}")
-                    except OSError:
-                        pass
-                    return "missing"
-                try:
-                    with Image.open(last_frame_path) as last_img:
-                        last_img.verify()
-                    print(f"    ✓ Utolsó frame beolvasható ({last_frame_path.name})")
-                    return "success"
-                except Exception as exc:
-                    print(f"    ✗ Utolsó frame beolvasási hiba: {exc}")
-                    return "error"
-            except EncodingStopped:
-                raise
-            except Exception as exc:
-                print(f"    ✗ Utolsó frame export hibázott: {exc}")
-                return "error"
-
-        if not last_frame_ok:
-            primary_cmd = [
-                FFMPEG_PATH, '-hide_banner', '-loglevel', 'error', '-y',
-                '-sseof', '-0.1',
-                '-i', os.fspath(video_path),
-                '-frames:v', '1',
-                os.fspath(last_frame_path)
-            ]
-            attempt_result = run_last_frame_attempt(primary_cmd, "    FFmpeg utolsó frame export indítása...")
-            if attempt_result == "success":
-                last_frame_ok = True
-            else:
-                if attempt_result == "missing":
-                    last_frame_warning = True
-                fallback_cmd = [
-                    FFMPEG_PATH, '-hide_banner', '-loglevel', 'error', '-y',
-                    '-i', os.fspath(video_path),
-                    '-vf'
-                ]
-                encoded_count = encoded_frame_count
-                if encoded_count and encoded_count > 0:
-                    last_index = max(encoded_count - 1, 0)
-                    fallback_cmd.append(f"select=eq(n\\,{last_index})")
-                else:
-                    fallback_cmd.append("select=eq(n\\,n)")
-                fallback_cmd.extend([
-                    '-vsync', '0',
-                    '-frames:v', '1',
-                    os.fspath(last_frame_path)
-                ])
-                fallback_result = run_last_frame_attempt(fallback_cmd, "    FFmpeg utolsó frame export (végigfutás)...")
-                if fallback_result == "success":
-                    last_frame_ok = True
-                    last_frame_warning = False
-                elif fallback_result == "missing":
-                    last_frame_warning = True
-                else:
-                    last_frame_ok = False
+                row = conn.execute(
+                    'SELECT size, mtime_ns, inode, encoder, crf, target_vmaf, predicted_vmaf FROM crf_predictor_skips '
+                    'WHERE path = ? AND checked_at IS NULL', (key,)
+                ).fetchone()
+            except sqlite3.Error:
+                return
+            if row is None or identity is None or tuple(row[:3]) != tuple(identity):
+                return
+            encoder, predicted_crf, target_vmaf, predicted_vmaf = row[3:]
+            if {'av1_nvenc': 'nvenc'}.get(encoder, encoder) != encoder_type or int(predicted_crf) != int(crf):
+                return
+            try:
+                with CACHE_DB_LOCK:
+                    conn.execute('UPDATE crf_predictor_skips SET measured_vmaf = ?, checked_at = ? WHERE path = ?',
+                                 (float(measured_vmaf), time.time(), key))
+                    conn.commit()
+            except sqlite3.Error as e:
+                load_debug_log(f"[CrfPredictor] Kihagyás ellenőrzés írás hiba: {e}")
+                return
+        met = float(measured_vmaf) >= target_vmaf
+        checked, hits = self.skip_check_rate(encoder)
+        message = (f"🔎 CRF előrejelző ellenőrzés ({encoder}): {Path(input_path).name} - CRF {format_localized_number(predicted_crf, decimals=1)}, "
+                   f"becsült VMAF ≈{format_localized_number(predicted_vmaf, decimals=1)}, mért {format_metric_value(measured_vmaf)} "
+                   f"(cél {format_localized_number(target_vmaf, decimals=1)}) {'✓' if met else '✗'} | kihagyott keresések: {hits}/{checked} megfelelt")
+        print(message)
+        if logger:
+            try:
+                logger.write(message + "\n")
+                logger.flush()
+            except Exception:
+                pass
 
-        if not last_frame_ok and not last_frame_warning:
-            is_valid = False
+    @staticmethod
+    def skip_check_rate(encoder):
+        """A kihagyott keresések ellenőrzött és megfelelt darabszáma: (checked, hits)."""
+        with cache_db_connection() as conn:
+            if conn is None:
+                return 0, 0
+            try:
+                row = conn.execute(
+                    'SELECT COUNT(*), COALESCE(SUM(measured_vmaf >= target_vmaf), 0) FROM crf_predictor_skips '
+                    'WHERE encoder = ? AND checked_at IS NOT NULL', (encoder,)
+                ).fetchone()
+            except sqlite3.Error:
+                return 0, 0
+        return int(row[0]), int(row[1])
+
+    def _encoder_stats(self, encoder):
+        """Az encoder statisztikája (első híváskor a crf_predictor_stats táblából); self._lock alatt hívandó."""
+        if self._stats is None:
+            self._stats = {}
+            with cache_db_connection() as conn:
+                if conn is not None:
+                    try:
+                        for row in conn.execute('SELECT encoder, predictions, hits, skips, full_searches, full_search_seconds, seconds_saved '
+                                                'FROM crf_predictor_stats').fetchall():
+                            self._stats[row[0]] = dict(zip(('predictions', 'hits', 'skips', 'full_searches', 'full_search_seconds', 'seconds_saved'),
+                                                           row[1:]))
+                    except sqlite3.Error:
+                        pass
+        return self._stats.setdefault(encoder, {'predictions': 0, 'hits': 0, 'skips': 0, 'full_searches': 0,
+                                                'full_search_seconds': None, 'seconds_saved': 0.0})
 
-        print(f"\n{'='*60}")
-        print(f"VALIDÁCIÓ EREDMÉNYE:")
-        file_size_mb = file_size / (1024**2)
-        print(f"  Fájlméret: OK ({format_localized_number(file_size_mb, decimals=2)} MB)")
-        print(f"  VirtualDub2 frame export: {len(extracted_frames)}/4 OK")
-        success_percent = format_localized_number(success_rate * 100, decimals=1)
-        print(f"  Valódi tartalom: {valid_frames}/{len(extracted_frames)} ({success_percent}%)")
-        print(f"  Fekete/üres: {black_frames}")
-        print(f"  Követelmény: ≥{min_success_rate*100:.0f}% valódi tartalom")
-        if source_frame_count is not None or encoded_frame_count is not None:
-            src_display = str(source_frame_count) if source_frame_count is not None else "ismeretlen"
-            dst_display = str(encoded_frame_count) if encoded_frame_count is not None else "ismeretlen"
-            print(f"  Frame-ek (forrás/cél): {src_display} / {dst_display}")
-            if source_frame_count and encoded_frame_count:
-                diff = encoded_frame_count - source_frame_count
-                status_text = "⚠ eltérés" if frame_count_warning else "OK"
-                print(f"  Frame különbség: {diff:+d} ({status_text})")
-        if last_frame_warning:
-            print(f"  Utolsó frame: ⚠ Nem sikerült ellenőrizni (fájl nem jött létre)")
+    def report(self, encoder, prediction, crf, seconds, logger=None):
+        """Keresés eredményének könyvelése és logolása (találati arány, megtakarított idő).
+
+        Args:
+            prediction: predict() eredménye (None = becslés nélküli teljes keresés - az átlagidőt méri).
+            crf: A talált CRF (None, ha a keresés nem talált megfelelőt).
+            seconds: A keresés ideje (kihagyott keresésnél 0).
+        """
+        with self._lock:
+            stats = self._encoder_stats(encoder)
+            baseline = stats['full_search_seconds']
+            if prediction is None:
+                runs = stats['full_searches']
+                stats['full_search_seconds'] = seconds if baseline is None else (baseline * runs + seconds) / (runs + 1)
+                stats['full_searches'] = runs + 1
+                hit = None
+            elif prediction['skip']:
+                stats['skips'] += 1
+                hit = None
+                if baseline is not None:
+                    stats['seconds_saved'] += baseline
+            else:
+                stats['predictions'] += 1
+                hit = crf is not None and prediction['window'][0] <= crf <= prediction['window'][1]
+                if hit:
+                    stats['hits'] += 1
+                if baseline is not None:
+                    stats['seconds_saved'] += max(0.0, baseline - seconds)
+            snapshot = dict(stats)
+        with cache_db_connection() as conn:
+            if conn is not None:
+                try:
+                    with CACHE_DB_LOCK:
+                        ensure_cache_tables(conn.cursor())
+                        conn.execute(
+                            'INSERT OR REPLACE INTO crf_predictor_stats (encoder, predictions, hits, skips, full_searches, full_search_seconds, '
+                            'seconds_saved, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                            (encoder, snapshot['predictions'], snapshot['hits'], snapshot['skips'], snapshot['full_searches'],
+                             snapshot['full_search_seconds'], snapshot['seconds_saved'], time.time())
+                        )
+                        conn.commit()
+                except sqlite3.Error as e:
+                    load_debug_log(f"[CrfPredictor] Statisztika írás hiba: {e}")
+        if prediction is None:
+            return
+        if prediction['skip']:
+            checked, checked_hits = self.skip_check_rate(encoder)
+            outcome = (f"keresés kihagyva, CRF {format_localized_number(prediction['crf'], decimals=1)}, "
+                       f"becsült VMAF ≈{format_localized_number(prediction['vmaf'], decimals=1)} "
+                       f"(ellenőrzött kihagyások: {checked_hits}/{checked} megfelelt)")
         else:
-            print(f"  Utolsó frame: {'OK' if last_frame_ok else '✗ HIBA'}")
-        print(f"  Végső eredmény: {'✓ ÉRVÉNYES' if is_valid else '✗ ÉRVÉNYTELEN'}")
-        print(f"{'='*60}")
-        
-        debug_pause(
-            f"Validáció kész: {'ÉRVÉNYES' if is_valid else 'ÉRVÉNYTELEN'} ({valid_frames}/{len(extracted_frames)} jó)",
-            "Temp könyvtár törlése" if not DEBUG_MODE else "Temp MEGŐRIZVE (debug)",
-            f"Temp: {temp_dir}, Videó: {video_path}"
-        )
-        
-        return is_valid
-    except EncodingStopped:
-        raise
-    finally:
-        if not DEBUG_MODE:
+            found = format_localized_number(crf, decimals=1) if crf is not None else "-"
+            outcome = (f"ablak {format_localized_number(prediction['window'][0], decimals=0)}-{format_localized_number(prediction['window'][1], decimals=0)}, "
+                       f"talált CRF {found} {'✓' if hit else '✗'}")
+        rate = f"{snapshot['hits']}/{snapshot['predictions']}"
+        if snapshot['predictions']:
+            rate += f" ({snapshot['hits'] / snapshot['predictions'] * 100:.0f}%)"
+        saved = format_seconds_hms(snapshot['seconds_saved']) if snapshot['full_search_seconds'] is not None else "-"
+        message = (f"📈 CRF előrejelző ({encoder}): becslés {format_localized_number(prediction['estimate'], decimals=1)} "
+                   f"({prediction['neighbors']} szomszéd, szórás {format_localized_number(prediction['spread'], decimals=1)}), {outcome} | "
+                   f"találati arány {rate}, kihagyott keresés: {snapshot['skips']}, megtakarított idő ≈ {saved}")
+        print(message)
+        if logger:
             try:
-                shutil.rmtree(temp_dir)
-            except (OSError, PermissionError, FileNotFoundError):
+                logger.write(message + "\n")
+                logger.flush()
+            except Exception:
                 pass
-        else:
-            print(f"  🛑 DEBUG: Temp MEGŐRIZVE: {temp_dir}")
 
-def find_video_files(root_dir: Union[str, Path], include_av1: bool = False) -> List[Path]:
-    """Recursively find video files in a directory.
-    
-    Args:
-        root_dir: Path to the root directory.
-        include_av1: If False, skips files ending with .av1.
-        
-    Returns:
-        list: List of found video files as Path objects.
-    """
-    video_files = []
-    root_path = Path(root_dir)
-    
-    try:
-        for file_path in root_path.rglob('*'):
-            try:
-                if file_path.is_file() and file_path.suffix.lower() in VIDEO_EXTENSIONS:
-                    # Kihagyjuk a .ab-av1-* almappákban lévő fájlokat (ab-av1 temp fájlok)
-                    path_parts = file_path.parts
-                    if any('.ab-av1-' in part for part in path_parts):
-                        continue
-                    
-                    if include_av1:
-                        # Ha include_av1=True, akkor minden videó fájlt hozzáadunk
-                        video_files.append(file_path)
-                    else:
-                        # Alapértelmezett: kihagyjuk az .av1 fájlokat
-                        if not file_path.stem.endswith('.av1'):
-                            video_files.append(file_path)
-            except (OSError, PermissionError):
-                # Egyedi fájl hozzáférési hiba - folytatjuk a következővel
-                continue
-    except (OSError, PermissionError, FileNotFoundError):
-        # Root könyvtár hozzáférési hiba - üres lista visszaadása
-        return []
-    
-    return video_files
 
-def get_output_filename(input_path: Path, source_root: Optional[Union[str, Path]], dest_root: Optional[Union[str, Path]]) -> Optional[Path]:
-    """Determine the output file path.
-    
-    Args:
-        input_path: Path to the input video (Path).
-        source_root: Source root directory (Path or None).
-        dest_root: Destination root directory (Path or None).
-        
-    Returns:
-        Path: Output file path (with .av1.mkv extension), or None on error.
+CRF_PREDICTOR = CrfPredictor()
+
+
+class SkipEncodePredictor:
+    """Kódolás előtti döntés: a várhatóan nem zsugorodó forrás CRF keresés és kódolás nélkül másolódik.
+
+    Az első biztos jelzés dönt:
+      1. A forrás saját mért CRF görbéje (CRF_SAMPLES): ha van a küszöbnek (CRF_SEARCH_MIN_VMAF, max méret%)
+         megfelelő pont → kódolás; ha a küszöb határán is túl nagy a méret → kihagyás.
+      2. Hasonló korábbi források (CrfPredictor szomszédok, a másolt sorokkal együtt): ha súlyozottan
+         legalább SKIP_ENCODE_HOPELESS_RATIO hányaduk nem lett kisebb → kihagyás.
+      3. Történet nélkül: már hatékony codec alacsony bit/pixel/frame értékkel (SKIP_ENCODE_BPP_THRESHOLDS).
+
+    A megspórolt idő = kihagyott tartalom hossza × mért kódolási idő / tartalom másodperc (encoderenként).
     """
-    try:
-        if dest_root is None:
-            return input_path.parent / f"{input_path.stem}.av1.mkv"
-        else:
-            source_path = Path(source_root)
-            dest_path = Path(dest_root)
-            relative_path = input_path.relative_to(source_path)
-            new_filename = f"{input_path.stem}.av1.mkv"
-            output_path = dest_path / relative_path.parent / new_filename
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            return output_path
-    except (OSError, PermissionError, ValueError) as e:
-        # ValueError: relative_to lehet hogy hibázik, ha input_path nincs source_path alatt
-        # OSError/PermissionError: mkdir hiba
-        if LOAD_DEBUG:
-            load_debug_log(f"[get_output_filename] Hiba output path generáláskor: {e}")
+
+    STAT_FIELDS = ('skipped', 'skipped_content_seconds', 'encodes', 'encode_seconds', 'encoded_content_seconds',
+                   'oversized', 'oversized_seconds')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = None  # encoder -> statisztika dict (skip_encode_stats)
+
+    def assess(self, input_path, encoder, max_encoded_percent, sample_key=None):
+        """A kihagyás indoka (str), ha a forrás reménytelen, különben None.
+
+        Args:
+            sample_key: A forrás CrfSampleTable kulcsa (a mért görbe a legerősebb jelzés).
+        """
+        if not SKIP_ENCODE_PREDICTOR_ENABLED:
+            return None
+        if sample_key is not None:
+            if any(vmaf >= CRF_SEARCH_MIN_VMAF and size_pct <= max_encoded_percent for _, vmaf, size_pct in CRF_SAMPLES.samples(sample_key)):
+                return None
+            if CRF_SAMPLES.resolve(sample_key, CRF_SEARCH_MIN_VMAF, max_encoded_percent)[0] == 'skip':
+                return (f"a mért CRF görbén VMAF {format_localized_number(CRF_SEARCH_MIN_VMAF, decimals=1)} mellett is "
+                        f"{format_localized_number(max_encoded_percent, decimals=0)}% feletti méret")
+        features = CRF_PREDICTOR.source_features(input_path)
+        if features is None:
+            return None
+        neighbors = CRF_PREDICTOR.neighbors(features, ('av1_nvenc', 'svt-av1', 'copy'))
+        if len(neighbors) >= SKIP_ENCODE_MIN_NEIGHBORS:
+            weights = [1.0 / (dist + 0.25) for dist, _ in neighbors]
+            not_shrunk = sum(weight for weight, (_, row) in zip(weights, neighbors)
+                             if row[4] is not None and row[4] >= SKIP_ENCODE_SIZE_PERCENT)
+            ratio = not_shrunk / sum(weights)
+            if ratio >= SKIP_ENCODE_HOPELESS_RATIO:
+                return f"{len(neighbors)} hasonló korábbi forrás {ratio * 100:.0f}%-a nem lett kisebb"
+            return None
+        codec, bpp = features[0], 2 ** features[2]
+        threshold = SKIP_ENCODE_BPP_THRESHOLDS.get(codec)
+        if threshold is not None and bpp < threshold:
+            return f"már hatékony {codec} forrás ({bpp:.3f} bit/pixel/frame < {threshold:g})"
         return None
 
+    def _encoder_stats(self, encoder):
+        """Az encoder statisztikája (első híváskor a skip_encode_stats táblából); self._lock alatt hívandó."""
+        if self._stats is None:
+            self._stats = {}
+            with cache_db_connection() as conn:
+                if conn is not None:
+                    try:
+                        for row in conn.execute(f'SELECT encoder, {", ".join(self.STAT_FIELDS)} FROM skip_encode_stats').fetchall():
+                            self._stats[row[0]] = {field: value or 0 for field, value in zip(self.STAT_FIELDS, row[1:])}
+                    except sqlite3.Error:
+                        pass
+        return self._stats.setdefault(encoder, {field: 0 for field in self.STAT_FIELDS})
+
+    def _update(self, encoder, **increments):
+        with self._lock:
+            stats = self._encoder_stats(encoder)
+            for field, value in increments.items():
+                stats[field] += value
+            snapshot = dict(stats)
+        with cache_db_connection() as conn:
+            if conn is not None:
+                try:
+                    with CACHE_DB_LOCK:
+                        ensure_cache_tables(conn.cursor())
+                        conn.execute(
+                            f'INSERT OR REPLACE INTO skip_encode_stats (encoder, {", ".join(self.STAT_FIELDS)}, updated_at) '
+                            f'VALUES ({", ".join("?" * (len(self.STAT_FIELDS) + 2))})',
+                            (encoder,) + tuple(snapshot[field] for field in self.STAT_FIELDS) + (time.time(),)
+                        )
+                        conn.commit()
+                except sqlite3.Error as e:
+                    load_debug_log(f"[SkipEncodePredictor] Statisztika írás hiba: {e}")
+        return snapshot
+
+    def record_encode(self, encoder, content_seconds, seconds, oversized=False):
+        """Egy teljes kódolás ideje (a sebesség becsléshez); oversized: a kimenet nem lett kisebb a forrásnál."""
+        if not content_seconds or seconds <= 0:
+            return
+        increments = {'encodes': 1, 'encode_seconds': seconds, 'encoded_content_seconds': content_seconds}
+        if oversized:
+            increments.update(oversized=1, oversized_seconds=seconds)
+        self._update(encoder, **increments)
 
-def get_copy_filename(input_path: Path, source_root: Optional[Union[str, Path]], dest_root: Optional[Union[str, Path]]) -> Optional[Path]:
-    """Generate output path with ORIGINAL extension (for copy fallback).
-    
-    Used when encoding fails and video must be copied unchanged.
-    Preserves original filename and extension (e.g. video.mp4 stays video.mp4).
-    
-    Args:
-        input_path: Path to input video (Path).
-        source_root: Source root directory (Path or None).
-        dest_root: Destination root directory (Path or None).
-        
-    Returns:
-        Path: Output path with original extension, or None on error.
-    """
-    try:
-        if dest_root is None:
-            # Same directory: keep original path
-            return input_path
+    @staticmethod
+    def _claim_decision(input_path, encoder, reason, content_seconds):
+        """A kihagyási döntés rögzítése; False, ha ugyanerre a (változatlan) fájlra már rögzítve volt.
+
+        Az NVENC → SVT továbbadás után az SVT worker ugyanazt a forrást újra értékeli - a statisztika
+        (kihagyott fájlok, megspórolt idő) így fájlonként csak egyszer nő.
+        """
+        identity = ProbeCache.file_identity(input_path)
+        if identity is None:
+            return True
+        key = ProbeCache.path_key(input_path)
+        with cache_db_connection() as conn:
+            if conn is None:
+                return True
+            try:
+                with CACHE_DB_LOCK:
+                    ensure_cache_tables(conn.cursor())
+                    row = conn.execute('SELECT size, mtime_ns, inode FROM skip_encode_decisions WHERE path = ?', (key,)).fetchone()
+                    if row is not None and tuple(row) == tuple(identity):
+                        return False
+                    conn.execute(
+                        'INSERT OR REPLACE INTO skip_encode_decisions (path, size, mtime_ns, inode, encoder, reason, content_seconds, decided_at) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                        (key, identity[0], identity[1], identity[2], encoder, reason, content_seconds, time.time())
+                    )
+                    conn.commit()
+            except sqlite3.Error as e:
+                load_debug_log(f"[SkipEncodePredictor] Döntés írás hiba: {e}")
+        return True
+
+    def record_skip(self, input_path, encoder, reason, logger=None):
+        """Kihagyott kódolás könyvelése (fájlonként egyszer) és logolása (kihagyott fájlok, megspórolt kódolási idő)."""
+        try:
+            content_seconds = probe_media(input_path).duration or 0.0
+        except (OSError, ValueError, subprocess.SubprocessError):
+            content_seconds = 0.0
+        if self._claim_decision(input_path, encoder, reason, content_seconds):
+            stats = self._update(encoder, skipped=1, skipped_content_seconds=content_seconds)
+            counted = ""
         else:
-            source_path = Path(source_root)
-            dest_path = Path(dest_root)
-            relative_path = input_path.relative_to(source_path)
-            # Preserve original filename AND extension
-            output_path = dest_path / relative_path
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            return output_path
-    except (OSError, PermissionError, ValueError) as e:
-        # ValueError: relative_to hiba
-        # OSError/PermissionError: mkdir hiba
-        if LOAD_DEBUG:
-            load_debug_log(f"[get_copy_filename] Hiba copy path generáláskor: {e}")
-        return None
+            with self._lock:
+                stats = dict(self._encoder_stats(encoder))
+            counted = " (már elszámolva)"
+        if stats['encoded_content_seconds']:
+            speed = stats['encode_seconds'] / stats['encoded_content_seconds']
+            avoided = format_seconds_hms(stats['skipped_content_seconds'] * speed)
+            this_file = format_seconds_hms(content_seconds * speed)
+        else:
+            avoided = this_file = "-"
+        message = (f"⏭ KÓDOLÁS KIHAGYVA ({encoder}): {input_path.name} - {reason} → másolás (≈ {this_file} kódolás){counted}\n"
+                   f"   Kihagyott fájlok: {stats['skipped']}, megspórolt kódolási idő ≈ {avoided} | "
+                   f"túlméretes kódolások: {stats['oversized']} ({format_seconds_hms(stats['oversized_seconds'])})")
+        print(message)
+        if logger:
+            try:
+                logger.write(message + "\n")
+                logger.flush()
+            except Exception:
+                pass
 
 
-def is_misnamed_copy(source_path, dest_av1_path):
-    """Check if .av1.mkv file is actually unchanged copy of source.
-    
-    Detects cases where a video was copied (not encoded) but incorrectly
-    saved with .av1.mkv extension. Uses file size comparison as the
-    primary indicator.
-    
-    Args:
-        source_path: Original source video path (Path).
-        dest_av1_path: Destination .av1.mkv file path (Path).
-        
-    Returns:
-        bool: True if dest file is unchanged copy (same size as source).
+SKIP_ENCODE_PREDICTOR = SkipEncodePredictor()
+
+
+NATIVE_CRF_NVENC_SLOTS = threading.BoundedSemaphore(NATIVE_CRF_NVENC_SESSIONS)  # Párhuzamos NVENC minta kódolások (minden worker közös)
+
+
+class NativeCrfSearch:
+    """Beépített CRF keresés: egyszer kivágott, cache-elt minta klipek + párhuzamos minta kódolás + libvmaf.
+
+    A minták kulcskockához igazított stream copy-val készülnek (NATIVE_CRF_SAMPLE_CACHE_DIR, fájl
+    azonosító szerinti alkönyvtár), így ugyanarra a forrásra minden további keresés vágás nélkül indul.
+    Egy CRF mérése: az összes minta kódolása (NVENC: NATIVE_CRF_NVENC_SESSIONS, SVT-AV1: a kiosztott
+    magokból) és libvmaf pontozása; a VMAF a minták összes frame-jének átlaga, a méret% a kódolt és
+    a forrás minták arányából jön (mint az ab-av1 predicted size). A mért pontok a CRF_SAMPLES
+    táblába kerülnek ('native' engine kulccsal), a következő CRF-et a CRF→VMAF görbén szelő módszer
+    (két pont közti lineáris interpoláció) adja - vak felezés helyett.
     """
-    # Check both files exist
-    if not source_path.exists() or not dest_av1_path.exists():
-        return False
-    
-    # Check extension is .av1.mkv
-    if dest_av1_path.suffix.lower() != '.mkv':
-        return False
-    if '.av1' not in dest_av1_path.stem:
-        return False
-    
-    # Compare file sizes (most reliable indicator of unchanged copy)
-    try:
-        source_size = source_path.stat().st_size
-        dest_size = dest_av1_path.stat().st_size
-        
-        # Same size = likely unchanged copy  
-        # Encoded files are typically 50-75% of original size
-        return source_size == dest_size
-    except (OSError, PermissionError):
-        return False
 
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dir_locks = {}
+
+    @staticmethod
+    def available(encoder):
+        """Futtatható-e a natív keresés (ffmpeg libvmaf + a kért encoder)."""
+        if not TOOL_CAPABILITIES.ffmpeg():
+            return False
+        ffmpeg_encoder = 'libsvtav1' if encoder == 'svt-av1' else 'av1_nvenc'
+        return TOOL_CAPABILITIES.has_filter('libvmaf') and TOOL_CAPABILITIES.has_encoder(ffmpeg_encoder)
+
+    @staticmethod
+    def cache_root():
+        """A minta klip cache gyökérkönyvtára."""
+        if NATIVE_CRF_SAMPLE_CACHE_DIR:
+            return Path(NATIVE_CRF_SAMPLE_CACHE_DIR)
+        return Path(tempfile.gettempdir()) / 'av1_crf_samples'
+
+    @staticmethod
+    def sample_plan(duration_seconds):
+        """[(start, seconds)] minta lista; [(0.0, None)], ha a teljes stream egy minta (rövid videó)."""
+        if not duration_seconds or duration_seconds <= 0:
+            return [(0.0, None)]
+        count = int(round(duration_seconds / NATIVE_CRF_SAMPLE_EVERY_SECONDS))
+        count = max(NATIVE_CRF_MIN_SAMPLES, min(NATIVE_CRF_MAX_SAMPLES, count))
+        if duration_seconds < count * NATIVE_CRF_SAMPLE_SECONDS * 2:
+            return [(0.0, None)]
+        # Egyenlő idősávok közepe (determinisztikus, mint az ab-av1 egyenletes mintavétele)
+        stratum = duration_seconds / count
+        return [(max(0.0, (index + 0.5) * stratum - NATIVE_CRF_SAMPLE_SECONDS / 2), NATIVE_CRF_SAMPLE_SECONDS)
+                for index in range(count)]
+
+    @staticmethod
+    def _run(cmd, job, stop_event, cpus=None, abort_event=None):
+        """ffmpeg futtatás leállítás figyeléssel; hibánál RuntimeError az stderr végével."""
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            startupinfo=get_startup_info(),
+            **child_process_kwargs()
+        )
+        apply_process_placement(process, job, cpus=cpus)
+        with ACTIVE_PROCESSES_LOCK:
+            ACTIVE_PROCESSES.append(process)
+        try:
+            while True:
+                try:
+                    _, stderr_text = process.communicate(timeout=0.5)
+                    break
+                except subprocess.TimeoutExpired:
+                    if stop_event.is_set() or (abort_event is not None and abort_event.is_set()):
+                        terminate_process_tree(process)
+                        process.wait()
+                        if stop_event.is_set():
+                            raise EncodingStopped()
+                        raise RuntimeError("megszakítva (párhuzamos minta hiba)")
+        finally:
+            with ACTIVE_PROCESSES_LOCK:
+                if process in ACTIVE_PROCESSES:
+                    ACTIVE_PROCESSES.remove(process)
+        if process.returncode != 0:
+            raise RuntimeError(f"ffmpeg hiba (rc={process.returncode}): {(stderr_text or '').strip()[-300:]}")
+
+    def _dir_lock(self, name):
+        with self._lock:
+            return self._dir_locks.setdefault(name, threading.Lock())
+
+    def prepare_samples(self, input_path, stop_event, logger=None):
+        """A forrás minta klipjei (cache-ből, vagy most kivágva).
+
+        Returns:
+            list: A minta klipek útvonalai.
+        """
+        input_path = Path(input_path)
+        stat_result = input_path.stat()
+        input_str = os.fspath(input_path.absolute())
+        identity = f"{input_str}|{stat_result.st_size}|{stat_result.st_mtime_ns}|{NATIVE_CRF_SAMPLE_SECONDS:g}|{NATIVE_CRF_SAMPLE_EVERY_SECONDS:g}"
+        digest = hashlib.sha1(identity.encode('utf-8')).hexdigest()[:20]
+        sample_dir = self.cache_root() / digest
+        manifest_path = sample_dir / 'samples.json'
+        with self._dir_lock(digest):
+            try:
+                names = json.loads(manifest_path.read_text(encoding='utf-8'))['samples']
+                paths = [sample_dir / name for name in names]
+                if paths and all(path.exists() for path in paths):
+                    os.utime(sample_dir)
+                    return paths
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+
+            shutil.rmtree(sample_dir, ignore_errors=True)
+            sample_dir.mkdir(parents=True, exist_ok=True)
+            duration_seconds, _ = get_video_info(input_path)
+            plan = self.sample_plan(duration_seconds)
+            if logger:
+                logger.write(f"✂ Natív CRF keresés: {len(plan)} minta klip kivágása (stream copy) → {sample_dir}\n")
+                logger.flush()
+            names = []
+            for index, (start, seconds) in enumerate(plan):
+                name = f"sample_{index:02d}.mkv"
+                cmd = [FFMPEG_PATH, '-hide_banner', '-nostdin', '-v', 'error', '-y']
+                if seconds is not None:
+                    cmd += ['-ss', f"{start:.3f}"]
+                cmd += ['-i', input_str]
+                if seconds is not None:
+                    cmd += ['-t', f"{seconds:.3f}"]
+                cmd += ['-map', '0:v:0', '-c', 'copy', '-avoid_negative_ts', 'make_zero', os.fspath(sample_dir / name)]
+                self._run(cmd, 'search', stop_event)
+                names.append(name)
+            manifest_path.write_text(json.dumps({'source': input_str, 'size': stat_result.st_size,
+                                                 'mtime_ns': stat_result.st_mtime_ns, 'samples': names}), encoding='utf-8')
+        self._prune_cache(keep=sample_dir)
+        return [sample_dir / name for name in names]
+
+    def _prune_cache(self, keep=None):
+        """A legrégebben használt minta könyvtárak törlése NATIVE_CRF_SAMPLE_CACHE_MAX_BYTES felett."""
+        entries = []
+        try:
+            for entry in self.cache_root().iterdir():
+                if not entry.is_dir():
+                    continue
+                size = sum(child.stat().st_size for child in entry.iterdir() if child.is_file())
+                entries.append((entry.stat().st_mtime, size, entry))
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda item: item[0]):
+            if total <= NATIVE_CRF_SAMPLE_CACHE_MAX_BYTES:
+                break
+            if keep is not None and entry == keep:
+                continue
+            lock = self._dir_lock(entry.name)
+            if not lock.acquire(blocking=False):
+                continue
+            try:
+                shutil.rmtree(entry, ignore_errors=True)
+            finally:
+                lock.release()
+            total -= size
+
+    @staticmethod
+    def _parallelism(encoder, sample_count, svt_cores):
+        """(párhuzamos minták, SVT magok / minta (video_encoder_args lp szintre képezi), libvmaf szálak / minta)."""
+        if encoder == 'av1_nvenc':
+            parallel = max(1, min(sample_count, NATIVE_CRF_NVENC_SESSIONS))
+            return parallel, None, max(1, get_metric_core_budget(svt_cores) // parallel)
+        cpu_count = multiprocessing.cpu_count()
+        cores = max(1, min(int(svt_cores), cpu_count)) if svt_cores else cpu_count
+        parallel = max(1, min(sample_count, cores // NATIVE_CRF_SVT_MIN_CORES_PER_SAMPLE))
+        per_sample = max(1, cores // parallel)
+        return parallel, per_sample, per_sample
+
+    def evaluate(self, samples, encoder, crf, resolution, stop_event, logger=None, svt_preset=2, svt_cores=None, cpus=None):
+        """Egy CRF mérése az összes mintán.
+
+        Returns:
+            tuple: (vmaf, size_pct) - a minták frame-jeinek átlag VMAF-ja és a becsült méret%.
+        """
+        parallel, svt_lp, vmaf_threads = self._parallelism(encoder, len(samples), svt_cores)
+        filtergraph = _combined_metrics_filtergraph(['VMAF'], resolution, resolution, vmaf_threads,
+                                                    libvmaf_extra="log_fmt=json:log_path={log_name}")
+        work_dir = tempfile.mkdtemp(prefix='av1_crf_native_')
+        abort_event = threading.Event()
+
+        def _measure_sample(index):
+            sample_str = os.fspath(samples[index])
+            encoded_path = Path(work_dir) / f"crf_{index:02d}.mkv"
+            cmd = [FFMPEG_PATH, '-hide_banner', '-nostdin', '-v', 'error', '-y', '-i', sample_str, '-map', '0:v:0']
+            cmd += video_encoder_args(encoder, crf, svt_preset=svt_preset, svt_cores=svt_lp) + [os.fspath(encoded_path)]
+            if encoder == 'av1_nvenc':
+                with NATIVE_CRF_NVENC_SLOTS:
+                    self._run(cmd, 'search', stop_event, cpus=cpus, abort_event=abort_event)
+            else:
+                self._run(cmd, 'search', stop_event, cpus=cpus, abort_event=abort_event)
+            log_name = f"vmaf_{index:02d}.json"
+            frames = _run_libvmaf_clip(
+                sample_str, os.fspath(encoded_path), 0.0, None, filtergraph.replace('{log_name}', log_name), work_dir, log_name,
+                stop_event, abort_event=abort_event, label=f"CRF {crf:g} minta {index + 1}/{len(samples)}", cpus=cpus)
+            if not frames:
+                raise RuntimeError(f"minta {index + 1}: üres VMAF log")
+            scores = np.fromiter((frame['metrics']['vmaf'] for frame in frames), dtype=np.float64, count=len(frames))
+            return scores, samples[index].stat().st_size, encoded_path.stat().st_size
 
-def rename_misnamed_copy_file(dest_av1_path, source_path, logger=None):
-    """Rename misnamed .av1.mkv copy to original extension.
-    
-    Takes a .av1.mkv file that is actually an unchanged copy and renames
-    it to match the original source file's extension.
-    
-    Args:
-        dest_av1_path: Current .av1.mkv file path (Path).
-        source_path: Original source file for extension reference (Path).
-        logger: Optional logger for console output (ConsoleLogger).
-        
-    Returns:
-        Path: New path with original extension, or None on error.
-    """
-    try:
-        # Generate new name with original extension
-        original_ext = source_path.suffix
-        # Remove .av1 from stem
-        new_stem = dest_av1_path.stem.replace('.av1', '')
-        new_name = new_stem + original_ext
-        new_path = dest_av1_path.with_name(new_name)
-        
-        # Check if target already exists
-        if new_path.exists() and new_path != dest_av1_path:
-            if logger:
-                with console_redirect(logger):
-                    print(f"⚠ Cél fájl már létezik: {new_path.name}")
-            return None
-        
-        # Atomic rename
-        dest_av1_path.rename(new_path)
-        
-        if logger:
-            with console_redirect(logger):
-                print(f"✓ Átnevezve: {dest_av1_path.name} → {new_path.name}")
-        
-        return new_path
-        
-    except (OSError, PermissionError) as e:
-        if logger:
-            with console_redirect(logger):
-                print(f"✗ Átnevezés hiba: {e}")
-        return None
+        try:
+            results = [None] * len(samples)
+            with ThreadPoolExecutor(max_workers=parallel) as executor:
+                futures = {executor.submit(_measure_sample, index): index for index in range(len(samples))}
+                try:
+                    for future in as_completed(futures):
+                        results[futures[future]] = future.result()
+                except BaseException:
+                    abort_event.set()
+                    raise
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
 
+        vmaf = float(np.concatenate([scores for scores, _, _ in results]).mean())
+        source_bytes = sum(source_size for _, source_size, _ in results)
+        encoded_bytes = sum(encoded_size for _, _, encoded_size in results)
+        size_pct = int(round(encoded_bytes / source_bytes * 100)) if source_bytes else 100
+        return vmaf, size_pct
 
-def verify_and_copy_subtitles(source_path, dest_path, logger=None):
-    """Verify and copy missing subtitle files from source to dest location.
-    
-    Ensures all subtitle files associated with the source video are also
-    present at the destination location. Copies any missing subtitles.
-    
-    Args:
-        source_path: Source video path (Path).
-        dest_path: Destination video path (Path).
-        logger: Optional logger for console output (ConsoleLogger).
-        
-    Returns:
-        int: Number of subtitles copied.
-    """
-    # Find source subtitles
-    source_subs = find_subtitle_files(source_path)
-    if not source_subs:
-        return 0
-    
-    copied_count = 0
-    
-    for sub_path, lang_code in source_subs:
-        # Generate destination subtitle name
-        if lang_code:
-            # Insert language code before extension
-            dest_sub_name = f"{dest_path.stem}.{lang_code}{sub_path.suffix}"
+    @staticmethod
+    def next_crf(samples, target, bracket, crf_range, start=None):
+        """A következő mérendő CRF a CRF→VMAF görbe szelőjéből (None, ha nincs mit mérni).
+
+        Args:
+            samples: [(crf, vmaf, size_pct)] mért pontok.
+            target: VMAF cél.
+            bracket: (legnagyobb megfelelő CRF, legkisebb elbukó CRF felette) - None = nyitott.
+            crf_range: (min_crf, max_crf) az encoderhez.
+            start: Első CRF, ha még nincs mért pont.
+        """
+        lower, upper = bracket
+        low = crf_range[0] if lower is None else lower + CRF_SEARCH_CRF_INCREMENT
+        high = crf_range[1] if upper is None else upper - CRF_SEARCH_CRF_INCREMENT
+        if low > high:
+            return None
+        points = {crf: vmaf for crf, vmaf, _ in samples}
+        if lower is not None and upper is not None:
+            pair = [(lower, points[lower]), (upper, points[upper])]
         else:
-            dest_sub_name = dest_path.stem + sub_path.suffix
-        
-        dest_sub_path = dest_path.parent / dest_sub_name
-        
-        # Copy if doesn't exist
-        if not dest_sub_path.exists():
-            try:
-                shutil.copy2(sub_path, dest_sub_path)
-                copied_count += 1
-                if logger:
-                    with console_redirect(logger):
-                        print(f"✓ Felirat másolva: {dest_sub_path.name}")
-            except (OSError, PermissionError) as e:
-                if logger:
-                    with console_redirect(logger):
-                        print(f"⚠ Felirat másolás hiba: {e}")
-    
-    return copied_count
+            pair = sorted(points.items(), key=lambda item: abs(item[1] - target))[:2]
+        if len(pair) == 2 and pair[0][1] != pair[1][1]:
+            (crf_a, vmaf_a), (crf_b, vmaf_b) = pair
+            estimate = crf_a + (target - vmaf_a) * (crf_b - crf_a) / (vmaf_b - vmaf_a)
+        elif pair:
+            crf_a, vmaf_a = pair[0]
+            estimate = crf_a + (vmaf_a - target) / NATIVE_CRF_INITIAL_SLOPE
+        else:
+            estimate = start if start is not None else (low + high) / 2
+        if lower is not None and upper is not None and upper - lower >= 4 * CRF_SEARCH_CRF_INCREMENT:
+            # Szelő módszer védelme: a zárt intervallum legalább negyedével szűküljön (görbült szakaszon se lépkedjen egyesével)
+            quarter = (upper - lower) / 4
+            estimate = min(max(estimate, lower + quarter), upper - quarter)
+        # Lefelé kerekítés: a megfelelő oldal felé (a cél a legnagyobb megfelelő CRF)
+        return float(min(max(np.floor(estimate / CRF_SEARCH_CRF_INCREMENT) * CRF_SEARCH_CRF_INCREMENT, low), high))
+
+    def search(self, input_path, encoder, min_vmaf, vmaf_step, max_encoded_percent, min_vmaf_threshold, progress_callback=None,
+               logger=None, stop_event=None, svt_preset=2, svt_cores=None, crf_window=None, start_crf=None):
+        """CRF keresés VMAF fallback-kel (min_vmaf → min_vmaf_threshold, vmaf_step lépésekkel).
+
+        crf_window / start_crf: a CRF előrejelző ablaka és becslése - a keresés ezen belül indul, és csak
+        akkor lép ki a teljes tartományra, ha a válasz az ablakon kívül esik.
+
+        Returns:
+            tuple: ('found', (crf, vmaf)) vagy ('exhausted', utolsó min_vmaf) - ez utóbbi a küszöb alatti érték,
+                ahogy az ab-av1 ciklus hagyja.
+        """
+        if stop_event is None:
+            stop_event = STOP_EVENT
+        encoder_label = "NVENC" if encoder == 'av1_nvenc' else "SVT-AV1"
+        key = CrfSampleTable.key(input_path, encoder, svt_preset, engine='native')
+        samples = self.prepare_samples(input_path, stop_event, logger=logger)
+        resolution = get_video_resolution(input_path)
+        crf_range = CRF_SEARCH_RANGE.get(encoder, (10, 63))
+        window = crf_range
+        if crf_window is not None:
+            window = (max(crf_range[0], crf_window[0]), min(crf_range[1], crf_window[1]))
+        if start_crf is None:
+            start_crf = CRF_SEARCH_START.get(encoder)
+        # A minta processzek a hívó szál mag foglalásán belül futnak (affinitás)
+        cpus = CORE_SCHEDULER.current_cpus()
+        print(f"🎬 NATÍV CRF SEARCH ({encoder}) - {len(samples)} minta, Min VMAF: {min_vmaf}")
+
+        while min_vmaf >= min_vmaf_threshold:
+            if stop_event.is_set():
+                raise EncodingStopped()
+            for _ in range(NATIVE_CRF_MAX_ITERATIONS):
+                action, data = CRF_SAMPLES.resolve(key, min_vmaf, max_encoded_percent)
+                if action in ('hit', 'skip'):
+                    break
+                bracket = data if action == 'search' else (None, None)
+                crf = self.next_crf(CRF_SAMPLES.samples(key), min_vmaf, bracket, window, start=start_crf)
+                if crf is None and window != crf_range:
+                    # Az előrejelzett ablak elfogyott, a határ rajta kívül van - teljes tartomány, ugyanazzal a céllal
+                    window = crf_range
+                    crf = self.next_crf(CRF_SAMPLES.samples(key), min_vmaf, bracket, window, start=start_crf)
+                if crf is None:
+                    break
+                if progress_callback:
+                    progress_callback(f"{encoder_label} CRF keresés (VMAF: {format_localized_number(min_vmaf, decimals=1)}, CRF {crf:g})")
+                started = time.monotonic()
+                vmaf, size_pct = self.evaluate(samples, encoder, crf, resolution, stop_event, logger=logger,
+                                               svt_preset=svt_preset, svt_cores=svt_cores, cpus=cpus)
+                CRF_SAMPLES.record(key, [(crf, vmaf, size_pct)])
+                # Az ab-av1 minta soraihoz hasonló konzol kimenet
+                print(f"crf {crf:g} VMAF {vmaf:.2f} predicted video stream size ({size_pct}%) taking {time.monotonic() - started:.1f}s")
+
+            valid = [sample for sample in CRF_SAMPLES.samples(key) if sample[1] >= min_vmaf and sample[2] <= max_encoded_percent]
+            if valid:
+                best_crf, best_vmaf, best_size = max(valid, key=lambda sample: sample[0])
+                print(f"✓ CRF TALÁLVA (natív): CRF {format_localized_number(best_crf, decimals=1)}, "
+                      f"VMAF {format_localized_number(best_vmaf, decimals=1)}, {best_size}%")
+                return ('found', (float(best_crf), float(best_vmaf)))
+
+            min_vmaf_str = format_localized_number(min_vmaf, decimals=1)
+            next_vmaf_str = format_localized_number(min_vmaf - vmaf_step, decimals=1)
+            print(f"⚠ Nincs VMAF >= {min_vmaf_str} ÉS fájl <= {format_localized_number(max_encoded_percent, decimals=1)}% - "
+                  f"VMAF csökkentés: {min_vmaf_str} → {next_vmaf_str}")
+            min_vmaf -= vmaf_step
+            if progress_callback:
+                progress_callback(f"{encoder_label} CRF keresés (VMAF fallback: {format_localized_number(min_vmaf, decimals=1)})")
+        return ('exhausted', min_vmaf)
+
 
+NATIVE_CRF_SEARCH = NativeCrfSearch()
 
-def run_crf_search(input_path, encoder='av1_nvenc', initial_min_vmaf=None, vmaf_step=None, max_encoded_percent=None, progress_callback=None, logger=None, stop_event=None, svt_preset=2):
-    """Run CRF search using ab-av1 to find optimal encoding settings.
+
+def run_crf_search(input_path, encoder='av1_nvenc', initial_min_vmaf=None, vmaf_step=None, max_encoded_percent=None, progress_callback=None, logger=None, stop_event=None, svt_preset=2, svt_cores=None, engine=None, allow_skip=True):
+    """Run CRF search (native sample engine or ab-av1) to find optimal encoding settings.
     
     Args:
         input_path: Path to input video.
@@ -5219,17 +11284,118 @@ def run_crf_search(input_path, encoder='av1_nvenc', initial_min_vmaf=None, vmaf_
         logger: Logger instance.
         stop_event: Event to stop search.
         svt_preset: SVT-AV1 preset value.
+        svt_cores: A CORE_SCHEDULER által kiosztott magok (SVT lp és libvmaf n_threads; None = alapértelmezés).
+        engine: 'native' vagy 'ab-av1' (None = CRF_SEARCH_ENGINE); a natív keresés hibájánál ab-av1 fut.
+        allow_skip: SkipEncodePredictor kihagyás engedélyezése (kézi újrakódolásnál False - a felhasználó kérte).
         
     Returns:
         int: Optimal CRF/CQ value or None if failed.
+
+    Az eredmény (forrás ujjlenyomat, encoder, preset, engine, cél VMAF, lépés, max méret%) kulccsal a
+    crf_search_results táblába kerül; azonos keresésnél nincs új minta kódolás. Az engine kulcs a ténylegesen
+    lefutott keresésé (natív hiba utáni ab-av1 eredmény az ab-av1 kulcs alá kerül).
+    """
+    if engine is None:
+        engine = CRF_SEARCH_ENGINE
+    if engine == 'native' and not NATIVE_CRF_SEARCH.available(encoder):
+        engine = 'ab-av1'
+    initial_min_vmaf, vmaf_step, max_encoded_percent = resolve_encoding_defaults(initial_min_vmaf, vmaf_step, max_encoded_percent)
+    if stop_event is None:
+        stop_event = STOP_EVENT
+
+    # OPTIMALIZÁCIÓ: leállítás / összeomlás / kézi újrakódolás után ugyanarra a forrásra és paraméterekre
+    # a korábbi keresés eredménye azonnal visszajön (a forrás ujjlenyomata stat alapján cache-elt)
+    outcome_key = CrfSampleTable.key(input_path, encoder, svt_preset, engine=engine)
+    cached = CRF_SAMPLES.outcome(outcome_key, initial_min_vmaf, vmaf_step, max_encoded_percent)
+    if cached is not None:
+        if cached['exhausted']:
+            print(f"✓ CRF KERESÉS CACHE: {input_path.name} - a VMAF fallback korábban elfogyott ({encoder})")
+            if encoder == 'av1_nvenc':
+                return (cached['crf'], cached['vmaf'], True)
+            raise NoSuitableCRFFound("Nem talált megfelelő CRF értéket a megadott paraméterekhez (korábbi keresés)",
+                                     final_min_vmaf=cached['vmaf'])
+        print(f"✓ CRF KERESÉS CACHE: {input_path.name} - CRF {format_localized_number(cached['crf'], decimals=1)}, "
+              f"VMAF {format_localized_number(cached['vmaf'], decimals=1)} ({encoder})")
+        return (float(cached['crf']), float(cached['vmaf']))
+
+    # OPTIMALIZÁCIÓ: várhatóan nem zsugorodó forrás (már hatékony HEVC/AV1, ...) - keresés és kódolás nélkül
+    # úgy tér vissza, mint az elfogyott VMAF fallback: NVENC → SVT queue, SVT → NoSuitableCRFFound → másolás
+    skip_reason = SKIP_ENCODE_PREDICTOR.assess(input_path, encoder, max_encoded_percent, sample_key=outcome_key) if allow_skip else None
+    if skip_reason:
+        SKIP_ENCODE_PREDICTOR.record_skip(input_path, encoder, skip_reason, logger=logger)
+        if encoder == 'av1_nvenc':
+            return (CRF_SEARCH_START.get(encoder, 28), CRF_SEARCH_MIN_VMAF - vmaf_step, True)
+        raise NoSuitableCRFFound(f"Kódolás kihagyva: {skip_reason}")
+
+    # OPTIMALIZÁCIÓ: a korábbi kódolásokból becsült CRF szűk keresési ablakot ad (vagy magabiztos becslésnél
+    # a keresés el is marad) - a találati arány és a megtakarított idő a logba kerül
+    prediction = CRF_PREDICTOR.predict(input_path, encoder, initial_min_vmaf, max_encoded_percent)
+    if prediction is not None and prediction['skip']:
+        print(f"✓ CRF BECSLÉS (keresés nélkül): {input_path.name} - CRF {format_localized_number(prediction['crf'], decimals=1)}, "
+              f"becsült VMAF ≈{format_localized_number(prediction['vmaf'], decimals=1)}, cél VMAF {format_localized_number(initial_min_vmaf, decimals=1)} ({encoder})")
+        CRF_PREDICTOR.report(encoder, prediction, prediction['crf'], 0.0, logger=logger)
+        CRF_PREDICTOR.record_skip(input_path, encoder, prediction, initial_min_vmaf)
+        # FONTOS: nem mért érték - a hívó '≈'-vel jelzi, és a kimenet teljes VMAF mérése ellenőrzi
+        return (prediction['crf'], EstimatedVmaf(prediction['vmaf']))
+    crf_window = prediction['window'] if prediction is not None else None
+    start_crf = prediction['crf'] if prediction is not None else None
+
+    search_started = time.monotonic()
+    search_info = {}
+    try:
+        result = _run_crf_search_uncached(input_path, encoder, initial_min_vmaf, vmaf_step, max_encoded_percent, progress_callback=progress_callback,
+                                          logger=logger, stop_event=stop_event, svt_preset=svt_preset, svt_cores=svt_cores, engine=engine,
+                                          crf_window=crf_window, start_crf=start_crf, search_info=search_info)
+    except NoSuitableCRFFound as e:
+        outcome_key = _crf_outcome_key_for_run(outcome_key, search_info, engine, input_path, encoder, svt_preset)
+        # Csak a küszöbig lefutott fallback eredménye végleges (ab-av1 hiba miatti megszakítás nem)
+        if e.final_min_vmaf is not None and e.final_min_vmaf < CRF_SEARCH_MIN_VMAF:
+            CRF_SAMPLES.store_outcome(outcome_key, initial_min_vmaf, vmaf_step, max_encoded_percent, None, e.final_min_vmaf, exhausted=True)
+            CRF_PREDICTOR.report(encoder, prediction, None, time.monotonic() - search_started, logger=logger)
+        raise
+    outcome_key = _crf_outcome_key_for_run(outcome_key, search_info, engine, input_path, encoder, svt_preset)
+    if len(result) == 3:
+        if result[2] and result[1] < CRF_SEARCH_MIN_VMAF:
+            CRF_SAMPLES.store_outcome(outcome_key, initial_min_vmaf, vmaf_step, max_encoded_percent, result[0], result[1], exhausted=True)
+            CRF_PREDICTOR.report(encoder, prediction, None, time.monotonic() - search_started, logger=logger)
+    else:
+        CRF_SAMPLES.store_outcome(outcome_key, initial_min_vmaf, vmaf_step, max_encoded_percent, result[0], result[1])
+        CRF_PREDICTOR.report(encoder, prediction, result[0], time.monotonic() - search_started, logger=logger)
+        CRF_PREDICTOR.observe(input_path, encoder, result[0], result[1])
+    return result
+
+
+def _crf_outcome_key_for_run(outcome_key, search_info, engine, input_path, encoder, svt_preset):
+    """Az eredmény cache kulcsa a ténylegesen lefutott engine szerint (natív hiba → ab-av1 kulcs)."""
+    ran_engine = search_info.get('engine', engine)
+    if ran_engine == engine:
+        return outcome_key
+    return CrfSampleTable.key(input_path, encoder, svt_preset, engine=ran_engine)
+
+
+def _run_crf_search_uncached(input_path, encoder, initial_min_vmaf, vmaf_step, max_encoded_percent, progress_callback=None, logger=None,
+                             stop_event=None, svt_preset=2, svt_cores=None, engine=None, crf_window=None, start_crf=None, search_info=None):
+    """run_crf_search tényleges keresése (natív engine vagy ab-av1, VMAF fallback-kel) - eredmény cache nélkül.
+
+    crf_window / start_crf: a CrfPredictor ablaka és becslése. Ha a válasz az ablakon kívül esik,
+    a keresés ugyanazzal a VMAF céllal a teljes tartományon folytatódik (nem csökkenti a célt).
+    search_info: opcionális dict - az 'engine' kulcsba a ténylegesen lefutott engine kerül
+    ('native' vagy 'ab-av1'), kivétel esetén is.
     """
+    if search_info is None:
+        search_info = {}
 
     # Ellenőrizzük, hogy a fájl létezik-e és a helyes fájl-e
     if not input_path.exists():
         raise FileNotFoundError(f"CRF kereséshez megadott fájl nem létezik: {input_path}")
     
-    # Ellenőrizzük, hogy az ab-av1.exe létezik-e
-    if not Path(ABAV1_PATH).exists() and not shutil.which(ABAV1_PATH):
+    if engine is None:
+        engine = CRF_SEARCH_ENGINE
+    native_engine = engine == 'native' and NATIVE_CRF_SEARCH.available(encoder)
+    search_info['engine'] = 'native' if native_engine else 'ab-av1'
+
+    # Ellenőrizzük, hogy az ab-av1.exe létezik-e (natív keresésnél csak fallback, ott nem végzetes)
+    if not native_engine and not Path(ABAV1_PATH).exists() and not shutil.which(ABAV1_PATH):
         error_msg = f"VÉGZETES HIBA: Az ab-av1.exe nem található! Útvonal: {ABAV1_PATH}\n\nA program nem tudja elindítani az ab-av1.exe-t, ezért a CRF keresés nem lehetséges.\n\nEllenőrizd, hogy az ab-av1.exe létezik-e a megadott útvonalon, vagy állítsd be a helyes útvonalat a beállításokban."
         print(f"\n{'='*80}")
         print(f"⚠⚠⚠ VÉGZETES HIBA ⚠⚠⚠")
@@ -5281,7 +11447,7 @@ def run_crf_search(input_path, encoder='av1_nvenc', initial_min_vmaf=None, vmaf_
     initial_min_vmaf, vmaf_step, max_encoded_percent = resolve_encoding_defaults(initial_min_vmaf, vmaf_step, max_encoded_percent)
 
     min_vmaf = initial_min_vmaf
-    min_vmaf_threshold = 85.0
+    min_vmaf_threshold = CRF_SEARCH_MIN_VMAF
 
     if stop_event is None:
         stop_event = STOP_EVENT
@@ -5293,16 +11459,97 @@ def run_crf_search(input_path, encoder='av1_nvenc', initial_min_vmaf=None, vmaf_
         encoder_label = "NVENC" if encoder == 'av1_nvenc' else "SVT-AV1"
         min_vmaf_str = format_localized_number(min_vmaf, decimals=1)
         progress_callback(f"{encoder_label} CRF keresés (VMAF: {min_vmaf_str})")
+
+    # OPTIMALIZÁCIÓ: a korábbi iterációk (és hívások) minta mérései megmaradnak - alacsonyabb VMAF célnál
+    # a válasz a mért görbéből jön, új minta kódolás csak a még nem próbált CRF tartományra indul
+    sample_key = CrfSampleTable.key(input_path, encoder, svt_preset)
+
+    if native_engine:
+        try:
+            native_status, native_value = NATIVE_CRF_SEARCH.search(
+                input_path, encoder, min_vmaf, vmaf_step, max_encoded_percent, min_vmaf_threshold, progress_callback=progress_callback,
+                logger=logger, stop_event=stop_event, svt_preset=svt_preset, svt_cores=svt_cores,
+                crf_window=crf_window, start_crf=start_crf)
+        except EncodingStopped:
+            raise
+        except Exception as e:
+            print(f"⚠ Natív CRF keresés hiba: {e} – ab-av1 crf-search")
+            if logger:
+                logger.write(f"⚠ Natív CRF keresés hiba: {e} – ab-av1 crf-search\n")
+                logger.flush()
+            search_info['engine'] = 'ab-av1'
+        else:
+            if native_status == 'found':
+                crf_value, actual_vmaf = native_value
+                # KRITIKUS VÉDELEM: a minták ugyanabból a fájlból készültek, mint a keresés kezdetekor
+                try:
+                    input_stat_end = input_path.stat()
+                except (OSError, PermissionError) as e:
+                    raise FileNotFoundError(f"VÉGZETES HIBA: Nem sikerült ellenőrizni a fájlt: {e}")
+                if input_path.absolute() != input_absolute_start or input_stat_end.st_size != input_size_start or abs(input_stat_end.st_mtime - input_mtime_start) > 1.0:
+                    raise ValueError(f"VÉGZETES HIBA: A forrás fájl MÓDOSULT a CRF keresés során!\n"
+                                     f"Fájl: {input_str}\n"
+                                     f"Ez azt jelenti, hogy a CRF érték ({crf_value}) érvénytelen!")
+                debug_pause(
+                    f"Natív CRF: {format_localized_number(crf_value, decimals=1)} (VMAF: {format_localized_number(actual_vmaf, decimals=1)})",
+                    f"FFmpeg kódolás CRF {format_localized_number(crf_value, decimals=1)}-val",
+                    f"Encoder: {encoder}"
+                )
+                return (crf_value, actual_vmaf)
+            # Elfogyott a VMAF fallback - az ab-av1 ciklus kimarad, a vége ugyanúgy dönt (NVENC → SVT, SVT → másolás)
+            min_vmaf = native_value
     
     while min_vmaf >= min_vmaf_threshold:
         if stop_event.is_set():
             raise EncodingStopped()
+        min_vmaf_str = format_localized_number(min_vmaf, decimals=1)
+        sample_action, sample_data = CRF_SAMPLES.resolve(sample_key, min_vmaf, max_encoded_percent)
+        if sample_action == 'hit':
+            sample_crf, sample_vmaf, sample_size = sample_data
+            print(f"✓ CRF TALÁLVA (korábbi mintákból, VMAF ≥ {min_vmaf_str}): CRF {format_localized_number(sample_crf, decimals=1)}, "
+                  f"VMAF {format_localized_number(sample_vmaf, decimals=1)}, {sample_size}%")
+            debug_pause(
+                f"Ab-av1 CRF (minta tábla): {format_localized_number(sample_crf, decimals=1)} (VMAF: {format_localized_number(sample_vmaf, decimals=1)})",
+                f"FFmpeg kódolás CRF {format_localized_number(sample_crf, decimals=1)}-val",
+                f"Encoder: {encoder}, Min VMAF: {min_vmaf_str}"
+            )
+            return (float(sample_crf), float(sample_vmaf))
+        if sample_action == 'skip':
+            next_vmaf_str = format_localized_number(min_vmaf - vmaf_step, decimals=1)
+            print(f"⚠ A mért mintákból: VMAF ≥ {min_vmaf_str} csak {format_localized_number(max_encoded_percent, decimals=1)}% feletti mérettel - "
+                  f"VMAF csökkentés új minta kódolás nélkül: {min_vmaf_str} → {next_vmaf_str}")
+            min_vmaf -= vmaf_step
+            if progress_callback:
+                encoder_label = "NVENC" if encoder == 'av1_nvenc' else "SVT-AV1"
+                progress_callback(f"{encoder_label} CRF keresés (VMAF fallback: {format_localized_number(min_vmaf, decimals=1)})")
+            continue
+        crf_range = sample_data if sample_action == 'search' else (None, None)
+        if crf_window is not None:
+            # Előrejelzett ablak a még nem próbált tartományon belül (ha nincs közös rész, teljes keresés)
+            window_low = crf_window[0] if crf_range[0] is None else max(crf_range[0], crf_window[0])
+            window_high = crf_window[1] if crf_range[1] is None else min(crf_range[1], crf_window[1])
+            if window_low < window_high:
+                crf_range = (window_low, window_high)
+            else:
+                crf_window = None
         # FONTOS: Abszolút útvonalat használunk, hogy biztosan a helyes fájlt használjuk
         # A cwd=input_path.parent csak a working directory-t állítja be, de az -i paraméterben abszolút útvonal van
         if encoder == 'svt-av1':
             ab_av1_cmd = [ABAV1_PATH, 'crf-search', '-i', input_str, '-e', 'svt-av1', '--min-vmaf', str(min_vmaf), '--preset', str(svt_preset), '--max-encoded-percent', str(int(max_encoded_percent))]
+            if svt_cores:
+                # Minta kódolás és VMAF a kiosztott mag kereten belül
+                # KRITIKUS: az SVT lp szint (1-6), nem szálszám - a magszámot az ab-av1 (és gyerekei) affinitása korlátozza
+                svt_lp = svt_lp_for_cores(svt_cores)
+                if svt_lp:
+                    ab_av1_cmd += ['--svt', f'lp={svt_lp}']
+                ab_av1_cmd += ['--vmaf', f'n_threads={int(svt_cores)}']
         else:
             ab_av1_cmd = [ABAV1_PATH, 'crf-search', '-i', input_str, '-e', 'av1_nvenc', '--min-vmaf', str(min_vmaf), '--max-encoded-percent', str(int(max_encoded_percent))]
+        # Csak a mért görbe még nem próbált szakasza (a határ CRF-ek már ismertek)
+        if crf_range[0] is not None:
+            ab_av1_cmd += ['--min-crf', f'{crf_range[0]:g}']
+        if crf_range[1] is not None:
+            ab_av1_cmd += ['--max-crf', f'{crf_range[1]:g}']
         
         if stop_event.is_set():
             raise EncodingStopped()
@@ -5324,8 +11571,10 @@ def run_crf_search(input_path, encoder='av1_nvenc', initial_min_vmaf=None, vmaf_
                 stderr=subprocess.STDOUT,
                 universal_newlines=True,
                 bufsize=1,
-                startupinfo=get_startup_info()
+                startupinfo=get_startup_info(),
+                **child_process_kwargs()
             )
+            apply_process_placement(process, 'search')
             
             # Process regisztráció
             with ACTIVE_PROCESSES_LOCK:
@@ -5359,8 +11608,11 @@ def run_crf_search(input_path, encoder='av1_nvenc', initial_min_vmaf=None, vmaf_
             if stop_event.is_set():
                 raise EncodingStopped()
             
-            crf_pattern = r'crf\s+(\d+)\s+VMAF\s+([\d.]+)\s+predicted\s+video\s+stream\s+size\s+[\d.]+\s+\w+\s+\((\d+)%\)'
-            all_crf_results = re.findall(crf_pattern, full_output_text)
+            all_crf_results = CRF_SAMPLE_PATTERN.findall(full_output_text)
+            CRF_SAMPLES.record(sample_key, all_crf_results)
+            if sample_key is not None:
+                # A korábbi iterációk mintái is jelöltek (a szűkített keresés a határokat nem méri újra)
+                all_crf_results = CRF_SAMPLES.samples(sample_key)
             
             has_failed = 'Failed to find a suitable crf' in full_output_text or 'Error: Failed to find' in full_output_text
             
@@ -5369,7 +11621,7 @@ def run_crf_search(input_path, encoder='av1_nvenc', initial_min_vmaf=None, vmaf_
                 
                 if all_crf_results:
                     valid_crfs = [
-                        (int(crf), float(vmaf), int(size_pct)) 
+                        (float(crf), float(vmaf), int(size_pct)) 
                         for crf, vmaf, size_pct in all_crf_results 
                         if float(vmaf) >= min_vmaf and int(size_pct) <= max_encoded_percent
                     ]
@@ -5428,6 +11680,11 @@ def run_crf_search(input_path, encoder='av1_nvenc', initial_min_vmaf=None, vmaf_
                     else:
                         print(f"⚠ Nincs VMAF >= {min_vmaf_str} ÉS fájl <= {format_localized_number(max_encoded_percent, decimals=1)}%")
                 
+                if crf_window is not None:
+                    # Az előrejelzett ablakban nem volt megoldás - ugyanaz a cél a teljes tartományon
+                    print(f"⚠ Előrejelzett CRF ablak ({crf_range[0]:g}-{crf_range[1]:g}) nem elég - keresés a teljes tartományon")
+                    crf_window = None
+                    continue
                 next_vmaf_str = format_localized_number(min_vmaf - vmaf_step, decimals=1)
                 print(f"⚠ VMAF csökkentés: {min_vmaf_str} → {next_vmaf_str}")
                 min_vmaf -= vmaf_step
@@ -5443,6 +11700,11 @@ def run_crf_search(input_path, encoder='av1_nvenc', initial_min_vmaf=None, vmaf_
                     last_match = all_crf_vmaf_matches[-1]
                     crf_value = float(last_match[0])
                     actual_vmaf = float(last_match[1])
+                    if crf_window is not None and crf_value >= crf_range[1]:
+                        # Az ablak teteje is megfelelt - a határ feljebb lehet (a mért minták alapján csak afölött keres)
+                        print(f"⚠ CRF {crf_value:g} az előrejelzett ablak tetején - keresés feljebb")
+                        crf_window = None
+                        continue
                     print(f"✓ CRF TALÁLVA: {crf_value} (VMAF: {actual_vmaf})")
                     
                     debug_pause(
@@ -5595,9 +11857,184 @@ def run_crf_search(input_path, encoder='av1_nvenc', initial_min_vmaf=None, vmaf_
     # Ha SVT-AV1-nél is elfogyott a VMAF fallback, akkor nincs megfelelő CRF → egyszerű másolás
     print(f"⚠ SVT-AV1 VMAF fallback elfogyott → Nem talált megfelelő CRF értéket (VMAF >= 85.0 ÉS fájl <= 75%)")
     print(f"   Videó másolása átkódolás nélkül...")
-    raise NoSuitableCRFFound("Nem talált megfelelő CRF értéket a megadott paraméterekhez")
+    raise NoSuitableCRFFound("Nem talált megfelelő CRF értéket a megadott paraméterekhez", final_min_vmaf=min_vmaf)
+
+def benchmark_crf_search_engines(input_paths, encoder='svt-av1', min_vmaf=95.0, vmaf_step=1.0, max_encoded_percent=75,
+                                 svt_preset=2, svt_cores=None, logger=None):
+    """A natív és az ab-av1 CRF keresés összemérése ugyanazokon a bemeneteken.
+
+    Fájlonként mindkét engine a CRF_SAMPLES tábla, az eredmény cache és a CRF előrejelző nélkül (hidegen)
+    fut; a natív minta klip cache megmarad, így egy új fájlnál az első natív futás a vágás idejét is tartalmazza.
+    A sorrend fájlonként váltakozik, és minden futás előtt (az időmérés indulása előtt) a forrás
+    szinkron beolvasással a page cache-be kerül (warm_page_cache blocking=True) - így mindkét engine
+    meleg cache-sel fut, a mért idő a keresés ideje, nem a lemezé (a RAM-nál nagyobb forrásnál csak
+    a fájl vége marad a cache-ben).
+
+    Returns:
+        list: [{'input', 'engine', 'crf', 'vmaf', 'seconds', 'error'}] bemenetenként és engine-enként.
+    """
+    results = []
+    for index, input_path in enumerate(input_paths):
+        input_path = Path(input_path)
+        engines = ('native', 'ab-av1') if index % 2 == 0 else ('ab-av1', 'native')
+        for engine in engines:
+            entry = {'input': input_path.name, 'engine': engine, 'crf': None, 'vmaf': None, 'seconds': None, 'error': None}
+            results.append(entry)
+            if engine == 'native' and not NATIVE_CRF_SEARCH.available(encoder):
+                entry['error'] = "nem elérhető (ffmpeg libvmaf / encoder hiányzik)"
+                continue
+            CRF_SAMPLES.forget(CrfSampleTable.key(input_path, encoder, svt_preset, engine=engine))
+            # Azonos kiinduló állapot: a forrás (a page cache méretéig) mindkét engine előtt beolvasva -
+            # a fadvise aszinkron, a readahead még az időmérés alatt futna
+            warm_page_cache(input_path, max_bytes=0, blocking=True)
+            if STOP_EVENT.is_set():
+                raise EncodingStopped()
+            started = time.monotonic()
+            search_info = {}
+            try:
+                result = _run_crf_search_uncached(input_path, encoder, min_vmaf, vmaf_step, max_encoded_percent, logger=logger,
+                                                  svt_preset=svt_preset, svt_cores=svt_cores, engine=engine, search_info=search_info)
+                if search_info.get('engine', engine) != engine:
+                    entry['error'] = f"natív hiba - {search_info['engine']} futott helyette"
+                elif len(result) == 3 and result[2]:
+                    entry['error'] = "VMAF fallback elfogyott"
+                else:
+                    entry['crf'], entry['vmaf'] = result[0], result[1]
+            except EncodingStopped:
+                raise
+            except Exception as e:
+                entry['error'] = str(e)
+            entry['seconds'] = time.monotonic() - started
+
+    print(f"\n{'='*80}")
+    print(f"CRF KERESÉS BENCHMARK ({encoder}, min VMAF {min_vmaf:g}, max {max_encoded_percent}%)")
+    print(f"{'='*80}")
+    for entry in results:
+        outcome = entry['error'] or f"CRF {entry['crf']:g}, VMAF {entry['vmaf']:.2f}"
+        seconds = f"{entry['seconds']:.1f}s" if entry['seconds'] is not None else "-"
+        print(f"{entry['input'][:40]:<40} {entry['engine']:<8} {seconds:>10}  {outcome}")
+    by_input = {}
+    for entry in results:
+        if entry['seconds'] is not None and not entry['error']:
+            by_input.setdefault(entry['input'], {})[entry['engine']] = entry['seconds']
+    speedups = [times['ab-av1'] / times['native'] for times in by_input.values() if 'native' in times and 'ab-av1' in times and times['native'] > 0]
+    if speedups:
+        print(f"Natív gyorsulás az ab-av1-hez képest: átlag {sum(speedups) / len(speedups):.2f}× ({len(speedups)} fájl)")
+    print(f"{'='*80}\n")
+    return results
+
+
+def _inline_metrics_args(reference_size, resized, hash_path, n_threads=None):
+    """Az encode parancs végére fűzött inline metrika kimenetek (loopback dekóder, ffmpeg 7+).
+
+    A forrás frame-eket az ffmpeg a kódoláshoz már dekódolja; ugyanezek mennek referenciaként a
+    VMAF/PSNR filterekbe, a torzított ág pedig a frissen kódolt stream visszadekódolt példánya
+    ([dec:0]). A forrás video packetjeiből közben a tartalom ujjlenyomat is elkészül (hash kimenet),
+    így a metrika cache kulcsához sem kell a forrást újraolvasni.
+
+    Args:
+        reference_size: A forrás (width, height) értéke.
+        resized: Átméretezett kódolás (a torzított ág felskálázása a forrás méretére).
+        hash_path: A forrás video stream sha256 hash kimeneti fájlja.
+        n_threads: libvmaf szálak (None = METRIC_CORE_BUDGET).
+
+    Returns:
+        tuple: (args, metrics) vagy (None, []), ha az ffmpeg nem támogatja (nincs -dec / libvmaf / AV1 dekóder).
+    """
+    if not TOOL_CAPABILITIES.supports_loopback_decoder() or not TOOL_CAPABILITIES.has_filter('libvmaf'):
+        return None, []
+    decoder = next((name for name in INLINE_METRICS_AV1_DECODERS if TOOL_CAPABILITIES.has_decoder(name)), None)
+    if decoder is None:
+        return None, []
+    metrics = ['VMAF', 'XPSNR' if TOOL_CAPABILITIES.has_filter('xpsnr') else 'PSNR']
+    filtergraph = _combined_metrics_filtergraph(
+        metrics, reference_size, (None, None) if resized else reference_size, get_metric_core_budget(n_threads),
+        libvmaf_extra=f'n_subsample={INLINE_METRICS_VMAF_SUBSAMPLE}' if INLINE_METRICS_VMAF_SUBSAMPLE > 1 else None,
+        reference_input='0:v', distorted_input='dec:0', output_prefix='m')
+    args = [
+        # Forrás video stream ujjlenyomat (ugyanaz, mint a ContentFingerprintCache külön futása)
+        '-map', '0:v:0', '-c', 'copy', '-f', 'hash', '-hash', 'sha256', hash_path,
+        # Az 1. kimenet (a kódolt fájl) 0. streamje visszadekódolva → [dec:0]
+        '-c', decoder, '-dec', '0:0',
+        '-filter_complex', filtergraph,
+    ]
+    for index in range(len(metrics)):
+        # FONTOS: a metrika filterek kimenetei külön null kimenetre mennek, különben a fő fájlba kerülnének
+        args.extend(['-map', f'[m{index}]'])
+    args.extend(['-f', 'null', '-'])
+    return args, metrics
+
+
+def _store_inline_metrics(reference_path, encoded_path, results, metrics, hash_path, reference_identity):
+    """Inline mért metrikák mentése a metrika cache-be (az utána futó VMAF/PSNR teszt így dekódolás nélkül kész).
+
+    A forrás ujjlenyomat az inline hash kimenetből jön (a forrás nem olvasódik újra); a kódolt
+    fájlé most készül, amíg a frissen írt fájl a page cache-ben van.
+    """
+    try:
+        with open(hash_path, encoding='utf-8', errors='replace') as handle:
+            hash_match = re.search(r'SHA256=([0-9a-fA-F]{64})', handle.read())
+    except OSError:
+        hash_match = None
+    # Csak ha a forrás a kódolás óta nem változott - különben a forrás teljes újra-hash-elése kellene
+    if not hash_match or reference_identity is None or ProbeCache.file_identity(reference_path) != reference_identity:
+        print("⚠ Inline forrás ujjlenyomat hiányzik vagy a forrás változott – a VMAF/PSNR teszt külön fut")
+        return
+    reference_fp = 'sha256:' + hash_match.group(1).lower()
+    CONTENT_FINGERPRINTS.remember(reference_path, reference_fp, identity=reference_identity)
+    missing = [metric for metric in metrics if metric not in results]
+    if missing:
+        print(f"⚠ Inline metrika hiányzik a kimenetben: {', '.join(missing)} – a VMAF/PSNR teszt külön fut")
+        return
+    try:
+        encoded_fp = CONTENT_FINGERPRINTS.get(encoded_path)
+    except (subprocess.SubprocessError, OSError, RuntimeError) as e:
+        load_debug_log(f"[InlineMetrics] Kódolt ujjlenyomat hiba: {e}")
+        encoded_fp = None
+    if not encoded_fp:
+        return
+    values = {'PSNR': results[metrics[1]]}
+    if INLINE_METRICS_VMAF_SUBSAMPLE <= 1:
+        values['VMAF'] = results['VMAF']
+    METRIC_CACHE.store(reference_path, encoded_path, values, fingerprints=(reference_fp, encoded_fp), psnr_variant=metrics[1])
+    print("📊 Inline metrikák (kódolás közben mérve): "
+          + " / ".join(f"{metric}: {format_metric_value(results[metric])}" for metric in metrics))
+
+
+def svt_lp_for_cores(cores):
+    """Mag keret → SVT-AV1 lp szint (a legnagyobb szint, aminek a magszáma még belefér; None = összes mag)."""
+    if not cores or int(cores) >= multiprocessing.cpu_count():
+        return None
+    level = 1
+    for index, level_cores in enumerate(SVT_LP_LEVEL_CORES, start=1):
+        if level_cores <= int(cores):
+            level = index
+    return level
+
+
+def video_encoder_args(encoder, cq_value, svt_preset=2, svt_cores=None):
+    """A videó encoder ffmpeg kimeneti opciói (teljes kódolás és natív CRF keresés minta kódolása közös).
+
+    Args:
+        encoder: 'av1_nvenc' vagy 'svt-av1'.
+        cq_value: CQ (NVENC) / CRF (SVT-AV1) érték.
+        svt_preset: SVT-AV1 preset.
+        svt_cores: Kiosztott magok (svt_lp_for_cores szerint lp szintre képezve; None = az SVT alapértelmezése).
+
+    Returns:
+        list: ffmpeg argumentumok (-c:v ...).
+    """
+    if encoder == 'svt-av1':
+        args = ['-c:v', 'libsvtav1', '-preset', str(svt_preset), '-crf', str(int(cq_value)), '-g', '240', '-pix_fmt', 'yuv420p10le']
+        svt_lp = svt_lp_for_cores(svt_cores)
+        if svt_lp:
+            # KRITIKUS: az lp szint, nem szálszám (SVT-AV1 2.x: 1-6) - a magszámot az affinitás korlátozza
+            args.extend(['-svtav1-params', f'lp={svt_lp}'])
+        return args
+    return ['-c:v', 'av1_nvenc', '-preset', 'p7', '-tune', 'hq', '-rc', 'vbr', '-cq', str(int(cq_value)), '-multipass', 'fullres', '-pix_fmt', 'p010le']
 
-def encode_single_attempt(input_path, output_path, cq_value, subtitle_files, encoder='av1_nvenc', status_callback=None, stop_event=None, vmaf_value=None, resize_enabled=False, resize_height=1080, audio_compression_enabled=False, audio_compression_method='fast', svt_preset=2, logger=None):
+
+def encode_single_attempt(input_path, output_path, cq_value, subtitle_files, encoder='av1_nvenc', status_callback=None, stop_event=None, vmaf_value=None, resize_enabled=False, resize_height=1080, audio_compression_enabled=False, audio_compression_method='fast', svt_preset=2, logger=None, audio_plan=None, inline_metrics=False, svt_cores=None):
     """Execute a single encoding attempt with specified settings.
     
     Args:
@@ -5615,6 +12052,9 @@ def encode_single_attempt(input_path, output_path, cq_value, subtitle_files, enc
         audio_compression_method: Audio compression method.
         svt_preset: SVT-AV1 preset.
         logger: Logger instance.
+        inline_metrics: VMAF/PSNR mérése ugyanabban az ffmpeg folyamatban, saját CORE_SCHEDULER kerettel
+            (elfogadott kimenetnél az eredmény a metrika cache-be kerül).
+        svt_cores: A CORE_SCHEDULER által kiosztott magok - SVT-AV1 lp (None = összes mag).
         
     Returns:
         bool: True if encoding successful, False otherwise.
@@ -5636,8 +12076,14 @@ def encode_single_attempt(input_path, output_path, cq_value, subtitle_files, enc
         raise ValueError(f"Invalid output path: {e}") from e
     
     # KÖZEPES JAVÍTÁS #8: Használjuk a sanitizált input_str-t a Path objektum helyett
+    # OPTIMALIZÁCIÓ: egyetlen ffprobe az egész kísérlethez (duration, fps, hangsávok, feliratok, felbontás)
+    try:
+        input_probe = probe_media(Path(input_str))
+    except (subprocess.SubprocessError, OSError, ValueError) as e:
+        print(f"✗ FFprobe hiba: {e}")
+        input_probe = ProbeResult(Path(input_str), {})
     # Get video duration and fps for progress display
-    duration_seconds, video_fps = get_video_info(Path(input_str))
+    duration_seconds, video_fps = get_video_info(Path(input_str), probe=input_probe)
     # KÖZEPES JAVÍTÁS #11: Biztonságos None érték kezelés
     if duration_seconds is None or duration_seconds <= 0:
         duration_seconds = 0
@@ -5734,109 +12180,29 @@ def encode_single_attempt(input_path, output_path, cq_value, subtitle_files, enc
             raise ValueError(f"Invalid subtitle path: {subtitle_path} - {e}") from e
         ffmpeg_cmd.extend(['-i', subtitle_str])
     
-    # Hangdinamika kompresszió ellenőrzése
-    use_audio_compression = False
-    audio_51_stream_index = None
-    compressed_audio_lang = None  # Az eredeti 5.1 hangsáv nyelve (a kompressziós hangsávhoz)
-    if audio_compression_enabled:
-        # KÖZEPES JAVÍTÁS #8: Használjuk a sanitizált input_str-t
-        if needs_audio_compression(Path(input_str)):
-            # Megkeressük a 5.1 hangsáv indexét az alapértelmezett nyelvhez
-            default_lang, _, _ = get_audio_streams_info(Path(input_str))
-            if default_lang:
-                # KÖZEPES JAVÍTÁS #8: Használjuk a sanitizált input_str-t
-                audio_51_stream_index = get_51_audio_stream_index(Path(input_str), default_lang)
-                # Ha megtaláltuk a 5.1 hangsávot, használjuk a kompressziót
-                if audio_51_stream_index is not None:
-                    use_audio_compression = True
-                    # Az eredeti 5.1 hangsáv nyelvének lekérdezése
-                    try:
-                        cmd = [
-                            FFPROBE_PATH, '-v', 'error',
-                            '-select_streams', f'a:{audio_51_stream_index}',
-                            '-show_entries', 'stream_tags=language',
-                            '-of', 'default=noprint_wrappers=1:nokey=1',
-                            input_str  # Már sanitizálva van
-                        ]
-                        result = subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=10, startupinfo=get_startup_info())
-                        lang_raw = result.stdout.strip()
-                        if lang_raw:
-                            # Normalizáljuk a nyelv kódot (3 betűs -> 2 betűs, ha szükséges)
-                            compressed_audio_lang = normalize_audio_lang(lang_raw)
-                            # Ha 2 betűs, akkor a LANGUAGE_MAP-ból kérjük a 3 betűs verziót
-                            if len(compressed_audio_lang) == 2 and compressed_audio_lang in LANGUAGE_MAP:
-                                compressed_audio_lang = LANGUAGE_MAP[compressed_audio_lang]
-                            else:
-                                # Ha már 3 betűs, használjuk azt
-                                compressed_audio_lang = lang_raw if len(lang_raw) == 3 else compressed_audio_lang
-                    except (ValueError, TypeError, AttributeError, KeyError):
-                        # Ha nem sikerül, az alapértelmezett nyelvet használjuk
-                        if default_lang in LANGUAGE_MAP:
-                            compressed_audio_lang = LANGUAGE_MAP[default_lang]
-                        else:
-                            compressed_audio_lang = default_lang
+    # Hangsáv terv: az encode_video feladatonként egyszer számolja, itt csak akkor, ha önállóan hívtak
+    if audio_plan is None:
+        audio_plan = AudioPlan.build(Path(input_str), probe=input_probe, compression_enabled=audio_compression_enabled, method=audio_compression_method)
     
     # Video és hangsávok mapping
     ffmpeg_cmd.extend(['-map', '0:v:0'])
     
-    # Eredeti hangsávok számának meghatározása (a kompressziós hangsáv indexéhez)
-    original_audio_count = 0
-    try:
-        # KÖZEPES JAVÍTÁS #8: Használjuk a sanitizált input_str-t
-        default_lang, _, _ = get_audio_streams_info(Path(input_str))
-        if default_lang is not None:
-            # FFprobe parancs az eredeti hangsávok számának lekérdezéséhez
-            count_cmd = [
-                FFPROBE_PATH, '-v', 'error',
-                '-select_streams', 'a',
-                '-show_entries', 'stream=index',
-                '-of', 'default=noprint_wrappers=1:nokey=1',
-                input_str  # Már sanitizálva van
-            ]
-            count_result = subprocess.run(count_cmd, capture_output=True, text=True, check=True, timeout=10, startupinfo=get_startup_info())
-            original_audio_count = len([line for line in count_result.stdout.strip().split('\n') if line.strip()])
-    except (subprocess.SubprocessError, ValueError, AttributeError):
-        # Ha nem sikerül, feltételezzük, hogy 1 hangsáv van
-        original_audio_count = 1
-    
     # Mindig másoljuk az összes hangsávot
     ffmpeg_cmd.extend(['-map', '0:a?'])  # Összes hangsáv
     
     # Hangdinamika kompresszió filter hozzáadása (ha be van kapcsolva, hozzáadjuk a 5.1 hangsávot kompresszióval)
     audio_filter_complex = None
     compressed_audio_index = None  # Az utolsó hangsáv indexe (a kompressziós hangsáv)
-    if use_audio_compression and audio_51_stream_index is not None:
-        # Ha a combobox értéke fordított szöveg, konvertáljuk
-        method = audio_compression_method
-        if method == t('audio_compression_fast'):
-            method = 'fast'
-        elif method == t('audio_compression_dialogue'):
-            method = 'dialogue'
-        
-        audio_filter = build_audio_conversion_filter(method)
-        
-        # Filter complex használata: a 5.1 hangsávot kompresszióval hozzáadjuk
-        audio_filter_complex = f'[0:a:{audio_51_stream_index}]{audio_filter}[acompressed]'
+    if audio_plan.use_compression:
+        audio_filter_complex = audio_plan.filter_graph
         # A kompressziós hangsávot hozzáadjuk a mapping-hez
         ffmpeg_cmd.extend(['-map', '[acompressed]'])
         # Az utolsó hangsáv indexe (a kompressziós hangsáv) = eredeti hangsávok száma
-        compressed_audio_index = original_audio_count
+        compressed_audio_index = audio_plan.audio_stream_count
     
     # Beágyazott feliratok számának lekérdezése
-    embedded_subtitle_count = 0
-    try:
-        count_cmd = [
-            FFPROBE_PATH, '-v', 'error',
-            '-select_streams', 's',
-            '-show_entries', 'stream=index',
-            '-of', 'default=noprint_wrappers=1:nokey=1',
-            input_str  # Már sanitizálva van
-        ]
-        count_result = subprocess.run(count_cmd, capture_output=True, text=True, check=True, timeout=10, startupinfo=get_startup_info())
-        embedded_subtitle_count = len([line for line in count_result.stdout.strip().split('\n') if line.strip()])
-    except (subprocess.SubprocessError, ValueError, AttributeError):
-        # Ha nem sikerül, feltételezzük, hogy 0 beágyazott felirat van
-        embedded_subtitle_count = 0
+    # (ha a probe nem sikerült, a lista üres → 0 beágyazott felirat)
+    embedded_subtitle_count = len(input_probe.subtitle_streams)
     
     ffmpeg_cmd.extend(['-map', '0:s?'])
     
@@ -5847,7 +12213,7 @@ def encode_single_attempt(input_path, output_path, cq_value, subtitle_files, enc
     if resize_enabled:
         # A rövidebb oldal pixelszáma alapján méretezünk
         # KÖZEPES JAVÍTÁS #8: Használjuk a sanitizált input_str-t
-        video_width, video_height = get_video_resolution(Path(input_str))
+        video_width, video_height = get_video_resolution(Path(input_str), probe=input_probe)
         if video_width and video_height and video_width > 0 and video_height > 0:
             # Rövidebb oldal meghatározása
             shorter_side = min(video_width, video_height)
@@ -5878,32 +12244,32 @@ def encode_single_attempt(input_path, output_path, cq_value, subtitle_files, enc
         ffmpeg_cmd.extend(['-filter_complex', audio_filter_complex])
     
     # Video encoder beállítások
+    ffmpeg_cmd.extend(video_encoder_args(encoder, cq_value, svt_preset=svt_preset, svt_cores=svt_cores) + ['-stats_period', '0.5'])
+    if vmaf_value is not None:
+        vmaf_str = format_number_en(vmaf_value, decimals=1) if isinstance(vmaf_value, (int, float)) else str(vmaf_value)
+        # FONTOS: a kihagyott keresés becslése külön tag - a parse_settings_metadata nem olvassa VMAF-ként
+        vmaf_tag = f"Predicted VMAF: ≈{vmaf_str}" if isinstance(vmaf_value, EstimatedVmaf) else f"Planned VMAF: {vmaf_str}"
     if encoder == 'svt-av1':
-        ffmpeg_cmd.extend(['-c:v', 'libsvtav1', '-preset', str(svt_preset), '-crf', str(int(cq_value)), '-g', '240', '-pix_fmt', 'yuv420p10le', '-stats_period', '0.5'])
         # Metadata hozzáadása SVT-AV1 esetén
         if vmaf_value is not None:
-            vmaf_str = format_number_en(vmaf_value, decimals=1) if isinstance(vmaf_value, (int, float)) else str(vmaf_value)
-            metadata_str = f"FFMPEG SVT-AV1 - CRF:{int(cq_value)} - Preset {svt_preset} - Planned VMAF: {vmaf_str}"
+            metadata_str = f"FFMPEG SVT-AV1 - CRF:{int(cq_value)} - Preset {svt_preset} - {vmaf_tag}"
             ffmpeg_cmd.extend(['-metadata', f'Settings={metadata_str}'])
     else:
-        ffmpeg_cmd.extend(['-c:v', 'av1_nvenc', '-preset', 'p7', '-tune', 'hq', '-rc', 'vbr', '-cq', str(int(cq_value)), '-multipass', 'fullres', '-pix_fmt', 'p010le', '-stats_period', '0.5'])
         # Metadata hozzáadása NVENC esetén
         if vmaf_value is not None:
-            vmaf_str = format_number_en(vmaf_value, decimals=1) if isinstance(vmaf_value, (int, float)) else str(vmaf_value)
-            metadata_str = f"FFMPEG NVENC - CQ:{int(cq_value)} - Preset 7 - Planned VMAF: {vmaf_str}"
+            metadata_str = f"FFMPEG NVENC - CQ:{int(cq_value)} - Preset 7 - {vmaf_tag}"
             ffmpeg_cmd.extend(['-metadata', f'Settings={metadata_str}'])
     
     # Audio codec beállítás
-    if use_audio_compression and audio_51_stream_index is not None and compressed_audio_index is not None:
+    if audio_plan.use_compression and compressed_audio_index is not None:
         # Először minden hangsávra copy
         ffmpeg_cmd.extend(['-c:a', 'copy'])
         # Az utolsó hangsávra (a kompressziósra) AAC - stream specifier használata
         ffmpeg_cmd.extend([f'-c:a:{compressed_audio_index}', 'aac', f'-b:a:{compressed_audio_index}', '192k', f'-ac:{compressed_audio_index}', '2'])
         # Metadata hozzáadása a kompressziós hangsávhoz: nyelv és 2.0 jelölés
-        if compressed_audio_lang:
-            ffmpeg_cmd.extend([f'-metadata:s:a:{compressed_audio_index}', f'language={compressed_audio_lang}'])
-        title_text = get_audio_conversion_title(method)
-        ffmpeg_cmd.extend([f'-metadata:s:a:{compressed_audio_index}', f'title={title_text}'])
+        if audio_plan.target_language:
+            ffmpeg_cmd.extend([f'-metadata:s:a:{compressed_audio_index}', f'language={audio_plan.target_language}'])
+        ffmpeg_cmd.extend([f'-metadata:s:a:{compressed_audio_index}', f'title={audio_plan.title}'])
     else:
         ffmpeg_cmd.extend(['-c:a', 'copy'])
     
@@ -5925,6 +12291,37 @@ def encode_single_attempt(input_path, output_path, cq_value, subtitle_files, enc
             ffmpeg_cmd.extend([f'-metadata:s:s:{external_subtitle_stream_idx}', f'title={title}'])
     
     ffmpeg_cmd.extend(['-y', output_str])
+
+    # OPTIMALIZÁCIÓ: inline metrikák - a forrás egyszer dekódolva szolgálja ki a kódolást és a VMAF/PSNR-t,
+    # a külön metrika futás (forrás + kódolt fájl újradekódolása) elmarad
+    inline_metric_names = []
+    inline_hash_path = None
+    inline_reference_identity = None
+    inline_ticket = None
+    if inline_metrics and INLINE_METRICS_ENABLED:
+        # KRITIKUS: a libvmaf szálak a CORE_SCHEDULER keretéből - várakozás nélkül; ha most nincs szabad
+        # keret, a kódolás nem vár rá, a VMAF/PSNR teszt később külön fut. Nincs affinitás verem (reserve):
+        # az SVT kódoló a saját foglalásának magjain marad.
+        inline_ticket, inline_cores = CORE_SCHEDULER.acquire(get_metric_core_budget(), minimum=METRIC_MIN_CORES,
+                                                             label=f"Inline metrika {Path(input_str).name}", blocking=False)
+        if inline_ticket is None:
+            print("ℹ Nincs szabad CPU keret az inline metrikákhoz – a VMAF/PSNR teszt külön fut")
+        else:
+            hash_fd, inline_hash_path = tempfile.mkstemp(prefix='av1_srchash_', suffix='.txt')
+            os.close(hash_fd)
+            inline_args, inline_metric_names = _inline_metrics_args(
+                get_video_resolution(Path(input_str), probe=input_probe), resize_enabled, inline_hash_path,
+                n_threads=inline_cores)
+            if inline_args:
+                inline_reference_identity = ProbeCache.file_identity(Path(input_str))
+                ffmpeg_cmd.extend(inline_args)
+            else:
+                print("ℹ Inline metrikák nem elérhetők (ffmpeg 7+ loopback dekóder, libvmaf és AV1 dekóder kell) – a VMAF/PSNR teszt külön fut")
+                os.remove(inline_hash_path)
+                inline_hash_path = None
+                CORE_SCHEDULER.release(inline_ticket)
+                inline_ticket = None
+    inline_results = {}
     
     # FFmpeg parancs kiírása a konzolba
     # Ha van logger, akkor a console_redirect() context manager-en keresztül megy
@@ -5940,12 +12337,16 @@ def encode_single_attempt(input_path, output_path, cq_value, subtitle_files, enc
         stop_event = STOP_EVENT
 
     if stop_event.is_set():
+        if inline_ticket is not None:
+            CORE_SCHEDULER.release(inline_ticket)
         raise EncodingStopped()
 
     try:
         # FONTOS: NEM állítjuk be a cwd-t, mert lehetnek egyező fájlnevek különböző mappákban
         # Az abszolút útvonalak használata biztosítja, hogy a helyes fájlokat használjuk
-        process = subprocess.Popen(ffmpeg_cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True, bufsize=1, shell=False, startupinfo=get_startup_info())
+        process = subprocess.Popen(ffmpeg_cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True, bufsize=1, shell=False, startupinfo=get_startup_info(),
+                                   **child_process_kwargs())
+        apply_process_placement(process, 'encode')
         
         # Process regisztráció
         with ACTIVE_PROCESSES_LOCK:
@@ -5965,6 +12366,13 @@ def encode_single_attempt(input_path, output_path, cq_value, subtitle_files, enc
                         sys.stdout.flush()
                 except (OSError, IOError, AttributeError):
                     pass
+                for metric in inline_metric_names:
+                    metric_match = METRIC_SUMMARY_PATTERNS[metric].search(line)
+                    if metric_match:
+                        try:
+                            inline_results[metric] = float(metric_match.group(1))
+                        except ValueError:
+                            pass
                 if status_callback:
                     # Csak a frame= sorokat dolgozzuk fel progress számításhoz (figyelmeztető üzeneteket ignoráljuk)
                     if line.strip().startswith('frame='):
@@ -6022,6 +12430,22 @@ def encode_single_attempt(input_path, output_path, cq_value, subtitle_files, enc
             raise EncodingStopped()
 
         success = process.returncode == 0
+
+        # OPTIMALIZÁCIÓ: Void padding a Settings tag mögé (amíg a fájl a page cache-ben van),
+        # így az utólagos Actual VMAF / PSNR beírás helyben, adatmozgatás nélkül történik
+        if success and vmaf_value is not None and output_path.suffix.lower() in ('.mkv', '.webm'):
+            reserve_matroska_tag_space(output_path, logger=logger)
+
+        if success and inline_metric_names:
+            # Csak az elfogadott (a forrásnál kisebb) kimenet eredménye kerül a cache-be - a túl nagy
+            # próbálkozás fájlját az encode_video úgyis felülírja
+            try:
+                accepted = output_path.stat().st_size < Path(input_str).stat().st_size
+            except OSError:
+                accepted = False
+            if accepted:
+                _store_inline_metrics(Path(input_str), output_path, inline_results, inline_metric_names,
+                                      inline_hash_path, inline_reference_identity)
         
         debug_pause(
             f"FFmpeg kész: {'OK' if success else 'HIBA'} (CQ: {int(cq_value)})",
@@ -6035,8 +12459,16 @@ def encode_single_attempt(input_path, output_path, cq_value, subtitle_files, enc
     except (subprocess.SubprocessError, OSError, ValueError, TypeError, AttributeError) as e:
         print(f"✗ Kódolási hiba: {e}")
         return False
+    finally:
+        if inline_ticket is not None:
+            CORE_SCHEDULER.release(inline_ticket)
+        if inline_hash_path:
+            try:
+                os.remove(inline_hash_path)
+            except OSError:
+                pass
 
-def encode_video(input_path, output_path, initial_cq_value, subtitle_files, encoder='av1_nvenc', status_callback=None, initial_min_vmaf=None, vmaf_step=None, max_encoded_percent=None, stop_event=None, vmaf_value=None, resize_enabled=False, resize_height=1080, audio_compression_enabled=False, audio_compression_method='fast', svt_preset=2, logger=None):
+def encode_video(input_path, output_path, initial_cq_value, subtitle_files, encoder='av1_nvenc', status_callback=None, initial_min_vmaf=None, vmaf_step=None, max_encoded_percent=None, stop_event=None, vmaf_value=None, resize_enabled=False, resize_height=1080, audio_compression_enabled=False, audio_compression_method='fast', svt_preset=2, logger=None, inline_metrics=False, svt_cores=None):
     """Main video encoding workflow.
     
     Handles the entire encoding process including:
@@ -6064,6 +12496,8 @@ def encode_video(input_path, output_path, initial_cq_value, subtitle_files, enco
         audio_compression_method: Audio compression method.
         svt_preset: SVT preset.
         logger: Logger instance.
+        inline_metrics: VMAF/PSNR mérése a kódolással egy folyamatban (lásd encode_single_attempt).
+        svt_cores: SVT-AV1 kódolásnál a kiosztott magok száma (lásd encode_single_attempt).
         
     Returns:
         bool: True if successful, False otherwise.
@@ -6098,16 +12532,23 @@ def encode_video(input_path, output_path, initial_cq_value, subtitle_files, enco
     print(f"🔊 HANGSÁVOK ELEMZÉSE: {input_path.name}")
     print(f"{'='*80}")
     
+    # OPTIMALIZÁCIÓ: a hangsáv tervet egyszer számoljuk, minden CQ/CRF próbálkozás ezt kapja
+    # (kikapcsolt kompressziónál nincs hangsáv elemzés)
     try:
-        default_lang, lang_51_count, lang_20_count = get_audio_streams_info(input_path)
-        print(f"Alapértelmezett nyelv: {default_lang if default_lang else 'Nincs'}")
+        audio_plan = AudioPlan.build(input_path, compression_enabled=audio_compression_enabled, method=audio_compression_method)
+    except Exception as e:
+        print(f"⚠ Hangsáv elemzés hiba: {e}\n")
+        audio_plan = AudioPlan(compression_enabled=False, method=AudioPlan.normalize_method(audio_compression_method))
+    
+    if audio_plan.compression_enabled:
+        print(f"Alapértelmezett nyelv: {audio_plan.default_lang if audio_plan.default_lang else 'Nincs'}")
         
-        if lang_51_count or lang_20_count:
+        if audio_plan.lang_51_count or audio_plan.lang_20_count:
             print(f"\nHangsávok nyelv szerint:")
-            all_langs = set(list(lang_51_count.keys()) + list(lang_20_count.keys()))
+            all_langs = set(list(audio_plan.lang_51_count.keys()) + list(audio_plan.lang_20_count.keys()))
             for lang in sorted(all_langs):
-                count_51 = lang_51_count.get(lang, 0)
-                count_20 = lang_20_count.get(lang, 0)
+                count_51 = audio_plan.lang_51_count.get(lang, 0)
+                count_20 = audio_plan.lang_20_count.get(lang, 0)
                 lang_display = lang if lang != 'unknown' else 'Ismeretlen'
                 if count_51 > 0:
                     print(f"  - {lang_display}: {count_51} db 5.1 hangsáv")
@@ -6116,33 +12557,39 @@ def encode_video(input_path, output_path, initial_cq_value, subtitle_files, enco
         else:
             print(f"Nincs hangsáv információ")
         
-        # Hangdinamika kompresszió ellenőrzése
-        if audio_compression_enabled:
-            print(f"\n🔊 Hangdinamika kompresszió: BEKAPCSOLVA (módszer: {audio_compression_method})")
-            if needs_audio_compression(input_path):
-                if default_lang:
-                    audio_51_stream_index = get_51_audio_stream_index(input_path, default_lang)
-                    if audio_51_stream_index is not None:
-                        print(f"  ✓ 5.1 hangsáv található az alapértelmezett nyelvhez (index: {audio_51_stream_index})")
-                        print(f"  ✓ Új 2.0 hangsáv kerül hozzáadásra dinamika kompresszióval")
-                    else:
-                        print(f"  ✗ 5.1 hangsáv nem található az alapértelmezett nyelvhez")
+        print(f"\n🔊 Hangdinamika kompresszió: BEKAPCSOLVA (módszer: {audio_plan.method})")
+        if audio_plan.compression_needed:
+            if audio_plan.default_lang:
+                if audio_plan.source_51_index is not None:
+                    print(f"  ✓ 5.1 hangsáv található az alapértelmezett nyelvhez (index: {audio_plan.source_51_index})")
+                    print(f"  ✓ Új 2.0 hangsáv kerül hozzáadásra dinamika kompresszióval")
                 else:
-                    print(f"  ✗ Alapértelmezett nyelv nem található")
+                    print(f"  ✗ 5.1 hangsáv nem található az alapértelmezett nyelvhez")
             else:
-                print(f"  ✗ Nem szükséges kompresszió (van 2.0 hangsáv vagy nincs 5.1)")
+                print(f"  ✗ Alapértelmezett nyelv nem található")
         else:
-            print(f"\n🔊 Hangdinamika kompresszió: KIKAPCSOLVA")
-        
-        print(f"{'='*80}\n")
-    except Exception as e:
-        print(f"⚠ Hangsáv elemzés hiba: {e}\n")
+            print(f"  ✗ Nem szükséges kompresszió (van 2.0 hangsáv vagy nincs 5.1)")
+    else:
+        print(f"🔊 Hangdinamika kompresszió: KIKAPCSOLVA")
+    
+    print(f"{'='*80}\n")
     
+    # A kódolási sebesség (idő / tartalom másodperc) a SkipEncodePredictor megspórolt idő becsléséhez
+    try:
+        content_seconds = probe_media(input_path).duration
+    except (OSError, ValueError, subprocess.SubprocessError):
+        content_seconds = None
+
     while cq_value <= max_cq:
         if stop_event.is_set():
             raise EncodingStopped()
 
-        success = encode_single_attempt(input_path, output_path, cq_value, subtitle_files, encoder, status_callback, stop_event=stop_event, vmaf_value=current_vmaf, resize_enabled=resize_enabled, resize_height=resize_height, audio_compression_enabled=audio_compression_enabled, audio_compression_method=audio_compression_method, svt_preset=svt_preset, logger=logger)
+        attempt_started = time.monotonic()
+        success = encode_single_attempt(input_path, output_path, cq_value, subtitle_files, encoder, status_callback, stop_event=stop_event, vmaf_value=current_vmaf, resize_enabled=resize_enabled, resize_height=resize_height, audio_compression_enabled=audio_compression_enabled, audio_compression_method=audio_compression_method, svt_preset=svt_preset, logger=logger, audio_plan=audio_plan, inline_metrics=inline_metrics, svt_cores=svt_cores)
+        attempt_seconds = time.monotonic() - attempt_started
+        # OPTIMALIZÁCIÓ: inline metrikák csak az első (a CRF keresés szerinti, jellemzően elfogadott)
+        # próbálkozásnál - a túl nagy kimenet utáni CQ/CRF újrapróbálkozások nem mérnek
+        inline_metrics = False
         
         if not success:
             if output_path.exists() and not DEBUG_MODE:
@@ -6153,6 +12600,7 @@ def encode_video(input_path, output_path, initial_cq_value, subtitle_files, enco
             return False
         
         new_size = output_path.stat().st_size
+        SKIP_ENCODE_PREDICTOR.record_encode(encoder, content_seconds, attempt_seconds, oversized=new_size >= original_size)
         
         if new_size < original_size:
             return True
@@ -6173,7 +12621,9 @@ def encode_video(input_path, output_path, initial_cq_value, subtitle_files, enco
                 )
                 
                 current_vmaf -= vmaf_step
-                cq_result = run_crf_search(input_path, encoder, current_vmaf, vmaf_step, max_encoded_percent, stop_event=stop_event, svt_preset=svt_preset)
+                # A kódolás már elindult (mért túl nagy kimenet) - itt nincs predikciós kihagyás
+                cq_result = run_crf_search(input_path, encoder, current_vmaf, vmaf_step, max_encoded_percent, stop_event=stop_event, svt_preset=svt_preset, svt_cores=svt_cores,
+                                           allow_skip=False)
                 
                 # KRITIKUS VÉDELEM: Ellenőrzés a CRF keresés UTÁN
                 # Biztosítjuk, hogy UGYANAZ a fájl van, mint az encoding kezdetekor
@@ -6287,8 +12737,10 @@ def remove_audio_track_from_file(source_path, audio_index, logger=None, stop_eve
         text=True,
         bufsize=1,
         universal_newlines=True,
-        startupinfo=get_startup_info()
+        startupinfo=get_startup_info(),
+        **child_process_kwargs()
     )
+    apply_process_placement(process, 'audio')
 
     with ACTIVE_PROCESSES_LOCK:
         ACTIVE_PROCESSES.append(process)
@@ -6315,6 +12767,10 @@ def remove_audio_track_from_file(source_path, audio_index, logger=None, stop_eve
             temp_output.unlink()
         raise RuntimeError(f"FFmpeg hangsáv eltávolítás hiba (rc={process.returncode})")
 
+    # Az új fájl Tags eleme mögé padding, hogy a későbbi metaadat frissítés helyben fusson
+    if source_suffix.lower() in ('.mkv', '.webm'):
+        reserve_matroska_tag_space(temp_output, logger=logger)
+
     original_replaced = False
     try:
         if backup_path.exists():
@@ -6421,8 +12877,10 @@ def convert_audio_track_to_stereo(source_path, audio_index, method='fast', langu
         text=True,
         bufsize=1,
         universal_newlines=True,
-        startupinfo=get_startup_info()
+        startupinfo=get_startup_info(),
+        **child_process_kwargs()
     )
+    apply_process_placement(process, 'audio')
 
     with ACTIVE_PROCESSES_LOCK:
         ACTIVE_PROCESSES.append(process)
@@ -6449,6 +12907,10 @@ def convert_audio_track_to_stereo(source_path, audio_index, method='fast', langu
             temp_output.unlink()
         raise RuntimeError(f"FFmpeg konverzió hiba (rc={process.returncode})")
 
+    # Az új fájl Tags eleme mögé padding, hogy a későbbi metaadat frissítés helyben fusson
+    if source_suffix.lower() in ('.mkv', '.webm'):
+        reserve_matroska_tag_space(temp_output, logger=logger)
+
     original_replaced = False
     try:
         if backup_path.exists():
@@ -6526,6 +12988,13 @@ class VideoEncoderGUI:
         global GUI_INSTANCE
         GUI_INSTANCE = self
 
+        # SQLite adatbázis útvonala (script mappájában) - már inicializálva _init_database-ben
+        # Biztosítjuk, hogy mindig a script fájl tényleges mappájába mentse
+        self.db_path = default_db_path()
+        # KRITIKUS: a modul szintű cache-ek (képesség registry, probe cache, ...) már a program detektálás
+        # előtt ebbe az adatbázisba írnak/olvasnak - változatlan binárisnál nincs felderítő subprocess
+        set_cache_db_path(self.db_path)
+
         # Program útvonalak automatikus észlelése
         detected_programs = auto_detect_programs()
         self.ffmpeg_path = tk.StringVar(value=detected_programs['ffmpeg'] or '')
@@ -6546,6 +13015,9 @@ class VideoEncoderGUI:
                 LOG_WRITER.flush()
             except (OSError, IOError, AttributeError):
                 pass
+        # OPTIMALIZÁCIÓ: a képességek betöltése (cache-ből, változott binárisnál felderítés) háttérszálon,
+        # nem a GUI konstruktorban
+        threading.Thread(target=self._warm_tool_capabilities, daemon=True).start()
 
         self.source_path = None
         self.dest_path = None
@@ -6596,19 +13068,7 @@ class VideoEncoderGUI:
             'orig_size': 70, 'new_size': 70, 'size_change': 50, 'duration': 80, 'frames': 80, 'completed_date': 120
         }
         
-        # SQLite adatbázis útvonala (script mappájában) - már inicializálva _init_database-ben
-        # Biztosítjuk, hogy mindig a script fájl tényleges mappájába mentse
-        try:
-            # __file__ abszolút útvonala
-            script_file = Path(__file__).resolve()
-            script_dir = script_file.parent
-        except (OSError, ValueError, AttributeError):
-            # Fallback: jelenlegi munkakönyvtár
-            script_dir = Path.cwd()
-        
-        # SQLite adatbázis útvonala (script mappájában)
-        self.db_path = script_dir / "save.db"
-        # SQLite adatbázis inicializálása
+        # SQLite adatbázis inicializálása (self.db_path és a cache DB fent, a program detektálás előtt)
         self._init_database()
         
         self.encoding_queue = queue.Queue()
@@ -6627,6 +13087,8 @@ class VideoEncoderGUI:
         self.svt_preset = tk.IntVar(value=2)
         self.debug_mode = tk.BooleanVar(value=False)
         self.auto_vmaf_psnr = tk.BooleanVar(value=False)
+        self.auto_vmaf_sampled = tk.BooleanVar(value=False)
+        self.auto_inline_metrics = tk.BooleanVar(value=False)  # Opt-in: a kódoló folyamat extra CPU terhelése
         self.resize_enabled = tk.BooleanVar(value=False)
         self.resize_height = tk.IntVar(value=1080)
         self.skip_av1_files = tk.BooleanVar(value=False)
@@ -6737,6 +13199,10 @@ class VideoEncoderGUI:
                         self.update_resize_label(saved_state['resize_height'])
                     if 'auto_vmaf_psnr' in saved_state:
                         self.auto_vmaf_psnr.set(saved_state['auto_vmaf_psnr'])
+                    if 'auto_vmaf_sampled' in saved_state:
+                        self.auto_vmaf_sampled.set(saved_state['auto_vmaf_sampled'])
+                    if 'auto_inline_metrics' in saved_state:
+                        self.auto_inline_metrics.set(saved_state['auto_inline_metrics'])
                     if 'nvenc_worker_count' in saved_state:
                         self.nvenc_worker_count.set(int(saved_state['nvenc_worker_count']))
                         self.update_nvenc_workers_label(saved_state['nvenc_worker_count'])
@@ -6897,14 +13363,30 @@ class VideoEncoderGUI:
         )
         self.debug_checkbutton.grid(row=2, column=0, columnspan=3, sticky=tk.W, padx=5, pady=5)
         
-        # Automatikus VMAF/PSNR számítás checkbox
+        # Automatikus VMAF/PSNR számítás checkbox (+ gyors mintavételes mód ugyanabban a sorban)
+        auto_vmaf_frame = ttk.Frame(top_frame)
+        auto_vmaf_frame.grid(row=3, column=0, columnspan=3, sticky=tk.W, padx=5, pady=5)
         self.auto_vmaf_psnr_checkbutton = ttk.Checkbutton(
-            top_frame,
+            auto_vmaf_frame,
             text=t('auto_vmaf_psnr'),
             variable=self.auto_vmaf_psnr,
             command=self._save_settings_debounced
         )
-        self.auto_vmaf_psnr_checkbutton.grid(row=3, column=0, columnspan=3, sticky=tk.W, padx=5, pady=5)
+        self.auto_vmaf_psnr_checkbutton.pack(side=tk.LEFT)
+        self.auto_vmaf_sampled_checkbutton = ttk.Checkbutton(
+            auto_vmaf_frame,
+            text=t('auto_vmaf_sampled'),
+            variable=self.auto_vmaf_sampled,
+            command=self._save_settings_debounced
+        )
+        self.auto_vmaf_sampled_checkbutton.pack(side=tk.LEFT, padx=(10, 0))
+        self.auto_inline_metrics_checkbutton = ttk.Checkbutton(
+            auto_vmaf_frame,
+            text=t('auto_inline_metrics'),
+            variable=self.auto_inline_metrics,
+            command=self._save_settings_debounced
+        )
+        self.auto_inline_metrics_checkbutton.pack(side=tk.LEFT, padx=(10, 0))
         
         # Videók betöltése gomb bal oldalon
         self.load_videos_btn = ttk.Button(top_frame, text=t('load_videos'), command=self.load_videos)
@@ -7945,6 +14427,10 @@ class VideoEncoderGUI:
                     }
                     if status_code:
                         vmaf_task['final_status_code'] = status_code
+                    if self.auto_vmaf_sampled.get():
+                        # Gyors mód: mintavételes becslés, teljes mérés csak ha a CI átfedi a min VMAF-ot
+                        vmaf_task['sampled'] = True
+                        vmaf_task['min_vmaf'] = float(self.min_vmaf.get())
                     VMAF_QUEUE.put(vmaf_task)
                     new_size_str = f"{format_localized_number(new_size_mb, decimals=1)} MB"
                     change_percent_str = f"{format_localized_number(change_percent, decimals=2, show_sign=True)}%"
@@ -8264,6 +14750,10 @@ class VideoEncoderGUI:
             self.debug_checkbutton.config(text=t('debug_mode'))
             if hasattr(self, 'auto_vmaf_psnr_checkbutton'):
                 self.auto_vmaf_psnr_checkbutton.config(text=t('auto_vmaf_psnr'))
+            if hasattr(self, 'auto_vmaf_sampled_checkbutton'):
+                self.auto_vmaf_sampled_checkbutton.config(text=t('auto_vmaf_sampled'))
+            if hasattr(self, 'auto_inline_metrics_checkbutton'):
+                self.auto_inline_metrics_checkbutton.config(text=t('auto_inline_metrics'))
             self.load_videos_btn.config(text=t('load_videos'))
             
             # Jobb oldali címkék frissítése (fix szélességgel - minden címke 20 karakter széles, hogy a csúszkák ugyanarról a helyről kezdődjenek)
@@ -8582,10 +15072,16 @@ class VideoEncoderGUI:
 
             if multi_completed:
                 menu.add_separator()
-                menu.add_command(
+                vmaf_multi_menu = tk.Menu(menu, tearoff=0)
+                vmaf_multi_menu.add_command(
                     label=t('menu_vmaf_test_multiple').format(count=len(selected_video_items)),
                     command=lambda: self.request_vmaf_test_multiple(selected_video_items)
                 )
+                vmaf_multi_menu.add_command(
+                    label=t('menu_vmaf_sampled_multiple').format(count=len(selected_video_items)),
+                    command=lambda: self.request_vmaf_test_multiple(selected_video_items, sampled=True)
+                )
+                menu.add_cascade(label=t('menu_vmaf_submenu'), menu=vmaf_multi_menu)
             if menu.index('end') is not None:
                 menu.post(event.x_root, event.y_root)
             return
@@ -8722,13 +15218,26 @@ class VideoEncoderGUI:
                 label=t('menu_psnr_only'),
                 command=lambda: self.request_vmaf_test(selected_video_path, item_id, check_vmaf=False, check_psnr=True)
             )
+            vmaf_menu.add_command(
+                label=t('menu_vmaf_sampled'),
+                command=lambda: self.request_vmaf_test(selected_video_path, item_id, check_vmaf=True, check_psnr=False, sampled=True)
+            )
+            vmaf_menu.add_separator()
+            vmaf_menu.add_command(
+                label=t('menu_frame_metrics'),
+                command=lambda: self.show_frame_metrics(output_file)
+            )
+            vmaf_menu.add_command(
+                label=t('menu_frame_metric_lows'),
+                command=self.show_frame_metric_lows
+            )
             menu.add_cascade(label=t('menu_vmaf_full'), menu=vmaf_menu)
 
         if menu.index('end') is not None:
             menu.post(event.x_root, event.y_root)
 
-    def request_vmaf_test_multiple(self, item_ids):
-        """VMAF/PSNR teszt kérése több videóra"""
+    def request_vmaf_test_multiple(self, item_ids, sampled=False):
+        """VMAF/PSNR teszt kérése több videóra (sampled=True: gyors mintavételes VMAF becslés)"""
         for item_id in item_ids:
             video_path = None
             for vid_path, vid_item_id in self.video_items.items():
@@ -8737,7 +15246,73 @@ class VideoEncoderGUI:
                     break
             
             if video_path:
-                self.request_vmaf_test(video_path, item_id)
+                if sampled:
+                    self.request_vmaf_test(video_path, item_id, check_vmaf=True, check_psnr=False, sampled=True)
+                else:
+                    self.request_vmaf_test(video_path, item_id)
+
+    @staticmethod
+    def _format_frame_metric_segments(worst_segments):
+        """Legrosszabb szakaszok szöveges listája (kezdő idő + átlag)."""
+        lines = []
+        for segment in worst_segments:
+            minutes, seconds = divmod(int(segment.get('start_seconds', 0)), 60)
+            hours, minutes = divmod(minutes, 60)
+            lines.append(f"  {hours}:{minutes:02d}:{seconds:02d}  {segment.get('mean', 0.0):.2f}")
+        return lines
+
+    def show_frame_metrics(self, output_file):
+        """A kódolt fájl tárolt per-frame VMAF logjának összesítése (újramérés nélkül)."""
+        stored = load_frame_metrics(output_file, 'VMAF')
+        if stored is None:
+            # Per-frame log nincs, de lehet mintavételes becslés (konfidencia intervallummal)
+            sampled = load_sampled_estimate(output_file, 'VMAF')
+            message = t('msg_frame_metrics_missing')
+            if sampled:
+                message += (f"\n\nVMAF ≈ {sampled['mean']:.2f} (95% CI: {sampled['ci_low']:.2f} – {sampled['ci_high']:.2f}, "
+                            f"{sampled['clips']} clips)")
+            messagebox.showinfo("Info", message)
+            return
+        _, summary = stored
+        lines = [
+            Path(output_file).name,
+            f"mean {summary['mean']:.2f}  harmonic {summary['harmonic_mean']:.2f}  ({summary['frames']} frames)",
+            f"1% low {summary['p1']:.2f}  5% low {summary['p5']:.2f}  min {summary['min']:.2f}",
+        ]
+        segment_lines = self._format_frame_metric_segments(summary.get('worst_segments') or [])
+        if segment_lines:
+            lines.append(f"worst {FRAME_METRICS_WORST_WINDOW_SECONDS:g}s:")
+            lines.extend(segment_lines)
+        messagebox.showinfo("VMAF", '\n'.join(lines))
+
+    def show_frame_metric_lows(self):
+        """A tárolt per-frame logok közül a legrosszabb 1% low-val rendelkezők listája.
+
+        A lekérdezés (fájlonkénti stat + DB olvasás) háttér szálon fut, az eredmény root.after-rel jön vissza.
+        """
+        # FONTOS: a GUI szál nem blokkolhat - sok tárolt logra / hálózati meghajtón a stat hívások lassúak
+        threading.Thread(target=self._frame_metric_lows_worker, daemon=True).start()
+
+    def _frame_metric_lows_worker(self):
+        """show_frame_metric_lows háttér része: lekérdezés és a szöveg összeállítása."""
+        try:
+            rows = query_frame_metric_lows('VMAF', 'p1', limit=FRAME_METRICS_LOWS_SHOWN)
+        except Exception as e:
+            load_debug_log(f"[show_frame_metric_lows] Lekérdezés hiba: {e}")
+            rows = []
+        if not rows:
+            self.root.after(0, lambda: messagebox.showinfo("Info", t('msg_frame_metric_lows_empty')))
+            return
+        lines = []
+        for path, mean, p1, p5, _minimum, worst in rows:
+            worst_text = ''
+            if worst:
+                minutes, seconds = divmod(int(worst[0].get('start_seconds', 0)), 60)
+                worst_text = f"  worst @{minutes}:{seconds:02d} {worst[0].get('mean', 0.0):.2f}"
+            lines.append(f"{p1:6.2f} / {p5:6.2f} / {mean:6.2f}  {Path(path).name}{worst_text}")
+        load_debug_log("[show_frame_metric_lows]\n" + '\n'.join(lines))
+        message = '\n'.join(lines)
+        self.root.after(0, lambda: messagebox.showinfo("VMAF 1% / 5% low / mean", message))
 
     def ensure_vmaf_worker_running(self):
         """Gondoskodik róla, hogy a VMAF/PSNR worker és a queue feldolgozás aktív legyen."""
@@ -8753,7 +15328,7 @@ class VideoEncoderGUI:
             self.start_button.config(text=t('btn_stop'), command=self.stop_encoding_graceful, state=tk.NORMAL)
             self.check_encoding_queue()
 
-    def request_vmaf_test(self, video_path, item_id, check_vmaf=True, check_psnr=True):
+    def request_vmaf_test(self, video_path, item_id, check_vmaf=True, check_psnr=True, sampled=False):
         """Request VMAF/PSNR calculation for a specific video.
         
         Adds the request to the VMAF worker queue.
@@ -8763,6 +15338,8 @@ class VideoEncoderGUI:
             item_id: Treeview item ID.
             check_vmaf: Whether to calculate VMAF.
             check_psnr: Whether to calculate PSNR.
+            sampled: Fast sampled VMAF estimate; escalates to a full pass when the
+                confidence interval straddles the current min VMAF.
         """
 
         output_file = self.video_to_output.get(video_path)
@@ -8787,6 +15364,9 @@ class VideoEncoderGUI:
             'check_vmaf': bool(check_vmaf),
             'check_psnr': bool(check_psnr),
         }
+        if sampled:
+            vmaf_task['sampled'] = True
+            vmaf_task['min_vmaf'] = float(self.min_vmaf.get())
         VMAF_QUEUE.put(vmaf_task)
         
         # Státusz frissítés
@@ -9022,7 +15602,7 @@ class VideoEncoderGUI:
         self.encoding_queue.put(("tag", item_id, "audio_edit"))
         # save_json hivatkozások eltávolítva - adatbázis mentés csak start_encoding és stop_encoding-ban történik
 
-        with CPU_WORKER_LOCK:
+        with CORE_SCHEDULER.reserve(AUDIO_EDIT_CORES, label='audio'):
             with console_redirect(self.svt_logger):
                 print(f"\n{'='*80}\nHANGSÁV ELTÁVOLÍTÁS: {output_file.name}\n{track_info.get('description', '')}\n{'='*80}\n")
             remove_audio_track_from_file(output_file, track_info['ffmpeg_audio_index'], logger=self.svt_logger, stop_event=STOP_EVENT)
@@ -9447,8 +16027,8 @@ class VideoEncoderGUI:
             elif column == "vmaf":
                 vmaf = values[self.COLUMN_INDEX['vmaf']] if len(values) > self.COLUMN_INDEX['vmaf'] else ""
                 try:
-                    # Lokalizált szám kezelése
-                    vmaf_normalized = normalize_number_string(vmaf) if vmaf != "-" else "-"
+                    # Lokalizált szám kezelése ('≈' = becsült érték, a szám szerint rendezzük)
+                    vmaf_normalized = normalize_number_string(str(vmaf).lstrip('≈')) if vmaf != "-" else "-"
                     vmaf_val = float(vmaf_normalized) if vmaf_normalized != "-" else 0
                 except (ValueError, TypeError):
                     vmaf_val = 0
@@ -9456,8 +16036,8 @@ class VideoEncoderGUI:
             elif column == "psnr":
                 psnr = values[self.COLUMN_INDEX['psnr']] if len(values) > self.COLUMN_INDEX['psnr'] else ""
                 try:
-                    # Lokalizált szám kezelése
-                    psnr_normalized = normalize_number_string(psnr) if psnr != "-" else "-"
+                    # Lokalizált szám kezelése ('≈' = becsült érték, a szám szerint rendezzük)
+                    psnr_normalized = normalize_number_string(str(psnr).lstrip('≈')) if psnr != "-" else "-"
                     psnr_val = float(psnr_normalized) if psnr_normalized != "-" else 0
                 except (ValueError, TypeError):
                     psnr_val = 0
@@ -9588,6 +16168,21 @@ class VideoEncoderGUI:
     def _on_tool_path_change(self, *args):
         self.apply_tool_paths_from_gui()
 
+    def _warm_tool_capabilities(self):
+        """ffmpeg / ab-av1 képességek betöltése háttérszálon és az összegzés logolása."""
+        try:
+            TOOL_CAPABILITIES.abav1()
+            summary = TOOL_CAPABILITIES.summary_text()
+        except Exception as e:
+            load_debug_log(f"[_warm_tool_capabilities] Hiba: {e}")
+            return
+        if LOG_WRITER:
+            try:
+                LOG_WRITER.write(f"  {summary}\n")
+                LOG_WRITER.flush()
+            except (OSError, IOError, AttributeError):
+                pass
+
     def apply_tool_paths_from_gui(self):
         apply_external_tool_paths(
             (self.ffmpeg_path.get().strip() or None),
@@ -9709,6 +16304,7 @@ class VideoEncoderGUI:
                 output_encoder_type TEXT
             )
             ''')
+            ensure_cache_tables(cursor)
         except sqlite3.Error as e:
             if LOAD_DEBUG:
                 load_debug_log(f"[_ensure_db_tables] Hiba a táblák létrehozásakor: {e}")
@@ -9858,6 +16454,8 @@ class VideoEncoderGUI:
                     'audio_compression_enabled': bool(self.audio_compression_enabled.get()),
                     'audio_compression_method': str(self.audio_compression_method.get()),
                     'auto_vmaf_psnr': bool(self.auto_vmaf_psnr.get()),
+                    'auto_vmaf_sampled': bool(self.auto_vmaf_sampled.get()),
+                    'auto_inline_metrics': bool(self.auto_inline_metrics.get()),
                     'svt_preset': int(self.svt_preset.get()),
                     'nvenc_worker_count': int(self.nvenc_worker_count.get())
                 }
@@ -10220,15 +16818,8 @@ class VideoEncoderGUI:
                                                 load_debug_log(f"[save_state_to_db] Output videó probolás (fájl változott): {output_file}")
                                             else:
                                                 load_debug_log(f"[save_state_to_db] Output videó probolás (hidegindítás/új videó): {output_file}")
-                                        # Teljes probe - Settings tag-ből encoder_type
-                                        probe_cmd = [
-                                            FFPROBE_PATH, '-v', 'error',
-                                            '-show_entries', 'format_tags=Settings',
-                                            '-of', 'default=noprint_wrappers=1:nokey=1',
-                                            os.fspath(output_file.absolute())
-                                        ]
-                                        result_probe = subprocess.run(probe_cmd, capture_output=True, text=True, timeout=5, startupinfo=get_startup_info())
-                                        settings_str = result_probe.stdout.strip() if result_probe.stdout else ""
+                                        # Teljes probe (probe cache) - Settings tag-ből encoder_type
+                                        settings_str = probe_media_header(output_file.absolute()).settings
                                         if settings_str:
                                             if 'NVENC' in settings_str.upper() or 'CQ:' in settings_str:
                                                 output_encoder_type = 'nvenc'
@@ -10612,6 +17203,8 @@ class VideoEncoderGUI:
                         'audio_compression_enabled': bool(self.audio_compression_enabled.get()),
                         'audio_compression_method': str(self.audio_compression_method.get()),
                         'auto_vmaf_psnr': bool(self.auto_vmaf_psnr.get()),
+                        'auto_vmaf_sampled': bool(self.auto_vmaf_sampled.get()),
+                        'auto_inline_metrics': bool(self.auto_inline_metrics.get()),
                         'svt_preset': int(self.svt_preset.get()),
                         'nvenc_worker_count': int(self.nvenc_worker_count.get())
                     }
@@ -10778,15 +17371,8 @@ class VideoEncoderGUI:
                             if not output_encoder_type:
                                 # Probolás szükséges
                                 try:
-                                    probe_cmd = [
-                                        FFPROBE_PATH, '-v', 'error',
-                                        '-show_entries', 'format_tags=Settings',
-                                        '-of', 'default=noprint_wrappers=1:nokey=1',
-                                        str(output_file)
-                                    ]
-                                    result = subprocess.run(probe_cmd, capture_output=True, text=True, timeout=30, startupinfo=get_startup_info())
-                                    if result.returncode == 0 and result.stdout:
-                                        settings_tag = result.stdout.strip()
+                                    settings_tag = probe_media_header(output_file).settings
+                                    if settings_tag:
                                         if 'encoder=nvenc' in settings_tag.lower():
                                             output_encoder_type = 'nvenc'
                                         elif 'encoder=svt-av1' in settings_tag.lower() or 'encoder=libsvtav1' in settings_tag.lower():
@@ -10841,7 +17427,86 @@ class VideoEncoderGUI:
                         conn.close()
                     except Exception:
                         pass
-    
+
+    def update_output_info_batch_in_db(self, rows):
+        """Kimeneti fájl metaadatok visszaírása egyetlen tranzakcióban (melegindítás batch probe után).
+
+        Args:
+            rows: (video_path_str, cq, vmaf, psnr, output_file_size_bytes, output_modified_timestamp,
+                output_encoder_type) tuple-ök listája. A státuszt nem írja, azt a betöltés végi mentés kezeli.
+
+        Returns:
+            int: Frissített sorok száma.
+        """
+        if not rows or not hasattr(self, 'db_path') or not self.db_path:
+            return 0
+
+        with self.db_lock:
+            conn = None
+            try:
+                # Retry logika SQLITE_BUSY hibákra
+                max_retries = 3
+                retry_delay = 0.1  # 100ms
+                for attempt in range(max_retries):
+                    try:
+                        conn = sqlite3.connect(str(self.db_path), timeout=30.0)
+                        break  # Sikeres kapcsolat
+                    except sqlite3.OperationalError as e:
+                        if "database is locked" in str(e).lower() and attempt < max_retries - 1:
+                            time.sleep(retry_delay * (attempt + 1))  # Exponenciális backoff
+                            continue
+                        else:
+                            raise  # Egyéb hiba vagy utolsó próbálkozás
+
+                cursor = conn.cursor()
+                self._ensure_db_tables(cursor)
+
+                # PRAGMA beállítások
+                try:
+                    cursor.execute('PRAGMA journal_mode = WAL')
+                    cursor.execute('PRAGMA synchronous = NORMAL')
+                except Exception:
+                    pass
+
+                # OPTIMALIZÁCIÓ: egyetlen tranzakció az összes sorra (nem fájlonkénti commit)
+                cursor.executemany('''
+                    UPDATE videos SET
+                        cq = COALESCE(?, cq),
+                        vmaf = COALESCE(?, vmaf),
+                        psnr = COALESCE(?, psnr),
+                        new_size_bytes = ?,
+                        output_file_size_bytes = ?,
+                        output_modified_timestamp = ?,
+                        output_encoder_type = COALESCE(?, output_encoder_type)
+                    WHERE video_path = ?
+                ''', [
+                    (cq, vmaf, psnr, size_bytes, size_bytes, modified_timestamp, encoder_type, video_path_str)
+                    for video_path_str, cq, vmaf, psnr, size_bytes, modified_timestamp, encoder_type in rows
+                ])
+                updated_rows = max(cursor.rowcount, 0)
+                conn.commit()
+                return updated_rows
+
+            except (sqlite3.Error, OSError, PermissionError) as e:
+                if conn:
+                    try:
+                        conn.rollback()
+                    except Exception:
+                        pass
+                if LOG_WRITER:
+                    try:
+                        LOG_WRITER.write(f"⚠ [update_output_info_batch_in_db] Hiba: {e} | {len(rows)} sor\n")
+                        LOG_WRITER.flush()
+                    except Exception:
+                        pass
+                return 0
+            finally:
+                if conn:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
     def _save_settings_debounced(self):
         """Debounced beállítások mentése (2 másodperc késleltetéssel)"""
         # Töröljük az előző timert, ha van
@@ -10947,6 +17612,8 @@ class VideoEncoderGUI:
                     'audio_compression_enabled': settings_dict.get('audio_compression_enabled') == 'True' if settings_dict.get('audio_compression_enabled') else False,
                     'audio_compression_method': settings_dict.get('audio_compression_method', ''),
                     'auto_vmaf_psnr': settings_dict.get('auto_vmaf_psnr') == 'True' if settings_dict.get('auto_vmaf_psnr') else False,
+                    'auto_vmaf_sampled': settings_dict.get('auto_vmaf_sampled') == 'True' if settings_dict.get('auto_vmaf_sampled') else False,
+                    'auto_inline_metrics': settings_dict.get('auto_inline_metrics') == 'True' if settings_dict.get('auto_inline_metrics') else False,
                     'svt_preset': int(settings_dict.get('svt_preset', 0)) if settings_dict.get('svt_preset') else 0,
                     'nvenc_worker_count': int(settings_dict.get('nvenc_worker_count', 0)) if settings_dict.get('nvenc_worker_count') else 0,
                     'videos': videos_list
@@ -11259,6 +17926,8 @@ class VideoEncoderGUI:
                     'audio_compression_enabled': saved_state.get('audio_compression_enabled'),
                     'audio_compression_method': saved_state.get('audio_compression_method'),
                     'auto_vmaf_psnr': saved_state.get('auto_vmaf_psnr'),
+                    'auto_vmaf_sampled': saved_state.get('auto_vmaf_sampled'),
+                    'auto_inline_metrics': saved_state.get('auto_inline_metrics'),
                     'svt_preset': saved_state.get('svt_preset'),
                     'nvenc_worker_count': saved_state.get('nvenc_worker_count')
                 },
@@ -11520,7 +18189,69 @@ class VideoEncoderGUI:
             # Ne használjuk a JSON-ból betöltött sorszámokat, mert az ABC sorrend állandó
             # A video_files már ABC sorrendben van, és a video_order is ABC sorrendben van beállítva
             # Ez biztosítja, hogy mindig ugyanaz a sorszám legyen ugyanaz a fájlhoz
-        
+
+        # OPTIMALIZÁCIÓ: a tényleges párhuzamosságot eszközönként a ProbeScheduler (AIMD) szabja meg
+        # a mért latencia alapján - a thread pool csak a felső korlát (NVMe: 32+, NAS: 1-4)
+        probe_scheduler = ProbeScheduler()
+
+        # OPTIMALIZÁCIÓ: melegindításkor a módosult kimeneteket egy batch menetben olvassuk be
+        # (egy cél könyvtár scan + fájlonként egyetlen fejléc olvasás), és egyetlen tranzakcióban
+        # írjuk vissza a DB-be. A process_video_data ezután nem probol kimenetet, csak kikeresi.
+        prefetched_output_info = {}
+        if saved_videos and self.dest_path and not destination_is_empty:
+            video_loading_log(f"STEP 3.5: Módosult kimenetek batch beolvasása")
+            prefetch_start = time.time()
+            dest_scan = batch_scan_directory(self.dest_path)
+            dest_scan_by_key = {ProbeCache.path_key(path): (path, stat_info) for path, stat_info in dest_scan.items()}
+            changed_outputs = {}
+            video_path_by_output = {}
+            for saved_video_entry in saved_videos.values():
+                saved_output_path = saved_video_entry.get('output_path')
+                if not saved_output_path:
+                    continue
+                scanned = dest_scan_by_key.get(ProbeCache.path_key(saved_output_path))
+                if scanned is None:
+                    continue
+                output_path, stat_info = scanned
+                entry_status_code = saved_video_entry.get('status_code') or normalize_status_to_code(saved_video_entry.get('status', ''))
+                saved_size = saved_video_entry.get('output_file_size_bytes')
+                saved_modified = saved_video_entry.get('output_modified_timestamp')
+                # Ugyanaz a döntés, mint a process_video_data-ban: completed státusznál csak a méret/dátum
+                # eltérés, queue/encoding státusznál a meglévő kimenet számít módosultnak
+                if entry_status_code in ('completed', 'completed_nvenc', 'completed_svt', 'completed_copy', 'completed_exists'):
+                    if saved_size == stat_info['size'] and (saved_modified is None or abs(saved_modified - stat_info['mtime']) < 1.0):
+                        continue
+                elif entry_status_code not in ('pending', 'nvenc_queue', 'svt_queue', 'svt_encoding', 'svt_validation', 'svt_crf_search', 'encoding', 'nvenc_encoding'):
+                    continue
+                changed_outputs[output_path] = stat_info
+                video_path_by_output[output_path] = saved_video_entry.get('video_path')
+
+            if changed_outputs:
+                def prefetch_progress(done, total):
+                    if done == total or done % 25 == 0:
+                        self.status_label.config(text=f"Módosult kimenetek beolvasása: {done}/{total} | {probe_scheduler.total_concurrency()} párh., {probe_scheduler.probes_per_second():.1f} probe/s")
+                        self.root.update()
+
+                prefetched_output_info = get_output_files_info_batch(changed_outputs, scheduler=probe_scheduler, progress_callback=prefetch_progress)
+                db_rows = []
+                for output_path, video_path_str in video_path_by_output.items():
+                    info = prefetched_output_info.get(ProbeCache.path_key(output_path))
+                    if not info or info[4] is None or not video_path_str:
+                        continue
+                    info_cq, info_vmaf, info_psnr, _, info_size, _, info_encoder, _, _ = info
+                    db_rows.append((
+                        video_path_str,
+                        str(info_cq) if info_cq is not None else None,
+                        format_localized_number(info_vmaf, decimals=1) if info_vmaf is not None else None,
+                        format_localized_number(info_psnr, decimals=1) if info_psnr is not None else None,
+                        info_size,
+                        changed_outputs[output_path]['mtime'],
+                        info_encoder
+                    ))
+                stored_rows = self.update_output_info_batch_in_db(db_rows)
+                log_file_check(f"✓ Módosult kimenetek: {len(changed_outputs)} beolvasva, {stored_rows} DB sor frissítve ({time.time() - prefetch_start:.2f}s)")
+            video_loading_log(f"STEP 3.5 DONE: {(time.time() - prefetch_start) * 1000:.2f}ms - {len(dest_scan)} cél fájl, {len(changed_outputs)} módosult kimenet")
+
         # Párhuzamos videó adatgyűjtés helper függvény
         def process_video_data(video_path):
             """
@@ -11991,12 +18722,17 @@ class VideoEncoderGUI:
                     
                     if result['output_exists']:
                         if should_probe_output:
-                            # Teljes probe - csak akkor hívjuk meg, ha a fájl módosult
-                            video_loading_log(f"  PROBING output file (file changed or no saved data)")
-                            probe_start = time.time()
-                            output_cq_crf, output_vmaf, output_psnr, output_frame_count, output_file_size, output_modified_date, output_encoder_type, should_delete_output, output_duration_seconds = get_output_file_info(result['output_file'])
-                            probe_time = (time.time() - probe_start) * 1000
-                            video_loading_log(f"  Output probe took {probe_time:.2f}ms: cq={output_cq_crf}, vmaf={output_vmaf}, size={output_file_size}")
+                            # Teljes probe - csak akkor hívjuk meg, ha a fájl módosult (a batch menet eredménye elsőbbséget élvez)
+                            prefetched_info = prefetched_output_info.get(ProbeCache.path_key(result['output_file']))
+                            if prefetched_info is not None:
+                                output_cq_crf, output_vmaf, output_psnr, output_frame_count, output_file_size, output_modified_date, output_encoder_type, should_delete_output, output_duration_seconds = prefetched_info
+                                video_loading_log(f"  Output info from batch prefetch: cq={output_cq_crf}, vmaf={output_vmaf}, size={output_file_size}")
+                            else:
+                                video_loading_log(f"  PROBING output file (file changed or no saved data)")
+                                probe_start = time.time()
+                                output_cq_crf, output_vmaf, output_psnr, output_frame_count, output_file_size, output_modified_date, output_encoder_type, should_delete_output, output_duration_seconds = get_output_file_info(result['output_file'])
+                                probe_time = (time.time() - probe_start) * 1000
+                                video_loading_log(f"  Output probe took {probe_time:.2f}ms: cq={output_cq_crf}, vmaf={output_vmaf}, size={output_file_size}")
                             if output_file_modified is None:
                                 try:
                                     output_file_modified = result['output_file'].stat().st_mtime
@@ -12051,20 +18787,9 @@ class VideoEncoderGUI:
                                 # Ha még mindig nincs, de completed státusz van, akkor próbáljuk meg a fájlból probolni (gyors, csak Settings tag)
                                 elif saved_status_code in ('completed', 'completed_copy', 'completed_exists'):
                                     try:
-                                        # Gyors probe csak a Settings tag-ért (nem teljes probe)
-                                        probe_cmd = [
-                                            FFPROBE_PATH, '-v', 'error',
-                                            '-show_entries', 'format_tags=Settings',
-                                            '-of', 'default=noprint_wrappers=1:nokey=1',
-                                            os.fspath(result['output_file'].absolute())
-                                        ]
-                                        result_probe = subprocess.run(probe_cmd, capture_output=True, text=True, timeout=5, startupinfo=get_startup_info())
-                                        settings_str = result_probe.stdout.strip() if result_probe.stdout else ""
-                                        if settings_str:
-                                            if 'NVENC' in settings_str.upper() or 'CQ:' in settings_str:
-                                                output_encoder_type = 'nvenc'
-                                            elif 'SVT-AV1' in settings_str.upper() or 'SVT' in settings_str.upper() or 'CRF:' in settings_str:
-                                                output_encoder_type = 'svt-av1'
+                                        # Settings tag a probe cache-ből (ha a fájl nem változott, nincs ffprobe)
+                                        settings_str = probe_media_header(result['output_file'].absolute()).settings
+                                        output_encoder_type = parse_settings_metadata(settings_str)[3]
                                     except Exception:
                                         pass
                         
@@ -12367,10 +19092,7 @@ class VideoEncoderGUI:
         
         # Párhuzamos feldolgozás - több worker gyorsabb betöltéshez
         total_videos = len(self.video_files)
-        # Optimalizált worker szám: nem túl sok, hogy ne legyen használhatatlan a számítógép
-        # I/O-bound műveletek, de nem kell túl sok thread (4-8 elég)
-        cpu_count = os.cpu_count() or 4
-        max_workers = min(8, total_videos, max(4, cpu_count))  # Max 8 worker, min 4 (ha van elég CPU)
+        max_workers = max(1, min(PROBE_POOL_MAX_WORKERS, total_videos))
         
         # Thread-safe queue az elkészült adatokhoz
         completed_data_queue = queue.Queue()
@@ -12481,7 +19203,7 @@ class VideoEncoderGUI:
             
             # Státusz frissítés
             if items_to_add:
-                self.status_label.config(text=f"Videók feldolgozása: {processed_count[0]}/{total_videos}")
+                self.status_label.config(text=f"Videók feldolgozása: {processed_count[0]}/{total_videos} | {probe_scheduler.total_concurrency()} párh., {probe_scheduler.probes_per_second():.1f} probe/s")
                 # Rendezzük az elemeket order_num szerint (ABC sorrend)
                 self._sort_tree_by_order_num()
                 # Nem hívjuk meg self.root.update()-et, mert az időzítő kezeli a frissítést
@@ -12492,7 +19214,7 @@ class VideoEncoderGUI:
         
         # Thread pool és futures
         executor = ThreadPoolExecutor(max_workers=max_workers)
-        future_to_video = {executor.submit(process_video_data, vp): vp for vp in self.video_files}
+        future_to_video = probe_scheduler.submit_all(executor, self.video_files, process_video_data)
         all_futures = list(future_to_video.keys())
         
         # Külön thread a futures befejezésének kezelésére (nem blokkolja a főszálat)
@@ -12670,6 +19392,7 @@ class VideoEncoderGUI:
                         
                         if LOAD_DEBUG:
                             load_debug_log(f"finish_loading: processed={processed_count[0]}/{total_videos} | videók a fában={len(self.video_items)} | queue={completed_data_queue.qsize()}")
+                            load_debug_log(f"finish_loading: {PROBE_CACHE.stats_text()}")
                             if processed_count[0] < total_videos:
                                 missing_videos = []
                                 try:
@@ -12694,6 +19417,7 @@ class VideoEncoderGUI:
                             executor.shutdown(wait=False)
                         except Exception as e:
                             log_file_check(f"⚠ Hiba executor lezárása során: {e}")
+                        log_file_check(f"✓ Betöltés {probe_scheduler.stats_text()}")
                         
                         # Utolsó rendezés order_num szerint (ABC sorrend)
                         self._sort_tree_by_order_num()
@@ -14128,15 +20852,8 @@ class VideoEncoderGUI:
                                     # Ha van output fájl, proboljuk és frissítsük a tree_item_data-t
                                     if output_file and output_file.exists():
                                         try:
-                                            # Gyors probe csak az encoder_type-ért
-                                            probe_cmd = [
-                                                FFPROBE_PATH, '-v', 'error',
-                                                '-show_entries', 'format_tags=Settings',
-                                                '-of', 'default=noprint_wrappers=1:nokey=1',
-                                                os.fspath(output_file.absolute())
-                                            ]
-                                            result_probe = subprocess.run(probe_cmd, capture_output=True, text=True, timeout=5, startupinfo=get_startup_info())
-                                            settings_str = result_probe.stdout.strip() if result_probe.stdout else ""
+                                            # Gyors probe csak az encoder_type-ért (probe cache)
+                                            settings_str = probe_media_header(output_file.absolute()).settings
                                             if settings_str:
                                                 output_encoder_type = None
                                                 if 'NVENC' in settings_str.upper() or 'CQ:' in settings_str:
@@ -14410,6 +21127,8 @@ class VideoEncoderGUI:
                 vmaf_value = task.get('vmaf_value', None)
                 resize_enabled = task.get('resize_enabled', False)
                 resize_height = task.get('resize_height', 1080)
+                # Opt-in: a metrikák a kódolással egy folyamatban készülnek (metrika cache-be), csak az elfogadott próbálkozásnál
+                inline_metrics = bool(self.auto_inline_metrics.get())
                 audio_compression_enabled = task.get('audio_compression_enabled', self.audio_compression_enabled.get())
                 audio_compression_method = task.get('audio_compression_method', self.audio_compression_method.get())
                 if audio_compression_method == t('audio_compression_fast'):
@@ -14448,7 +21167,8 @@ class VideoEncoderGUI:
                             resize_enabled=resize_enabled,
                             resize_height=resize_height,
                             audio_compression_enabled=audio_compression_enabled,
-                            audio_compression_method=audio_compression_method
+                            audio_compression_method=audio_compression_method,
+                            inline_metrics=inline_metrics
                         )
                     except EncodingStopped:
                         stop_encoding = True
@@ -14573,7 +21293,7 @@ class VideoEncoderGUI:
                         continue
                     elif is_valid:
                         orig_size_mb, new_size_mb, change_percent = self.calculate_file_sizes(video_path, output_file)
-                        vmaf_display = final_vmaf if isinstance(final_vmaf, str) else format_localized_number(final_vmaf, decimals=1)
+                        vmaf_display = format_search_vmaf(final_vmaf)
                         orig_size_display = f"{format_localized_number(orig_size_mb, decimals=1)} MB"
                         self.mark_encoding_completed(item_id, f"✓ Kész ({used_encoder})", str(int(final_cq)), vmaf_display, "-", orig_size_display, new_size_mb, change_percent)
                         self._copy_invalid_subtitles(invalid_subtitles, output_file)
@@ -14643,6 +21363,8 @@ class VideoEncoderGUI:
             max_encoded = task['max_encoded']
             resize_enabled = task.get('resize_enabled', False)
             resize_height = task.get('resize_height', 1080)
+            # Opt-in: a metrikák a kódolással egy folyamatban készülnek (metrika cache-be), csak az elfogadott próbálkozásnál
+            inline_metrics = bool(self.auto_inline_metrics.get())
             audio_compression_enabled = task.get('audio_compression_enabled', self.audio_compression_enabled.get())
             audio_compression_method = task.get('audio_compression_method', self.audio_compression_method.get())
             # Ha a combobox értéke fordított szöveg, konvertáljuk
@@ -14679,290 +21401,205 @@ class VideoEncoderGUI:
                 print(f"SVT-AV1 FELDOLGOZÁS: {video_path.name}")
                 print(f"TELJES ÚTVONAL: {video_path.absolute()}")
                 print(f"{'*'*80}\n")
-                
-                print(f"⏳ Várakozás SVT-AV1 slot-ra...")
 
-            # KRITIKUS: CPU worker lock - biztosítja, hogy csak 1 CPU worker (SVT-AV1 vagy VMAF/PSNR) fusson egyszerre
-            # A státusz frissítés a lock-on BELÜL történik, hogy ne legyen race condition
-            with CPU_WORKER_LOCK:
-                # Leállítás ellenőrzés
-                if not self.is_encoding:
-                    current_values = self.tree.item(item_id, 'values')
-                    status = current_values[self.COLUMN_INDEX['status']] if len(current_values) > self.COLUMN_INDEX['status'] else ""
-                    tags = self.tree.item(item_id, 'tags')
-                    # Kész vagy ellenőrizendő állapotot nem bolygatunk
-                    if "✓ Kész" not in status and "completed" not in tags and "Ellenőrizendő" not in status and "needs_check" not in tags:
-                        completed_date = current_values[self.COLUMN_INDEX['completed_date']] if len(current_values) > self.COLUMN_INDEX['completed_date'] else ""
-                        self.encoding_queue.put(("update", item_id, t('status_svt_queue'), "-", "-", "-", "-", orig_size_str, "-", "-", completed_date))
-                        self.encoding_queue.put(("tag", item_id, "pending"))
-                        # save_json hivatkozások eltávolítva - adatbázis mentés csak start_encoding és stop_encoding-ban történik
-                        SVT_QUEUE.task_done()
-                        continue
-                
-                # Státusz frissítés: SVT-AV1 queue-ban vár (lock-on belül, hogy ne legyen race condition)
+            # KRITIKUS: CPU mag keret szakaszonként - a CRF keresés és a kódolás külön foglal (SVT_ENCODE_CORES),
+            # köztük, a kihagyott keresésnél és a kódolás utáni teendők alatt a magok a VMAF/PSNR workereké
+
+            # Leállítás ellenőrzés
+            if not self.is_encoding:
                 current_values = self.tree.item(item_id, 'values')
-                completed_date = current_values[self.COLUMN_INDEX['completed_date']] if len(current_values) > self.COLUMN_INDEX['completed_date'] else ""
-                self.encoding_queue.put(("update", item_id, t('status_svt_queue'), "-", "-", "-", "-", orig_size_str, "-", "-", completed_date))
+                status = current_values[self.COLUMN_INDEX['status']] if len(current_values) > self.COLUMN_INDEX['status'] else ""
+                tags = self.tree.item(item_id, 'tags')
+                # Kész vagy ellenőrizendő állapotot nem bolygatunk
+                if "✓ Kész" not in status and "completed" not in tags and "Ellenőrizendő" not in status and "needs_check" not in tags:
+                    completed_date = current_values[self.COLUMN_INDEX['completed_date']] if len(current_values) > self.COLUMN_INDEX['completed_date'] else ""
+                    self.encoding_queue.put(("update", item_id, t('status_svt_queue'), "-", "-", "-", "-", orig_size_str, "-", "-", completed_date))
+                    self.encoding_queue.put(("tag", item_id, "pending"))
+                    # save_json hivatkozások eltávolítva - adatbázis mentés csak start_encoding és stop_encoding-ban történik
+                    SVT_QUEUE.task_done()
+                    continue
                 
-                with console_redirect(self.svt_logger):
-                    print(f"✓ SVT-AV1 slot megszerzve, CRF keresés kezdése...\n")
+            # Státusz frissítés: SVT-AV1 queue-ban vár (a mag foglalás a CRF keresésnél / kódolásnál várakozik)
+            current_values = self.tree.item(item_id, 'values')
+            completed_date = current_values[self.COLUMN_INDEX['completed_date']] if len(current_values) > self.COLUMN_INDEX['completed_date'] else ""
+            self.encoding_queue.put(("update", item_id, t('status_svt_queue'), "-", "-", "-", "-", orig_size_str, "-", "-", completed_date))
+                
+            with console_redirect(self.svt_logger):
+                print(f"ℹ SVT-AV1 feladat indul, CRF keresés kezdése...\n")
 
-                    def status_callback_svt(msg):
-                        self.encoding_queue.put(("status_only", item_id, msg))
+                def status_callback_svt(msg):
+                    self.encoding_queue.put(("status_only", item_id, msg))
 
-                    def progress_callback_svt(msg):
-                        self.encoding_queue.put(("progress", item_id, msg))
-                        # Becsült befejezési idő számítása a progress alapján (frame szám alapján számolódik)
-                        self.update_estimated_end_time_from_progress(item_id, msg)
+                def progress_callback_svt(msg):
+                    self.encoding_queue.put(("progress", item_id, msg))
+                    # Becsült befejezési idő számítása a progress alapján (frame szám alapján számolódik)
+                    self.update_estimated_end_time_from_progress(item_id, msg)
 
-                    current_values = self.tree.item(item_id, 'values')
-                    completed_date = current_values[self.COLUMN_INDEX['completed_date']] if len(current_values) > self.COLUMN_INDEX['completed_date'] else ""
-                    # Kezdeti státusz a cél VMAF értékkel
-                    localized_vmaf = format_localized_number(initial_min_vmaf, decimals=1)
-                    self.encoding_queue.put(("update", item_id, f"SVT-AV1 CRF keresés (VMAF: {localized_vmaf})...", "-", "-", "-", "-", orig_size_str, "-", "-", completed_date))
+                current_values = self.tree.item(item_id, 'values')
+                completed_date = current_values[self.COLUMN_INDEX['completed_date']] if len(current_values) > self.COLUMN_INDEX['completed_date'] else ""
+                # Kezdeti státusz a cél VMAF értékkel
+                localized_vmaf = format_localized_number(initial_min_vmaf, decimals=1)
+                self.encoding_queue.put(("update", item_id, f"SVT-AV1 CRF keresés (VMAF: {localized_vmaf})...", "-", "-", "-", "-", orig_size_str, "-", "-", completed_date))
                     
-                    # Kezdési időpont tárolása
-                    self.encoding_start_times[item_id] = time.time()
+                # Kezdési időpont tárolása
+                self.encoding_start_times[item_id] = time.time()
                     
-                    # Ellenőrizzük, hogy skip_crf_search van-e (manuális újrakódolás)
-                    skip_crf_search = task.get('skip_crf_search', False)
-                    target_cq = task.get('target_cq')
+                # Ellenőrizzük, hogy skip_crf_search van-e (manuális újrakódolás)
+                skip_crf_search = task.get('skip_crf_search', False)
+                target_cq = task.get('target_cq')
                     
-                    if skip_crf_search and target_cq is not None:
-                        # Manuális újrakódolás - skip CRF search, használjuk a target_cq-t
-                        cq_value_svt = target_cq
-                        vmaf_value_svt = task.get('vmaf_value', None)
-                        if vmaf_value_svt is None:
-                            vmaf_value_svt = "-"  # VMAF nincs analízálva manuális újrakódolásnál
+                if skip_crf_search and target_cq is not None:
+                    # Manuális újrakódolás - skip CRF search, használjuk a target_cq-t
+                    cq_value_svt = target_cq
+                    vmaf_value_svt = task.get('vmaf_value', None)
+                    if vmaf_value_svt is None:
+                        vmaf_value_svt = "-"  # VMAF nincs analízálva manuális újrakódolásnál
+                    with console_redirect(self.svt_logger):
+                        print(f"🎬 SVT-AV1 manuális újrakódolás (CRF keresés kihagyva): {video_path.name}")
+                        print(f"   Cél CRF: {target_cq}")
+                else:
+                    # Normál folyamat - CRF keresés
+                    # FONTOS: Ellenőrizzük, hogy ugyanaz a video_path kerül használatra a CRF kereséshez és a kódoláshoz
+                    video_path_abs_svt = video_path.absolute()
+                    try:
                         with console_redirect(self.svt_logger):
-                            print(f"🎬 SVT-AV1 manuális újrakódolás (CRF keresés kihagyva): {video_path.name}")
-                            print(f"   Cél CRF: {target_cq}")
-                    else:
-                        # Normál folyamat - CRF keresés
-                        # FONTOS: Ellenőrizzük, hogy ugyanaz a video_path kerül használatra a CRF kereséshez és a kódoláshoz
-                        video_path_abs_svt = video_path.absolute()
-                        try:
-                            with console_redirect(self.svt_logger):
-                                print(f"🎬 SVT-AV1 CRF keresés indul: {video_path.name}")
-                                print(f"🔍 CRF keresés fájl ellenőrzés (teljes útvonal): {video_path_abs_svt}")
-                                cq_result_svt = run_crf_search(video_path, encoder='svt-av1', initial_min_vmaf=initial_min_vmaf, vmaf_step=vmaf_step, max_encoded_percent=max_encoded, progress_callback=status_callback_svt, logger=self.svt_logger, stop_event=STOP_EVENT, svt_preset=self.svt_preset.get())
-                                print(f"✓ SVT-AV1 CRF keresés kész: {cq_result_svt}")
-                        except FileNotFoundError as e:
-                            # Ab-av1.exe nem található - végzetes hiba
-                            error_msg = f"VÉGZETES HIBA: Az ab-av1.exe nem található vagy nem indítható!\n\nHiba: {e}\n\nA program nem tudja elindítani az ab-av1.exe-t, ezért a CRF keresés nem lehetséges.\n\nEllenőrizd, hogy az ab-av1.exe létezik-e a megadott útvonalon, vagy állítsd be a helyes útvonalat a beállításokban."
-                            with console_redirect(self.svt_logger):
-                                print(f"\n{'='*80}")
-                                print(f"⚠⚠⚠ VÉGZETES HIBA ⚠⚠⚠")
-                                print(f"{'='*80}")
-                                print(error_msg)
-                                print(f"{'='*80}\n")
-                            if LOG_WRITER:
-                                try:
-                                    LOG_WRITER.write(f"\n{'='*80}\n")
-                                    LOG_WRITER.write(f"⚠⚠⚠ VÉGZETES HIBA ⚠⚠⚠\n")
-                                    LOG_WRITER.write(f"{'='*80}\n")
-                                    LOG_WRITER.write(f"{error_msg}\n")
-                                    LOG_WRITER.write(f"{'='*80}\n\n")
-                                    LOG_WRITER.flush()
-                                except Exception:
-                                    pass
-                            # Azonnali leállítás
-                            STOP_EVENT.set()
-                            self.graceful_stop_requested = True
-                            # MessageBox hibaüzenet (GUI thread-ben)
-                            self.root.after(0, lambda: messagebox.showerror(
-                                "VÉGZETES HIBA",
-                                error_msg
-                            ))
-                            # Várunk egy kicsit, hogy a MessageBox megjelenjen
-                            time.sleep(0.5)
-                            # Visszaállítjuk a státuszt
-                            current_values = self.tree.item(item_id, 'values')
-                            completed_date = current_values[self.COLUMN_INDEX['completed_date']] if len(current_values) > self.COLUMN_INDEX['completed_date'] else ""
-                            self.encoding_queue.put(("update", item_id, "✗ Ab-av1.exe nem található", "-", "-", "-", "-", orig_size_str, "-", "-", completed_date))
-                            self.encoding_queue.put(("tag", item_id, "failed"))
-                            SVT_QUEUE.task_done()
-                            continue
-                        except NoSuitableCRFFound:
-                            # Nincs megfelelő CRF (VMAF >= 85 ÉS fájl <= 75%) → egyszerű másolás
-                            with console_redirect(self.svt_logger):
-                                print(f"\n⚠ Nincs megfelelő CRF (VMAF >= 85.0 ÉS fájl <= 75%)")
-                                print(f"   → Videó másolása feliratokkal együtt átkódolás nélkül\n")
+                            print(f"🎬 SVT-AV1 CRF keresés indul: {video_path.name}")
+                            print(f"🔍 CRF keresés fájl ellenőrzés (teljes útvonal): {video_path_abs_svt}")
+                            # A CRF keresés saját mag keretet kap, a kódolás előtt felszabadul
+                            with CORE_SCHEDULER.reserve(SVT_ENCODE_CORES, minimum=SVT_ENCODE_MIN_CORES, label=f"SVT CRF {video_path.name}") as svt_cores:
+                                print(f"🧮 SVT-AV1 CRF keresés mag keret: {svt_cores} / {CORE_SCHEDULER.total_cores} mag")
+                                # Kézi újrakódolás (jobb klikk) megkerüli a kihagyás predikciót
+                                cq_result_svt = run_crf_search(video_path, encoder='svt-av1', initial_min_vmaf=initial_min_vmaf, vmaf_step=vmaf_step, max_encoded_percent=max_encoded, progress_callback=status_callback_svt, logger=self.svt_logger, stop_event=STOP_EVENT, svt_preset=self.svt_preset.get(), svt_cores=svt_cores,
+                                                               allow_skip=not str(reason).startswith('manual_reencode'))
+                            print(f"✓ SVT-AV1 CRF keresés kész: {cq_result_svt}")
+                    except FileNotFoundError as e:
+                        # Ab-av1.exe nem található - végzetes hiba
+                        error_msg = f"VÉGZETES HIBA: Az ab-av1.exe nem található vagy nem indítható!\n\nHiba: {e}\n\nA program nem tudja elindítani az ab-av1.exe-t, ezért a CRF keresés nem lehetséges.\n\nEllenőrizd, hogy az ab-av1.exe létezik-e a megadott útvonalon, vagy állítsd be a helyes útvonalat a beállításokban."
+                        with console_redirect(self.svt_logger):
+                            print(f"\n{'='*80}")
+                            print(f"⚠⚠⚠ VÉGZETES HIBA ⚠⚠⚠")
+                            print(f"{'='*80}")
+                            print(error_msg)
+                            print(f"{'='*80}\n")
+                        if LOG_WRITER:
+                            try:
+                                LOG_WRITER.write(f"\n{'='*80}\n")
+                                LOG_WRITER.write(f"⚠⚠⚠ VÉGZETES HIBA ⚠⚠⚠\n")
+                                LOG_WRITER.write(f"{'='*80}\n")
+                                LOG_WRITER.write(f"{error_msg}\n")
+                                LOG_WRITER.write(f"{'='*80}\n\n")
+                                LOG_WRITER.flush()
+                            except Exception:
+                                pass
+                        # Azonnali leállítás
+                        STOP_EVENT.set()
+                        self.graceful_stop_requested = True
+                        # MessageBox hibaüzenet (GUI thread-ben)
+                        self.root.after(0, lambda: messagebox.showerror(
+                            "VÉGZETES HIBA",
+                            error_msg
+                        ))
+                        # Várunk egy kicsit, hogy a MessageBox megjelenjen
+                        time.sleep(0.5)
+                        # Visszaállítjuk a státuszt
+                        current_values = self.tree.item(item_id, 'values')
+                        completed_date = current_values[self.COLUMN_INDEX['completed_date']] if len(current_values) > self.COLUMN_INDEX['completed_date'] else ""
+                        self.encoding_queue.put(("update", item_id, "✗ Ab-av1.exe nem található", "-", "-", "-", "-", orig_size_str, "-", "-", completed_date))
+                        self.encoding_queue.put(("tag", item_id, "failed"))
+                        SVT_QUEUE.task_done()
+                        continue
+                    except NoSuitableCRFFound:
+                        # Nincs megfelelő CRF (VMAF >= 85 ÉS fájl <= 75%) → egyszerű másolás
+                        with console_redirect(self.svt_logger):
+                            print(f"\n⚠ Nincs megfelelő CRF (VMAF >= 85.0 ÉS fájl <= 75%)")
+                            print(f"   → Videó másolása feliratokkal együtt átkódolás nélkül\n")
                             
-                            # Másolás
-                            copy_success = copy_video_and_subtitles(video_path, output_file)
+                        # Másolás
+                        copy_success = copy_video_and_subtitles(video_path, output_file)
                             
-                            if copy_success:
-                                # Sikeres másolás - kész státusz
-                                orig_size_mb = video_path.stat().st_size / (1024**2)
-                                new_size_mb = output_file.stat().st_size / (1024**2)
-                                orig_size_str = f"{format_localized_number(orig_size_mb, decimals=1)} MB"
-                                new_size_str = f"{format_localized_number(new_size_mb, decimals=1)} MB"
-                                completed_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                        if copy_success:
+                            # Sikeres másolás - kész státusz
+                            orig_size_mb = video_path.stat().st_size / (1024**2)
+                            new_size_mb = output_file.stat().st_size / (1024**2)
+                            orig_size_str = f"{format_localized_number(orig_size_mb, decimals=1)} MB"
+                            new_size_str = f"{format_localized_number(new_size_mb, decimals=1)} MB"
+                            completed_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                                 
-                                # Becsült befejezési idő törlése
-                                if item_id in self.estimated_end_dates:
-                                    del self.estimated_end_dates[item_id]
+                            # Becsült befejezési idő törlése
+                            if item_id in self.estimated_end_dates:
+                                del self.estimated_end_dates[item_id]
                                 
-                                self.encoding_queue.put(("update", item_id, t('status_completed_copy'), "-", "-", "-", "-", "100%", orig_size_str, new_size_str, "0%", completed_date))
-                                self.encoding_queue.put(("tag", item_id, "completed"))
-                                self.encoding_queue.put(("progress_bar", 0))  # Az érték dinamikusan számolódik
+                            self.encoding_queue.put(("update", item_id, t('status_completed_copy'), "-", "-", "-", "-", "100%", orig_size_str, new_size_str, "0%", completed_date))
+                            self.encoding_queue.put(("tag", item_id, "completed"))
+                            self.encoding_queue.put(("progress_bar", 0))  # Az érték dinamikusan számolódik
                                 
-                                # Adatbázis frissítése másolás befejezése után
-                                if video_path:
-                                    def update_db_after_copy():
-                                        try:
-                                            self.update_single_video_in_db(
-                                                video_path, item_id, t('status_completed_copy'), 
-                                                "-", "-", "-", orig_size_str, 
-                                                new_size_mb, 0.0, completed_date
-                                            )
-                                        except Exception as e:
-                                            if LOG_WRITER:
-                                                try:
-                                                    LOG_WRITER.write(f"⚠ [copy] Adatbázis frissítés hiba: {e} | video: {video_path}\n")
-                                                    LOG_WRITER.flush()
-                                                except Exception:
-                                                    pass
+                            # Adatbázis frissítése másolás befejezése után
+                            if video_path:
+                                def update_db_after_copy():
+                                    try:
+                                        self.update_single_video_in_db(
+                                            video_path, item_id, t('status_completed_copy'), 
+                                            "-", "-", "-", orig_size_str, 
+                                            new_size_mb, 0.0, completed_date
+                                        )
+                                    except Exception as e:
+                                        if LOG_WRITER:
+                                            try:
+                                                LOG_WRITER.write(f"⚠ [copy] Adatbázis frissítés hiba: {e} | video: {video_path}\n")
+                                                LOG_WRITER.flush()
+                                            except Exception:
+                                                pass
                                     
-                                    db_thread = threading.Thread(target=update_db_after_copy, daemon=True)
-                                    db_thread.start()
+                                db_thread = threading.Thread(target=update_db_after_copy, daemon=True)
+                                db_thread.start()
                                 
-                                with console_redirect(self.svt_logger):
-                                    print(f"✓ Videó sikeresen másolva: {output_file.name}\n")
-                            else:
-                                # Másolás sikertelen (pl. már létezik a célhelyen) - skip
-                                completed_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                            with console_redirect(self.svt_logger):
+                                print(f"✓ Videó sikeresen másolva: {output_file.name}\n")
+                        else:
+                            # Másolás sikertelen (pl. már létezik a célhelyen) - skip
+                            completed_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                                 
-                                # Becsült befejezési idő törlése
-                                if item_id in self.estimated_end_dates:
-                                    del self.estimated_end_dates[item_id]
+                            # Becsült befejezési idő törlése
+                            if item_id in self.estimated_end_dates:
+                                del self.estimated_end_dates[item_id]
                                 
-                                self.encoding_queue.put(("update", item_id, t('status_completed_exists'), "-", "-", "-", "-", "100%", orig_size_str, "-", "-", completed_date))
-                                self.encoding_queue.put(("tag", item_id, "completed"))
-                                self.encoding_queue.put(("progress_bar", 0))  # Az érték dinamikusan számolódik
+                            self.encoding_queue.put(("update", item_id, t('status_completed_exists'), "-", "-", "-", "-", "100%", orig_size_str, "-", "-", completed_date))
+                            self.encoding_queue.put(("tag", item_id, "completed"))
+                            self.encoding_queue.put(("progress_bar", 0))  # Az érték dinamikusan számolódik
                                 
-                                # Adatbázis frissítése "már létezik" esetén
-                                if video_path:
-                                    # Próbáljuk meg meghatározni az output fájl méretét
-                                    new_size_mb = None
-                                    if output_file and output_file.exists():
-                                        try:
-                                            new_size_mb = output_file.stat().st_size / (1024**2)
-                                        except (OSError, PermissionError):
-                                            pass
-                                    
-                                    def update_db_after_exists():
-                                        try:
-                                            self.update_single_video_in_db(
-                                                video_path, item_id, t('status_completed_exists'), 
-                                                "-", "-", "-", orig_size_str, 
-                                                new_size_mb, None, completed_date
-                                            )
-                                        except Exception as e:
-                                            if LOG_WRITER:
-                                                try:
-                                                    LOG_WRITER.write(f"⚠ [exists] Adatbázis frissítés hiba: {e} | video: {video_path}\n")
-                                                    LOG_WRITER.flush()
-                                                except Exception:
-                                                    pass
+                            # Adatbázis frissítése "már létezik" esetén
+                            if video_path:
+                                # Próbáljuk meg meghatározni az output fájl méretét
+                                new_size_mb = None
+                                if output_file and output_file.exists():
+                                    try:
+                                        new_size_mb = output_file.stat().st_size / (1024**2)
+                                    except (OSError, PermissionError):
+                                        pass
                                     
-                                    db_thread = threading.Thread(target=update_db_after_exists, daemon=True)
-                                    db_thread.start()
-                                
-                                with console_redirect(self.svt_logger):
-                                    print(f"⚠ Videó már létezik a célhelyen, átugrás\n")
-                            
-                            SVT_QUEUE.task_done()
-                            continue
-                        except EncodingStopped:
-                            current_values = self.tree.item(item_id, 'values')
-                            status = current_values[self.COLUMN_INDEX['status']] if len(current_values) > self.COLUMN_INDEX['status'] else ""
-                            tags = self.tree.item(item_id, 'tags')
-                            # Kész vagy ellenőrizendő állapotot nem bolygatunk
-                            if "✓ Kész" not in status and "completed" not in tags and "Ellenőrizendő" not in status and "needs_check" not in tags:
-                                completed_date = current_values[self.COLUMN_INDEX['completed_date']] if len(current_values) > self.COLUMN_INDEX['completed_date'] else ""
-                                self.encoding_queue.put(("update", item_id, t('status_svt_queue'), "-", "-", "-", "-", orig_size_str, "-", "-", completed_date))
-                                self.encoding_queue.put(("tag", item_id, "pending"))
-                                # save_json hivatkozások eltávolítva - adatbázis mentés csak start_encoding és stop_encoding-ban történik
-                            with console_redirect(self.svt_logger):
-                                print(f"\n🛑 Leállítás kérés → SVT-AV1 worker megszakítva\n")
-                            SVT_QUEUE.task_done()
-                            return
-                        
-                        # Leállítás ellenőrzés CRF keresés után
-                        if not self.is_encoding:
-                            current_values = self.tree.item(item_id, 'values')
-                            status = current_values[self.COLUMN_INDEX['status']] if len(current_values) > self.COLUMN_INDEX['status'] else ""
-                            tags = self.tree.item(item_id, 'tags')
-                            # Kész vagy ellenőrizendő állapotot nem bolygatunk
-                            if "✓ Kész" not in status and "completed" not in tags and "Ellenőrizendő" not in status and "needs_check" not in tags:
-                                completed_date = current_values[self.COLUMN_INDEX['completed_date']] if len(current_values) > self.COLUMN_INDEX['completed_date'] else ""
-                                self.encoding_queue.put(("update", item_id, t('status_svt_queue'), "-", "-", "-", "-", orig_size_str, "-", "-", completed_date))
-                                self.encoding_queue.put(("tag", item_id, "pending"))
-                                # save_json hivatkozások eltávolítva - adatbázis mentés csak start_encoding és stop_encoding-ban történik
-                            SVT_QUEUE.task_done()
-                            continue
-                        
-                        cq_value_svt, vmaf_value_svt = cq_result_svt
-                    current_values = self.tree.item(item_id, 'values')
-                    completed_date = current_values[self.COLUMN_INDEX['completed_date']] if len(current_values) > self.COLUMN_INDEX['completed_date'] else ""
-                    vmaf_display = vmaf_value_svt if isinstance(vmaf_value_svt, str) else format_localized_number(vmaf_value_svt, decimals=1)
-                    self.encoding_queue.put(("update", item_id, f"SVT-AV1 kódolás ({reason})...", str(int(cq_value_svt)), vmaf_display, "-", "-", orig_size_str, "-", "-", completed_date))
-                    
-                    # Ha még nincs kezdési időpont (pl. ha CRF keresés nélkül kezdődik), akkor most tároljuk
-                    self.encoding_start_times[item_id] = time.time()
-                    
-                    # SVT kódolás SVT konzolra irányítva
-                    # FONTOS: Ellenőrizzük, hogy ugyanaz a video_path kerül használatra a kódoláshoz, mint a CRF kereséshez
-                    video_path_abs_check_svt = video_path.absolute()
-                    if not skip_crf_search:
-                        if video_path_abs_check_svt != video_path_abs_svt:
-                            error_msg = f"VÉGZETES HIBA: A video_path megváltozott a CRF keresés és a kódolás között!\n\nCRF keresés fájl: {video_path_abs_svt}\nKódolás fájl: {video_path_abs_check_svt}\n\nEz azt jelenti, hogy a CRF keresés egy fájlhoz történt, de a kódolás másik fájlhoz kezdődött. Ez kritikus hiba!\n\nA program azonnal leáll."
+                                def update_db_after_exists():
+                                    try:
+                                        self.update_single_video_in_db(
+                                            video_path, item_id, t('status_completed_exists'), 
+                                            "-", "-", "-", orig_size_str, 
+                                            new_size_mb, None, completed_date
+                                        )
+                                    except Exception as e:
+                                        if LOG_WRITER:
+                                            try:
+                                                LOG_WRITER.write(f"⚠ [exists] Adatbázis frissítés hiba: {e} | video: {video_path}\n")
+                                                LOG_WRITER.flush()
+                                            except Exception:
+                                                pass
+                                    
+                                db_thread = threading.Thread(target=update_db_after_exists, daemon=True)
+                                db_thread.start()
+                                
                             with console_redirect(self.svt_logger):
-                                print(f"\n{'='*80}")
-                                print(f"⚠⚠⚠ VÉGZETES HIBA ⚠⚠⚠")
-                                print(f"{'='*80}")
-                                print(error_msg)
-                                print(f"{'='*80}\n")
-                            # Log fájlba is írjuk
-                            if LOG_WRITER:
-                                try:
-                                    LOG_WRITER.write(f"\n{'='*80}\n")
-                                    LOG_WRITER.write(f"⚠⚠⚠ VÉGZETES HIBA ⚠⚠⚠\n")
-                                    LOG_WRITER.write(f"{'='*80}\n")
-                                    LOG_WRITER.write(f"{error_msg}\n")
-                                    LOG_WRITER.write(f"{'='*80}\n\n")
-                                    LOG_WRITER.flush()
-                                except Exception:
-                                    pass
-                            # Azonnali leállítás
-                            STOP_EVENT.set()
-                            self.graceful_stop_requested = True
-                            # MessageBox hibaüzenet (GUI thread-ben)
-                            self.root.after(0, lambda: messagebox.showerror(
-                                "VÉGZETES HIBA",
-                                error_msg
-                            ))
-                            # Várunk egy kicsit, hogy a MessageBox megjelenjen
-                            time.sleep(0.5)
-                            raise ValueError(error_msg)
-                    try:
-                        with console_redirect(self.svt_logger):
-                            if skip_crf_search and target_cq is not None:
-                                # Manuális újrakódolás - encode_single_attempt használata (skip encode_video belső CRF keresését)
-                                print(f"🔍 Kódolás fájl ellenőrzés (skip_crf_search, teljes útvonal): {video_path_abs_check_svt}")
-                                print(f"🎬 SVT-AV1 kódolás kezdése: {video_path.name}")
-                                print(f"   Teljes útvonal: {video_path_abs_check_svt}")
-                                print(f"   Cél fájl: {output_file.absolute()}")
-                                success_svt = encode_single_attempt(video_path, output_file, target_cq, subtitle_files, 'svt-av1', progress_callback_svt, stop_event=STOP_EVENT, vmaf_value=vmaf_value_svt, resize_enabled=resize_enabled, resize_height=resize_height, audio_compression_enabled=audio_compression_enabled, audio_compression_method=audio_compression_method, svt_preset=self.svt_preset.get(), logger=self.svt_logger)
-                            else:
-                                # Normál folyamat - encode_video használata (CRF keresés benne van)
-                                print(f"🔍 Kódolás fájl ellenőrzés (teljes útvonal): {video_path_abs_check_svt}")
-                                print(f"🎬 SVT-AV1 kódolás kezdése: {video_path.name}")
-                                print(f"   Teljes útvonal: {video_path_abs_check_svt}")
-                                print(f"   Cél fájl: {output_file.absolute()}")
-                                success_svt = encode_video(video_path, output_file, cq_value_svt, subtitle_files, 'svt-av1', progress_callback_svt, initial_min_vmaf, vmaf_step, max_encoded, stop_event=STOP_EVENT, vmaf_value=vmaf_value_svt, resize_enabled=resize_enabled, resize_height=resize_height, audio_compression_enabled=audio_compression_enabled, audio_compression_method=audio_compression_method, svt_preset=self.svt_preset.get(), logger=self.svt_logger)
+                                print(f"⚠ Videó már létezik a célhelyen, átugrás\n")
+                            
+                        SVT_QUEUE.task_done()
+                        continue
                     except EncodingStopped:
                         current_values = self.tree.item(item_id, 'values')
                         status = current_values[self.COLUMN_INDEX['status']] if len(current_values) > self.COLUMN_INDEX['status'] else ""
@@ -14977,256 +21614,347 @@ class VideoEncoderGUI:
                             print(f"\n🛑 Leállítás kérés → SVT-AV1 worker megszakítva\n")
                         SVT_QUEUE.task_done()
                         return
-                    
-                    # Leállítás ellenőrzés kódolás után
+                        
+                    # Leállítás ellenőrzés CRF keresés után
                     if not self.is_encoding:
                         current_values = self.tree.item(item_id, 'values')
                         status = current_values[self.COLUMN_INDEX['status']] if len(current_values) > self.COLUMN_INDEX['status'] else ""
                         tags = self.tree.item(item_id, 'tags')
                         # Kész vagy ellenőrizendő állapotot nem bolygatunk
                         if "✓ Kész" not in status and "completed" not in tags and "Ellenőrizendő" not in status and "needs_check" not in tags:
-                            self.encoding_queue.put(("update", item_id, t('status_svt_queue'), "-", "-", "-", "-", orig_size_str, "-", "-", ""))
+                            completed_date = current_values[self.COLUMN_INDEX['completed_date']] if len(current_values) > self.COLUMN_INDEX['completed_date'] else ""
+                            self.encoding_queue.put(("update", item_id, t('status_svt_queue'), "-", "-", "-", "-", orig_size_str, "-", "-", completed_date))
                             self.encoding_queue.put(("tag", item_id, "pending"))
                             # save_json hivatkozások eltávolítva - adatbázis mentés csak start_encoding és stop_encoding-ban történik
                         SVT_QUEUE.task_done()
                         continue
-                    
-                    if success_svt:
-                        # KRITIKUS: Ellenőrizzük, hogy a videó már "Kész" állapotban van-e (pl. VMAF/PSNR számítás után)
-                        # Ha igen, ne indítsuk újra a validálást!
-                        current_values = self.tree.item(item_id, 'values')
-                        status_before_validation = current_values[self.COLUMN_INDEX['status']] if len(current_values) > self.COLUMN_INDEX['status'] else ""
-                        tags_before_validation = self.tree.item(item_id, 'tags')
-                        is_already_completed = (
-                            "✓ Kész" in status_before_validation or 
-                            "completed" in tags_before_validation or 
-                            "Kész" in status_before_validation
-                        )
-                        
-                        if is_already_completed:
-                            # A videó már kész (pl. VMAF/PSNR számítás után), ne indítsuk újra a validálást!
-                            SVT_QUEUE.task_done()
-                            continue
                         
+                    cq_value_svt, vmaf_value_svt = cq_result_svt
+                current_values = self.tree.item(item_id, 'values')
+                completed_date = current_values[self.COLUMN_INDEX['completed_date']] if len(current_values) > self.COLUMN_INDEX['completed_date'] else ""
+                vmaf_display = format_search_vmaf(vmaf_value_svt)
+                self.encoding_queue.put(("update", item_id, f"SVT-AV1 kódolás ({reason})...", str(int(cq_value_svt)), vmaf_display, "-", "-", orig_size_str, "-", "-", completed_date))
+                    
+                # Ha még nincs kezdési időpont (pl. ha CRF keresés nélkül kezdődik), akkor most tároljuk
+                self.encoding_start_times[item_id] = time.time()
+                    
+                # SVT kódolás SVT konzolra irányítva
+                # FONTOS: Ellenőrizzük, hogy ugyanaz a video_path kerül használatra a kódoláshoz, mint a CRF kereséshez
+                video_path_abs_check_svt = video_path.absolute()
+                if not skip_crf_search:
+                    if video_path_abs_check_svt != video_path_abs_svt:
+                        error_msg = f"VÉGZETES HIBA: A video_path megváltozott a CRF keresés és a kódolás között!\n\nCRF keresés fájl: {video_path_abs_svt}\nKódolás fájl: {video_path_abs_check_svt}\n\nEz azt jelenti, hogy a CRF keresés egy fájlhoz történt, de a kódolás másik fájlhoz kezdődött. Ez kritikus hiba!\n\nA program azonnal leáll."
+                        with console_redirect(self.svt_logger):
+                            print(f"\n{'='*80}")
+                            print(f"⚠⚠⚠ VÉGZETES HIBA ⚠⚠⚠")
+                            print(f"{'='*80}")
+                            print(error_msg)
+                            print(f"{'='*80}\n")
+                        # Log fájlba is írjuk
+                        if LOG_WRITER:
+                            try:
+                                LOG_WRITER.write(f"\n{'='*80}\n")
+                                LOG_WRITER.write(f"⚠⚠⚠ VÉGZETES HIBA ⚠⚠⚠\n")
+                                LOG_WRITER.write(f"{'='*80}\n")
+                                LOG_WRITER.write(f"{error_msg}\n")
+                                LOG_WRITER.write(f"{'='*80}\n\n")
+                                LOG_WRITER.flush()
+                            except Exception:
+                                pass
+                        # Azonnali leállítás
+                        STOP_EVENT.set()
+                        self.graceful_stop_requested = True
+                        # MessageBox hibaüzenet (GUI thread-ben)
+                        self.root.after(0, lambda: messagebox.showerror(
+                            "VÉGZETES HIBA",
+                            error_msg
+                        ))
+                        # Várunk egy kicsit, hogy a MessageBox megjelenjen
+                        time.sleep(0.5)
+                        raise ValueError(error_msg)
+                try:
+                    # A kódolás mag kerete (a CRF keresésé már felszabadult; encode_video esetleges újrakeresése ebben fut)
+                    with CORE_SCHEDULER.reserve(SVT_ENCODE_CORES, minimum=SVT_ENCODE_MIN_CORES, label=f"SVT {video_path.name}") as svt_cores, \
+                            console_redirect(self.svt_logger):
+                        print(f"🧮 SVT-AV1 mag keret: {svt_cores} / {CORE_SCHEDULER.total_cores} mag")
+                        if skip_crf_search and target_cq is not None:
+                            # Manuális újrakódolás - encode_single_attempt használata (skip encode_video belső CRF keresését)
+                            print(f"🔍 Kódolás fájl ellenőrzés (skip_crf_search, teljes útvonal): {video_path_abs_check_svt}")
+                            print(f"🎬 SVT-AV1 kódolás kezdése: {video_path.name}")
+                            print(f"   Teljes útvonal: {video_path_abs_check_svt}")
+                            print(f"   Cél fájl: {output_file.absolute()}")
+                            success_svt = encode_single_attempt(video_path, output_file, target_cq, subtitle_files, 'svt-av1', progress_callback_svt, stop_event=STOP_EVENT, vmaf_value=vmaf_value_svt, resize_enabled=resize_enabled, resize_height=resize_height, audio_compression_enabled=audio_compression_enabled, audio_compression_method=audio_compression_method, svt_preset=self.svt_preset.get(), logger=self.svt_logger, inline_metrics=inline_metrics, svt_cores=svt_cores)
+                        else:
+                            # Normál folyamat - encode_video használata (CRF keresés benne van)
+                            print(f"🔍 Kódolás fájl ellenőrzés (teljes útvonal): {video_path_abs_check_svt}")
+                            print(f"🎬 SVT-AV1 kódolás kezdése: {video_path.name}")
+                            print(f"   Teljes útvonal: {video_path_abs_check_svt}")
+                            print(f"   Cél fájl: {output_file.absolute()}")
+                            success_svt = encode_video(video_path, output_file, cq_value_svt, subtitle_files, 'svt-av1', progress_callback_svt, initial_min_vmaf, vmaf_step, max_encoded, stop_event=STOP_EVENT, vmaf_value=vmaf_value_svt, resize_enabled=resize_enabled, resize_height=resize_height, audio_compression_enabled=audio_compression_enabled, audio_compression_method=audio_compression_method, svt_preset=self.svt_preset.get(), logger=self.svt_logger, inline_metrics=inline_metrics, svt_cores=svt_cores)
+                except EncodingStopped:
+                    current_values = self.tree.item(item_id, 'values')
+                    status = current_values[self.COLUMN_INDEX['status']] if len(current_values) > self.COLUMN_INDEX['status'] else ""
+                    tags = self.tree.item(item_id, 'tags')
+                    # Kész vagy ellenőrizendő állapotot nem bolygatunk
+                    if "✓ Kész" not in status and "completed" not in tags and "Ellenőrizendő" not in status and "needs_check" not in tags:
                         completed_date = current_values[self.COLUMN_INDEX['completed_date']] if len(current_values) > self.COLUMN_INDEX['completed_date'] else ""
-                        vmaf_display = vmaf_value_svt if isinstance(vmaf_value_svt, str) else format_localized_number(vmaf_value_svt, decimals=1)
-                        self.encoding_queue.put(("update", item_id, f"SVT-AV1 validálás ({reason})...", str(int(cq_value_svt)), vmaf_display, "-", "100%", orig_size_str, "-", "-", completed_date))
+                        self.encoding_queue.put(("update", item_id, t('status_svt_queue'), "-", "-", "-", "-", orig_size_str, "-", "-", completed_date))
+                        self.encoding_queue.put(("tag", item_id, "pending"))
+                        # save_json hivatkozások eltávolítva - adatbázis mentés csak start_encoding és stop_encoding-ban történik
+                    with console_redirect(self.svt_logger):
+                        print(f"\n🛑 Leállítás kérés → SVT-AV1 worker megszakítva\n")
+                    SVT_QUEUE.task_done()
+                    return
+                    
+                # Leállítás ellenőrzés kódolás után
+                if not self.is_encoding:
+                    current_values = self.tree.item(item_id, 'values')
+                    status = current_values[self.COLUMN_INDEX['status']] if len(current_values) > self.COLUMN_INDEX['status'] else ""
+                    tags = self.tree.item(item_id, 'tags')
+                    # Kész vagy ellenőrizendő állapotot nem bolygatunk
+                    if "✓ Kész" not in status and "completed" not in tags and "Ellenőrizendő" not in status and "needs_check" not in tags:
+                        self.encoding_queue.put(("update", item_id, t('status_svt_queue'), "-", "-", "-", "-", orig_size_str, "-", "-", ""))
+                        self.encoding_queue.put(("tag", item_id, "pending"))
+                        # save_json hivatkozások eltávolítva - adatbázis mentés csak start_encoding és stop_encoding-ban történik
+                    SVT_QUEUE.task_done()
+                    continue
+                    
+                if success_svt:
+                    # KRITIKUS: Ellenőrizzük, hogy a videó már "Kész" állapotban van-e (pl. VMAF/PSNR számítás után)
+                    # Ha igen, ne indítsuk újra a validálást!
+                    current_values = self.tree.item(item_id, 'values')
+                    status_before_validation = current_values[self.COLUMN_INDEX['status']] if len(current_values) > self.COLUMN_INDEX['status'] else ""
+                    tags_before_validation = self.tree.item(item_id, 'tags')
+                    is_already_completed = (
+                        "✓ Kész" in status_before_validation or 
+                        "completed" in tags_before_validation or 
+                        "Kész" in status_before_validation
+                    )
                         
-                        # Leállítás ellenőrzés validálás előtt
-                        if not self.is_encoding:
-                            current_values = self.tree.item(item_id, 'values')
-                            status = current_values[self.COLUMN_INDEX['status']] if len(current_values) > self.COLUMN_INDEX['status'] else ""
-                            tags = self.tree.item(item_id, 'tags')
-                            # Kész vagy ellenőrizendő állapotot nem bolygatunk
-                            if "✓ Kész" not in status and "completed" not in tags and "Ellenőrizendő" not in status and "needs_check" not in tags:
-                                completed_date = current_values[self.COLUMN_INDEX['completed_date']] if len(current_values) > self.COLUMN_INDEX['completed_date'] else ""
-                                self.encoding_queue.put(("update", item_id, t('status_svt_queue'), "-", "-", "-", "-", orig_size_str, "-", "-", completed_date))
-                                self.encoding_queue.put(("tag", item_id, "pending"))
-                                # save_json hivatkozások eltávolítva - adatbázis mentés csak start_encoding és stop_encoding-ban történik
-                            SVT_QUEUE.task_done()
-                            continue
+                    if is_already_completed:
+                        # A videó már kész (pl. VMAF/PSNR számítás után), ne indítsuk újra a validálást!
+                        SVT_QUEUE.task_done()
+                        continue
                         
-                        # Validálás SVT konzolra irányítva
-                        try:
-                            with console_redirect(self.svt_logger):
-                                is_valid = validate_encoded_video_vlc(output_file, encoder='svt-av1', stop_event=STOP_EVENT, source_path=video_path)
-                        except EncodingStopped:
-                            current_values = self.tree.item(item_id, 'values')
-                            status = current_values[self.COLUMN_INDEX['status']] if len(current_values) > self.COLUMN_INDEX['status'] else ""
-                            tags = self.tree.item(item_id, 'tags')
-                            # Kész vagy ellenőrizendő állapotot nem bolygatunk
-                            if "✓ Kész" not in status and "completed" not in tags and "Ellenőrizendő" not in status and "needs_check" not in tags:
-                                completed_date = current_values[self.COLUMN_INDEX['completed_date']] if len(current_values) > self.COLUMN_INDEX['completed_date'] else ""
-                                self.encoding_queue.put(("update", item_id, t('status_svt_queue'), "-", "-", "-", "-", orig_size_str, "-", "-", completed_date))
-                                self.encoding_queue.put(("tag", item_id, "pending"))
-                                # save_json hivatkozások eltávolítva - adatbázis mentés csak start_encoding és stop_encoding-ban történik
-                            with console_redirect(self.svt_logger):
-                                print(f"\n🛑 Leállítás kérés → SVT-AV1 worker megszakítva\n")
-                            SVT_QUEUE.task_done()
-                            return
+                    completed_date = current_values[self.COLUMN_INDEX['completed_date']] if len(current_values) > self.COLUMN_INDEX['completed_date'] else ""
+                    vmaf_display = format_search_vmaf(vmaf_value_svt)
+                    self.encoding_queue.put(("update", item_id, f"SVT-AV1 validálás ({reason})...", str(int(cq_value_svt)), vmaf_display, "-", "100%", orig_size_str, "-", "-", completed_date))
                         
-                        # KRITIKUS: Újraellenőrizzük a validálás után is, hogy a videó már "Kész" állapotban van-e
-                        # (lehet, hogy közben VMAF/PSNR számítás befejeződött)
+                    # Leállítás ellenőrzés validálás előtt
+                    if not self.is_encoding:
                         current_values = self.tree.item(item_id, 'values')
-                        status_after_validation = current_values[self.COLUMN_INDEX['status']] if len(current_values) > self.COLUMN_INDEX['status'] else ""
-                        tags_after_validation = self.tree.item(item_id, 'tags')
-                        is_now_completed = (
-                            "✓ Kész" in status_after_validation or 
-                            "completed" in tags_after_validation or 
-                            "Kész" in status_after_validation
-                        )
+                        status = current_values[self.COLUMN_INDEX['status']] if len(current_values) > self.COLUMN_INDEX['status'] else ""
+                        tags = self.tree.item(item_id, 'tags')
+                        # Kész vagy ellenőrizendő állapotot nem bolygatunk
+                        if "✓ Kész" not in status and "completed" not in tags and "Ellenőrizendő" not in status and "needs_check" not in tags:
+                            completed_date = current_values[self.COLUMN_INDEX['completed_date']] if len(current_values) > self.COLUMN_INDEX['completed_date'] else ""
+                            self.encoding_queue.put(("update", item_id, t('status_svt_queue'), "-", "-", "-", "-", orig_size_str, "-", "-", completed_date))
+                            self.encoding_queue.put(("tag", item_id, "pending"))
+                            # save_json hivatkozások eltávolítva - adatbázis mentés csak start_encoding és stop_encoding-ban történik
+                        SVT_QUEUE.task_done()
+                        continue
                         
-                        if is_now_completed:
-                            # A videó közben kész lett (pl. VMAF/PSNR számítás befejeződött), ne írjuk felül!
-                            SVT_QUEUE.task_done()
-                            continue
+                    # Validálás SVT konzolra irányítva
+                    try:
+                        with console_redirect(self.svt_logger):
+                            is_valid = validate_encoded_video_vlc(output_file, encoder='svt-av1', stop_event=STOP_EVENT, source_path=video_path)
+                    except EncodingStopped:
+                        current_values = self.tree.item(item_id, 'values')
+                        status = current_values[self.COLUMN_INDEX['status']] if len(current_values) > self.COLUMN_INDEX['status'] else ""
+                        tags = self.tree.item(item_id, 'tags')
+                        # Kész vagy ellenőrizendő állapotot nem bolygatunk
+                        if "✓ Kész" not in status and "completed" not in tags and "Ellenőrizendő" not in status and "needs_check" not in tags:
+                            completed_date = current_values[self.COLUMN_INDEX['completed_date']] if len(current_values) > self.COLUMN_INDEX['completed_date'] else ""
+                            self.encoding_queue.put(("update", item_id, t('status_svt_queue'), "-", "-", "-", "-", orig_size_str, "-", "-", completed_date))
+                            self.encoding_queue.put(("tag", item_id, "pending"))
+                            # save_json hivatkozások eltávolítva - adatbázis mentés csak start_encoding és stop_encoding-ban történik
+                        with console_redirect(self.svt_logger):
+                            print(f"\n🛑 Leállítás kérés → SVT-AV1 worker megszakítva\n")
+                        SVT_QUEUE.task_done()
+                        return
                         
-                        # Leállítás ellenőrzés validálás után
-                        if not self.is_encoding:
-                            current_values = self.tree.item(item_id, 'values')
-                            status = current_values[self.COLUMN_INDEX['status']] if len(current_values) > self.COLUMN_INDEX['status'] else ""
-                            tags = self.tree.item(item_id, 'tags')
-                            # Kész vagy ellenőrizendő állapotot nem bolygatunk
-                            if "✓ Kész" not in status and "completed" not in tags and "Ellenőrizendő" not in status and "needs_check" not in tags:
-                                completed_date = current_values[self.COLUMN_INDEX['completed_date']] if len(current_values) > self.COLUMN_INDEX['completed_date'] else ""
-                                self.encoding_queue.put(("update", item_id, t('status_svt_queue'), "-", "-", "-", "-", orig_size_str, "-", "-", completed_date))
-                                self.encoding_queue.put(("tag", item_id, "pending"))
-                                # save_json hivatkozások eltávolítva - adatbázis mentés csak start_encoding és stop_encoding-ban történik
-                            SVT_QUEUE.task_done()
-                            continue
+                    # KRITIKUS: Újraellenőrizzük a validálás után is, hogy a videó már "Kész" állapotban van-e
+                    # (lehet, hogy közben VMAF/PSNR számítás befejeződött)
+                    current_values = self.tree.item(item_id, 'values')
+                    status_after_validation = current_values[self.COLUMN_INDEX['status']] if len(current_values) > self.COLUMN_INDEX['status'] else ""
+                    tags_after_validation = self.tree.item(item_id, 'tags')
+                    is_now_completed = (
+                        "✓ Kész" in status_after_validation or 
+                        "completed" in tags_after_validation or 
+                        "Kész" in status_after_validation
+                    )
                         
-                        if is_valid:
-                            orig_size_mb, new_size_mb, change_percent = self.calculate_file_sizes(video_path, output_file)
-                            vmaf_display = vmaf_value_svt if isinstance(vmaf_value_svt, str) else format_localized_number(vmaf_value_svt, decimals=1)
-                            orig_size_display = f"{format_localized_number(orig_size_mb, decimals=1)} MB"
-                            self.mark_encoding_completed(item_id, t('status_completed_svt'), str(int(cq_value_svt)), vmaf_display, "-", orig_size_display, new_size_mb, change_percent)
-                            self._copy_invalid_subtitles(invalid_subtitles, output_file)
+                    if is_now_completed:
+                        # A videó közben kész lett (pl. VMAF/PSNR számítás befejeződött), ne írjuk felül!
+                        SVT_QUEUE.task_done()
+                        continue
+                        
+                    # Leállítás ellenőrzés validálás után
+                    if not self.is_encoding:
+                        current_values = self.tree.item(item_id, 'values')
+                        status = current_values[self.COLUMN_INDEX['status']] if len(current_values) > self.COLUMN_INDEX['status'] else ""
+                        tags = self.tree.item(item_id, 'tags')
+                        # Kész vagy ellenőrizendő állapotot nem bolygatunk
+                        if "✓ Kész" not in status and "completed" not in tags and "Ellenőrizendő" not in status and "needs_check" not in tags:
+                            completed_date = current_values[self.COLUMN_INDEX['completed_date']] if len(current_values) > self.COLUMN_INDEX['completed_date'] else ""
+                            self.encoding_queue.put(("update", item_id, t('status_svt_queue'), "-", "-", "-", "-", orig_size_str, "-", "-", completed_date))
+                            self.encoding_queue.put(("tag", item_id, "pending"))
+                            # save_json hivatkozások eltávolítva - adatbázis mentés csak start_encoding és stop_encoding-ban történik
+                        SVT_QUEUE.task_done()
+                        continue
+                        
+                    if is_valid:
+                        orig_size_mb, new_size_mb, change_percent = self.calculate_file_sizes(video_path, output_file)
+                        vmaf_display = format_search_vmaf(vmaf_value_svt)
+                        orig_size_display = f"{format_localized_number(orig_size_mb, decimals=1)} MB"
+                        self.mark_encoding_completed(item_id, t('status_completed_svt'), str(int(cq_value_svt)), vmaf_display, "-", orig_size_display, new_size_mb, change_percent)
+                        self._copy_invalid_subtitles(invalid_subtitles, output_file)
                             
-                            with console_redirect(self.svt_logger):
-                                orig_size_str_log = format_localized_number(orig_size_mb, decimals=1)
-                                new_size_str_log = format_localized_number(new_size_mb, decimals=1)
-                                change_percent_str_log = format_localized_number(change_percent, decimals=2, show_sign=True)
-                                print(f"\n✓ SVT-AV1 kódolás sikeres: {video_path.name}")
-                                print(f"  {orig_size_str_log}MB → {new_size_str_log}MB ({change_percent_str_log}%)\n")
-                        elif not is_valid and output_file.exists():
-                            orig_size_mb = video_path.stat().st_size / (1024**2)
-                            new_size_mb = output_file.stat().st_size / (1024**2)
-                            change_percent = ((new_size_mb - orig_size_mb) / orig_size_mb) * 100 if orig_size_mb > 0 else 0
+                        with console_redirect(self.svt_logger):
+                            orig_size_str_log = format_localized_number(orig_size_mb, decimals=1)
+                            new_size_str_log = format_localized_number(new_size_mb, decimals=1)
+                            change_percent_str_log = format_localized_number(change_percent, decimals=2, show_sign=True)
+                            print(f"\n✓ SVT-AV1 kódolás sikeres: {video_path.name}")
+                            print(f"  {orig_size_str_log}MB → {new_size_str_log}MB ({change_percent_str_log}%)\n")
+                    elif not is_valid and output_file.exists():
+                        orig_size_mb = video_path.stat().st_size / (1024**2)
+                        new_size_mb = output_file.stat().st_size / (1024**2)
+                        change_percent = ((new_size_mb - orig_size_mb) / orig_size_mb) * 100 if orig_size_mb > 0 else 0
                             
-                            current_values = self.tree.item(item_id, 'values')
-                            completed_date = current_values[self.COLUMN_INDEX['completed_date']] if len(current_values) > self.COLUMN_INDEX['completed_date'] else ""
-                            vmaf_display = vmaf_value_svt if isinstance(vmaf_value_svt, str) else format_localized_number(vmaf_value_svt, decimals=1)
-                            new_size_str_check = f"{format_localized_number(new_size_mb, decimals=1)} MB"
-                            change_percent_str_check = f"{format_localized_number(change_percent, decimals=2, show_sign=True)}%"
-                            self.encoding_queue.put(("update", item_id, "⚠ Ellenőrizendő (SVT)", str(int(cq_value_svt)), vmaf_display, "-", "100%", orig_size_str, new_size_str_check, change_percent_str_check, completed_date))
-                            self.encoding_queue.put(("tag", item_id, "needs_check"))
-                            self.encoding_queue.put(("progress_bar", 0))  # Az érték dinamikusan számolódik
+                        current_values = self.tree.item(item_id, 'values')
+                        completed_date = current_values[self.COLUMN_INDEX['completed_date']] if len(current_values) > self.COLUMN_INDEX['completed_date'] else ""
+                        vmaf_display = format_search_vmaf(vmaf_value_svt)
+                        new_size_str_check = f"{format_localized_number(new_size_mb, decimals=1)} MB"
+                        change_percent_str_check = f"{format_localized_number(change_percent, decimals=2, show_sign=True)}%"
+                        self.encoding_queue.put(("update", item_id, "⚠ Ellenőrizendő (SVT)", str(int(cq_value_svt)), vmaf_display, "-", "100%", orig_size_str, new_size_str_check, change_percent_str_check, completed_date))
+                        self.encoding_queue.put(("tag", item_id, "needs_check"))
+                        self.encoding_queue.put(("progress_bar", 0))  # Az érték dinamikusan számolódik
                             
-                            with console_redirect(self.svt_logger):
-                                print(f"\n⚠ SVT-AV1 validáció sikertelen, ellenőrizendő: {video_path.name}\n")
-                        else:
-                            current_values = self.tree.item(item_id, 'values')
-                            completed_date = current_values[self.COLUMN_INDEX['completed_date']] if len(current_values) > self.COLUMN_INDEX['completed_date'] else ""
-                            # Becsült befejezési idő törlése
-                            if item_id in self.estimated_end_dates:
-                                del self.estimated_end_dates[item_id]
+                        with console_redirect(self.svt_logger):
+                            print(f"\n⚠ SVT-AV1 validáció sikertelen, ellenőrizendő: {video_path.name}\n")
+                    else:
+                        current_values = self.tree.item(item_id, 'values')
+                        completed_date = current_values[self.COLUMN_INDEX['completed_date']] if len(current_values) > self.COLUMN_INDEX['completed_date'] else ""
+                        # Becsült befejezési idő törlése
+                        if item_id in self.estimated_end_dates:
+                            del self.estimated_end_dates[item_id]
                             
-                            self.encoding_queue.put(("update", item_id, t('status_failed'), "-", "-", "-", "-", orig_size_str, "-", "-", completed_date))
-                            self.encoding_queue.put(("tag", item_id, "failed"))
-                            self.encoding_queue.put(("progress_bar", 0))  # Az érték dinamikusan számolódik
+                        self.encoding_queue.put(("update", item_id, t('status_failed'), "-", "-", "-", "-", orig_size_str, "-", "-", completed_date))
+                        self.encoding_queue.put(("tag", item_id, "failed"))
+                        self.encoding_queue.put(("progress_bar", 0))  # Az érték dinamikusan számolódik
                             
-                            if output_file.exists() and not DEBUG_MODE:
-                                output_file.unlink()
+                        if output_file.exists() and not DEBUG_MODE:
+                            output_file.unlink()
                             
-                            with console_redirect(self.svt_logger):
-                                print(f"\n✗ SVT-AV1 kódolás sikertelen: {video_path.name}\n")
-                    else:
-                        # ========================================================================
-                        # COPY FALLBACK: Encoding sikertelen → Változatlan másolás
-                        # ========================================================================
                         with console_redirect(self.svt_logger):
-                            print(f"\n⚠ SVT-AV1 kódolás sikertelen: {video_path.name}")
-                            print(f"   → Változatlan másolás (eredeti kiterjesztés megtartva)...\n")
+                            print(f"\n✗ SVT-AV1 kódolás sikertelen: {video_path.name}\n")
+                else:
+                    # ========================================================================
+                    # COPY FALLBACK: Encoding sikertelen → Változatlan másolás
+                    # ========================================================================
+                    with console_redirect(self.svt_logger):
+                        print(f"\n⚠ SVT-AV1 kódolás sikertelen: {video_path.name}")
+                        print(f"   → Változatlan másolás (eredeti kiterjesztés megtartva)...\n")
                         
-                        # Generate copy destination with ORIGINAL extension
-                        copy_dest = get_copy_filename(video_path, self.source_path, self.dest_path)
+                    # Generate copy destination with ORIGINAL extension
+                    copy_dest = get_copy_filename(video_path, self.source_path, self.dest_path)
                         
-                        # Perform copy with validated subtitles
-                        copy_success = copy_video_fallback(
-                            video_path,
-                            copy_dest,
-                            subtitle_files,  # Valid subtitles only
-                            logger=self.svt_logger
-                        )
+                    # Perform copy with validated subtitles
+                    copy_success = copy_video_fallback(
+                        video_path,
+                        copy_dest,
+                        subtitle_files,  # Valid subtitles only
+                        logger=self.svt_logger
+                    )
                         
-                        if copy_success:
-                            # Calculate sizes
-                            try:
-                                orig_size_mb, new_size_mb, change_percent = self.calculate_file_sizes(
-                                    video_path, copy_dest
-                                )
-                                orig_size_display = f"{format_localized_number(orig_size_mb, decimals=1)} MB"
-                                new_size_display = f"{format_localized_number(new_size_mb, decimals=1)} MB"
-                                change_display = "0%"  # No change
-                            except Exception as e:
-                                with console_redirect(self.svt_logger):
-                                    print(f"⚠ Méretszámítás hiba: {e}")
-                                orig_size_mb = video_path.stat().st_size / (1024**2)
-                                new_size_mb = orig_size_mb
-                                change_percent = 0
-                                orig_size_display = f"{format_localized_number(orig_size_mb, decimals=1)} MB"
-                                new_size_display = orig_size_display
-                                change_display = "0%"
+                    if copy_success:
+                        # Calculate sizes
+                        try:
+                            orig_size_mb, new_size_mb, change_percent = self.calculate_file_sizes(
+                                video_path, copy_dest
+                            )
+                            orig_size_display = f"{format_localized_number(orig_size_mb, decimals=1)} MB"
+                            new_size_display = f"{format_localized_number(new_size_mb, decimals=1)} MB"
+                            change_display = "0%"  # No change
+                        except Exception as e:
+                            with console_redirect(self.svt_logger):
+                                print(f"⚠ Méretszámítás hiba: {e}")
+                            orig_size_mb = video_path.stat().st_size / (1024**2)
+                            new_size_mb = orig_size_mb
+                            change_percent = 0
+                            orig_size_display = f"{format_localized_number(orig_size_mb, decimals=1)} MB"
+                            new_size_display = orig_size_display
+                            change_display = "0%"
                             
-                            # Mark as completed (copied) in tree
-                            completed_date_copy = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                            self.encoding_queue.put((
-                                "update", 
-                                item_id, 
-                                t('status_completed_copy'),  # "✓ Kész (másolva)"
-                                "-",  # No CQ
-                                "-",  # No VMAF
-                                "-",  # No PSNR
-                                "100%",  # Progress
-                                orig_size_display,
-                                new_size_display,
-                                change_display,
-                                completed_date_copy
-                            ))
-                            self.encoding_queue.put(("tag", item_id, "completed"))
-                            self.encoding_queue.put(("progress_bar", 0))
+                        # Mark as completed (copied) in tree
+                        completed_date_copy = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                        self.encoding_queue.put((
+                            "update", 
+                            item_id, 
+                            t('status_completed_copy'),  # "✓ Kész (másolva)"
+                            "-",  # No CQ
+                            "-",  # No VMAF
+                            "-",  # No PSNR
+                            "100%",  # Progress
+                            orig_size_display,
+                            new_size_display,
+                            change_display,
+                            completed_date_copy
+                        ))
+                        self.encoding_queue.put(("tag", item_id, "completed"))
+                        self.encoding_queue.put(("progress_bar", 0))
+                            
+                        # Update video_to_output mapping (CRITICAL!)
+                        self.video_to_output[video_path] = copy_dest
                             
-                            # Update video_to_output mapping (CRITICAL!)
-                            self.video_to_output[video_path] = copy_dest
+                        # Copy invalid subtitles too
+                        try:
+                            self._copy_invalid_subtitles(invalid_subtitles, copy_dest)
+                        except Exception as e:
+                            with console_redirect(self.svt_logger):
+                                print(f"⚠ Érvénytelen feliratok másolása hiba: {e}")
                             
-                            # Copy invalid subtitles too
+                        # Database update in background thread
+                        def update_db_after_copy():
                             try:
-                                self._copy_invalid_subtitles(invalid_subtitles, copy_dest)
+                                self.update_single_video_in_db(
+                                    video_path, item_id, t('status_completed_copy'),
+                                    "-", "-", "-",
+                                    orig_size_display, new_size_mb, change_percent, completed_date_copy
+                                )
                             except Exception as e:
-                                with console_redirect(self.svt_logger):
-                                    print(f"⚠ Érvénytelen feliratok másolása hiba: {e}")
-                            
-                            # Database update in background thread
-                            def update_db_after_copy():
-                                try:
-                                    self.update_single_video_in_db(
-                                        video_path, item_id, t('status_completed_copy'),
-                                        "-", "-", "-",
-                                        orig_size_display, new_size_mb, change_percent, completed_date_copy
-                                    )
-                                except Exception as e:
-                                    if LOG_WRITER:
-                                        try:
-                                            LOG_WRITER.write(f"⚠ [copy] Adatbázis frissítés hiba: {e} | video: {video_path}\n")
-                                            LOG_WRITER.flush()
-                                        except Exception:
-                                            pass
+                                if LOG_WRITER:
+                                    try:
+                                        LOG_WRITER.write(f"⚠ [copy] Adatbázis frissítés hiba: {e} | video: {video_path}\n")
+                                        LOG_WRITER.flush()
+                                    except Exception:
+                                        pass
                             
-                            db_thread = threading.Thread(target=update_db_after_copy, daemon=True)
-                            db_thread.start()
+                        db_thread = threading.Thread(target=update_db_after_copy, daemon=True)
+                        db_thread.start()
                             
-                            with console_redirect(self.svt_logger):
-                                orig_mb_str = format_localized_number(orig_size_mb, decimals=1)
-                                print(f"\n✓ Videó változatlan másolva: {video_path.name}")
-                                print(f"  {orig_mb_str} MB (nincs méretváltozás)\n")
-                        else:
-                            # Copy also failed - mark as failed
-                            completed_date = ""
-                            self.encoding_queue.put((
-                                "update",
-                                item_id,
-                                "✗ Hiba (másolás sikertelen)",
-                                "-", "-", "-", "-",
-                                orig_size_str, "-", "-", completed_date
-                            ))
-                            self.encoding_queue.put(("tag", item_id, "failed"))
-                            self.encoding_queue.put(("progress_bar", 0))
+                        with console_redirect(self.svt_logger):
+                            orig_mb_str = format_localized_number(orig_size_mb, decimals=1)
+                            print(f"\n✓ Videó változatlan másolva: {video_path.name}")
+                            print(f"  {orig_mb_str} MB (nincs méretváltozás)\n")
+                    else:
+                        # Copy also failed - mark as failed
+                        completed_date = ""
+                        self.encoding_queue.put((
+                            "update",
+                            item_id,
+                            "✗ Hiba (másolás sikertelen)",
+                            "-", "-", "-", "-",
+                            orig_size_str, "-", "-", completed_date
+                        ))
+                        self.encoding_queue.put(("tag", item_id, "failed"))
+                        self.encoding_queue.put(("progress_bar", 0))
                             
-                            with console_redirect(self.svt_logger):
-                                print(f"\n✗ Másolás is sikertelen: {video_path.name}\n")
+                        with console_redirect(self.svt_logger):
+                            print(f"\n✗ Másolás is sikertelen: {video_path.name}\n")
                     
-                    with console_redirect(self.svt_logger):
-                        print(f"✓ SVT-AV1 slot felszabadítva\n")
+                with console_redirect(self.svt_logger):
+                    print(f"✓ SVT-AV1 slot felszabadítva\n")
             
             SVT_QUEUE.task_done()
         
@@ -15299,6 +22027,8 @@ class VideoEncoderGUI:
                 max_encoded = task['max_encoded']
                 resize_enabled = task.get('resize_enabled', False)
                 resize_height = task.get('resize_height', 1080)
+                # Opt-in: a metrikák a kódolással egy folyamatban készülnek (metrika cache-be), csak az elfogadott próbálkozásnál
+                inline_metrics = bool(self.auto_inline_metrics.get())
                 audio_compression_enabled = task.get('audio_compression_enabled', self.audio_compression_enabled.get())
                 audio_compression_method = task.get('audio_compression_method', self.audio_compression_method.get())
                 # Ha a combobox értéke fordított szöveg, konvertáljuk
@@ -15476,7 +22206,7 @@ class VideoEncoderGUI:
                 
                 current_values = self.tree.item(item_id, 'values')
                 completed_date = current_values[self.COLUMN_INDEX['completed_date']] if len(current_values) > self.COLUMN_INDEX['completed_date'] else ""
-                vmaf_display = format_localized_number(vmaf_value_nvenc, decimals=1) if vmaf_value_nvenc is not None else "-"
+                vmaf_display = format_search_vmaf(vmaf_value_nvenc)
                 self.encoding_queue.put(("update", item_id, "NVENC kódolás...", str(int(cq_value_nvenc)), vmaf_display, "-", "-", orig_size_str, "-", "-", completed_date))
                 self.encoding_queue.put(("tag", item_id, "encoding_nvenc"))
                 
@@ -15523,7 +22253,7 @@ class VideoEncoderGUI:
                         print(f"🎬 NVENC kódolás kezdése: {video_path.name}")
                         print(f"   Teljes útvonal: {video_path_abs_check}")
                         print(f"   Cél fájl: {output_file.absolute()}")
-                        success_nvenc = encode_video(video_path, output_file, cq_value_nvenc, subtitle_files, 'av1_nvenc', progress_callback, initial_min_vmaf, vmaf_step, max_encoded, stop_event=STOP_EVENT, vmaf_value=vmaf_value_nvenc, resize_enabled=resize_enabled, resize_height=resize_height, audio_compression_enabled=audio_compression_enabled, audio_compression_method=audio_compression_method, logger=nvenc_logger)
+                        success_nvenc = encode_video(video_path, output_file, cq_value_nvenc, subtitle_files, 'av1_nvenc', progress_callback, initial_min_vmaf, vmaf_step, max_encoded, stop_event=STOP_EVENT, vmaf_value=vmaf_value_nvenc, resize_enabled=resize_enabled, resize_height=resize_height, audio_compression_enabled=audio_compression_enabled, audio_compression_method=audio_compression_method, logger=nvenc_logger, inline_metrics=inline_metrics)
                 except NVENCFallbackRequired:
                     nvenc_fallback_requested = True
                     success_nvenc = False
@@ -15641,7 +22371,7 @@ class VideoEncoderGUI:
                         continue
                     
                     completed_date = current_values[self.COLUMN_INDEX['completed_date']] if len(current_values) > self.COLUMN_INDEX['completed_date'] else ""
-                    vmaf_display = format_localized_number(vmaf_value_nvenc, decimals=1) if vmaf_value_nvenc is not None else "-"
+                    vmaf_display = format_search_vmaf(vmaf_value_nvenc)
                     self.encoding_queue.put(("update", item_id, "NVENC validálás...", str(int(cq_value_nvenc)), vmaf_display, "-", "100%", orig_size_str, "-", "-", completed_date))
                     
                     if not self.is_encoding:
@@ -15761,7 +22491,7 @@ class VideoEncoderGUI:
                     orig_size_mb, new_size_mb, change_percent = self.calculate_file_sizes(video_path, output_file)
                     orig_size_display = f"{format_localized_number(orig_size_mb, decimals=1)} MB"
                     status_text = get_completed_status_for_encoder(used_encoder)
-                    final_vmaf_display = format_localized_number(final_vmaf, decimals=1)
+                    final_vmaf_display = format_search_vmaf(final_vmaf)
                     self.mark_encoding_completed(item_id, status_text, str(int(final_cq)), final_vmaf_display, "-", orig_size_display, new_size_mb, change_percent)
                     self._copy_invalid_subtitles(invalid_subtitles, output_file)
                     
@@ -15882,6 +22612,13 @@ class VideoEncoderGUI:
             orig_size_str = task['orig_size_str']
             check_vmaf = bool(task.get('check_vmaf', True))
             check_psnr = bool(task.get('check_psnr', True))
+
+            # OPTIMALIZÁCIÓ: batch pipeline - amíg ez a pár mérődik, a következő VMAF_PREFETCH_LOOKAHEAD
+            # pár fájljai a page cache-be kerülnek és a probe elkészül (hálózati tárolón sokat számít; hash nem fut)
+            if VMAF_PREFETCH_LOOKAHEAD > 0:
+                with VMAF_QUEUE.mutex:
+                    upcoming_tasks = list(VMAF_QUEUE.queue)[:VMAF_PREFETCH_LOOKAHEAD]
+                VMAF_PREFETCHER.schedule(upcoming_tasks)
             if not check_vmaf and not check_psnr:
                 check_vmaf = True
 
@@ -15922,8 +22659,23 @@ class VideoEncoderGUI:
                 VMAF_QUEUE.task_done()
                 continue
             
-            # KRITIKUS: CPU worker lock - biztosítja, hogy csak 1 CPU worker (SVT-AV1 vagy VMAF/PSNR) fusson egyszerre
-            with CPU_WORKER_LOCK:
+            # OPTIMALIZÁCIÓ: metrika cache - ha sem a forrás, sem a kódolt fájl videó tartalma nem változott
+            # (DB visszaállítás, csak metaadat átírás után is), a tárolt érték jön, dekódolás és CPU lock nélkül
+            # FONTOS: csak a már ismert ujjlenyomatokkal (compute=False) - a teljes fájl hash nem kerülhet
+            # minden mérés elé; a hash a mérés után, üresjáratban fut (METRIC_CACHE.store_when_idle)
+            cache_metric_names = (['VMAF'] if check_vmaf else []) + (['PSNR'] if check_psnr else [])
+            with console_redirect(self.svt_logger):
+                metric_fingerprints = METRIC_CACHE.fingerprints(video_path, output_file, compute=False)
+                cached_metrics = METRIC_CACHE.lookup(video_path, output_file, cache_metric_names,
+                                                     fingerprints=metric_fingerprints) if metric_fingerprints else None
+            if STOP_EVENT.is_set():
+                VMAF_QUEUE.task_done()
+                VMAF_QUEUE.put(task)
+                continue
+
+            # KRITIKUS: CPU mag keret - a VMAF/PSNR annyi szálon fut, amennyi magot az ütemező kiosztott
+            # (cache találatnál nincs CPU munka, nem foglalunk magot)
+            with (nullcontext(0) if cached_metrics else CORE_SCHEDULER.reserve(get_metric_core_budget(), minimum=METRIC_MIN_CORES, label=f"VMAF {video_path.name}")) as metric_cores:
                 # KRITIKUS: A lock-on belül dolgozunk, hogy egyesével történjen a feldolgozás
                 # és csak az aktív videó legyen "folyamatban" státuszban
                 # Slot megszerzése - egyesével dolgozunk
@@ -15989,7 +22741,7 @@ class VideoEncoderGUI:
                 if video_duration_seconds is not None and video_duration_seconds <= 0:
                     video_duration_seconds = None
                 total_duration_str = format_seconds_hms(video_duration_seconds) if video_duration_seconds else None
-                metric_results = {'vmaf': None, 'psnr': None}
+                metric_results = {'vmaf': None, 'psnr': None, 'psnr_variant': None}
                 metadata_updated_once = False
                 current_progress_message = "-"
                 current_status_display = t('status_vmaf_calculating')
@@ -16018,8 +22770,9 @@ class VideoEncoderGUI:
                         if check_psnr:
                             current_status_display = t('status_psnr_only')
                         push_partial_update()
-                    elif metric_upper in ('PSNR', 'XPSNR'):
+                    elif metric_upper in ('PSNR', 'XPSNR', 'PSNR_Y'):
                         metric_results['psnr'] = value
+                        metric_results['psnr_variant'] = metric_upper
                         callback_psnr_str = format_metric_value(value)
                         pending_psnr = False
                         if metric_results['vmaf'] is None:
@@ -16084,8 +22837,8 @@ class VideoEncoderGUI:
                     current_progress_message = progress_display
                     self.encoding_queue.put(("update", item_id, status, callback_cq_str, callback_vmaf_str, callback_psnr_str, progress_display, callback_orig_size_str, callback_new_size_str, callback_size_change, completed_date_to_use))
                 
-                # KRITIKUS: A calculate_full_vmaf() hívás a CPU_WORKER_LOCK-on BELÜL történik,
-                # hogy ne fusson egyszerre SVT-AV1 és VMAF számítás
+                # KRITIKUS: A calculate_full_vmaf() hívás a mag foglaláson BELÜL történik,
+                # hogy az SVT-AV1 és a VMAF együtt se lépje túl a CPU keretet
                 # De a VMAF_LOCK-ot kiengedjük, hogy ne blokkoljuk a státusz frissítéseket
                 try:
                     # VMAF számítás SVT-AV1 konzolba (CPU-s worker)
@@ -16093,16 +22846,57 @@ class VideoEncoderGUI:
                         print(f"\n{'='*80}")
                         print(f"📊 VMAF/PSNR TESZT: {video_path.name}")
                         print(f"{'='*80}")
-                        vmaf_result = calculate_full_vmaf(
-                            video_path,
-                            output_file,
-                            progress_callback,
-                            STOP_EVENT,
-                            logger=self.svt_logger,
-                            check_vmaf=check_vmaf,
-                            check_psnr=check_psnr,
-                            metric_done_callback=metric_done_callback
-                        )
+                        vmaf_result = None
+                        sampled_estimate = None
+                        if cached_metrics:
+                            # A PSNR a cache-ben talált változat nevén jön (XPSNR / PSNR / PSNR_Y)
+                            cached_psnr_variant = next((variant for variant in PSNR_VARIANTS if variant in cached_metrics), None)
+                            metric_results['psnr_variant'] = cached_psnr_variant
+                            vmaf_result = (cached_metrics.get('VMAF'), cached_metrics.get(cached_psnr_variant))
+                            print(f"⚡ Metrika cache találat (változatlan tartalom): "
+                                  + " / ".join(f"{name}: {format_metric_value(value)}" for name, value in cached_metrics.items()))
+                        # OPTIMALIZÁCIÓ: gyors mód - K rövid klip mintavételes becslése konfidencia intervallummal,
+                        # teljes mérés csak ha az intervallum átfedi a min VMAF küszöböt (vagy túl rövid a videó)
+                        elif task.get('sampled') and check_vmaf:
+                            try:
+                                sampled_estimate = calculate_sampled_vmaf(
+                                    video_path, output_file, check_psnr=check_psnr, progress_callback=progress_callback,
+                                    stop_event=STOP_EVENT, logger=self.svt_logger, core_budget=metric_cores)
+                            except EncodingStopped:
+                                raise
+                            except Exception as e:
+                                print(f"⚠ Mintavételes VMAF hiba: {e} – teljes mérés")
+                                sampled_estimate = None
+                            if sampled_estimate:
+                                estimate = sampled_estimate['VMAF']
+                                print(f"≈ Mintavételes VMAF: {format_metric_value(estimate['mean'])} "
+                                      f"(95% CI: {format_metric_value(estimate['ci_low'])} – {format_metric_value(estimate['ci_high'])}, "
+                                      f"{sampled_estimate['clips']} klip)")
+                                task_min_vmaf = task.get('min_vmaf')
+                                if task.get('escalate', VMAF_SAMPLE_ESCALATE) and not sampled_vmaf_is_conclusive(estimate, task_min_vmaf):
+                                    print(f"⚠ A konfidencia intervallum átfedi a min VMAF-ot ({format_metric_value(task_min_vmaf)}) → teljes mérés")
+                                    sampled_estimate = None
+                                else:
+                                    sampled_psnr = sampled_estimate['PSNR_Y']['mean'] if sampled_estimate.get('PSNR_Y') else None
+                                    if sampled_psnr is not None:
+                                        psnr_estimate = sampled_estimate['PSNR_Y']
+                                        print(f"≈ Mintavételes PSNR_Y: {format_metric_value(sampled_psnr)} "
+                                              f"(95% CI: {format_metric_value(psnr_estimate['ci_low'])} – {format_metric_value(psnr_estimate['ci_high'])})")
+                                    vmaf_result = (estimate['mean'], sampled_psnr)
+                                    # A CI-vel együtt tárolva (a Settings metaadatba / metrika cache-be nem kerül)
+                                    store_sampled_estimate(output_file, sampled_estimate)
+                        if vmaf_result is None:
+                            vmaf_result = calculate_full_vmaf(
+                                video_path,
+                                output_file,
+                                progress_callback,
+                                STOP_EVENT,
+                                logger=self.svt_logger,
+                                check_vmaf=check_vmaf,
+                                check_psnr=check_psnr,
+                                metric_done_callback=metric_done_callback,
+                                core_budget=metric_cores
+                            )
                         if vmaf_result:
                             vmaf_value, psnr_value = vmaf_result
                         else:
@@ -16117,12 +22911,23 @@ class VideoEncoderGUI:
                         metrics_ok = False
                     
                     if metrics_ok:
-                        if not metadata_updated_once and final_vmaf_value is not None:
+                        # Mintavételes becslés nem kerül a fájl metaadatába ("Actual VMAF" csak teljes mérésből)
+                        if not metadata_updated_once and final_vmaf_value is not None and not sampled_estimate:
                             with console_redirect(self.svt_logger):
                                 update_video_metadata_vmaf(output_file, final_vmaf_value, psnr_value=final_psnr_value, logger=self.svt_logger)
                                 metadata_updated_once = True
+                        # A metaadat átírás UTÁN: a halasztott mentés az aktuális stat azonosítót rögzíti
+                        if not cached_metrics and not sampled_estimate:
+                            METRIC_CACHE.store_when_idle(video_path, output_file, {
+                                'VMAF': final_vmaf_value if check_vmaf else None,
+                                # Ismeretlen változatú PSNR nem kerül a cache-be (nem tudnánk, mivel vethető össze)
+                                'PSNR': final_psnr_value if check_psnr and metric_results['psnr_variant'] else None,
+                            }, psnr_variant=metric_results['psnr_variant'])
                         # Célfájl információinak kiolvasása (CQ/CRF, fájlméret, változás)
                         output_cq_crf, output_vmaf_meta, output_psnr_meta, output_frame_count, output_file_size, output_modified_date, output_encoder_type, _, _ = get_output_file_info(output_file)
+                        if check_vmaf and final_vmaf_value is not None and not sampled_estimate:
+                            # Keresés nélküli (becsült) CRF ellenőrzése a teljes VMAF-fal
+                            CRF_PREDICTOR.verify_skip(video_path, output_encoder_type, output_cq_crf, final_vmaf_value, logger=self.svt_logger)
                         
                         # CQ/CRF érték - ha van a célfájlban, azt használjuk, különben az eredeti
                         final_cq_str = original_cq_str
@@ -16131,16 +22936,14 @@ class VideoEncoderGUI:
                         elif final_cq_str == "-":
                             # Ha az eredeti is "-", próbáljuk a metaadatból kiolvasni
                             try:
-                                probe_cmd = [FFPROBE_PATH, '-v', 'error', '-show_entries', 'format_tags=Settings', '-of', 'default=noprint_wrappers=1:nokey=1', os.fspath(output_file.absolute())]
-                                result = subprocess.run(probe_cmd, capture_output=True, text=True, timeout=5)
-                                settings_metadata = result.stdout.strip()
+                                settings_metadata = probe_media_header(output_file.absolute()).settings
                                 cq_match = re.search(r'CQ:(\d+)', settings_metadata)
                                 crf_match = re.search(r'CRF:(\d+)', settings_metadata)
                                 if cq_match:
                                     final_cq_str = cq_match.group(1)
                                 elif crf_match:
                                     final_cq_str = crf_match.group(1)
-                            except (AttributeError, ValueError, TypeError):
+                            except (AttributeError, ValueError, TypeError, subprocess.SubprocessError, OSError):
                                 pass
                         
                         # Fájlméret és változás - ha van a célfájlban, azt használjuk
@@ -16182,9 +22985,7 @@ class VideoEncoderGUI:
                                     status = t('status_completed')
                             else:
                                 try:
-                                    probe_cmd = [FFPROBE_PATH, '-v', 'error', '-show_entries', 'format_tags=Settings', '-of', 'default=noprint_wrappers=1:nokey=1', os.fspath(output_file.absolute())]
-                                    result = subprocess.run(probe_cmd, capture_output=True, text=True, timeout=5)
-                                    settings_metadata = result.stdout.strip()
+                                    settings_metadata = probe_media_header(output_file.absolute()).settings
                                     if 'SVT-AV1' in settings_metadata or 'svt-av1' in settings_metadata.lower():
                                         status = t('status_completed_svt')
                                     elif 'NVENC' in settings_metadata:
@@ -16215,6 +23016,11 @@ class VideoEncoderGUI:
                         else:
                             vmaf_display = format_metric_value(final_vmaf_value) if final_vmaf_value is not None else (format_metric_value(output_vmaf_meta) if output_vmaf_meta is not None else callback_vmaf_str)
                             psnr_display = callback_psnr_str if callback_psnr_str not in ("", None, "-") else "-"
+                        if sampled_estimate:
+                            # Mintavételes becslés: '≈' jelöli a táblázatban és az adatbázisban is (nem mérés)
+                            vmaf_display = f"≈{format_metric_value(final_vmaf_value)}"
+                            if final_psnr_value is not None:
+                                psnr_display = f"≈{format_metric_value(final_psnr_value)}"
                         self.encoding_queue.put(("update", item_id, status, final_cq_str, vmaf_display, psnr_display, "100%", orig_size_str, final_new_size_str, final_size_change, final_completed_date))
                         
                         self.encoding_queue.put(("tag", item_id, "completed"))
@@ -16267,7 +23073,10 @@ class VideoEncoderGUI:
                             schedule_vmaf_idle()
                         
                         with console_redirect(self.svt_logger):
-                            if check_psnr and final_psnr_value is not None:
+                            if sampled_estimate:
+                                print(f"\n✓ Mintavételes becslés kész: {video_path.name} - VMAF: {vmaf_display}"
+                                      + (f" / PSNR_Y: {psnr_display}" if final_psnr_value is not None else "") + "\n")
+                            elif check_psnr and final_psnr_value is not None:
                                 print(f"\n✓ VMAF/PSNR teszt kész: {video_path.name} - VMAF: {format_metric_value(final_vmaf_value) if final_vmaf_value is not None else '-'} / PSNR: {format_metric_value(final_psnr_value)}\n")
                             elif final_vmaf_value is not None and check_vmaf:
                                 print(f"\n✓ VMAF teszt kész: {video_path.name} - VMAF: {format_metric_value(final_vmaf_value)}\n")
@@ -16394,9 +23203,18 @@ if __name__ == "__main__":
     force_console = False
     short_test = os.environ.get("AV1_SHORT_TEST") == "1"
     load_debug_flag = LOAD_DEBUG
+    benchmark_crf_search = False
+    benchmark_encoder = 'svt-av1'
     cleaned_args = [sys.argv[0]]
     for arg in sys.argv[1:]:
         arg_lower = arg.lower()
+        if arg_lower in ("--benchmark-crf-search", "-benchmarkcrfsearch"):
+            # Konzolos mód: natív vs. ab-av1 CRF keresés a megadott fájlokon, GUI nélkül
+            benchmark_crf_search = True
+            continue
+        if arg_lower.startswith("--benchmark-encoder="):
+            benchmark_encoder = arg.split("=", 1)[1]
+            continue
         if arg_lower in ("-forceconsole", "--forceconsole", "--force-console"):
             force_console = True
             continue
@@ -16418,6 +23236,12 @@ if __name__ == "__main__":
         os.environ["AV1_LOAD_DEBUG"] = "1"
         globals()['LOAD_DEBUG'] = True
     sys.argv = cleaned_args
+    if benchmark_crf_search:
+        # KRITIKUS: ugyanaz a DB és ugyanazok az eszköz útvonalak, mint a GUI-ban (különben PATH alapértelmezés)
+        benchmark_db_path = prepare_console_environment()
+        print(f"ℹ Adatbázis: {benchmark_db_path} | FFmpeg: {FFMPEG_PATH} | ab-av1: {ABAV1_PATH}")
+        benchmark_crf_search_engines([Path(arg) for arg in cleaned_args[1:]], encoder=benchmark_encoder)
+        sys.exit(0)
     # Naplózás fájlba - ELŐBB mentjük az eredeti stdout/stderr-t
     original_stdout = sys.__stdout__  # Eredeti stdout (nem a ThreadSafeStdoutRouter)
     original_stderr = sys.__stderr__  # Eredeti stderr